@@ -11,6 +11,7 @@ from agent0.chainsync.test_fixtures import database_engine, db_session, dummy_se
 from agent0.core.test_utils import cycle_trade_policy
 from agent0.test_fixtures import (
     chain_fixture,
+    deployment_cache_dir,
     fast_chain_fixture,
     fast_hyperdrive_fixture,
     hyperdrive_fixture,
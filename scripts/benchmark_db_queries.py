@@ -0,0 +1,214 @@
+"""Script to benchmark the hot chainsync queries against an existing database.
+
+For each query, this reports the best wall clock time over a number of runs, along with the
+postgres query plan of each sql statement the query issues. Run this before and after
+`partition_db.py` to compare plans on a production sized database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from typing import Any, Callable, NamedTuple, Sequence
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from agent0.chainsync.db.base import initialize_session
+from agent0.chainsync.db.hyperdrive import (
+    DBTradeEvent,
+    get_current_positions,
+    get_latest_block_number_from_trade_event,
+    get_pool_info,
+    get_position_snapshot,
+    get_positions_over_time,
+    get_trade_events,
+)
+from agent0.hyperlogs import setup_logging
+
+
+def _capture_statements(session: Session, fn: Callable[[], Any]) -> list[tuple[str, Any]]:
+    statements: list[tuple[str, Any]] = []
+
+    def _before_cursor_execute(_conn, _cursor, statement, parameters, _context, _executemany):
+        statements.append((statement, parameters))
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+    return statements
+
+
+def benchmark_query(session: Session, name: str, fn: Callable[[], Any], num_runs: int, explain: bool) -> float:
+    """Time a query and log its query plans.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    name: str
+        The name of the query to report.
+    fn: Callable[[], Any]
+        The function issuing the query.
+    num_runs: int
+        The number of times to run the query.
+    explain: bool
+        If True, will log the query plan of each sql statement the query issues.
+
+    Returns
+    -------
+    float
+        The best wall clock time of the query in seconds.
+    """
+    best_time = float("inf")
+    for _ in range(num_runs):
+        start_time = time.perf_counter()
+        fn()
+        best_time = min(best_time, time.perf_counter() - start_time)
+    logging.info("%s: %.4fs", name, best_time)
+
+    if explain:
+        for statement, parameters in _capture_statements(session, fn):
+            plan = session.connection().exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+            logging.info("%s plan:\n%s", name, "\n".join(row[0] for row in plan))
+        session.rollback()
+    return best_time
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Run the benchmarks.
+
+    Arguments
+    ---------
+    argv: Sequence[str]
+        The command line arguments.
+    """
+    parsed_args = parse_arguments(argv)
+    setup_logging(log_stdout=True)
+
+    # This reads the .env file for database credentials
+    db_session = initialize_session()
+
+    # Benchmark against the pool and wallet with the most trades
+    hyperdrive_address, wallet_address = (
+        db_session.query(DBTradeEvent.hyperdrive_address, DBTradeEvent.wallet_address)
+        .group_by(DBTradeEvent.hyperdrive_address, DBTradeEvent.wallet_address)
+        .order_by(func.count().desc())  # pylint: disable=not-callable
+        .first()
+    ) or (None, None)
+    if hyperdrive_address is None:
+        raise ValueError("No trade events in the database to benchmark against.")
+    latest_block = get_latest_block_number_from_trade_event(db_session, hyperdrive_address, wallet_address=None)
+    start_block = max(latest_block - parsed_args.block_range, 0)
+    logging.info(
+        "Benchmarking pool %s, wallet %s, blocks %s to %s",
+        hyperdrive_address,
+        wallet_address,
+        start_block,
+        latest_block,
+    )
+
+    queries: dict[str, Callable[[], Any]] = {
+        "get_trade_events(wallet)": lambda: get_trade_events(
+            db_session, wallet_address=wallet_address, hyperdrive_address=hyperdrive_address
+        ),
+        "get_current_positions(wallet)": lambda: get_current_positions(
+            db_session, wallet_addr=wallet_address, hyperdrive_address=hyperdrive_address, query_block=latest_block
+        ),
+        "get_current_positions(pool)": lambda: get_current_positions(
+            db_session, hyperdrive_address=hyperdrive_address, query_block=latest_block
+        ),
+        "get_pool_info(block range)": lambda: get_pool_info(
+            db_session, hyperdrive_address=hyperdrive_address, start_block=start_block
+        ),
+        "get_position_snapshot(latest)": lambda: get_position_snapshot(
+            db_session, hyperdrive_address=hyperdrive_address, latest_entry=True
+        ),
+        "get_position_snapshot(wallet, block range)": lambda: get_position_snapshot(
+            db_session, hyperdrive_address=hyperdrive_address, wallet_address=wallet_address, start_block=start_block
+        ),
+        "get_positions_over_time(wallet, block range)": lambda: get_positions_over_time(
+            db_session, wallet_address=[wallet_address], start_block=start_block
+        ),
+    }
+    for name, fn in queries.items():
+        benchmark_query(db_session, name, fn, num_runs=parsed_args.num_runs, explain=not parsed_args.no_explain)
+
+    db_session.close()
+
+
+class Args(NamedTuple):
+    """Command line arguments for the script."""
+
+    block_range: int
+    num_runs: int
+    no_explain: bool
+
+
+def namespace_to_args(namespace: argparse.Namespace) -> Args:
+    """Converts argprase.Namespace to Args.
+
+    Arguments
+    ---------
+    namespace: argparse.Namespace
+        Object for storing arg attributes.
+
+    Returns
+    -------
+    Args
+        Formatted arguments
+    """
+    return Args(
+        block_range=namespace.block_range,
+        num_runs=namespace.num_runs,
+        no_explain=namespace.no_explain,
+    )
+
+
+def parse_arguments(argv: Sequence[str] | None = None) -> Args:
+    """Parses input arguments.
+
+    Arguments
+    ---------
+    argv: Sequence[str]
+        The argv values returned from argparser.
+
+    Returns
+    -------
+    Args
+        Formatted arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks hot chainsync queries and logs their query plans.")
+    parser.add_argument(
+        "--block-range",
+        type=int,
+        default=10000,
+        help="The number of blocks before the latest block to use for block range queries. Default is 10000.",
+    )
+    parser.add_argument(
+        "--num-runs",
+        type=int,
+        default=5,
+        help="The number of times to run each query. Default is 5.",
+    )
+    parser.add_argument(
+        "--no-explain",
+        default=False,
+        action="store_true",
+        help="Only report timings without query plans.",
+    )
+
+    # Use system arguments if none were passed
+    if argv is None:
+        argv = sys.argv
+
+    return namespace_to_args(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
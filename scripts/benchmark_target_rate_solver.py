@@ -0,0 +1,195 @@
+"""Script to benchmark solving for the trade that moves the fixed rate to a target rate.
+
+This compares the YieldSpace solver used by the LP and arbitrage policy against the iterative
+path that predicts trades until the rate converges. For each target rate, this reports the best
+wall clock time of each solver over a number of runs, along with the distance of the resulting
+rate from the target as computed by the pool's own math.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from typing import Callable, NamedTuple, Sequence
+
+from fixedpointmath import FixedPoint
+
+from agent0 import LocalChain, LocalHyperdrive
+from agent0.core.hyperdrive.policies.lpandarb import (
+    apply_step_to_pool_state,
+    calc_reserves_to_hit_target_rate_iteratively,
+)
+from agent0.core.hyperdrive.utilities.target_rate import calc_reserve_deltas_for_target_rate
+from agent0.ethpy.hyperdrive import HyperdriveReadInterface
+from agent0.ethpy.hyperdrive.state import PoolState
+from agent0.hyperlogs import setup_logging
+
+YEAR_IN_SECONDS = 31_536_000
+TARGET_RATES = [FixedPoint("0.01"), FixedPoint("0.04"), FixedPoint("0.0501"), FixedPoint("0.06"), FixedPoint("0.1")]
+
+
+def benchmark_solver(
+    name: str,
+    solver: Callable[..., tuple[FixedPoint, FixedPoint]],
+    interface: HyperdriveReadInterface,
+    pool_state: PoolState,
+    target_rate: FixedPoint,
+    num_runs: int,
+) -> float:
+    """Time a solver and log how close it gets to the target rate.
+
+    Arguments
+    ---------
+    name: str
+        The name of the solver to report.
+    solver: Callable[..., tuple[FixedPoint, FixedPoint]]
+        The function computing the change in shares and bonds to hit the target rate.
+    interface: HyperdriveReadInterface
+        The interface to the pool.
+    pool_state: PoolState
+        The state of the pool to solve from.
+    target_rate: FixedPoint
+        The target fixed rate.
+    num_runs: int
+        The number of times to run the solver.
+
+    Returns
+    -------
+    float
+        The best wall clock time of the solver in seconds.
+    """
+    best_time = float("inf")
+    shares_needed, bonds_needed = FixedPoint(0), FixedPoint(0)
+    for _ in range(num_runs):
+        start_time = time.perf_counter()
+        shares_needed, bonds_needed = solver(interface, pool_state, target_rate, FixedPoint(0))
+        best_time = min(best_time, time.perf_counter() - start_time)
+    # Applying a step takes unsigned shares, adding them for longs and removing them for shorts
+    solved_pool_state = apply_step_to_pool_state(pool_state, bonds_needed, abs(shares_needed))
+    rate_error = interface.calc_spot_rate(solved_pool_state) - target_rate
+    logging.info(
+        "%s to %s: %.6fs d_bonds=%s rate error=%s", name, target_rate, best_time, bonds_needed, float(rate_error)
+    )
+    return best_time
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Run the benchmarks.
+
+    Arguments
+    ---------
+    argv: Sequence[str]
+        The command line arguments.
+    """
+    parsed_args = parse_arguments(argv)
+    setup_logging(log_stdout=True)
+
+    chain = LocalChain(LocalChain.Config(chain_port=parsed_args.chain_port, db_port=parsed_args.db_port))
+    pool = LocalHyperdrive(
+        chain, LocalHyperdrive.Config(position_duration=YEAR_IN_SECONDS, initial_fixed_apr=FixedPoint("0.05"))
+    )
+    # Move the rate off the initial rate so the pool has a share adjustment
+    agent = chain.init_agent(base=FixedPoint(1_000_000), eth=FixedPoint(10), pool=pool)
+    agent.open_long(FixedPoint(50_000))
+    pool_state = pool.interface.current_pool_state
+    logging.info("Benchmarking from a fixed rate of %s", pool.interface.calc_spot_rate(pool_state))
+
+    speedups = []
+    for target_rate in TARGET_RATES:
+        iterative_time = benchmark_solver(
+            "iterative",
+            calc_reserves_to_hit_target_rate_iteratively,
+            pool.interface,
+            pool_state,
+            target_rate,
+            num_runs=parsed_args.num_runs,
+        )
+        solver_time = benchmark_solver(
+            "yieldspace",
+            # The policy solver returns trade amounts, so we time the solver's reserve deltas
+            lambda _, pool_state, target_rate, min_trade_amount_bonds: calc_reserve_deltas_for_target_rate(
+                pool_state, target_rate, min_trade_amount_bonds
+            ),
+            pool.interface,
+            pool_state,
+            target_rate,
+            num_runs=parsed_args.num_runs,
+        )
+        speedups.append(iterative_time / solver_time)
+    logging.info("Speedup: min %.1fx, max %.1fx", min(speedups), max(speedups))
+
+    chain.cleanup()
+
+
+class Args(NamedTuple):
+    """Command line arguments for the script."""
+
+    num_runs: int
+    chain_port: int
+    db_port: int
+
+
+def namespace_to_args(namespace: argparse.Namespace) -> Args:
+    """Converts argprase.Namespace to Args.
+
+    Arguments
+    ---------
+    namespace: argparse.Namespace
+        Object for storing arg attributes.
+
+    Returns
+    -------
+    Args
+        Formatted arguments
+    """
+    return Args(
+        num_runs=namespace.num_runs,
+        chain_port=namespace.chain_port,
+        db_port=namespace.db_port,
+    )
+
+
+def parse_arguments(argv: Sequence[str] | None = None) -> Args:
+    """Parses input arguments.
+
+    Arguments
+    ---------
+    argv: Sequence[str]
+        The argv values returned from argparser.
+
+    Returns
+    -------
+    Args
+        Formatted arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks solving for the trade that hits a target rate.")
+    parser.add_argument(
+        "--num-runs",
+        type=int,
+        default=5,
+        help="The number of times to run each solver. Default is 5.",
+    )
+    parser.add_argument(
+        "--chain-port",
+        type=int,
+        default=10000,
+        help="The port to run the local chain on. Default is 10000.",
+    )
+    parser.add_argument(
+        "--db-port",
+        type=int,
+        default=10001,
+        help="The port to run the database on. Default is 10001.",
+    )
+
+    # Use system arguments if none were passed
+    if argv is None:
+        argv = sys.argv
+
+    return namespace_to_args(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -331,7 +331,7 @@ async def main(argv: Sequence[str] | None = None) -> None:
     parsed_args = parse_arguments(argv)
 
     rollbar_environment_name = "checkpoint_bot"
-    log_to_rollbar = initialize_rollbar(rollbar_environment_name)
+    log_to_rollbar = initialize_rollbar(rollbar_environment_name, async_reporting=True)
 
     # Initialize
     registry_address_env = None
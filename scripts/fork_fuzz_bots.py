@@ -196,7 +196,7 @@ def main(argv: Sequence[str] | None = None) -> None:
     rpc_uri = parsed_args.rpc_uri
     registry_address = parsed_args.registry_addr
 
-    log_to_rollbar = initialize_rollbar("forkfuzzbots")
+    log_to_rollbar = initialize_rollbar("forkfuzzbots", async_reporting=True)
 
     raise_error_on_fail = False
     if parsed_args.pause_on_invariance_fail:
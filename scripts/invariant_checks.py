@@ -274,7 +274,7 @@ async def main(argv: Sequence[str] | None = None) -> None:
             raise ValueError("ws_rpc_uri must be set if `event-trigger` is set.")
 
     rollbar_environment_name = "invariant_checks"
-    log_to_rollbar = initialize_rollbar(rollbar_environment_name)
+    log_to_rollbar = initialize_rollbar(rollbar_environment_name, async_reporting=True)
 
     # Keeps track of the last time we executed an invariant check
     # There are issues with chains where sometimes the block_number
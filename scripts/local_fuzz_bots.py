@@ -115,9 +115,9 @@ def main(argv: Sequence[str] | None = None) -> None:
     parsed_args = parse_arguments(argv)
 
     if parsed_args.steth:
-        log_to_rollbar = initialize_rollbar("steth_localfuzzbots")
+        log_to_rollbar = initialize_rollbar("steth_localfuzzbots", async_reporting=True)
     else:
-        log_to_rollbar = initialize_rollbar("erc4626_localfuzzbots")
+        log_to_rollbar = initialize_rollbar("erc4626_localfuzzbots", async_reporting=True)
 
     # Negative rng_seed means default
     if parsed_args.rng_seed < 0:
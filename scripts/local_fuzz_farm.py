@@ -0,0 +1,222 @@
+"""Runs random bots against many local chains in parallel for fuzz testing."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from typing import NamedTuple, Sequence
+
+from pypechain.core import FailedTransaction, PypechainCallException
+from web3.exceptions import ContractCustomError
+
+from agent0.hyperfuzz import FuzzAssertionException
+from agent0.hyperfuzz.system_fuzz import replay_fuzz_episode, run_fuzz_farm
+from agent0.hyperlogs import setup_logging
+from agent0.hyperlogs.rollbar_utilities import initialize_rollbar
+
+
+def _fuzz_ignore_errors(exc: Exception) -> bool:
+    """Function defining errors to ignore during fuzzing.
+
+    This needs to be defined at the module level, as it's passed to the worker processes.
+    """
+    # pylint: disable=too-many-return-statements
+    # Ignored fuzz exceptions
+    if isinstance(exc, FuzzAssertionException):
+        # LP rate invariance check
+        if (
+            len(exc.args) >= 2
+            and exc.args[0] == "Continuous Fuzz Bots Invariant Checks"
+            and "lp_rate=" in exc.args[1]
+            and "is expected to be >= vault_rate=" in exc.args[1]
+        ):
+            return True
+
+    # Contract call exceptions
+    elif isinstance(exc, PypechainCallException):
+        orig_exception = exc.orig_exception
+        if orig_exception is None:
+            return False
+
+        # Known issues due to random bots not accounting for these cases
+        if isinstance(orig_exception, ContractCustomError) and exc.decoded_error in (
+            "InsufficientLiquidity()",
+            "CircuitBreakerTriggered()",
+            "DistributeExcessIdleFailed()",
+            "MinimumTransactionAmount()",
+            "DecreasedPresentValueWhenAddingLiquidity()",
+        ):
+            return True
+
+        # Closing long results in fees exceeding long proceeds
+        if len(exc.args) > 1 and "Closing the long results in fees exceeding long proceeds" in exc.args[0]:
+            return True
+
+        # Status == 0
+        if (
+            isinstance(orig_exception, FailedTransaction)
+            and len(orig_exception.args) > 0
+            and "Receipt has status of 0" in orig_exception.args[0]
+        ):
+            return True
+
+    return False
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Runs the local fuzz farm.
+
+    Arguments
+    ---------
+    argv: Sequence[str]
+        The argv values returned from argparser.
+    """
+    parsed_args = parse_arguments(argv)
+    setup_logging(log_stdout=True, log_level=logging.INFO)
+
+    if parsed_args.replay_episode_seed >= 0:
+        replay_fuzz_episode(
+            parsed_args.replay_episode_seed,
+            num_iterations_per_episode=parsed_args.num_iterations_per_episode,
+            steth=parsed_args.steth,
+            lp_share_price_test=parsed_args.lp_share_price_test,
+            run_async=parsed_args.run_async,
+            ignore_raise_error_func=_fuzz_ignore_errors,
+        )
+        return
+
+    if parsed_args.steth:
+        log_to_rollbar = initialize_rollbar("steth_localfuzzfarm", async_reporting=True)
+    else:
+        log_to_rollbar = initialize_rollbar("erc4626_localfuzzfarm", async_reporting=True)
+
+    results = run_fuzz_farm(
+        num_workers=None if parsed_args.num_workers < 0 else parsed_args.num_workers,
+        num_episodes_per_worker=(
+            None if parsed_args.num_episodes_per_worker < 0 else parsed_args.num_episodes_per_worker
+        ),
+        num_iterations_per_episode=parsed_args.num_iterations_per_episode,
+        steth=parsed_args.steth,
+        lp_share_price_test=parsed_args.lp_share_price_test,
+        run_async=parsed_args.run_async,
+        rng_seed=None if parsed_args.rng_seed < 0 else parsed_args.rng_seed,
+        ignore_raise_error_func=_fuzz_ignore_errors,
+        log_to_rollbar=log_to_rollbar,
+    )
+
+    logging.info("Ran %s episodes with %s unique failures", results.num_episodes, len(results.failures))
+    for signature, failures in results.failures.items():
+        logging.info("%s failures (first episode seed %s): %s", len(failures), failures[0].episode_seed, signature)
+
+
+class Args(NamedTuple):
+    """Command line arguments for the fuzz farm."""
+
+    num_workers: int
+    num_episodes_per_worker: int
+    num_iterations_per_episode: int
+    lp_share_price_test: bool
+    run_async: bool
+    rng_seed: int
+    steth: bool
+    replay_episode_seed: int
+
+
+def namespace_to_args(namespace: argparse.Namespace) -> Args:
+    """Converts argprase.Namespace to Args.
+
+    Arguments
+    ---------
+    namespace: argparse.Namespace
+        Object for storing arg attributes.
+
+    Returns
+    -------
+    Args
+        Formatted arguments
+    """
+    return Args(
+        num_workers=namespace.num_workers,
+        num_episodes_per_worker=namespace.num_episodes_per_worker,
+        num_iterations_per_episode=namespace.num_iterations_per_episode,
+        lp_share_price_test=namespace.lp_share_price_test,
+        run_async=namespace.run_async,
+        rng_seed=namespace.rng_seed,
+        steth=namespace.steth,
+        replay_episode_seed=namespace.replay_episode_seed,
+    )
+
+
+def parse_arguments(argv: Sequence[str] | None = None) -> Args:
+    """Parses input arguments.
+
+    Arguments
+    ---------
+    argv: Sequence[str]
+        The argv values returned from argparser.
+
+    Returns
+    -------
+    Args
+        Formatted arguments
+    """
+    parser = argparse.ArgumentParser(description="Runs fuzz bots on many local chains in parallel.")
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=-1,
+        help="The number of worker processes. Defaults to the number of cpus.",
+    )
+    parser.add_argument(
+        "--num-episodes-per-worker",
+        type=int,
+        default=-1,
+        help="The number of random pool configs each worker fuzzes. Defaults to running forever.",
+    )
+    parser.add_argument(
+        "--num-iterations-per-episode",
+        type=int,
+        default=3000,
+        help="The number of iterations to run for each random pool config.",
+    )
+    parser.add_argument(
+        "--lp-share-price-test",
+        default=False,
+        action="store_true",
+        help="Runs the lp share price fuzz with specific fee and rate parameters.",
+    )
+    parser.add_argument(
+        "--run-async",
+        default=False,
+        action="store_true",
+        help="Runs the bots within each worker concurrently.",
+    )
+    parser.add_argument(
+        "--rng-seed",
+        type=int,
+        default=-1,
+        help="The random seed used to generate the worker seeds.",
+    )
+    parser.add_argument(
+        "--steth",
+        default=False,
+        action="store_true",
+        help="Runs fuzz testing on the steth hyperdrive",
+    )
+    parser.add_argument(
+        "--replay-episode-seed",
+        type=int,
+        default=-1,
+        help="Replays the episode with this episode seed on a single local chain instead of running the farm.",
+    )
+
+    # Use system arguments if none were passed
+    if argv is None:
+        argv = sys.argv
+
+    return namespace_to_args(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Script to migrate an existing chainsync database to block partitioned tables.
+
+This creates any missing indices defined in the schema, and (unless `--indices-only` is set)
+converts the trade event, pool info, and position snapshot tables into postgres range partitions
+over block number. With `--backfill-rollups`, the pool info rollup table used by the dashboard is
+rebuilt from the existing pool info rows. The data pipeline writing to the database should be stopped
+while migrating.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from typing import NamedTuple, Sequence
+
+from agent0.chainsync.db.base import initialize_session
+from agent0.chainsync.db.hyperdrive import (
+    BLOCK_PARTITIONED_TABLES,
+    DEFAULT_BLOCK_PARTITION_SIZE,
+    backfill_pool_info_rollups,
+    create_missing_indices,
+    get_block_partitions,
+    partition_tables_by_block,
+)
+from agent0.hyperlogs import setup_logging
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Migrate the database.
+
+    Arguments
+    ---------
+    argv: Sequence[str]
+        The command line arguments.
+    """
+    parsed_args = parse_arguments(argv)
+    setup_logging(log_stdout=True)
+
+    # This reads the .env file for database credentials
+    db_session = initialize_session()
+
+    logging.info("Creating missing indices...")
+    create_missing_indices(db_session)
+
+    if not parsed_args.indices_only:
+        logging.info("Partitioning tables with %s blocks per partition...", parsed_args.partition_size)
+        partition_tables_by_block(db_session, partition_size=parsed_args.partition_size)
+
+    if parsed_args.backfill_rollups:
+        logging.info("Backfilling pool info rollups...")
+        backfill_pool_info_rollups(db_session)
+
+    for table in BLOCK_PARTITIONED_TABLES:
+        block_ranges = get_block_partitions(db_session, table.name)
+        logging.info(
+            "Table %s: %s", table.name, "not partitioned" if block_ranges is None else f"{len(block_ranges)} partitions"
+        )
+
+    db_session.close()
+
+
+class Args(NamedTuple):
+    """Command line arguments for the script."""
+
+    partition_size: int
+    indices_only: bool
+    backfill_rollups: bool
+
+
+def namespace_to_args(namespace: argparse.Namespace) -> Args:
+    """Converts argprase.Namespace to Args.
+
+    Arguments
+    ---------
+    namespace: argparse.Namespace
+        Object for storing arg attributes.
+
+    Returns
+    -------
+    Args
+        Formatted arguments
+    """
+    return Args(
+        partition_size=namespace.partition_size,
+        indices_only=namespace.indices_only,
+        backfill_rollups=namespace.backfill_rollups,
+    )
+
+
+def parse_arguments(argv: Sequence[str] | None = None) -> Args:
+    """Parses input arguments.
+
+    Arguments
+    ---------
+    argv: Sequence[str]
+        The argv values returned from argparser.
+
+    Returns
+    -------
+    Args
+        Formatted arguments
+    """
+    parser = argparse.ArgumentParser(description="Migrates chainsync tables to block partitioned tables.")
+    parser.add_argument(
+        "--partition-size",
+        type=int,
+        default=DEFAULT_BLOCK_PARTITION_SIZE,
+        help=f"The number of blocks per partition. Defaults to {DEFAULT_BLOCK_PARTITION_SIZE}.",
+    )
+    parser.add_argument(
+        "--indices-only",
+        default=False,
+        action="store_true",
+        help="Only create missing indices without partitioning tables.",
+    )
+    parser.add_argument(
+        "--backfill-rollups",
+        default=False,
+        action="store_true",
+        help="Rebuild the pool info rollup table from the existing pool info rows.",
+    )
+
+    # Use system arguments if none were passed
+    if argv is None:
+        argv = sys.argv
+
+    return namespace_to_args(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -58,7 +58,7 @@ def main(argv: Sequence[str] | None = None) -> None:
         use_existing_postgres = False
         registry_address = parsed_args.registry_addr
 
-    log_to_rollbar = initialize_rollbar("remotefuzzbots")
+    log_to_rollbar = initialize_rollbar("remotefuzzbots", async_reporting=True)
 
     # Negative rng_seed means default
     if parsed_args.rng_seed < 0:
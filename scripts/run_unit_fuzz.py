@@ -8,7 +8,7 @@ import sys
 import time
 from typing import NamedTuple, Sequence
 
-from agent0.core.hyperdrive.interactive import LocalChain
+from agent0.core.hyperdrive.interactive import AnvilProcessPool, LocalChain
 from agent0.hyperfuzz import FuzzAssertionException
 from agent0.hyperfuzz.unit_fuzz import (
     fuzz_long_short_maturity_values,
@@ -33,9 +33,9 @@ def main(argv: Sequence[str] | None = None):
     parsed_args = parse_arguments(argv)
 
     if parsed_args.steth:
-        _ = initialize_rollbar("steth_unitfuzz")
+        _ = initialize_rollbar("steth_unitfuzz", async_reporting=True)
     else:
-        _ = initialize_rollbar("erc4626_unitfuzz")
+        _ = initialize_rollbar("erc4626_unitfuzz", async_reporting=True)
 
     num_trades = 10
     num_paths_checked = 20
@@ -46,20 +46,27 @@ def main(argv: Sequence[str] | None = None):
     else:
         chain_host = parsed_args.chain_host
 
-    # Negative port means default
-    if parsed_args.chain_port < 0:
-        if parsed_args.steth:
-            chain_port = 10001
-        else:
-            chain_port = 11001
-    else:
-        chain_port = parsed_args.chain_port
-
     if parsed_args.steth:
         db_port = 5434
     else:
         db_port = 6434
 
+    # Reuse anvil processes across fuzz runs, which run on ports chosen by the pool. When pausing on failures,
+    # the crashed chain needs to stay up on the known chain port, so we launch a new process per run instead.
+    # We also launch new processes if a chain port is given.
+    anvil_pool = None
+    chain_port = None
+    if parsed_args.pause_on_fail or parsed_args.chain_port >= 0:
+        # Negative port means default
+        if parsed_args.chain_port >= 0:
+            chain_port = parsed_args.chain_port
+        elif parsed_args.steth:
+            chain_port = 10001
+        else:
+            chain_port = 11001
+    else:
+        anvil_pool = AnvilProcessPool(size=1)
+
     num_checks = 0
     while True:
         try:
@@ -71,6 +78,7 @@ def main(argv: Sequence[str] | None = None):
                 log_filename=".logging/fuzz_long_short_maturity_values.log",
                 log_to_stdout=False,
                 gas_limit=int(1e6),  # Plenty of gas limit for transactions
+                anvil_pool=anvil_pool,
             )
             long_maturity_vals_epsilon = 1e-17
             short_maturity_vals_epsilon = 1e-9
@@ -110,6 +118,7 @@ def main(argv: Sequence[str] | None = None):
                 log_filename=".logging/fuzz_path_independence.log",
                 log_to_stdout=False,
                 gas_limit=int(1e6),  # Plenty of gas limit for transactions
+                anvil_pool=anvil_pool,
             )
             lp_share_price_epsilon = 1e-14
             effective_share_reserves_epsilon = 1e-4
@@ -152,6 +161,7 @@ def main(argv: Sequence[str] | None = None):
                 log_filename=".logging/fuzz_profit_check.log",
                 log_to_stdout=False,
                 gas_limit=int(1e6),  # Plenty of gas limit for transactions
+                anvil_pool=anvil_pool,
             )
             fuzz_profit_check(chain_config, parsed_args.steth, pause_on_fail=parsed_args.pause_on_fail)
         except FuzzAssertionException:
@@ -182,6 +192,7 @@ def main(argv: Sequence[str] | None = None):
                 log_filename=".logging/fuzz_present_value.log",
                 log_to_stdout=False,
                 gas_limit=int(1e6),  # Plenty of gas limit for transactions
+                anvil_pool=anvil_pool,
             )
             present_value_epsilon = 0.01
             fuzz_present_value(
@@ -10,7 +10,7 @@ import pandas as pd
 from fixedpointmath import FixedPoint
 from sqlalchemy.orm import Session
 
-from agent0.chainsync.db.hyperdrive import get_checkpoint_info
+from agent0.chainsync.db.hyperdrive import CheckpointPriceIndex, get_checkpoint_price_index
 from agent0.ethpy.hyperdrive import HyperdriveReadInterface
 from agent0.ethpy.hyperdrive.state import PoolState
 
@@ -78,7 +78,7 @@ def calc_single_closeout(
     position: pd.Series,
     interface: HyperdriveReadInterface,
     hyperdrive_state: PoolState,
-    checkpoint_share_prices: pd.Series,
+    checkpoint_share_prices: CheckpointPriceIndex,
     coerce_float: bool,
 ) -> Decimal | float:
     """Calculate the closeout value for a single position.
@@ -91,8 +91,8 @@ def calc_single_closeout(
         The hyperdrive read interface.
     hyperdrive_state: PoolState
         The hyperdrive pool state.
-    checkpoint_share_prices: pd.Series
-        A series with the index as checkpoint time and the value as the share prices.
+    checkpoint_share_prices: CheckpointPriceIndex
+        The index of checkpoint time to checkpoint vault share price for the pool.
     coerce_float: bool
         If True, will coerce underlying Decimals to floats.
 
@@ -139,19 +139,16 @@ def calc_single_closeout(
         # NOTE: anvil doesn't keep events past a certain point
         # so checkpoint events may be missing if we fork a chain.
         # We detect this case, print a warning, and set value to NaN.
-        if open_checkpoint_time not in checkpoint_share_prices.index:
-            if open_checkpoint_time < checkpoint_share_prices.index.min():
+        open_share_price = checkpoint_share_prices.get(open_checkpoint_time)
+        if open_share_price is None:
+            earliest_checkpoint_time = checkpoint_share_prices.earliest_checkpoint_time
+            if earliest_checkpoint_time is not None and open_checkpoint_time < earliest_checkpoint_time:
                 logging.warning(
                     "Chainsync: Missing checkpoint event data for short position, event history likely lost."
                 )
                 return Decimal("nan")
             # If we have events and open checkpoint time still missing, something very wrong.
             raise ValueError("Chainsync: Missing checkpoint event data for short position.")
-
-        open_share_price = checkpoint_share_prices.loc[open_checkpoint_time]
-        # Sanity check, the getter of checkpoint share price should only select distinct
-        # so this should be a singular int instead of a series.
-        assert isinstance(open_share_price, Decimal)
         open_share_price = FixedPoint(open_share_price)
 
         # If the position has matured, we use the share price from the checkpoint
@@ -159,8 +156,8 @@ def calc_single_closeout(
         # NOTE There exists a case where the position has matured but a checkpoint hasn't
         # been created yet. In this case, we default to using the current share price
         # this may create an PNL that might be off.
-        if (hyperdrive_state.block_time >= maturity) and (maturity in checkpoint_share_prices.index):
-            close_share_price = FixedPoint(checkpoint_share_prices.loc[maturity])
+        if (hyperdrive_state.block_time >= maturity) and (maturity in checkpoint_share_prices):
+            close_share_price = FixedPoint(checkpoint_share_prices.share_prices[maturity])
         else:
             close_share_price = hyperdrive_state.pool_info.vault_share_price
 
@@ -213,9 +210,10 @@ def calc_single_closeout(
 
 def calc_closeout_value(
     current_positions: pd.DataFrame,
-    checkpoint_info: pd.DataFrame,
+    checkpoint_share_prices: CheckpointPriceIndex,
     interface: HyperdriveReadInterface,
     coerce_float: bool,
+    hyperdrive_state: PoolState | None = None,
 ) -> pd.Series:
     """Calculate closeout value of agent positions.
 
@@ -223,12 +221,15 @@ def calc_closeout_value(
     ---------
     current_positions: pd.DataFrame
         A dataframe resulting from `get_current_wallet` that describes the current wallet position.
-    checkpoint_info: pd.DataFrame
-        A dataframe resulting from `get_checkpoint_info` that describes all checkpoints.
+    checkpoint_share_prices: CheckpointPriceIndex
+        The index of checkpoint time to checkpoint vault share price for the pool,
+        e.g., from `get_checkpoint_price_index`.
     interface: HyperdriveReadInterface
         The hyperdrive read interface.
     coerce_float: bool
         If True, will coerce underlying Decimals to floats.
+    hyperdrive_state: PoolState | None, optional
+        The pool state at the block of the positions. Defaults to getting the state from the interface.
 
     Returns
     -------
@@ -241,11 +242,9 @@ def calc_closeout_value(
     assert current_positions["block_number"].nunique() == 1
 
     # Get the pool state at this position
-    block_number = int(current_positions["block_number"].iloc[0])
-    hyperdrive_state = interface.get_hyperdrive_state(block_number)
-
-    # Prepare the checkpoint info dataframe for lookups based on checkpoint time
-    checkpoint_share_prices = checkpoint_info.set_index("checkpoint_time")["checkpoint_vault_share_price"]
+    if hyperdrive_state is None:
+        block_number = int(current_positions["block_number"].iloc[0])
+        hyperdrive_state = interface.get_hyperdrive_state(block_number)
 
     # Calculate closeout value per row of dataframe
     return current_positions.apply(
@@ -258,6 +257,40 @@ def calc_closeout_value(
     )
 
 
+def _is_missing_checkpoint_prices(
+    current_positions: pd.DataFrame, checkpoint_share_prices: CheckpointPriceIndex, hyperdrive_state: PoolState
+) -> bool:
+    """Check if the index is missing a checkpoint price that valuing the shorts in the positions needs.
+
+    Arguments
+    ---------
+    current_positions: pd.DataFrame
+        A dataframe resulting from `get_current_wallet` that describes the current wallet position.
+    checkpoint_share_prices: CheckpointPriceIndex
+        The index of checkpoint time to checkpoint vault share price for the pool.
+    hyperdrive_state: PoolState
+        The pool state at the block of the positions.
+
+    Returns
+    -------
+    bool
+        True if an open checkpoint, or the maturity checkpoint of a matured short, is missing from the index.
+    """
+    shorts = current_positions[(current_positions["token_type"] == "SHORT") & (current_positions["token_balance"] != 0)]
+    earliest_checkpoint_time = checkpoint_share_prices.earliest_checkpoint_time
+    for maturity in shorts["maturity_time"].unique():
+        maturity = int(maturity)
+        open_checkpoint_time = maturity - hyperdrive_state.pool_config.position_duration
+        # Checkpoints before the earliest one in the index are lost, and refreshing won't find them
+        if open_checkpoint_time not in checkpoint_share_prices and (
+            earliest_checkpoint_time is None or open_checkpoint_time >= earliest_checkpoint_time
+        ):
+            return True
+        if hyperdrive_state.block_time >= maturity and maturity not in checkpoint_share_prices:
+            return True
+    return False
+
+
 def fill_pnl_values(
     in_df: pd.DataFrame, db_session: Session, interface: HyperdriveReadInterface, coerce_float: bool
 ) -> pd.DataFrame:
@@ -285,14 +318,21 @@ def fill_pnl_values(
 
     out_df = in_df.copy()
 
-    checkpoint_info = get_checkpoint_info(
-        db_session, hyperdrive_address=interface.hyperdrive_address, coerce_float=False
-    )
+    # Look up checkpoint share prices from the in-memory index, which `checkpoint_events_to_db`
+    # keeps up to date. Checkpoint events can also be written through a different session
+    # (e.g., a maturity checkpoint created after the index was built), so we pull in new events
+    # only when a checkpoint the shorts need is missing from the index.
+    checkpoint_share_prices = get_checkpoint_price_index(db_session, interface.hyperdrive_address)
+    hyperdrive_state = interface.get_hyperdrive_state(int(in_df["block_number"].iloc[0]))
+    if _is_missing_checkpoint_prices(in_df, checkpoint_share_prices, hyperdrive_state):
+        checkpoint_share_prices.refresh(db_session)
+
     values_df = calc_closeout_value(
         in_df,
-        checkpoint_info,
+        checkpoint_share_prices,
         interface,
         coerce_float=coerce_float,
+        hyperdrive_state=hyperdrive_state,
     )
     out_df["unrealized_value"] = values_df
     out_df["pnl"] = out_df["unrealized_value"] + out_df["realized_value"]
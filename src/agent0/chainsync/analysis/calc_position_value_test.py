@@ -0,0 +1,112 @@
+"""Tests for calculating the value of positions"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from fixedpointmath import FixedPoint
+
+from agent0.chainsync.db.hyperdrive import CheckpointPriceIndex, add_checkpoint_info, get_checkpoint_price_index
+from agent0.chainsync.db.hyperdrive.schema import DBCheckpointInfo
+
+from .calc_position_value import fill_pnl_values
+
+POSITION_DURATION = 100
+MATURITY_TIME = 200
+
+
+class _ShortValueInterface:
+    """A read interface that values a short at its close vault share price, to check which price gets used."""
+
+    hyperdrive_address = "a"
+    base_is_yield = True
+    pool_config = SimpleNamespace(position_duration=POSITION_DURATION)
+
+    def get_hyperdrive_state(self, block_number: int) -> SimpleNamespace:
+        # pylint: disable=unused-argument
+        return SimpleNamespace(
+            block_time=MATURITY_TIME + 50,
+            pool_config=self.pool_config,
+            pool_info=SimpleNamespace(vault_share_price=FixedPoint("3")),
+        )
+
+    def calc_close_short(self, amount: FixedPoint, close_vault_share_price: FixedPoint, **_) -> FixedPoint:
+        return amount * close_vault_share_price
+
+
+# These tests are using fixtures defined in conftest.py
+class TestFillPnlValues:
+    """Testing the pnl calculation picks up checkpoints written after the price index was built"""
+
+    @pytest.mark.docker
+    def test_late_maturity_checkpoint(self, db_session):
+        """A maturity checkpoint added after the first call is used for the matured short"""
+        add_checkpoint_info(
+            DBCheckpointInfo(
+                checkpoint_time=MATURITY_TIME - POSITION_DURATION,
+                hyperdrive_address="a",
+                block_number=1,
+                checkpoint_vault_share_price=Decimal("1"),
+            ),
+            db_session,
+        )
+        positions = pd.DataFrame(
+            {
+                "token_type": ["SHORT"],
+                "token_balance": [Decimal("1")],
+                "maturity_time": [MATURITY_TIME],
+                "block_number": [10],
+                "realized_value": [Decimal("0")],
+            }
+        )
+        interface = _ShortValueInterface()
+
+        # Without a maturity checkpoint, the short is valued at the current vault share price
+        out_df = fill_pnl_values(positions, db_session, interface, coerce_float=False)  # type: ignore
+        assert out_df["unrealized_value"].iloc[0] == Decimal("3")
+
+        add_checkpoint_info(
+            DBCheckpointInfo(
+                checkpoint_time=MATURITY_TIME,
+                hyperdrive_address="a",
+                block_number=5,
+                checkpoint_vault_share_price=Decimal("2"),
+            ),
+            db_session,
+        )
+        out_df = fill_pnl_values(positions, db_session, interface, coerce_float=False)  # type: ignore
+        assert out_df["unrealized_value"].iloc[0] == Decimal("2")
+        assert out_df["pnl"].iloc[0] == Decimal("2")
+
+    def test_warm_cache_skips_refresh(self, monkeypatch: pytest.MonkeyPatch):
+        """Shorts whose checkpoints are in the index get valued without reading the db"""
+        refresh_sessions = []
+        monkeypatch.setattr(CheckpointPriceIndex, "refresh", lambda _, session: refresh_sessions.append(session))
+        db_session = SimpleNamespace(info={})
+        get_checkpoint_price_index(db_session, "a").add_checkpoint_events(  # type: ignore
+            pd.DataFrame(
+                {
+                    "hyperdrive_address": ["a", "a"],
+                    "checkpoint_time": [MATURITY_TIME - POSITION_DURATION, MATURITY_TIME],
+                    "block_number": [1, 5],
+                    "checkpoint_vault_share_price": [Decimal("1"), Decimal("2")],
+                }
+            )
+        )
+        refresh_sessions.clear()
+        positions = pd.DataFrame(
+            {
+                "token_type": ["SHORT"],
+                "token_balance": [Decimal("1")],
+                "maturity_time": [MATURITY_TIME],
+                "block_number": [10],
+                "realized_value": [Decimal("0")],
+            }
+        )
+
+        out_df = fill_pnl_values(positions, db_session, _ShortValueInterface(), coerce_float=False)  # type: ignore
+        assert out_df["unrealized_value"].iloc[0] == Decimal("2")
+        assert not refresh_sessions
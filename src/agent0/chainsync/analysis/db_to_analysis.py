@@ -9,6 +9,7 @@ from agent0.chainsync.db.hyperdrive import (
     DBPositionSnapshot,
     get_current_positions,
     get_latest_block_number_from_positions_snapshot_table,
+    update_leaderboard,
 )
 from agent0.chainsync.df_to_db import df_to_db
 from agent0.ethpy.hyperdrive import HyperdriveReadInterface
@@ -120,5 +121,10 @@ def snapshot_positions_to_db(
             all_pool_positions.append(current_pool_positions)
 
     if len(all_pool_positions) > 0:
+        all_pool_positions_df = pd.concat(all_pool_positions, axis=0)
         # Add wallet_pnl to the database
-        df_to_db(pd.concat(all_pool_positions, axis=0), DBPositionSnapshot, db_session)
+        df_to_db(all_pool_positions_df, DBPositionSnapshot, db_session)
+        # When not filtering by wallet, the snapshot contains all positions of the pools,
+        # so we can refresh the leaderboard directly from it
+        if wallet_addr is None and calc_pnl:
+            update_leaderboard(all_pool_positions_df, db_session)
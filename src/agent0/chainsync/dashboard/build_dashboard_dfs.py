@@ -7,9 +7,12 @@ from sqlalchemy.orm import Session
 
 from agent0.chainsync.db.base import get_addr_to_username
 from agent0.chainsync.db.hyperdrive import (
+    backfill_pool_info_rollups,
     get_all_traders,
     get_hyperdrive_addr_to_name,
+    get_leaderboard,
     get_pool_info,
+    get_pool_info_rollup,
     get_position_snapshot,
     get_positions_over_time,
     get_realized_value_over_time,
@@ -19,7 +22,7 @@ from agent0.chainsync.db.hyperdrive import (
 
 from .build_fixed_rate import build_fixed_rate
 from .build_leaderboard import build_per_pool_leaderboard, build_total_leaderboard
-from .build_ohlcv import build_ohlcv
+from .build_ohlcv import build_ohlcv_from_rollup
 from .build_outstanding_positions import build_outstanding_positions
 from .build_ticker import build_ticker_for_pool_page, build_ticker_for_wallet_page
 from .build_variable_rate import build_variable_rate
@@ -34,7 +37,11 @@ from .usernames import build_user_mapping
 
 
 def build_pool_dashboard(
-    hyperdrive_address: str, session: Session, max_live_blocks: int = 20000, max_ticker_rows: int = 10000
+    hyperdrive_address: str,
+    session: Session,
+    max_live_blocks: int = 20000,
+    max_ticker_rows: int = 10000,
+    max_plot_points: int | None = 2000,
 ) -> dict[str, pd.DataFrame]:
     """Builds the dataframes for the main dashboard page that focuses on pools.
 
@@ -48,6 +55,10 @@ def build_pool_dashboard(
         The maximum look-back length in blocks. Defaults to 5000.
     max_ticker_rows: int, optional
         The maximum number of ticker rows to show. Defaults to 1000.
+    max_plot_points: int | None, optional
+        The maximum number of pool info rows to read for the block to timestamp mapping and the
+        outstanding positions plot. Data is downsampled on the db side if the look-back range contains
+        more blocks. If None, will read every block. Defaults to 2000.
 
     Returns
     -------
@@ -64,21 +75,28 @@ def build_pool_dashboard(
     user_map = build_user_mapping(trader_addrs, addr_to_username)
 
     pool_info = get_pool_info(
-        session, hyperdrive_address=hyperdrive_address, start_block=-max_live_blocks, coerce_float=False
+        session,
+        hyperdrive_address=hyperdrive_address,
+        start_block=-max_live_blocks,
+        coerce_float=False,
+        max_points=max_plot_points,
     )
 
     # Get a block to timestamp mapping dataframe
+    # The mapping is downsampled, so rows get the timestamp of the nearest block in the mapping
     block_to_timestamp = pool_info[["block_number", "timestamp"]]
 
     # TODO generalize this
     # We check the block timestamp difference since we're running
     # either in real time mode or rapid 312 second per block mode
     # Determine which one, and set freq respectively
+    # The downsampled pool info skips blocks, so we read the latest two blocks separately
     if freq is None:
-        if len(pool_info) > 2:
-            time_diff = pool_info.iloc[-1]["timestamp"] - pool_info.iloc[-2]["timestamp"]
+        latest_pool_info = get_pool_info(session, hyperdrive_address=hyperdrive_address, start_block=-2)
+        if len(latest_pool_info) == 2:
+            time_diff = latest_pool_info.iloc[-1]["timestamp"] - latest_pool_info.iloc[-2]["timestamp"]
             if time_diff > pd.Timedelta("1min"):
-                freq = "D"
+                freq = "1D"
             else:
                 freq = "5min"
 
@@ -95,21 +113,56 @@ def build_pool_dashboard(
     # Adds user lookup to the ticker
     out_dfs["display_ticker"] = build_ticker_for_pool_page(trade_events, user_map, block_to_timestamp)
 
-    latest_wallet_pnl = get_position_snapshot(
+    # Read from the materialized leaderboard, falling back to the latest position snapshot
+    # if analysis hasn't populated the leaderboard yet.
+    latest_wallet_pnl = get_leaderboard(session, hyperdrive_address=hyperdrive_address, coerce_float=False)
+    if len(latest_wallet_pnl) == 0:
+        latest_wallet_pnl = get_position_snapshot(
+            session,
+            hyperdrive_address=hyperdrive_address,
+            latest_entry=True,
+            end_block=None,
+            coerce_float=False,
+        )
+    out_dfs["leaderboard"] = build_total_leaderboard(latest_wallet_pnl, user_map)
+
+    # Time series are read from the pre-aggregated rollup table, which gets filled in as pool info is added.
+    if freq is None:
+        freq = "5min"
+    # Buckets are keyed by their start time, so we include the bucket of the first pool info row
+    rollup_start_time = pd.Timestamp(pool_info["timestamp"].iloc[0]).floor(freq) if len(pool_info) > 0 else None
+    pool_info_rollup = get_pool_info_rollup(
         session,
+        bucket_size=freq,
         hyperdrive_address=hyperdrive_address,
-        latest_entry=True,
-        end_block=None,
+        start_time=rollup_start_time,
         coerce_float=False,
     )
-    out_dfs["leaderboard"] = build_total_leaderboard(latest_wallet_pnl, user_map)
+    if len(pool_info_rollup) == 0 and len(pool_info) > 0:
+        # Pool info rows from before the rollup table existed haven't been aggregated yet,
+        # so we build the rollups of this pool once from its pool info rows
+        backfill_pool_info_rollups(session, hyperdrive_address=hyperdrive_address)
+        pool_info_rollup = get_pool_info_rollup(
+            session,
+            bucket_size=freq,
+            hyperdrive_address=hyperdrive_address,
+            start_time=rollup_start_time,
+            coerce_float=False,
+        )
+    # The close value of each bucket is the value used for the rate plots
+    rate_info = pool_info_rollup.rename(
+        columns={
+            "fixed_rate_close": "fixed_rate",
+            "variable_rate_close": "variable_rate",
+            "vault_share_price_close": "vault_share_price",
+        }
+    )
+    out_dfs["ohlcv"] = build_ohlcv_from_rollup(pool_info_rollup)
 
-    # build ohlcv and volume
-    out_dfs["ohlcv"] = build_ohlcv(pool_info, freq=freq)
     # build rates
-    out_dfs["fixed_rate"] = build_fixed_rate(pool_info)
-    out_dfs["variable_rate"] = build_variable_rate(pool_info)
-    out_dfs["vault_share_price"] = build_vault_share_price(pool_info)
+    out_dfs["fixed_rate"] = build_fixed_rate(rate_info)
+    out_dfs["variable_rate"] = build_variable_rate(rate_info)
+    out_dfs["vault_share_price"] = build_vault_share_price(rate_info)
 
     # build outstanding positions plots
     out_dfs["outstanding_positions"] = build_outstanding_positions(pool_info)
@@ -123,6 +176,7 @@ def build_wallet_dashboard(
     user_map: pd.DataFrame | None = None,
     max_plot_blocks: int = 5000,
     max_ticker_rows: int = 1000,
+    max_plot_points: int | None = 2000,
 ) -> dict[str, pd.DataFrame]:
     """Builds the dataframes for the main dashboard page that focuses on pools.
 
@@ -138,6 +192,9 @@ def build_wallet_dashboard(
         The maximum number of blocks to look in the past for plotting. Defaults to 5000.
     max_ticker_rows: int, optional
         The maximum number of ticker rows to show. Defaults to 1000.
+    max_plot_points: int | None, optional
+        The maximum number of points per wallet to plot. Data is downsampled on the db side
+        if the plot range contains more blocks. If None, will plot every block. Defaults to 2000.
 
     Returns
     -------
@@ -146,6 +203,8 @@ def build_wallet_dashboard(
     """
 
     # pylint: disable=too-many-locals
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
 
     if user_map is None:
         trader_addrs = get_all_traders(session)
@@ -157,11 +216,12 @@ def build_wallet_dashboard(
     # Get ticker for selected addresses
     out_dfs: dict[str, pd.DataFrame] = {}
 
-    pool_info = get_pool_info(session, start_block=-max_plot_blocks, coerce_float=False)
+    pool_info = get_pool_info(session, start_block=-max_plot_blocks, coerce_float=False, max_points=max_plot_points)
     # Get a block to timestamp mapping dataframe
     # Since we're getting this from multiple addrs, we drop duplicates
+    # The mapping is downsampled, so rows get the timestamp of the nearest block in the mapping
     # TODO get this table directly from a db query
-    block_to_timestamp = pool_info[["block_number", "timestamp"]].drop_duplicates(ignore_index=True)
+    block_to_timestamp = pool_info[["block_number", "timestamp"]].drop_duplicates("block_number", ignore_index=True)
 
     # TODO these trade events won't show the token delta for withdrawal shares
     # for RemoveLiquidity
@@ -178,21 +238,42 @@ def build_wallet_dashboard(
         trade_events, user_map, hyperdrive_addr_mapping, block_to_timestamp
     )
 
-    position_snapshot = get_position_snapshot(
-        session,
-        wallet_address=wallet_addresses,
-        latest_entry=True,
-        end_block=None,
-        coerce_float=False,
-    )
-
     # Pnl aggregation
+    # Read from the materialized leaderboard, falling back to the latest position snapshot
+    # if analysis hasn't populated the leaderboard yet.
+    wallet_pnl = get_leaderboard(session, wallet_address=wallet_addresses, coerce_float=False)
+    if len(wallet_pnl) == 0:
+        position_snapshot = get_position_snapshot(
+            session,
+            wallet_address=wallet_addresses,
+            latest_entry=True,
+            end_block=None,
+            coerce_float=False,
+        )
+        wallet_pnl = position_snapshot
+    else:
+        # The leaderboard is computed from a snapshot of every position at its block,
+        # so we read the positions at that block instead of searching for the latest entry of each position.
+        position_snapshot = pd.concat(
+            [
+                get_position_snapshot(
+                    session,
+                    hyperdrive_address=pool_pnl["hyperdrive_address"].unique().tolist(),
+                    start_block=int(block_number),
+                    end_block=int(block_number) + 1,
+                    wallet_address=wallet_addresses,
+                    coerce_float=False,
+                )
+                for block_number, pool_pnl in wallet_pnl.groupby("block_number")
+            ],
+            ignore_index=True,
+        )
     out_dfs["total_pnl"] = build_total_leaderboard(
-        position_snapshot,
+        wallet_pnl,
         user_map=user_map,
     )
     out_dfs["pool_pnl"] = build_per_pool_leaderboard(
-        position_snapshot,
+        wallet_pnl,
         user_map=user_map,
         hyperdrive_addr_map=hyperdrive_addr_mapping,
     )
@@ -209,19 +290,31 @@ def build_wallet_dashboard(
     out_dfs["closed_positions"] = current_positions[current_positions["Token Balance"] == 0].reset_index(drop=True)
 
     pnl_over_time = get_total_pnl_over_time(
-        session, wallet_address=wallet_addresses, start_block=-max_plot_blocks, coerce_float=True
+        session,
+        wallet_address=wallet_addresses,
+        start_block=-max_plot_blocks,
+        coerce_float=True,
+        max_points=max_plot_points,
     )
 
     out_dfs["pnl_over_time"] = build_pnl_over_time(pnl_over_time, block_to_timestamp)
 
     # Get positions over time
     wallet_positions_over_time = get_positions_over_time(
-        session, wallet_address=wallet_addresses, start_block=-max_plot_blocks, coerce_float=True
+        session,
+        wallet_address=wallet_addresses,
+        start_block=-max_plot_blocks,
+        coerce_float=True,
+        max_points=max_plot_points,
     )
     out_dfs["positions_over_time"] = build_positions_over_time(wallet_positions_over_time, block_to_timestamp)
 
     realized_value_over_time = get_realized_value_over_time(
-        session, wallet_address=wallet_addresses, start_block=-max_plot_blocks, coerce_float=True
+        session,
+        wallet_address=wallet_addresses,
+        start_block=-max_plot_blocks,
+        coerce_float=True,
+        max_points=max_plot_points,
     )
     out_dfs["realized_value_over_time"] = build_realized_value_over_time(realized_value_over_time, block_to_timestamp)
 
@@ -1,18 +1,45 @@
 """Builds the leaderboard for the dashboard."""
 
+from __future__ import annotations
+
 import pandas as pd
 
 from .usernames import map_addresses
 
 
+def _rank_by_pnl(pnl: pd.Series, hyperdrive_address: pd.Series | None = None) -> pd.Series:
+    """Rank pnl the same way as the materialized leaderboard, starting at 1 for the highest pnl.
+
+    Arguments
+    ---------
+    pnl: pd.Series
+        The total pnl of each wallet.
+    hyperdrive_address: pd.Series | None, optional
+        The hyperdrive address of each entry, to rank within each pool. Defaults to ranking across all entries.
+
+    Returns
+    -------
+    pd.Series
+        The rank of each entry.
+    """
+    # We rank on floats, since Decimal nans can't be compared
+    float_pnl = pnl.astype(float)
+    if hyperdrive_address is not None:
+        return float_pnl.groupby(hyperdrive_address).rank(method="min", ascending=False).astype("Int64")
+    return float_pnl.rank(method="min", ascending=False).astype("Int64")
+
+
 def build_total_leaderboard(position_snapshot: pd.DataFrame, user_map: pd.DataFrame) -> pd.DataFrame:
     """Takes the position snapshot and aggregates pnl across all pools and positions,
     then ranks to show the leaderboard.
 
+    The stored totals and rank of the materialized leaderboard are used as is for a single pool.
+
     Arguments
     ---------
     position_snapshot: pd.DataFrame
-        The dataframe resulting from get_position_snapshot that contains the latest positions.
+        The dataframe resulting from get_position_snapshot that contains the latest positions,
+        or the materialized leaderboard from get_leaderboard.
     user_map: pd.DataFrame
         A dataframe with 4 columns (address, abbr_address, username, format_name).
         This is the output of :meth:`chainsync.dashboard.build_user_mapping`.
@@ -22,17 +49,17 @@ def build_total_leaderboard(position_snapshot: pd.DataFrame, user_map: pd.DataFr
     tuple[pd.DataFrame, pd.DataFrame]
         The user-combined and individual wallet leaderboard dataframes.
     """
-    total_pnl = position_snapshot.groupby("wallet_address")["pnl"].sum().reset_index()
+    if "rank" in position_snapshot.columns and position_snapshot["hyperdrive_address"].nunique() <= 1:
+        # The materialized leaderboard of a single pool is already totaled and sorted by rank
+        total_pnl = position_snapshot[["wallet_address", "pnl", "rank"]].reset_index(drop=True)
+    else:
+        total_pnl = position_snapshot.groupby("wallet_address")["pnl"].sum().reset_index()
+        total_pnl["rank"] = _rank_by_pnl(total_pnl["pnl"])
+        total_pnl = total_pnl.sort_values("rank").reset_index(drop=True)  # type: ignore
 
     mapped_addrs = map_addresses(total_pnl["wallet_address"], user_map)
     total_pnl["username"] = mapped_addrs["username"]
-
-    # Rank based on pnl
-    leaderboard = (
-        total_pnl[["username", "wallet_address", "pnl"]]
-        .sort_values("pnl", ascending=False)  # type: ignore
-        .reset_index(drop=True)
-    )
+    leaderboard = total_pnl[["rank", "username", "wallet_address", "pnl"]].set_index("rank")
 
     # Mapping for any type conversions.
     # Omissions mean leave as is
@@ -48,8 +75,6 @@ def build_total_leaderboard(position_snapshot: pd.DataFrame, user_map: pd.DataFr
         "pnl": "PnL",
     }
 
-    leaderboard.index.name = "rank"
-
     return leaderboard.astype(type_dict).rename(columns=rename_dict)
 
 
@@ -59,10 +84,13 @@ def build_per_pool_leaderboard(
     """Takes the position snapshot and aggregates pnl across positions in individual pools,
     then ranks to show the leaderboard.
 
+    The stored totals and rank of the materialized leaderboard are used as is.
+
     Arguments
     ---------
     position_snapshot: pd.DataFrame
-        The dataframe resulting from get_position_snapshot that contains the latest positions.
+        The dataframe resulting from get_position_snapshot that contains the latest positions,
+        or the materialized leaderboard from get_leaderboard.
     user_map: pd.DataFrame
         A dataframe containing the wallet address to name mapping.
     hyperdrive_addr_map: pd.DataFrame
@@ -73,7 +101,13 @@ def build_per_pool_leaderboard(
     tuple[pd.DataFrame, pd.DataFrame]
         The user-combined and individual wallet leaderboard dataframes.
     """
-    total_pnl = position_snapshot.groupby(["wallet_address", "hyperdrive_address"])["pnl"].sum().reset_index()
+    if "rank" in position_snapshot.columns:
+        # The materialized leaderboard is already totaled per pool and sorted by pool and rank
+        total_pnl = position_snapshot[["wallet_address", "hyperdrive_address", "pnl", "rank"]].reset_index(drop=True)
+    else:
+        total_pnl = position_snapshot.groupby(["hyperdrive_address", "wallet_address"])["pnl"].sum().reset_index()
+        total_pnl["rank"] = _rank_by_pnl(total_pnl["pnl"], total_pnl["hyperdrive_address"])
+        total_pnl = total_pnl.sort_values(["hyperdrive_address", "rank"]).reset_index(drop=True)  # type: ignore
 
     mapped_addrs = map_addresses(total_pnl["wallet_address"], user_map)
     total_pnl["username"] = mapped_addrs["username"]
@@ -85,12 +119,9 @@ def build_per_pool_leaderboard(
     )["name"]
     total_pnl["hyperdrive_name"] = hyperdrive_name
 
-    # Rank based on pnl
-    leaderboard = (
-        total_pnl[["username", "wallet_address", "hyperdrive_name", "hyperdrive_address", "pnl"]]
-        .sort_values("pnl", ascending=False)  # type: ignore
-        .reset_index(drop=True)
-    )
+    leaderboard = total_pnl[
+        ["rank", "username", "wallet_address", "hyperdrive_name", "hyperdrive_address", "pnl"]
+    ].set_index("rank")
 
     # Mapping for any type conversions.
     # Omissions mean leave as is
@@ -110,7 +141,5 @@ def build_per_pool_leaderboard(
         "pnl": "PnL",
     }
 
-    leaderboard.index.name = "rank"
-
     # Convert these leaderboards to strings, as streamlit doesn't like decimals
     return leaderboard.astype(type_dict).rename(columns=rename_dict)
@@ -5,34 +5,25 @@ from __future__ import annotations
 import pandas as pd
 
 
-def build_ohlcv(pool_analysis: pd.DataFrame, freq: str | None = None) -> pd.DataFrame:
-    """Builds the ohlcv dataframe ready to be plot
+def build_ohlcv_from_rollup(pool_info_rollup: pd.DataFrame) -> pd.DataFrame:
+    """Builds the ohlcv dataframe ready to be plot from the pre-aggregated pool info rollup.
 
     Arguments
     ---------
-    pool_analysis: pd.DataFrame
-        The pool analysis object from `get_pool_anlysis`
-    freq: str | None
-        The grouping frequency for the ohlcv plot.
-        See https://pandas.pydata.org/pandas-docs/stable/user_guide/timeseries.html#offset-aliases
-        for accepted values
-        If none, defaults to 5min
+    pool_info_rollup: pd.DataFrame
+        The pool info rollup for a single pool and bucket size from `get_pool_info_rollup`
 
     Returns
     -------
     pd.DataFrame
         The ready to plot dataframe for ohlcv
     """
-    if freq is None:
-        freq = "5min"
-
-    spot_prices = pool_analysis[["timestamp", "spot_price"]].copy()
-    spot_prices = spot_prices.set_index("timestamp")
-    if len(spot_prices) == 0:
+    if len(pool_info_rollup) == 0:
         return pd.DataFrame()
 
-    # TODO this is filling groups without data with nans, is this desired?
-    ohlcv = spot_prices.groupby([pd.Grouper(freq=freq)]).agg({"spot_price": ["first", "last", "max", "min"]})
+    ohlcv = pool_info_rollup[
+        ["timestamp", "spot_price_open", "spot_price_close", "spot_price_high", "spot_price_low"]
+    ].set_index("timestamp")
 
     ohlcv.columns = ["Open", "Close", "High", "Low"]
     ohlcv.index.name = "Date"
@@ -2,6 +2,7 @@
 
 import pandas as pd
 
+from .plot_utils import merge_block_timestamps
 from .usernames import abbreviate_address, map_addresses
 
 
@@ -31,7 +32,7 @@ def build_ticker_for_pool_page(
     trade_events["username"] = mapped_addrs["username"]
 
     # Look up block to timestamp
-    trade_events = trade_events.merge(block_to_timestamp, how="left", on="block_number")
+    trade_events = merge_block_timestamps(trade_events, block_to_timestamp)
 
     # Mapping for any type conversions.
     # Omissions mean leave as is
@@ -104,7 +105,7 @@ def build_ticker_for_wallet_page(
     trade_events["hyperdrive_name"] = hyperdrive_name
 
     # Look up block to timestamp
-    trade_events = trade_events.merge(block_to_timestamp, how="left", on="block_number")
+    trade_events = merge_block_timestamps(trade_events, block_to_timestamp)
 
     # Mapping for any type conversions.
     # Omissions mean leave as is
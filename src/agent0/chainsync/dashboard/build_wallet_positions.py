@@ -2,6 +2,7 @@
 
 import pandas as pd
 
+from .plot_utils import merge_block_timestamps
 from .usernames import abbreviate_address, map_addresses
 
 
@@ -87,7 +88,7 @@ def build_pnl_over_time(pnl_over_time: pd.DataFrame, block_to_timestamp: pd.Data
         The pnl over time dataframe for the dashboard.
     """
     # Look up block to timestamp
-    return pnl_over_time.merge(block_to_timestamp, how="left", on="block_number")
+    return merge_block_timestamps(pnl_over_time, block_to_timestamp)
 
 
 def build_positions_over_time(positions_over_time: pd.DataFrame, block_to_timestamp: pd.DataFrame) -> pd.DataFrame:
@@ -105,7 +106,7 @@ def build_positions_over_time(positions_over_time: pd.DataFrame, block_to_timest
     pd.DataFrame
         The positions over time dataframe for the dashboard.
     """
-    return positions_over_time.merge(block_to_timestamp, how="left", on="block_number")
+    return merge_block_timestamps(positions_over_time, block_to_timestamp)
 
 
 def build_realized_value_over_time(
@@ -125,4 +126,4 @@ def build_realized_value_over_time(
     pd.DataFrame
         The realized value over time dataframe for the dashboard.
     """
-    return realized_value_over_time.merge(block_to_timestamp, how="left", on="block_number")
+    return merge_block_timestamps(realized_value_over_time, block_to_timestamp)
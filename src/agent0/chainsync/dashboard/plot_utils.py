@@ -38,3 +38,42 @@ def reduce_plot_data(data: pd.DataFrame, x_column_name: str, y_column_name: str)
     # Filter out intermediate rows with no difference
     plot_data_idx = (data_diff != 0) | (reverse_data_diff != 0)
     return plot_data[plot_data_idx]
+
+
+def merge_block_timestamps(data: pd.DataFrame, block_to_timestamp: pd.DataFrame) -> pd.DataFrame:
+    """Adds the timestamp of the nearest block in a block to timestamp mapping to each row.
+
+    The mapping may be downsampled (e.g., from `get_pool_info` with `max_points`), so rows are matched
+    to the nearest block in the mapping instead of requiring an exact match. Rows with blocks outside
+    of the block range of the mapping don't get a timestamp.
+
+    Arguments
+    ---------
+    data: pd.DataFrame
+        The data with a `block_number` column.
+    block_to_timestamp: pd.DataFrame
+        A dataframe containing the mapping of block number to timestamp.
+
+    Returns
+    -------
+    pd.DataFrame
+        The data with a `timestamp` column added, in the original row order.
+    """
+    if len(data) == 0 or len(block_to_timestamp) == 0:
+        return data.merge(block_to_timestamp, how="left", on="block_number")
+
+    # merge_asof requires both sides to be sorted on the key with matching dtypes
+    sort_order = data["block_number"].to_numpy().argsort(kind="stable")
+    block_to_timestamp = block_to_timestamp.astype({"block_number": data["block_number"].dtype})
+    merged = pd.merge_asof(
+        data.iloc[sort_order].reset_index(drop=True),
+        block_to_timestamp.sort_values("block_number"),
+        on="block_number",
+        direction="nearest",
+    )
+    merged.index = sort_order
+    out_of_range = (merged["block_number"] < block_to_timestamp["block_number"].min()) | (
+        merged["block_number"] > block_to_timestamp["block_number"].max()
+    )
+    merged.loc[out_of_range, "timestamp"] = pd.NaT
+    return merged.sort_index()
@@ -1,14 +1,24 @@
 """Hyperdrive database utilities."""
 
 from .chain_to_db import checkpoint_events_to_db, init_data_chain_to_db, pool_info_to_db, trade_events_to_db
+from .checkpoint_price_index import (
+    CheckpointPriceIndex,
+    clear_checkpoint_price_indices,
+    get_checkpoint_price_index,
+    update_checkpoint_price_indices,
+)
 from .convert_data import convert_pool_config, convert_pool_info
-from .import_export_data import export_db_to_file, import_to_db, import_to_pandas
+from .db_snapshot import SNAPSHOT_TABLES, has_db_snapshot, load_db_snapshot, save_db_snapshot
+from .event_getters import get_event_logs_for_db
+from .import_export_data import export_db_to_file, import_to_db, import_to_pandas, iter_block_table_chunks
 from .interface import (
+    POOL_INFO_ROLLUP_BUCKETS,
     add_checkpoint_info,
     add_hyperdrive_addr_to_name,
     add_pool_config,
     add_pool_infos,
     add_trade_events,
+    backfill_pool_info_rollups,
     get_all_traders,
     get_checkpoint_info,
     get_current_positions,
@@ -18,12 +28,32 @@ from .interface import (
     get_latest_block_number_from_positions_snapshot_table,
     get_latest_block_number_from_table,
     get_latest_block_number_from_trade_event,
+    get_leaderboard,
     get_pool_config,
     get_pool_info,
+    get_pool_info_rollup,
     get_position_snapshot,
     get_positions_over_time,
     get_realized_value_over_time,
     get_total_pnl_over_time,
     get_trade_events,
+    update_leaderboard,
+    update_pool_info_rollups,
+)
+from .partitioning import (
+    BLOCK_PARTITIONED_TABLES,
+    DEFAULT_BLOCK_PARTITION_SIZE,
+    create_missing_indices,
+    ensure_block_partitions,
+    get_block_partitions,
+    partition_tables_by_block,
+)
+from .schema import (
+    DBCheckpointInfo,
+    DBHyperdriveAddrToName,
+    DBLeaderboard,
+    DBPoolConfig,
+    DBPoolInfo,
+    DBPoolInfoRollup,
+    DBPositionSnapshot,
 )
-from .schema import DBCheckpointInfo, DBHyperdriveAddrToName, DBPoolConfig, DBPoolInfo, DBPositionSnapshot
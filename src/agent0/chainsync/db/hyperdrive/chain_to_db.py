@@ -13,6 +13,7 @@ from agent0.chainsync.df_to_db import df_to_db
 from agent0.ethpy.base import EARLIEST_BLOCK_LOOKUP
 from agent0.ethpy.hyperdrive import HyperdriveReadInterface
 
+from .checkpoint_price_index import update_checkpoint_price_indices
 from .convert_data import convert_checkpoint_events, convert_pool_config, convert_pool_info, convert_trade_events
 from .event_getters import get_event_logs_for_db
 from .interface import (
@@ -169,6 +170,8 @@ def checkpoint_events_to_db(
     # Add to db
     if len(events_df) > 0:
         df_to_db(events_df, DBCheckpointInfo, db_session)
+        # Keep the in-memory checkpoint prices used for valuing positions up to date
+        update_checkpoint_price_indices(events_df, db_session)
 
 
 def trade_events_to_db(
@@ -0,0 +1,159 @@
+"""An in-memory index of checkpoint share prices used for valuing positions."""
+
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from .interface import get_checkpoint_info
+
+# The key in `Session.info` that holds the checkpoint price indices of a session
+_SESSION_INFO_KEY = "checkpoint_price_indices"
+
+
+class CheckpointPriceIndex:
+    """Incrementally updated lookup of checkpoint time to checkpoint vault share price for a single pool.
+
+    Valuing shorts requires the vault share price at the open and maturity checkpoints of
+    every position. This index keeps these prices in memory so that lookups are O(1), and
+    only reads the checkpoint events added to the db since the last refresh.
+    """
+
+    def __init__(self, hyperdrive_address: str) -> None:
+        """Initialize an empty checkpoint price index.
+
+        Arguments
+        ---------
+        hyperdrive_address: str
+            The hyperdrive pool address this index keeps checkpoint prices for.
+        """
+        self.hyperdrive_address = hyperdrive_address
+        self.share_prices: dict[int, Decimal] = {}
+        """A mapping from checkpoint time to the checkpoint vault share price."""
+        self.earliest_checkpoint_time: int | None = None
+        """The earliest checkpoint time in the index, or None if the index is empty."""
+        self.latest_block_number: int = -1
+        """The latest block number of the checkpoint events in the index."""
+
+    def __contains__(self, checkpoint_time: int) -> bool:
+        return checkpoint_time in self.share_prices
+
+    def __len__(self) -> int:
+        return len(self.share_prices)
+
+    def get(self, checkpoint_time: int) -> Decimal | None:
+        """Get the checkpoint vault share price for a checkpoint time.
+
+        Arguments
+        ---------
+        checkpoint_time: int
+            The checkpoint time to look up.
+
+        Returns
+        -------
+        Decimal | None
+            The checkpoint vault share price, or None if the checkpoint is not in the index.
+        """
+        return self.share_prices.get(checkpoint_time)
+
+    def add_checkpoint_events(self, checkpoint_events: pd.DataFrame) -> None:
+        """Add checkpoint events to the index.
+
+        Events for other pools are ignored. Duplicate checkpoint times keep the first price seen,
+        matching the distinct selection in `get_checkpoint_info`.
+
+        Arguments
+        ---------
+        checkpoint_events: pd.DataFrame
+            A dataframe that matches the db schema of checkpoint events,
+            e.g., from `convert_checkpoint_events` or `get_checkpoint_info`.
+        """
+        if len(checkpoint_events) == 0:
+            return
+        pool_events = checkpoint_events[checkpoint_events["hyperdrive_address"] == self.hyperdrive_address]
+        if len(pool_events) == 0:
+            return
+        for checkpoint_time, share_price in zip(
+            pool_events["checkpoint_time"], pool_events["checkpoint_vault_share_price"]
+        ):
+            self.share_prices.setdefault(int(checkpoint_time), Decimal(str(share_price)))
+        min_checkpoint_time = int(pool_events["checkpoint_time"].min())
+        if self.earliest_checkpoint_time is None or min_checkpoint_time < self.earliest_checkpoint_time:
+            self.earliest_checkpoint_time = min_checkpoint_time
+        self.latest_block_number = max(self.latest_block_number, int(pool_events["block_number"].max()))
+
+    def refresh(self, session: Session) -> None:
+        """Read checkpoint events added to the db since the last refresh into the index.
+
+        Arguments
+        ---------
+        session: Session
+            The initialized session object.
+        """
+        self.add_checkpoint_events(
+            get_checkpoint_info(
+                session,
+                hyperdrive_address=self.hyperdrive_address,
+                start_block=self.latest_block_number + 1,
+                coerce_float=False,
+            )
+        )
+
+
+def get_checkpoint_price_index(session: Session, hyperdrive_address: str) -> CheckpointPriceIndex:
+    """Get the checkpoint price index of a pool that is attached to the session.
+
+    The index is built from the db on first access, and is kept up to date afterwards by
+    `checkpoint_events_to_db`. Checkpoint events written through other sessions can be
+    picked up by calling `CheckpointPriceIndex.refresh`.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    hyperdrive_address: str
+        The hyperdrive pool address to get the index for.
+
+    Returns
+    -------
+    CheckpointPriceIndex
+        The checkpoint price index for the pool.
+    """
+    indices: dict[str, CheckpointPriceIndex] = session.info.setdefault(_SESSION_INFO_KEY, {})
+    if hyperdrive_address not in indices:
+        index = CheckpointPriceIndex(hyperdrive_address)
+        index.refresh(session)
+        indices[hyperdrive_address] = index
+    return indices[hyperdrive_address]
+
+
+def update_checkpoint_price_indices(checkpoint_events: pd.DataFrame, session: Session) -> None:
+    """Add newly inserted checkpoint events to the checkpoint price indices attached to the session.
+
+    Indices that have not been built yet are skipped, since they are read from the db on first access.
+
+    Arguments
+    ---------
+    checkpoint_events: pd.DataFrame
+        A dataframe that matches the db schema of checkpoint events.
+    session: Session
+        The initialized session object.
+    """
+    for index in session.info.get(_SESSION_INFO_KEY, {}).values():
+        index.add_checkpoint_events(checkpoint_events)
+
+
+def clear_checkpoint_price_indices(session: Session) -> None:
+    """Drop all checkpoint price indices attached to the session.
+
+    This must be called whenever checkpoint rows are removed from the db, e.g., when importing
+    a db snapshot, since the indices only ever add checkpoints.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    """
+    session.info.pop(_SESSION_INFO_KEY, None)
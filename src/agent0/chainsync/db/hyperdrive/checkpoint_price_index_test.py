@@ -0,0 +1,88 @@
+"""Tests for the in-memory checkpoint price index"""
+
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from .checkpoint_price_index import (
+    clear_checkpoint_price_indices,
+    get_checkpoint_price_index,
+    update_checkpoint_price_indices,
+)
+from .interface import add_checkpoint_info
+from .schema import DBCheckpointInfo
+
+
+# These tests are using fixtures defined in conftest.py
+class TestCheckpointPriceIndex:
+    """Testing the checkpoint price index attached to a db session"""
+
+    @pytest.mark.docker
+    def test_build_and_refresh(self, db_session):
+        """Testing the index is built from the db and picks up new rows on refresh"""
+        add_checkpoint_info(
+            DBCheckpointInfo(
+                checkpoint_time=100,
+                hyperdrive_address="a",
+                block_number=1,
+                checkpoint_vault_share_price=Decimal("1.5"),
+            ),
+            db_session,
+        )
+        add_checkpoint_info(
+            DBCheckpointInfo(
+                checkpoint_time=100,
+                hyperdrive_address="b",
+                block_number=1,
+                checkpoint_vault_share_price=Decimal("9.5"),
+            ),
+            db_session,
+        )
+
+        index = get_checkpoint_price_index(db_session, "a")
+        assert len(index) == 1
+        assert index.get(100) == Decimal("1.5")
+        assert index.earliest_checkpoint_time == 100
+        assert index.latest_block_number == 1
+        # The same index is returned for the session
+        assert get_checkpoint_price_index(db_session, "a") is index
+
+        # Rows written to the db without going through the index are only seen after a refresh
+        add_checkpoint_info(
+            DBCheckpointInfo(
+                checkpoint_time=200,
+                hyperdrive_address="a",
+                block_number=2,
+                checkpoint_vault_share_price=Decimal("2.5"),
+            ),
+            db_session,
+        )
+        assert 200 not in index
+        index.refresh(db_session)
+        assert index.get(200) == Decimal("2.5")
+        assert index.latest_block_number == 2
+
+        # Clearing drops the index, and the next access rebuilds it
+        clear_checkpoint_price_indices(db_session)
+        assert get_checkpoint_price_index(db_session, "a") is not index
+
+    @pytest.mark.docker
+    def test_update_from_events(self, db_session):
+        """Testing inserted checkpoint events are added to existing indices"""
+        index = get_checkpoint_price_index(db_session, "a")
+        assert len(index) == 0
+        assert index.earliest_checkpoint_time is None
+
+        events_df = pd.DataFrame(
+            {
+                "hyperdrive_address": ["a", "a", "b"],
+                "block_number": [5, 6, 6],
+                "checkpoint_time": [200, 100, 100],
+                "checkpoint_vault_share_price": [Decimal("2.5"), Decimal("1.5"), Decimal("9.5")],
+            }
+        )
+        update_checkpoint_price_indices(events_df, db_session)
+        assert index.share_prices == {100: Decimal("1.5"), 200: Decimal("2.5")}
+        assert index.earliest_checkpoint_time == 100
+        assert index.latest_block_number == 6
@@ -0,0 +1,120 @@
+"""Snapshots of the hyperdrive tables stored as copies within the database."""
+
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import Table, exc, inspect, text
+from sqlalchemy.orm import Session
+
+from agent0.chainsync.db.base import DBAddrToUsername
+
+from .checkpoint_price_index import clear_checkpoint_price_indices
+from .schema import (
+    DBCheckpointInfo,
+    DBHyperdriveAddrToName,
+    DBLeaderboard,
+    DBPoolConfig,
+    DBPoolInfo,
+    DBPoolInfoRollup,
+    DBPositionSnapshot,
+    DBTradeEvent,
+)
+
+SNAPSHOT_TABLES: list[Table] = [
+    DBAddrToUsername.__table__,  # type: ignore
+    DBHyperdriveAddrToName.__table__,  # type: ignore
+    DBPoolConfig.__table__,  # type: ignore
+    DBCheckpointInfo.__table__,  # type: ignore
+    DBTradeEvent.__table__,  # type: ignore
+    DBPoolInfo.__table__,  # type: ignore
+    DBPositionSnapshot.__table__,  # type: ignore
+    DBPoolInfoRollup.__table__,  # type: ignore
+    DBLeaderboard.__table__,  # type: ignore
+]
+"""The tables copied when snapshotting the database."""
+
+DEFAULT_SNAPSHOT_PREFIX = "snapshot_"
+"""The default prefix of the tables holding the snapshot."""
+
+
+def _is_postgres(session: Session) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def _commit(session: Session) -> None:
+    try:
+        session.commit()
+    except exc.SQLAlchemyError as err:
+        session.rollback()
+        logging.error("Error on snapshotting the db: %s", err)
+        raise err
+
+
+def has_db_snapshot(session: Session, snapshot_prefix: str = DEFAULT_SNAPSHOT_PREFIX) -> bool:
+    """Check if the database has a snapshot.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    snapshot_prefix: str, optional
+        The prefix of the tables holding the snapshot. Defaults to `DEFAULT_SNAPSHOT_PREFIX`.
+
+    Returns
+    -------
+    bool
+        True if all snapshot tables exist.
+    """
+    table_names = set(inspect(session.connection()).get_table_names())
+    return all(snapshot_prefix + table.name in table_names for table in SNAPSHOT_TABLES)
+
+
+def save_db_snapshot(session: Session, snapshot_prefix: str = DEFAULT_SNAPSHOT_PREFIX) -> None:
+    """Copy the hyperdrive tables to snapshot tables within the database, overwriting any previous snapshot.
+
+    Since the data never leaves the database, this is much faster than exporting the database to file.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    snapshot_prefix: str, optional
+        The prefix of the tables holding the snapshot. Defaults to `DEFAULT_SNAPSHOT_PREFIX`.
+    """
+    # Snapshots are thrown away with the db, so we skip the write ahead log in postgres
+    create_table = "CREATE UNLOGGED TABLE" if _is_postgres(session) else "CREATE TABLE"
+    for table in SNAPSHOT_TABLES:
+        snapshot_table_name = snapshot_prefix + table.name
+        session.execute(text(f"DROP TABLE IF EXISTS {snapshot_table_name}"))
+        session.execute(text(f"{create_table} {snapshot_table_name} AS SELECT * FROM {table.name}"))
+    _commit(session)
+
+
+def load_db_snapshot(session: Session, snapshot_prefix: str = DEFAULT_SNAPSHOT_PREFIX) -> None:
+    """Replace the hyperdrive tables with the snapshot tables saved by `save_db_snapshot`.
+
+    The snapshot is kept, so it can be loaded multiple times.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    snapshot_prefix: str, optional
+        The prefix of the tables holding the snapshot. Defaults to `DEFAULT_SNAPSHOT_PREFIX`.
+    """
+    if not has_db_snapshot(session, snapshot_prefix):
+        raise ValueError(f"No db snapshot with prefix {snapshot_prefix} to load.")
+    if _is_postgres(session):
+        session.execute(text(f"TRUNCATE {', '.join(table.name for table in SNAPSHOT_TABLES)}"))
+    else:
+        for table in SNAPSHOT_TABLES:
+            session.execute(text(f"DELETE FROM {table.name}"))
+    for table in SNAPSHOT_TABLES:
+        # The snapshot tables are created from the tables, so the columns are in the same order
+        session.execute(text(f"INSERT INTO {table.name} SELECT * FROM {snapshot_prefix + table.name}"))
+    _commit(session)
+
+    # The in-memory checkpoint prices may no longer match the checkpoints in the db after loading,
+    # so we drop them to be rebuilt on next access
+    clear_checkpoint_price_indices(session)
@@ -0,0 +1,69 @@
+"""Tests for snapshots of hyperdrive tables within the db"""
+
+import pytest
+
+from .db_snapshot import has_db_snapshot, load_db_snapshot, save_db_snapshot
+from .interface import add_trade_events, get_trade_events
+from .partitioning import partition_tables_by_block
+from .schema import DBTradeEvent
+
+
+# These tests are using fixtures defined in conftest.py
+class TestDBSnapshot:
+    """Testing saving and loading db snapshots in postgres"""
+
+    @pytest.mark.docker
+    def test_save_load_db_snapshot(self, db_session):
+        """Testing rows added after the snapshot get removed on load"""
+        add_trade_events(
+            [
+                DBTradeEvent(block_number=block, transaction_hash="a", hyperdrive_address="a", wallet_address="1")
+                for block in [1, 2]
+            ],
+            db_session,
+        )
+        assert not has_db_snapshot(db_session)
+        with pytest.raises(ValueError):
+            load_db_snapshot(db_session)
+
+        save_db_snapshot(db_session)
+        assert has_db_snapshot(db_session)
+
+        add_trade_events(
+            [DBTradeEvent(block_number=3, transaction_hash="a", hyperdrive_address="a", wallet_address="1")],
+            db_session,
+        )
+        assert get_trade_events(db_session)["block_number"].tolist() == [1, 2, 3]
+
+        # Snapshots can be loaded multiple times
+        for _ in range(2):
+            load_db_snapshot(db_session)
+            assert get_trade_events(db_session)["block_number"].tolist() == [1, 2]
+
+        # Rows can be added after loading
+        add_trade_events(
+            [DBTradeEvent(block_number=4, transaction_hash="a", hyperdrive_address="a", wallet_address="1")],
+            db_session,
+        )
+        trade_events = get_trade_events(db_session)
+        assert trade_events["block_number"].tolist() == [1, 2, 4]
+        assert trade_events["id"].is_unique
+
+    @pytest.mark.docker
+    def test_db_snapshot_partitioned_tables(self, db_session):
+        """Testing snapshots of tables partitioned by block"""
+        partition_tables_by_block(db_session, partition_size=10)
+        add_trade_events(
+            [
+                DBTradeEvent(block_number=block, transaction_hash="a", hyperdrive_address="a", wallet_address="1")
+                for block in [1, 15]
+            ],
+            db_session,
+        )
+        save_db_snapshot(db_session)
+        add_trade_events(
+            [DBTradeEvent(block_number=25, transaction_hash="a", hyperdrive_address="a", wallet_address="1")],
+            db_session,
+        )
+        load_db_snapshot(db_session)
+        assert get_trade_events(db_session)["block_number"].tolist() == [1, 15]
@@ -3,37 +3,176 @@
 from __future__ import annotations
 
 import logging
+import re
 from pathlib import Path
+from typing import Iterator, Type
 
 import pandas as pd
-from sqlalchemy import exc
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import BigInteger, Boolean, DateTime, Integer, LargeBinary, Numeric, String, Table, exc, select
 from sqlalchemy.orm import Session
 
-from agent0.chainsync.db.base import DBAddrToUsername, get_addr_to_username, initialize_session
+from agent0.chainsync.db.base import DBAddrToUsername, DBBase, get_addr_to_username, initialize_session
 from agent0.chainsync.df_to_db import df_to_db
 
+from .checkpoint_price_index import clear_checkpoint_price_indices
 from .interface import (
+    backfill_pool_info_rollups,
     get_checkpoint_info,
     get_hyperdrive_addr_to_name,
+    get_leaderboard,
     get_pool_config,
-    get_pool_info,
-    get_position_snapshot,
-    get_trade_events,
+    get_pool_info_rollup,
 )
-from .schema import DBCheckpointInfo, DBHyperdriveAddrToName, DBPoolConfig, DBPoolInfo, DBPositionSnapshot, DBTradeEvent
+from .schema import (
+    DBCheckpointInfo,
+    DBHyperdriveAddrToName,
+    DBLeaderboard,
+    DBPoolConfig,
+    DBPoolInfo,
+    DBPoolInfoRollup,
+    DBPositionSnapshot,
+    DBTradeEvent,
+)
+
+# The tables that grow with the number of blocks get streamed to and from file in chunks.
+# Keyed by the file name of the table.
+BLOCK_TABLES: dict[str, Type[DBBase]] = {
+    "trade_event": DBTradeEvent,
+    "pool_info": DBPoolInfo,
+    "position_snapshot": DBPositionSnapshot,
+}
+
+DEFAULT_CHUNK_SIZE = 50_000
+"""The default number of rows to read from the db, and to write per parquet row group."""
+
+# Incremental exports are written next to the full export as, e.g., `trade_event.since_block_100.parquet`
+_INCREMENTAL_FILE_REGEX = re.compile(r"\.since_block_(\d+)\.parquet$")
+
+
+def _arrow_schema(table: Table) -> pa.Schema:
+    """Build a parquet schema from a db table, so that every streamed chunk is written with the same types."""
+    fields = []
+    for column in table.columns:
+        if isinstance(column.type, (BigInteger, Integer)):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Numeric):
+            # Fixed point values have 18 decimals, this is the largest decimal parquet supports
+            arrow_type = pa.decimal256(76, 18)
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("ns")
+        elif isinstance(column.type, LargeBinary):
+            arrow_type = pa.binary()
+        elif isinstance(column.type, String):
+            arrow_type = pa.string()
+        else:
+            raise TypeError(f"Unsupported column type {column.type} for column {column.name}")
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def _export_block_table(
+    db_session: Session, schema_obj: Type[DBBase], out_file: Path, since_block: int | None, chunk_size: int
+) -> None:
+    """Stream a block table from the db to a parquet file, one row group per chunk."""
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    table: Table = schema_obj.__table__  # type: ignore
+    query = select(table)
+    if since_block is not None:
+        query = query.where(table.c.block_number >= since_block)
+    # We use a server side cursor to avoid loading the whole table into memory
+    query = query.order_by(table.c.block_number, table.c.id).execution_options(
+        stream_results=True, max_row_buffer=chunk_size
+    )
+    schema = _arrow_schema(table)
+    with pq.ParquetWriter(out_file, schema) as writer:
+        for chunk in pd.read_sql(query, con=db_session.connection(), coerce_float=False, chunksize=chunk_size):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    # Release the server side cursor's transaction
+    db_session.commit()
+
+
+def _block_table_files(in_dir: Path, name: str) -> list[tuple[int | None, Path]]:
+    """Get the files of a block table, sorted by the block each file starts at.
+
+    The full export starts at block None, followed by incremental exports.
+    """
+    files: list[tuple[int | None, Path]] = []
+    if (in_dir / f"{name}.parquet").exists():
+        files.append((None, in_dir / f"{name}.parquet"))
+    incremental_files = []
+    for file in in_dir.glob(f"{name}.since_block_*.parquet"):
+        match = _INCREMENTAL_FILE_REGEX.search(file.name)
+        if match is not None:
+            incremental_files.append((int(match[1]), file))
+    files.extend(sorted(incremental_files))
+    if len(files) == 0:
+        raise FileNotFoundError(f"No exported files found for {name} in {in_dir}")
+    return files
+
+
+def iter_block_table_chunks(in_dir: Path, name: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Stream an exported block table from file in chunks.
 
+    Rows in the full export and incremental exports are combined such that each block is read from the
+    latest export that contains it, so repeated incremental exports from the same block don't duplicate rows.
 
-def export_db_to_file(out_dir: Path, db_session: Session | None = None) -> None:
+    Arguments
+    ---------
+    in_dir: Path
+        The directory to read the parquet files from that matches the out_dir passed into export_db_to_file
+    name: str
+        The file name of the table, one of `BLOCK_TABLES`.
+    chunk_size: int, optional
+        The maximum number of rows per chunk. Defaults to `DEFAULT_CHUNK_SIZE`.
+
+    Yields
+    ------
+    pd.DataFrame
+        A chunk of rows from the table.
+    """
+    files = _block_table_files(in_dir, name)
+    for i, (_, file) in enumerate(files):
+        # Rows from this file are superseded by the next incremental export
+        end_block = files[i + 1][0] if i + 1 < len(files) else None
+        for batch in pq.ParquetFile(file).iter_batches(batch_size=chunk_size):
+            chunk = batch.to_pandas()
+            if end_block is not None:
+                chunk = chunk[chunk["block_number"] < end_block].reset_index(drop=True)
+            if len(chunk) > 0:
+                yield chunk
+
+
+def export_db_to_file(
+    out_dir: Path,
+    db_session: Session | None = None,
+    since_block: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> None:
     """Export all tables from the database and write as parquet files, one per table.
     We use parquet since it's type aware, so all original types (including Decimals) are preserved
     when read
 
+    The tables that grow with the number of blocks (trade events, pool info, and position snapshots)
+    are streamed from the db in chunks, so exporting doesn't need to hold these tables in memory.
+
     Arguments
     ---------
     out_dir: Path
         The directory to write the parquet files to. It's assumed this directory already exists.
     db_session: Session | None, optional
         The initialized session object. If none, will read credentials from `.env`
+    since_block: int | None, optional
+        If set, will only export rows of block tables from this block onwards into separate incremental
+        files next to a previous full export in `out_dir`. All other tables are exported in full.
+        Defaults to exporting all rows and removing any previous incremental files.
+    chunk_size: int, optional
+        The number of rows to read from the db at a time when streaming block tables.
+        Defaults to `DEFAULT_CHUNK_SIZE`.
     """
     if db_session is None:
         # postgres session
@@ -46,22 +185,32 @@ def export_db_to_file(out_dir: Path, db_session: Session | None = None) -> None:
     get_hyperdrive_addr_to_name(db_session).to_parquet(
         out_dir / "hyperdrive_addr_to_name.parquet", index=False, engine="pyarrow"
     )
-    get_trade_events(db_session, all_token_deltas=True).to_parquet(
-        out_dir / "trade_event.parquet", index=False, engine="pyarrow"
-    )
     get_pool_config(db_session, coerce_float=False).to_parquet(
         out_dir / "pool_config.parquet", index=False, engine="pyarrow"
     )
     get_checkpoint_info(db_session, coerce_float=False).to_parquet(
         out_dir / "checkpoint_info.parquet", index=False, engine="pyarrow"
     )
-    get_pool_info(db_session, coerce_float=False).to_parquet(
-        out_dir / "pool_info.parquet", index=False, engine="pyarrow"
+    get_pool_info_rollup(db_session, coerce_float=False).to_parquet(
+        out_dir / "pool_info_rollup.parquet", index=False, engine="pyarrow"
     )
-    get_position_snapshot(db_session, coerce_float=False).to_parquet(
-        out_dir / "position_snapshot.parquet", index=False, engine="pyarrow"
+    get_leaderboard(db_session, coerce_float=False).to_parquet(
+        out_dir / "leaderboard.parquet", index=False, engine="pyarrow"
     )
 
+    # Block tables
+    for name, schema_obj in BLOCK_TABLES.items():
+        if since_block is None:
+            # Previous incremental exports are stale after a full export
+            for file in out_dir.glob(f"{name}.since_block_*.parquet"):
+                file.unlink()
+            out_file = out_dir / f"{name}.parquet"
+        else:
+            if not (out_dir / f"{name}.parquet").exists():
+                raise FileNotFoundError(f"Incremental export requires a previous full export of {name} in {out_dir}")
+            out_file = out_dir / f"{name}.since_block_{since_block}.parquet"
+        _export_block_table(db_session, schema_obj, out_file, since_block, chunk_size)
+
 
 def import_to_pandas(in_dir: Path) -> dict[str, pd.DataFrame]:
     """Helper function to load data from parquet
@@ -80,17 +229,27 @@ def import_to_pandas(in_dir: Path) -> dict[str, pd.DataFrame]:
 
     out["addr_to_username"] = pd.read_parquet(in_dir / "addr_to_username.parquet", engine="pyarrow")
     out["hyperdrive_addr_to_name"] = pd.read_parquet(in_dir / "hyperdrive_addr_to_name.parquet", engine="pyarrow")
-    out["trade_event"] = pd.read_parquet(in_dir / "trade_event.parquet", engine="pyarrow")
     out["pool_config"] = pd.read_parquet(in_dir / "pool_config.parquet", engine="pyarrow")
     out["checkpoint_info"] = pd.read_parquet(in_dir / "checkpoint_info.parquet", engine="pyarrow")
-    out["pool_info"] = pd.read_parquet(in_dir / "pool_info.parquet", engine="pyarrow")
-    out["position_snapshot"] = pd.read_parquet(in_dir / "position_snapshot.parquet", engine="pyarrow")
+    for name in BLOCK_TABLES:
+        chunks = list(iter_block_table_chunks(in_dir, name))
+        if len(chunks) > 0:
+            out[name] = pd.concat(chunks, ignore_index=True)
+        else:
+            out[name] = pq.read_table(_block_table_files(in_dir, name)[0][1]).to_pandas()
+    # Exports from before the derived tables existed don't have these files
+    if (in_dir / "pool_info_rollup.parquet").exists():
+        out["pool_info_rollup"] = pd.read_parquet(in_dir / "pool_info_rollup.parquet", engine="pyarrow")
+    if (in_dir / "leaderboard.parquet").exists():
+        out["leaderboard"] = pd.read_parquet(in_dir / "leaderboard.parquet", engine="pyarrow")
     return out
 
 
-def import_to_db(db_session: Session, in_dir: Path, drop=True) -> None:
+def import_to_db(db_session: Session, in_dir: Path, drop=True, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
     """Helper function to load data from parquet into the db
 
+    The block tables are streamed from file in chunks and bulk loaded into the db.
+
     Arguments
     ---------
     db_session: Session
@@ -99,6 +258,8 @@ def import_to_db(db_session: Session, in_dir: Path, drop=True) -> None:
         The directory to read the parquet files from that matches the out_dir passed into export_db_to_file
     drop: bool, optional
         Whether to drop the existing data in the db before importing
+    chunk_size: int, optional
+        The number of rows to load into the db at a time for block tables. Defaults to `DEFAULT_CHUNK_SIZE`.
     """
     # Drop all if drop is set
 
@@ -109,7 +270,9 @@ def import_to_db(db_session: Session, in_dir: Path, drop=True) -> None:
         db_session.query(DBPoolConfig).delete()
         db_session.query(DBCheckpointInfo).delete()
         db_session.query(DBPoolInfo).delete()
+        db_session.query(DBPoolInfoRollup).delete()
         db_session.query(DBPositionSnapshot).delete()
+        db_session.query(DBLeaderboard).delete()
         try:
             db_session.commit()
         except exc.DataError as err:
@@ -117,11 +280,26 @@ def import_to_db(db_session: Session, in_dir: Path, drop=True) -> None:
             logging.error("Error on adding wallet_infos: %s", err)
             raise err
 
-    out = import_to_pandas(in_dir)
-    df_to_db(out["addr_to_username"], DBAddrToUsername, db_session)
-    df_to_db(out["hyperdrive_addr_to_name"], DBHyperdriveAddrToName, db_session)
-    df_to_db(out["trade_event"], DBTradeEvent, db_session)
-    df_to_db(out["pool_config"], DBPoolConfig, db_session)
-    df_to_db(out["checkpoint_info"], DBCheckpointInfo, db_session)
-    df_to_db(out["pool_info"], DBPoolInfo, db_session)
-    df_to_db(out["position_snapshot"], DBPositionSnapshot, db_session)
+    # The in-memory checkpoint prices may no longer match the checkpoints in the db after import,
+    # so we drop them to be rebuilt on next access
+    clear_checkpoint_price_indices(db_session)
+
+    df_to_db(pd.read_parquet(in_dir / "addr_to_username.parquet", engine="pyarrow"), DBAddrToUsername, db_session)
+    df_to_db(
+        pd.read_parquet(in_dir / "hyperdrive_addr_to_name.parquet", engine="pyarrow"),
+        DBHyperdriveAddrToName,
+        db_session,
+    )
+    df_to_db(pd.read_parquet(in_dir / "pool_config.parquet", engine="pyarrow"), DBPoolConfig, db_session)
+    df_to_db(pd.read_parquet(in_dir / "checkpoint_info.parquet", engine="pyarrow"), DBCheckpointInfo, db_session)
+    for name, schema_obj in BLOCK_TABLES.items():
+        for chunk in iter_block_table_chunks(in_dir, name, chunk_size=chunk_size):
+            df_to_db(chunk, schema_obj, db_session, bulk_copy=True)
+    # Exports from before the derived tables existed don't have these files
+    if (in_dir / "pool_info_rollup.parquet").exists():
+        df_to_db(pd.read_parquet(in_dir / "pool_info_rollup.parquet", engine="pyarrow"), DBPoolInfoRollup, db_session)
+    else:
+        # The rollups are derived from pool info, so they can be rebuilt from the imported rows
+        backfill_pool_info_rollups(db_session)
+    if (in_dir / "leaderboard.parquet").exists():
+        df_to_db(pd.read_parquet(in_dir / "leaderboard.parquet", engine="pyarrow"), DBLeaderboard, db_session)
@@ -4,11 +4,13 @@ from decimal import Decimal
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
+import pandas as pd
+import pyarrow.parquet as pq
 import pytest
 
-from .import_export_data import export_db_to_file, import_to_pandas
-from .interface import add_pool_config, get_pool_config
-from .schema import DBPoolConfig
+from .import_export_data import export_db_to_file, import_to_db, import_to_pandas
+from .interface import add_pool_config, add_trade_events, get_pool_config, get_trade_events
+from .schema import DBPoolConfig, DBTradeEvent
 
 
 # These tests are using fixtures defined in conftest.py
@@ -31,3 +33,49 @@ class TestExportImportData:
             export_db_to_file(temp_data_dir, db_session)
             read_pool_config = import_to_pandas(temp_data_dir)["pool_config"]
             assert read_pool_config.equals(pool_config_in)
+
+    @pytest.mark.docker
+    def test_streaming_incremental_export_import(self, db_session):
+        """Testing block tables round trip through chunked and incremental exports"""
+        add_trade_events(
+            [
+                DBTradeEvent(
+                    block_number=block,
+                    transaction_hash=str(block),
+                    hyperdrive_address="a",
+                    wallet_address="1",
+                    token_delta=Decimal("1.123456789012345678") * block,
+                )
+                for block in range(10)
+            ],
+            db_session,
+        )
+
+        with TemporaryDirectory() as temp_data_dir:
+            temp_data_dir = Path(temp_data_dir)
+            # Small chunks to write multiple row groups
+            export_db_to_file(temp_data_dir, db_session, chunk_size=3)
+            assert pq.ParquetFile(temp_data_dir / "trade_event.parquet").num_row_groups == 4
+
+            # Incremental exports only write new blocks
+            add_trade_events(
+                [DBTradeEvent(block_number=10, transaction_hash="10", hyperdrive_address="a", wallet_address="1")],
+                db_session,
+            )
+            export_db_to_file(temp_data_dir, db_session, since_block=10)
+            assert len(pd.read_parquet(temp_data_dir / "trade_event.since_block_10.parquet")) == 1
+            # Exporting again from an earlier block supersedes overlapping rows instead of duplicating them
+            export_db_to_file(temp_data_dir, db_session, since_block=8)
+
+            trade_events_in = get_trade_events(db_session)
+            read_trade_events = import_to_pandas(temp_data_dir)["trade_event"]
+            assert read_trade_events["block_number"].tolist() == list(range(11))
+            assert read_trade_events["token_delta"].tolist() == trade_events_in["token_delta"].tolist()
+
+            # Importing streams rows back into the db
+            import_to_db(db_session, temp_data_dir, drop=True, chunk_size=4)
+            assert get_trade_events(db_session)["block_number"].tolist() == list(range(11))
+
+            # A full export removes stale incremental exports
+            export_db_to_file(temp_data_dir, db_session)
+            assert len(list(temp_data_dir.glob("trade_event.since_block_*.parquet"))) == 0
@@ -3,23 +3,151 @@
 from __future__ import annotations
 
 import logging
+from datetime import datetime, timezone
+from typing import Any
 
 import pandas as pd
-from sqlalchemy import cast, exc, func
-from sqlalchemy.orm import Session
+from sqlalchemy import BigInteger, Select, cast, exc, func, literal, or_, select, type_coerce
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, insert
+from sqlalchemy.orm import InstrumentedAttribute, Query, Session
 
 from agent0.chainsync.db.base import get_latest_block_number_from_table
+from agent0.chainsync.df_to_db import df_to_db
 
 from .schema import (
     FIXED_NUMERIC,
     DBCheckpointInfo,
     DBHyperdriveAddrToName,
+    DBLeaderboard,
     DBPoolConfig,
     DBPoolInfo,
+    DBPoolInfoRollup,
     DBPositionSnapshot,
     DBTradeEvent,
 )
 
+# Downsampling helpers
+
+
+def _resolve_downsample_block_range(
+    session: Session,
+    query: Query,
+    block_number_column: InstrumentedAttribute,
+    start_block: int | None,
+    end_block: int | None,
+) -> tuple[int, int]:
+    """Resolve the (inclusive, exclusive) block range of a query for downsampling.
+
+    Missing bounds are taken from the rows matched by the query, so the range reflects
+    any filters of the query (e.g., on wallet or hyperdrive address).
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    query: Query
+        The filtered query to downsample.
+    block_number_column: InstrumentedAttribute
+        The block number column of the query.
+    start_block: int | None
+        The (non-negative) starting block of the query, or None if not filtered.
+    end_block: int | None
+        The (non-negative) ending block of the query, or None if not filtered.
+
+    Returns
+    -------
+    tuple[int, int]
+        The start and end block of the query.
+    """
+    if start_block is None or end_block is None:
+        subquery = query.subquery()
+        block_numbers = subquery.c[block_number_column.key]
+        min_block, max_block = session.execute(select(func.min(block_numbers), func.max(block_numbers))).one()
+        if start_block is None:
+            start_block = 0 if min_block is None else min_block
+        if end_block is None:
+            end_block = 0 if max_block is None else max_block + 1
+    return int(start_block), int(end_block)
+
+
+def _downsample_by_block(
+    query: Query,
+    block_number_column: Any,
+    partition_columns: list[Any],
+    order_column: Any,
+    start_block: int,
+    end_block: int,
+    max_points: int,
+    extreme_columns: list[Any] | None = None,
+) -> Select:
+    """Downsample a query on the db side to keep at most `max_points` rows per partition.
+
+    The block range is split into equally sized block buckets, and the last row (i.e., the row with
+    the highest block number) of each bucket is kept for each partition. For each of the `extreme_columns`,
+    the rows with the lowest and highest value in each bucket are kept as well, so spikes within a bucket
+    still show up in plots. This is done with window functions over the buckets, so the amount of data
+    transferred from the db is independent of the number of blocks in the range.
+
+    Arguments
+    ---------
+    query: Query
+        The query to downsample. This query should not have an `order_by` clause.
+    block_number_column: Any
+        The block number column of the query.
+    partition_columns: list[Any]
+        The columns that define separate series in the query (e.g., hyperdrive address, wallet address).
+        Each series gets downsampled independently.
+    order_column: Any
+        The column to sort the downsampled results by.
+    start_block: int
+        The (inclusive) start block of the query.
+    end_block: int
+        The (exclusive) end block of the query.
+    max_points: int
+        The maximum number of rows to return per partition.
+    extreme_columns: list[Any] | None, optional
+        The value expressions to keep the minimum and maximum rows of in each bucket.
+        Aggregated values must be passed as the aggregate expression, not its label.
+        Defaults to only keeping the last row of each bucket.
+
+    Returns
+    -------
+    Select
+        The downsampled select statement, sorted by `order_column`.
+    """
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    if max_points <= 0:
+        raise ValueError(f"{max_points=} must be positive.")
+    if extreme_columns is None:
+        extreme_columns = []
+    # Each bucket keeps up to one last, one min, and one max row per extreme column
+    num_buckets = max(max_points // (1 + 2 * len(extreme_columns)), 1)
+    # Ceiling division for the number of blocks per bucket
+    bucket_size = -(-(end_block - start_block) // num_buckets)
+    if bucket_size <= 1:
+        return query.order_by(order_column).statement
+
+    bucket = (block_number_column - literal(start_block, literal_execute=True)) // literal(
+        bucket_size, literal_execute=True
+    )
+    partition_by = [*partition_columns, bucket]
+    order_bys = [[block_number_column.desc()]]
+    for column in extreme_columns:
+        order_bys.append([column.asc().nulls_last(), block_number_column.desc()])
+        order_bys.append([column.desc().nulls_last(), block_number_column.desc()])
+    row_numbers = [
+        func.row_number().over(partition_by=partition_by, order_by=order_by).label(f"_downsample_row_{i}")
+        for i, order_by in enumerate(order_bys)
+    ]
+    subquery = query.add_columns(*row_numbers).subquery()
+    output_columns = [column for column in subquery.c if not column.key.startswith("_downsample_row_")]
+    return (
+        select(*output_columns)
+        .where(or_(*[subquery.c[row_number.key] == 1 for row_number in row_numbers]))
+        .order_by(subquery.c[order_column.key])
+    )
+
 
 # Pool Addr Mapping Name
 def add_hyperdrive_addr_to_name(
@@ -472,6 +600,7 @@ def get_pool_info(
     start_block: int | None = None,
     end_block: int | None = None,
     coerce_float=False,
+    max_points: int | None = None,
 ) -> pd.DataFrame:
     """Get all pool info and returns a pandas dataframe.
 
@@ -489,12 +618,18 @@ def get_pool_info(
         matches python slicing notation, e.g., list[:3], list[:-3].
     coerce_float: bool, optional
         If true, will return floats in dataframe. Otherwise, will return fixed point Decimal.
+    max_points: int | None, optional
+        If set, will downsample the result on the db side to at most this many rows per pool
+        by keeping the last row of equally sized block buckets. Only the last row is kept, so values
+        between the kept rows (e.g., spikes in outstanding positions) don't show up. Defaults to returning all rows.
 
     Returns
     -------
     DataFrame
         A DataFrame that consists of the queried pool info data.
     """
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
     query = session.query(DBPoolInfo)
 
     if hyperdrive_address is not None:
@@ -512,7 +647,234 @@ def get_pool_info(
         query = query.filter(DBPoolInfo.block_number < end_block)
 
     # Always sort by time in order
-    query = query.order_by(DBPoolInfo.timestamp)
+    if max_points is not None:
+        start_block, end_block = _resolve_downsample_block_range(
+            session, query, DBPoolInfo.block_number, start_block, end_block
+        )
+        statement = _downsample_by_block(
+            query,
+            DBPoolInfo.block_number,
+            partition_columns=[DBPoolInfo.hyperdrive_address],
+            order_column=DBPoolInfo.timestamp,
+            start_block=start_block,
+            end_block=end_block,
+            max_points=max_points,
+        )
+    else:
+        statement = query.order_by(DBPoolInfo.timestamp).statement
+
+    return pd.read_sql(statement, con=session.connection(), coerce_float=coerce_float)
+
+
+# Pool info rollup buckets, keyed by pandas offset alias with values in seconds
+POOL_INFO_ROLLUP_BUCKETS: dict[str, int] = {"5min": 5 * 60, "1h": 60 * 60, "1D": 24 * 60 * 60}
+# The pool info fields that get aggregated into open, high, low, close values in the rollup table
+POOL_INFO_ROLLUP_FIELDS: list[str] = ["spot_price", "fixed_rate", "variable_rate", "vault_share_price"]
+
+
+def _aggregate_pool_info_rollups(
+    session: Session,
+    hyperdrive_address: str | None = None,
+    start_block: int | None = None,
+    end_block: int | None = None,
+) -> None:
+    """Aggregate pool info rows into the rollup table with a single upsert per bucket size, without committing.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    hyperdrive_address: str | None, optional
+        The hyperdrive address to aggregate rows for. Aggregates all pools if None.
+    start_block: int | None, optional
+        The (inclusive) first block of pool info rows to aggregate. Aggregates from the first row if None.
+    end_block: int | None, optional
+        The (exclusive) last block of pool info rows to aggregate. Aggregates up to the last row if None.
+    """
+    rollup_table = DBPoolInfoRollup.__table__
+    # Timestamps in the db are stored in utc without a timezone, so the epoch is extracted as utc
+    epoch_timestamp = func.coalesce(
+        DBPoolInfo.epoch_timestamp, cast(func.extract("epoch", DBPoolInfo.timestamp), BigInteger)
+    )
+    for bucket_size, bucket_seconds in POOL_INFO_ROLLUP_BUCKETS.items():
+        # Compute the bucket of each row in a subquery, so that the group by is over a plain column
+        bucket_epoch = epoch_timestamp - epoch_timestamp % bucket_seconds
+        rows = select(
+            DBPoolInfo.hyperdrive_address,
+            DBPoolInfo.block_number,
+            func.timezone("UTC", func.to_timestamp(bucket_epoch)).label("timestamp"),
+            *[getattr(DBPoolInfo, field) for field in POOL_INFO_ROLLUP_FIELDS],
+        )
+        if hyperdrive_address is not None:
+            rows = rows.where(DBPoolInfo.hyperdrive_address == hyperdrive_address)
+        if start_block is not None:
+            rows = rows.where(DBPoolInfo.block_number >= start_block)
+        if end_block is not None:
+            rows = rows.where(DBPoolInfo.block_number < end_block)
+        rows_subquery = rows.subquery()
+
+        aggregates = {
+            "hyperdrive_address": rows_subquery.c.hyperdrive_address,
+            "bucket_size": literal(bucket_size),
+            "timestamp": rows_subquery.c.timestamp,
+            "first_block_number": func.min(rows_subquery.c.block_number),
+            "last_block_number": func.max(rows_subquery.c.block_number),
+            "num_samples": func.count(),
+        }
+        for field in POOL_INFO_ROLLUP_FIELDS:
+            column = rows_subquery.c[field]
+            # The first and last non-null values in block order
+            for suffix, block_order in [
+                ("open", rows_subquery.c.block_number),
+                ("close", rows_subquery.c.block_number.desc()),
+            ]:
+                aggregates[f"{field}_{suffix}"] = type_coerce(
+                    func.array_agg(aggregate_order_by(column, block_order)).filter(column.isnot(None)),
+                    ARRAY(FIXED_NUMERIC),
+                )[1]
+            aggregates[f"{field}_high"] = func.max(column)
+            aggregates[f"{field}_low"] = func.min(column)
+        bucket_rows = select(*[value.label(name) for name, value in aggregates.items()]).group_by(
+            rows_subquery.c.hyperdrive_address, rows_subquery.c.timestamp
+        )
+
+        # Merge into existing buckets. Open is kept from the existing bucket, and nulls are ignored
+        # by postgres' greatest and least.
+        statement = insert(rollup_table).from_select(list(aggregates.keys()), bucket_rows)
+        existing = rollup_table.c
+        merged = {
+            "last_block_number": statement.excluded.last_block_number,
+            "num_samples": existing.num_samples + statement.excluded.num_samples,
+        }
+        for field in POOL_INFO_ROLLUP_FIELDS:
+            merged[f"{field}_open"] = func.coalesce(existing[f"{field}_open"], statement.excluded[f"{field}_open"])
+            merged[f"{field}_high"] = func.greatest(existing[f"{field}_high"], statement.excluded[f"{field}_high"])
+            merged[f"{field}_low"] = func.least(existing[f"{field}_low"], statement.excluded[f"{field}_low"])
+            merged[f"{field}_close"] = func.coalesce(statement.excluded[f"{field}_close"], existing[f"{field}_close"])
+        statement = statement.on_conflict_do_update(
+            index_elements=[existing.hyperdrive_address, existing.bucket_size, existing.timestamp],
+            set_=merged,
+            # Buckets that already aggregated any of these blocks are left as is
+            where=existing.last_block_number < statement.excluded.first_block_number,
+        )
+        session.execute(statement)
+
+
+def update_pool_info_rollups(
+    session: Session,
+    hyperdrive_address: str | None = None,
+    start_block: int | None = None,
+    end_block: int | None = None,
+) -> None:
+    """Incrementally aggregates pool info rows into the pool info rollup table.
+
+    The aggregation is done on the db side with an `INSERT ... SELECT ... GROUP BY` upsert per bucket size.
+    New pool info rows are expected to be after the rows already in the rollups, which matches how
+    `acquire_data` adds rows. Buckets that already aggregated any block in the range are left unchanged,
+    so aggregating the same rows again is a no-op. Use `backfill_pool_info_rollups` to rebuild the rollups
+    from all pool info rows.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    hyperdrive_address: str | None, optional
+        The hyperdrive address to aggregate rows for. Aggregates all pools if None.
+    start_block: int | None, optional
+        The (inclusive) first block of pool info rows to aggregate. Aggregates from the first row if None.
+    end_block: int | None, optional
+        The (exclusive) last block of pool info rows to aggregate. Aggregates up to the last row if None.
+    """
+    try:
+        _aggregate_pool_info_rollups(session, hyperdrive_address, start_block, end_block)
+        session.commit()
+    except exc.DataError as err:
+        session.rollback()
+        logging.error("Error adding pool_info_rollups: %s", err)
+        raise err
+
+
+def backfill_pool_info_rollups(session: Session, hyperdrive_address: str | None = None) -> None:
+    """Rebuild the pool info rollup table from the existing pool info rows.
+
+    This is used for databases with pool info rows from before the rollup table existed.
+    The existing rollups are replaced in a single transaction.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    hyperdrive_address: str | None, optional
+        The hyperdrive address to rebuild rollups for. Rebuilds all pools if None.
+    """
+    try:
+        query = session.query(DBPoolInfoRollup)
+        if hyperdrive_address is not None:
+            query = query.filter(DBPoolInfoRollup.hyperdrive_address == hyperdrive_address)
+        query.delete()
+        _aggregate_pool_info_rollups(session, hyperdrive_address)
+        session.commit()
+    except exc.DataError as err:
+        session.rollback()
+        logging.error("Error backfilling pool_info_rollups: %s", err)
+        raise err
+
+
+def get_pool_info_rollup(
+    session: Session,
+    bucket_size: str | None = None,
+    hyperdrive_address: str | None = None,
+    start_time: datetime | None = None,
+    end_time: datetime | None = None,
+    coerce_float=False,
+) -> pd.DataFrame:
+    """Get the time bucketed open, high, low, close pool info and returns a pandas dataframe.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    bucket_size: str | None, optional
+        The bucket size to filter the query on. Must be one of the keys in `POOL_INFO_ROLLUP_BUCKETS`.
+        Returns all bucket sizes if None.
+    hyperdrive_address: str | None, optional
+        The hyperdrive address to filter the query on. Return all if None.
+    start_time: datetime | None, optional
+        The (inclusive) time to start the query on, in utc. Returns from the first bucket if None.
+    end_time: datetime | None, optional
+        The (exclusive) time to end the query on, in utc. Returns up to the last bucket if None.
+    coerce_float: bool, optional
+        If true, will return floats in dataframe. Otherwise, will return fixed point Decimal.
+
+    Returns
+    -------
+    DataFrame
+        A DataFrame that consists of the queried rollup data, sorted by bucket time.
+    """
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    query = session.query(DBPoolInfoRollup)
+
+    if bucket_size is not None:
+        if bucket_size not in POOL_INFO_ROLLUP_BUCKETS:
+            raise ValueError(f"Unknown {bucket_size=}, must be one of {list(POOL_INFO_ROLLUP_BUCKETS.keys())}")
+        query = query.filter(DBPoolInfoRollup.bucket_size == bucket_size)
+
+    if hyperdrive_address is not None:
+        query = query.filter(DBPoolInfoRollup.hyperdrive_address == hyperdrive_address)
+
+    # Timestamps in the db are stored in utc without a timezone
+    if start_time is not None:
+        if start_time.tzinfo is not None:
+            start_time = start_time.astimezone(timezone.utc).replace(tzinfo=None)
+        query = query.filter(DBPoolInfoRollup.timestamp >= start_time)
+    if end_time is not None:
+        if end_time.tzinfo is not None:
+            end_time = end_time.astimezone(timezone.utc).replace(tzinfo=None)
+        query = query.filter(DBPoolInfoRollup.timestamp < end_time)
+
+    # Always sort by time in order
+    query = query.order_by(DBPoolInfoRollup.timestamp)
 
     return pd.read_sql(query.statement, con=session.connection(), coerce_float=coerce_float)
 
@@ -543,7 +905,11 @@ def get_latest_block_number_from_checkpoint_info_table(session: Session, hyperdr
 
 
 def get_checkpoint_info(
-    session: Session, hyperdrive_address: str | None = None, checkpoint_time: int | None = None, coerce_float=False
+    session: Session,
+    hyperdrive_address: str | None = None,
+    checkpoint_time: int | None = None,
+    start_block: int | None = None,
+    coerce_float=False,
 ) -> pd.DataFrame:
     """Get all info associated with a given checkpoint.
 
@@ -555,6 +921,9 @@ def get_checkpoint_info(
         The hyperdrive pool address to filter the query on. Defaults to returning all checkpoint infos.
     checkpoint_time: int | None, optional
         The checkpoint time to filter the query on. Defaults to returning all checkpoint infos.
+    start_block: int | None, optional
+        The (inclusive) block number of the checkpoint event to start the query from.
+        Defaults to returning all checkpoint infos.
     coerce_float: bool, optional
         If True, will return floats in dataframe. Otherwise, will return fixed point Decimal.
         Defaults to False
@@ -572,6 +941,9 @@ def get_checkpoint_info(
     if checkpoint_time is not None:
         query = query.filter(DBCheckpointInfo.checkpoint_time == checkpoint_time)
 
+    if start_block is not None:
+        query = query.filter(DBCheckpointInfo.block_number >= start_block)
+
     # TODO there exists a race condition where the same checkpoint info row
     # can be duplicated. While this should be fixed in insertion, we fix by
     # ensuring the getter selects on distinct checkpoint times.
@@ -702,12 +1074,102 @@ def get_position_snapshot(
     return pd.read_sql(query.statement, con=session.connection(), coerce_float=coerce_float)
 
 
+def update_leaderboard(position_snapshot: pd.DataFrame, session: Session) -> None:
+    """Refresh the leaderboard entries for all pools in a position snapshot.
+
+    The position snapshot is expected to contain every position (including closed positions)
+    of every wallet in each pool at the snapshot block, which is what `snapshot_positions_to_db`
+    adds to the db when not filtering by wallet. All existing leaderboard rows for the pools in
+    the snapshot get replaced.
+
+    Arguments
+    ---------
+    position_snapshot: pd.DataFrame
+        The position snapshot with calculated pnl, as added to the position snapshot table.
+    session: Session
+        The initialized session object.
+    """
+    if len(position_snapshot) == 0:
+        return
+
+    leaderboard = (
+        position_snapshot.groupby(["hyperdrive_address", "wallet_address"])
+        .agg(block_number=("block_number", "max"), pnl=("pnl", "sum"))
+        .reset_index()
+    )
+    # We rank on floats, since Decimal nans can't be compared
+    leaderboard["rank"] = (
+        leaderboard["pnl"]
+        .astype(float)
+        .groupby(leaderboard["hyperdrive_address"])
+        .rank(method="min", ascending=False)
+        .astype("Int64")
+    )
+
+    # The delete and insert are committed as a single transaction in `df_to_db`
+    session.query(DBLeaderboard).filter(
+        DBLeaderboard.hyperdrive_address.in_(leaderboard["hyperdrive_address"].unique().tolist())
+    ).delete()
+    df_to_db(leaderboard, DBLeaderboard, session)
+
+
+def get_leaderboard(
+    session: Session,
+    hyperdrive_address: str | list[str] | None = None,
+    wallet_address: str | list[str] | None = None,
+    query_limit: int | None = None,
+    coerce_float=False,
+) -> pd.DataFrame:
+    """Get the materialized leaderboard and returns a pandas dataframe.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    hyperdrive_address: str | list[str] | None, optional
+        The hyperdrive pool address(es) to filter the query on. Defaults to returning all pools.
+    wallet_address: str | list[str] | None, optional
+        The wallet address(es) to filter the query on. Defaults to returning all wallets.
+    query_limit: int | None, optional
+        The number of rows to return. Defaults to return all rows.
+    coerce_float: bool, optional
+        If True, will return floats in dataframe. Otherwise, will return fixed point Decimal.
+        Defaults to False.
+
+    Returns
+    -------
+    DataFrame
+        A DataFrame that consists of the leaderboard, sorted by pool and rank.
+    """
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    query = session.query(DBLeaderboard)
+
+    if isinstance(hyperdrive_address, list):
+        query = query.filter(DBLeaderboard.hyperdrive_address.in_(hyperdrive_address))
+    elif hyperdrive_address is not None:
+        query = query.filter(DBLeaderboard.hyperdrive_address == hyperdrive_address)
+
+    if isinstance(wallet_address, list):
+        query = query.filter(DBLeaderboard.wallet_address.in_(wallet_address))
+    elif wallet_address is not None:
+        query = query.filter(DBLeaderboard.wallet_address == wallet_address)
+
+    query = query.order_by(DBLeaderboard.hyperdrive_address, DBLeaderboard.rank)
+
+    if query_limit is not None:
+        query = query.limit(query_limit)
+
+    return pd.read_sql(query.statement, con=session.connection(), coerce_float=coerce_float)
+
+
 def get_total_pnl_over_time(
     session: Session,
     start_block: int | None = None,
     end_block: int | None = None,
     wallet_address: list[str] | None = None,
     coerce_float=False,
+    max_points: int | None = None,
 ) -> pd.DataFrame:
     """Aggregate pnl over time over all positions a wallet has.
 
@@ -725,17 +1187,24 @@ def get_total_pnl_over_time(
         The wallet addresses to filter the query on. Returns all if None.
     coerce_float: bool
         If true, will return floats in dataframe. Otherwise, will return fixed point Decimal.
+    max_points: int | None, optional
+        If set, will downsample the result on the db side to at most this many rows per wallet
+        by keeping the last row, and the rows with the lowest and highest pnl, of equally sized
+        block buckets. Defaults to returning all rows.
 
     Returns
     -------
     DataFrame
         A DataFrame that consists of the queried pool info data.
     """
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
     # TODO add optional argument of hyperdrive address to not aggregate across pools.
+    total_pnl = func.sum(DBPositionSnapshot.pnl)
     query = session.query(
         DBPositionSnapshot.wallet_address,
         DBPositionSnapshot.block_number,
-        func.sum(DBPositionSnapshot.pnl).label("pnl"),
+        total_pnl.label("pnl"),
     )
 
     # Support for negative indices
@@ -754,9 +1223,24 @@ def get_total_pnl_over_time(
     query = query.group_by(DBPositionSnapshot.wallet_address, DBPositionSnapshot.block_number)
 
     # Always sort by block in order
-    query = query.order_by(DBPositionSnapshot.block_number)
+    if max_points is not None:
+        start_block, end_block = _resolve_downsample_block_range(
+            session, query, DBPositionSnapshot.block_number, start_block, end_block
+        )
+        statement = _downsample_by_block(
+            query,
+            DBPositionSnapshot.block_number,
+            partition_columns=[DBPositionSnapshot.wallet_address],
+            order_column=DBPositionSnapshot.block_number,
+            start_block=start_block,
+            end_block=end_block,
+            max_points=max_points,
+            extreme_columns=[total_pnl],
+        )
+    else:
+        statement = query.order_by(DBPositionSnapshot.block_number).statement
 
-    return pd.read_sql(query.statement, con=session.connection(), coerce_float=coerce_float)
+    return pd.read_sql(statement, con=session.connection(), coerce_float=coerce_float)
 
 
 def get_positions_over_time(
@@ -765,6 +1249,7 @@ def get_positions_over_time(
     end_block: int | None = None,
     wallet_address: list[str] | None = None,
     coerce_float=False,
+    max_points: int | None = None,
 ) -> pd.DataFrame:
     """Aggregate over token types over all position types.
 
@@ -782,17 +1267,24 @@ def get_positions_over_time(
         The wallet addresses to filter the query on. Returns all if None.
     coerce_float: bool
         If true, will return floats in dataframe. Otherwise, will return fixed point Decimal.
+    max_points: int | None, optional
+        If set, will downsample the result on the db side to at most this many rows per wallet and token type
+        by keeping the last row, and the rows with the lowest and highest token balance, of equally sized
+        block buckets. Defaults to returning all rows.
 
     Returns
     -------
     DataFrame
         A DataFrame that consists of the queried pool info data.
     """
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    total_token_balance = func.sum(DBPositionSnapshot.token_balance)
     query = session.query(
         DBPositionSnapshot.wallet_address,
         DBPositionSnapshot.block_number,
         DBPositionSnapshot.token_type,
-        func.sum(DBPositionSnapshot.token_balance).label("token_balance"),
+        total_token_balance.label("token_balance"),
     )
 
     # Support for negative indices
@@ -814,9 +1306,24 @@ def get_positions_over_time(
     )
 
     # Always sort by block in order
-    query = query.order_by(DBPositionSnapshot.block_number)
+    if max_points is not None:
+        start_block, end_block = _resolve_downsample_block_range(
+            session, query, DBPositionSnapshot.block_number, start_block, end_block
+        )
+        statement = _downsample_by_block(
+            query,
+            DBPositionSnapshot.block_number,
+            partition_columns=[DBPositionSnapshot.wallet_address, DBPositionSnapshot.token_type],
+            order_column=DBPositionSnapshot.block_number,
+            start_block=start_block,
+            end_block=end_block,
+            max_points=max_points,
+            extreme_columns=[total_token_balance],
+        )
+    else:
+        statement = query.order_by(DBPositionSnapshot.block_number).statement
 
-    return pd.read_sql(query.statement, con=session.connection(), coerce_float=coerce_float)
+    return pd.read_sql(statement, con=session.connection(), coerce_float=coerce_float)
 
 
 def get_realized_value_over_time(
@@ -825,6 +1332,7 @@ def get_realized_value_over_time(
     end_block: int | None = None,
     wallet_address: list[str] | None = None,
     coerce_float=False,
+    max_points: int | None = None,
 ) -> pd.DataFrame:
     """Aggregate over realized value over all position types.
 
@@ -842,16 +1350,23 @@ def get_realized_value_over_time(
         The wallet addresses to filter the query on. Returns all if None.
     coerce_float: bool
         If true, will return floats in dataframe. Otherwise, will return fixed point Decimal.
+    max_points: int | None, optional
+        If set, will downsample the result on the db side to at most this many rows per wallet
+        by keeping the last row, and the rows with the lowest and highest realized value, of equally sized
+        block buckets. Defaults to returning all rows.
 
     Returns
     -------
     DataFrame
         A DataFrame that consists of the queried pool info data.
     """
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    total_realized_value = func.sum(DBPositionSnapshot.realized_value)
     query = session.query(
         DBPositionSnapshot.wallet_address,
         DBPositionSnapshot.block_number,
-        func.sum(DBPositionSnapshot.realized_value).label("realized_value"),
+        total_realized_value.label("realized_value"),
     )
 
     # Support for negative indices
@@ -871,6 +1386,21 @@ def get_realized_value_over_time(
     query = query.group_by(DBPositionSnapshot.wallet_address, DBPositionSnapshot.block_number)
 
     # Always sort by block in order
-    query = query.order_by(DBPositionSnapshot.block_number)
+    if max_points is not None:
+        start_block, end_block = _resolve_downsample_block_range(
+            session, query, DBPositionSnapshot.block_number, start_block, end_block
+        )
+        statement = _downsample_by_block(
+            query,
+            DBPositionSnapshot.block_number,
+            partition_columns=[DBPositionSnapshot.wallet_address],
+            order_column=DBPositionSnapshot.block_number,
+            start_block=start_block,
+            end_block=end_block,
+            max_points=max_points,
+            extreme_columns=[total_realized_value],
+        )
+    else:
+        statement = query.order_by(DBPositionSnapshot.block_number).statement
 
-    return pd.read_sql(query.statement, con=session.connection(), coerce_float=coerce_float)
+    return pd.read_sql(statement, con=session.connection(), coerce_float=coerce_float)
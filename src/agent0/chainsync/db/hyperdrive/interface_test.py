@@ -1,9 +1,10 @@
 """CRUD tests for Transaction"""
 
-from datetime import datetime
+from datetime import datetime, timezone
 from decimal import Decimal
 
 import numpy as np
+import pandas as pd
 import pytest
 
 from .interface import (
@@ -12,15 +13,21 @@ from .interface import (
     add_pool_config,
     add_pool_infos,
     add_trade_events,
+    backfill_pool_info_rollups,
     get_all_traders,
     get_checkpoint_info,
     get_hyperdrive_addr_to_name,
     get_latest_block_number_from_pool_info_table,
     get_latest_block_number_from_trade_event,
+    get_leaderboard,
     get_pool_config,
     get_pool_info,
+    get_pool_info_rollup,
+    get_total_pnl_over_time,
+    update_leaderboard,
+    update_pool_info_rollups,
 )
-from .schema import DBCheckpointInfo, DBPoolConfig, DBPoolInfo, DBTradeEvent
+from .schema import DBCheckpointInfo, DBPoolConfig, DBPoolInfo, DBPositionSnapshot, DBTradeEvent
 
 
 class TestHyperdriveAddrToName:
@@ -299,6 +306,155 @@ class TestPoolInfoInterface:
             np.array(pool_info_df["timestamp"].values), np.array([timestamp_2]).astype("datetime64[ns]")
         )
 
+    @pytest.mark.docker
+    def test_downsample_pool_info(self, db_session):
+        """Testing db side downsampling of pool info via interface"""
+        pool_infos = [
+            DBPoolInfo(
+                block_number=block_number, hyperdrive_address=address, timestamp=datetime.fromtimestamp(block_number)
+            )
+            for block_number in range(100)
+            for address in ["a", "b"]
+        ]
+        add_pool_infos(pool_infos, db_session)
+
+        # Keeps the last block of every bucket of 10 blocks for each pool
+        pool_info_df = get_pool_info(db_session, hyperdrive_address="a", max_points=10)
+        np.testing.assert_array_equal(pool_info_df["block_number"], np.arange(9, 100, 10))
+        pool_info_df = get_pool_info(db_session, max_points=10)
+        assert len(pool_info_df) == 20
+        np.testing.assert_array_equal(pool_info_df["block_number"], np.repeat(np.arange(9, 100, 10), 2))
+
+        # Downsampling respects block ranges
+        pool_info_df = get_pool_info(db_session, hyperdrive_address="a", start_block=50, max_points=5)
+        np.testing.assert_array_equal(pool_info_df["block_number"], np.arange(59, 100, 10))
+
+        # Returns all rows if there are fewer blocks than max points
+        pool_info_df = get_pool_info(db_session, hyperdrive_address="a", max_points=1000)
+        assert len(pool_info_df) == 100
+
+
+class TestPositionSnapshotInterface:
+    """Testing postgres interface for position snapshot table"""
+
+    @pytest.mark.docker
+    def test_downsample_pnl_over_time(self, db_session):
+        """Testing db side downsampling of pnl keeps the extremes of each bucket"""
+        # Wallet "1" has a spike at block 15, wallet "2" only has blocks after 100
+        position_snapshots = [
+            DBPositionSnapshot(
+                hyperdrive_address="a",
+                block_number=block_number,
+                wallet_address="1",
+                pnl=Decimal(100 if block_number == 15 else 0),
+            )
+            for block_number in range(30)
+        ] + [
+            DBPositionSnapshot(hyperdrive_address="a", block_number=block_number, wallet_address="2", pnl=Decimal(1))
+            for block_number in range(100, 130)
+        ]
+        db_session.add_all(position_snapshots)
+        db_session.commit()
+
+        # 3 buckets of 10 blocks, keeping the last, min, and max row of each
+        pnl_df = get_total_pnl_over_time(db_session, wallet_address=["1"], max_points=9)
+        assert pnl_df["pnl"].max() == Decimal(100)
+        # Ties keep the latest block, so flat buckets only keep their last row
+        np.testing.assert_array_equal(pnl_df["block_number"], [9, 15, 19, 29])
+
+        # The block range of the filtered query is used for bucketing
+        pnl_df = get_total_pnl_over_time(db_session, wallet_address=["2"], max_points=9)
+        np.testing.assert_array_equal(pnl_df["block_number"], [109, 119, 129])
+
+
+class TestPoolInfoRollupInterface:
+    """Testing postgres interface for pool info rollup table"""
+
+    @pytest.mark.docker
+    def test_update_pool_info_rollups(self, db_session):
+        """Testing incremental aggregation of pool info into rollups"""
+        # 1628470800 is aligned to the hour
+        pool_infos = [
+            DBPoolInfo(
+                block_number=block_number,
+                hyperdrive_address="a",
+                timestamp=datetime.fromtimestamp(epoch_timestamp, timezone.utc),
+                epoch_timestamp=epoch_timestamp,
+                spot_price=Decimal(spot_price),
+            )
+            for block_number, epoch_timestamp, spot_price in [
+                (0, 1628470800, "0.95"),
+                (1, 1628470812, "0.97"),
+                (2, 1628470824, "0.93"),
+                (3, 1628471100, "0.94"),
+            ]
+        ]
+        add_pool_infos(pool_infos[:2], db_session)
+        update_pool_info_rollups(db_session, hyperdrive_address="a", start_block=0, end_block=2)
+        add_pool_infos(pool_infos[2:], db_session)
+        update_pool_info_rollups(db_session, hyperdrive_address="a", start_block=2, end_block=4)
+        # Aggregating the same rows again should be a no-op
+        update_pool_info_rollups(db_session, hyperdrive_address="a", start_block=2, end_block=4)
+
+        rollup_df = get_pool_info_rollup(db_session, bucket_size="5min")
+        assert len(rollup_df) == 2
+        np.testing.assert_array_equal(rollup_df["num_samples"], [3, 1])
+        np.testing.assert_array_equal(rollup_df["spot_price_open"], [Decimal("0.95"), Decimal("0.94")])
+        np.testing.assert_array_equal(rollup_df["spot_price_high"], [Decimal("0.97"), Decimal("0.94")])
+        np.testing.assert_array_equal(rollup_df["spot_price_low"], [Decimal("0.93"), Decimal("0.94")])
+        np.testing.assert_array_equal(rollup_df["spot_price_close"], [Decimal("0.93"), Decimal("0.94")])
+        # Null values are ignored in the aggregation
+        assert rollup_df["fixed_rate_open"].isna().all()
+
+        rollup_df = get_pool_info_rollup(db_session, bucket_size="1h")
+        assert len(rollup_df) == 1
+        assert rollup_df["first_block_number"].iloc[0] == 0
+        assert rollup_df["last_block_number"].iloc[0] == 3
+        assert rollup_df["spot_price_low"].iloc[0] == Decimal("0.93")
+        assert rollup_df["spot_price_close"].iloc[0] == Decimal("0.94")
+
+        # Query by time range
+        rollup_df = get_pool_info_rollup(
+            db_session, bucket_size="5min", start_time=datetime.fromtimestamp(1628471100, timezone.utc)
+        )
+        assert len(rollup_df) == 1
+        assert rollup_df["spot_price_open"].iloc[0] == Decimal("0.94")
+
+        with pytest.raises(ValueError):
+            get_pool_info_rollup(db_session, bucket_size="2min")
+
+    @pytest.mark.docker
+    def test_backfill_pool_info_rollups(self, db_session):
+        """Testing rebuilding rollups from pool info rows that were added without aggregating"""
+        pool_infos = [
+            DBPoolInfo(
+                block_number=block_number,
+                hyperdrive_address="a",
+                timestamp=datetime.fromtimestamp(epoch_timestamp, timezone.utc),
+                epoch_timestamp=epoch_timestamp,
+                spot_price=Decimal(spot_price),
+            )
+            for block_number, epoch_timestamp, spot_price in [
+                (0, 1628470800, "0.95"),
+                (1, 1628470812, "0.97"),
+                (2, 1628471100, "0.94"),
+            ]
+        ]
+        add_pool_infos(pool_infos, db_session)
+        # A partial rollup, e.g., from when the rollup table was added to a running db
+        update_pool_info_rollups(db_session, start_block=2)
+        assert len(get_pool_info_rollup(db_session, bucket_size="5min")) == 1
+
+        backfill_pool_info_rollups(db_session)
+        rollup_df = get_pool_info_rollup(db_session, bucket_size="5min")
+        assert len(rollup_df) == 2
+        np.testing.assert_array_equal(rollup_df["num_samples"], [2, 1])
+        np.testing.assert_array_equal(rollup_df["spot_price_open"], [Decimal("0.95"), Decimal("0.94")])
+        np.testing.assert_array_equal(rollup_df["spot_price_close"], [Decimal("0.97"), Decimal("0.94")])
+        rollup_df = get_pool_info_rollup(db_session, bucket_size="1h")
+        assert rollup_df["num_samples"].iloc[0] == 3
+        assert rollup_df["spot_price_open"].iloc[0] == Decimal("0.95")
+
 
 class TestHyperdriveEventsInterface:
     """Testing postgres interface for walletinfo table"""
@@ -374,3 +530,40 @@ class TestHyperdriveEventsInterface:
         assert len(agents) == 2
         assert "addr_1" in agents
         assert "addr_2" in agents
+
+
+class TestLeaderboardInterface:
+    """Testing postgres interface for leaderboard table"""
+
+    @pytest.mark.docker
+    def test_update_leaderboard(self, db_session):
+        """Testing refreshing and reading the leaderboard via interface"""
+        position_snapshot = pd.DataFrame(
+            {
+                "hyperdrive_address": ["a", "a", "a", "b", "b"],
+                "wallet_address": ["1", "1", "2", "1", "3"],
+                "block_number": [5, 5, 5, 5, 5],
+                "pnl": [Decimal("1"), Decimal("2"), Decimal("4"), Decimal("-2"), Decimal("-1")],
+            }
+        )
+        update_leaderboard(position_snapshot, db_session)
+
+        leaderboard_df = get_leaderboard(db_session, hyperdrive_address="a")
+        np.testing.assert_array_equal(leaderboard_df["wallet_address"], ["2", "1"])
+        np.testing.assert_array_equal(leaderboard_df["pnl"], [Decimal("4"), Decimal("3")])
+        np.testing.assert_array_equal(leaderboard_df["rank"], [1, 2])
+
+        leaderboard_df = get_leaderboard(db_session, wallet_address="1")
+        np.testing.assert_array_equal(leaderboard_df["hyperdrive_address"], ["a", "b"])
+        np.testing.assert_array_equal(leaderboard_df["rank"], [2, 2])
+
+        # Refreshing a pool replaces only that pool's entries
+        position_snapshot = position_snapshot[position_snapshot["hyperdrive_address"] == "a"].copy()
+        position_snapshot["block_number"] = 6
+        position_snapshot["pnl"] = [Decimal("1"), Decimal("2"), Decimal("0")]
+        update_leaderboard(position_snapshot, db_session)
+
+        leaderboard_df = get_leaderboard(db_session)
+        np.testing.assert_array_equal(leaderboard_df["hyperdrive_address"], ["a", "a", "b", "b"])
+        np.testing.assert_array_equal(leaderboard_df["wallet_address"], ["1", "2", "3", "1"])
+        np.testing.assert_array_equal(leaderboard_df["block_number"], [6, 6, 5, 5])
@@ -0,0 +1,227 @@
+"""Utilities for partitioning the large hyperdrive tables by block number in postgres."""
+
+from __future__ import annotations
+
+import logging
+import re
+
+from sqlalchemy import Table, exc, text
+from sqlalchemy.orm import Session
+
+from .schema import DBPoolInfo, DBPositionSnapshot, DBTradeEvent
+
+BLOCK_PARTITIONED_TABLES: list[Table] = [
+    DBTradeEvent.__table__,  # type: ignore
+    DBPoolInfo.__table__,  # type: ignore
+    DBPositionSnapshot.__table__,  # type: ignore
+]
+"""The tables that grow with the number of blocks, and hence get partitioned by block number."""
+
+DEFAULT_BLOCK_PARTITION_SIZE = 1_000_000
+"""The default number of blocks per partition."""
+
+# The key in `Session.info` that caches the partition layout of a session's db
+_SESSION_INFO_KEY = "block_partitions"
+# Matches the bound expression of a range partition, e.g., `FOR VALUES FROM ('0') TO ('1000000')`
+_PARTITION_BOUND_REGEX = re.compile(r"FROM \('?(\d+)'?\) TO \('?(\d+)'?\)")
+
+
+def _is_postgres(session: Session) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def _commit(session: Session) -> None:
+    try:
+        session.commit()
+    except exc.SQLAlchemyError as err:
+        session.rollback()
+        logging.error("Error partitioning tables: %s", err)
+        raise err
+
+
+def get_block_partitions(session: Session, table_name: str) -> list[tuple[int, int]] | None:
+    """Get the block ranges of the partitions of a table.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    table_name: str
+        The name of the table to get partitions for.
+
+    Returns
+    -------
+    list[tuple[int, int]] | None
+        The sorted (inclusive start, exclusive end) block ranges of the partitions of the table,
+        excluding the default partition. Returns None if the table isn't partitioned.
+    """
+    if not _is_postgres(session):
+        return None
+    is_partitioned = session.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table_name)"
+        ),
+        {"table_name": table_name},
+    ).scalar()
+    if not is_partitioned:
+        return None
+    bounds = session.execute(
+        text(
+            "SELECT pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table_name"
+        ),
+        {"table_name": table_name},
+    ).scalars()
+    block_ranges = []
+    for bound in bounds:
+        match = _PARTITION_BOUND_REGEX.search(bound)
+        # The default partition doesn't have a range
+        if match is not None:
+            block_ranges.append((int(match[1]), int(match[2])))
+    return sorted(block_ranges)
+
+
+def _create_block_partitions(
+    session: Session, parent_table: str, table_name: str, start_block: int, end_block: int, partition_size: int
+) -> None:
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    for partition_start in range(start_block, end_block, partition_size):
+        partition_end = partition_start + partition_size
+        session.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {table_name}_p{partition_start} PARTITION OF {parent_table} "
+                f"FOR VALUES FROM ({partition_start}) TO ({partition_end})"
+            )
+        )
+
+
+def create_missing_indices(session: Session) -> None:
+    """Create any indices defined in the schema of the block partitioned tables that don't exist in the db.
+
+    `create_all` only creates indices when creating the table, so existing dbs need this to pick up
+    indices added to the schema.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    """
+    for table in BLOCK_PARTITIONED_TABLES:
+        for index in table.indexes:
+            index.create(bind=session.connection(), checkfirst=True)
+    _commit(session)
+
+
+def partition_tables_by_block(session: Session, partition_size: int = DEFAULT_BLOCK_PARTITION_SIZE) -> None:
+    """Migrate the block partitioned tables to postgres range partitions over block number.
+
+    Each table is copied into a new table partitioned by block number, with partitions covering all existing
+    rows plus one partition ahead, and a default partition catching any rows outside of the partitions.
+    Since postgres requires the partition key to be part of the primary key, the primary key of partitioned
+    tables is (id, block_number). Tables that are already partitioned are skipped.
+
+    .. note::
+        The migration copies all rows in a single transaction and locks the tables while doing so,
+        so the data pipeline should be stopped while migrating.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    partition_size: int, optional
+        The number of blocks per partition. Defaults to `DEFAULT_BLOCK_PARTITION_SIZE`.
+    """
+    if not _is_postgres(session):
+        raise ValueError("Block partitioning is only supported on postgres.")
+    if partition_size <= 0:
+        raise ValueError(f"{partition_size=} must be positive.")
+
+    for table in BLOCK_PARTITIONED_TABLES:
+        table_name = table.name
+        if get_block_partitions(session, table_name) is not None:
+            logging.info("Table %s is already partitioned, skipping.", table_name)
+            continue
+
+        max_block = session.execute(text(f"SELECT MAX(block_number) FROM {table_name}")).scalar()
+        end_block = ((0 if max_block is None else max_block) // partition_size + 2) * partition_size
+        id_sequence = session.execute(
+            text("SELECT pg_get_serial_sequence(:table_name, 'id')"), {"table_name": table_name}
+        ).scalar()
+
+        new_table_name = f"{table_name}_partitioned"
+        session.execute(
+            text(
+                f"CREATE TABLE {new_table_name} (LIKE {table_name} INCLUDING DEFAULTS) "
+                "PARTITION BY RANGE (block_number)"
+            )
+        )
+        session.execute(
+            text(f"ALTER TABLE {new_table_name} ADD CONSTRAINT {table_name}_pkey_ PRIMARY KEY (id, block_number)")
+        )
+        _create_block_partitions(session, new_table_name, table_name, 0, end_block, partition_size)
+        session.execute(text(f"CREATE TABLE {table_name}_default PARTITION OF {new_table_name} DEFAULT"))
+        session.execute(text(f"INSERT INTO {new_table_name} SELECT * FROM {table_name}"))
+
+        # Keep the id sequence when dropping the original table
+        if id_sequence is not None:
+            session.execute(text(f"ALTER SEQUENCE {id_sequence} OWNED BY {new_table_name}.id"))
+        session.execute(text(f"DROP TABLE {table_name}"))
+        session.execute(text(f"ALTER TABLE {new_table_name} RENAME TO {table_name}"))
+        session.execute(text(f"ALTER TABLE {table_name} RENAME CONSTRAINT {table_name}_pkey_ TO {table_name}_pkey"))
+
+        # Indices created on the partitioned table get created on each partition
+        for index in table.indexes:
+            index.create(bind=session.connection())
+        logging.info("Partitioned table %s by block number up to block %s.", table_name, end_block)
+
+    _commit(session)
+    # Reset the cached partition layout
+    session.info.pop(_SESSION_INFO_KEY, None)
+
+
+def ensure_block_partitions(session: Session, block_number: int) -> None:
+    """Create partitions ahead of the given block for any block partitioned tables.
+
+    The partition size of each table is taken from its latest partition. Partitions are created so that
+    there is always at least one full partition after the given block. This is a no-op for tables that
+    aren't partitioned, and the partition layout is cached on the session, so this is cheap to call every block.
+
+    Arguments
+    ---------
+    session: Session
+        The initialized session object.
+    block_number: int
+        The latest block number that will be written to the tables.
+    """
+    partitions: dict[str, tuple[int, int] | None] | None = session.info.get(_SESSION_INFO_KEY)
+    if partitions is None:
+        partitions = {}
+        for table in BLOCK_PARTITIONED_TABLES:
+            block_ranges = get_block_partitions(session, table.name)
+            if block_ranges:
+                # Keep track of the partition size and the end block of the latest partition
+                latest_start, latest_end = block_ranges[-1]
+                partitions[table.name] = (latest_end - latest_start, latest_end)
+            else:
+                partitions[table.name] = None
+        session.info[_SESSION_INFO_KEY] = partitions
+
+    for table_name, layout in partitions.items():
+        if layout is None:
+            continue
+        partition_size, end_block = layout
+        if block_number + partition_size < end_block:
+            continue
+        new_end_block = (block_number // partition_size + 2) * partition_size
+        try:
+            _create_block_partitions(session, table_name, table_name, end_block, new_end_block, partition_size)
+            session.commit()
+        except exc.DBAPIError as err:
+            # This happens if rows in the new range were written to the default partition.
+            # We keep writing to the default partition in this case.
+            session.rollback()
+            logging.warning("Unable to create partitions for table %s: %s", table_name, err)
+        partitions[table_name] = (partition_size, new_end_block)
@@ -0,0 +1,68 @@
+"""Tests for block partitioning of hyperdrive tables"""
+
+import pytest
+
+from .interface import add_trade_events, get_latest_block_number_from_trade_event, get_trade_events
+from .partitioning import (
+    create_missing_indices,
+    ensure_block_partitions,
+    get_block_partitions,
+    partition_tables_by_block,
+)
+from .schema import DBTradeEvent
+
+
+# These tests are using fixtures defined in conftest.py
+class TestBlockPartitioning:
+    """Testing block partitioning of tables in postgres"""
+
+    @pytest.mark.docker
+    def test_partition_tables_by_block(self, db_session):
+        """Testing existing rows are kept when migrating to partitioned tables"""
+        add_trade_events(
+            [
+                DBTradeEvent(block_number=block, transaction_hash="a", hyperdrive_address="a", wallet_address="1")
+                for block in [1, 15, 25]
+            ],
+            db_session,
+        )
+        assert get_block_partitions(db_session, "trade_event") is None
+
+        partition_tables_by_block(db_session, partition_size=10)
+        # Partitions cover existing rows plus one partition ahead
+        assert get_block_partitions(db_session, "trade_event") == [(0, 10), (10, 20), (20, 30), (30, 40)]
+        # Empty tables get partitions starting from block 0
+        assert get_block_partitions(db_session, "pool_info") == [(0, 10), (10, 20)]
+        # Migrating again is a no-op
+        partition_tables_by_block(db_session, partition_size=10)
+        # Creating indices on partitioned tables is a no-op
+        create_missing_indices(db_session)
+
+        trade_events = get_trade_events(db_session)
+        assert trade_events["block_number"].tolist() == [1, 15, 25]
+
+        # New rows, including ones past the partitions, can still be added
+        add_trade_events(
+            [
+                DBTradeEvent(block_number=block, transaction_hash="a", hyperdrive_address="a", wallet_address="1")
+                for block in [35, 100]
+            ],
+            db_session,
+        )
+        assert get_latest_block_number_from_trade_event(db_session, hyperdrive_address="a", wallet_address=None) == 100
+        # Ids keep incrementing from before the migration
+        assert get_trade_events(db_session)["id"].is_unique
+
+    @pytest.mark.docker
+    def test_ensure_block_partitions(self, db_session):
+        """Testing partitions get created ahead of the latest block"""
+        # No-op on tables that aren't partitioned
+        ensure_block_partitions(db_session, 100)
+        assert get_block_partitions(db_session, "trade_event") is None
+
+        partition_tables_by_block(db_session, partition_size=10)
+        ensure_block_partitions(db_session, 5)
+        assert get_block_partitions(db_session, "trade_event") == [(0, 10), (10, 20)]
+        ensure_block_partitions(db_session, 25)
+        assert get_block_partitions(db_session, "trade_event") == [(0, 10), (10, 20), (20, 30), (30, 40)]
+        assert get_block_partitions(db_session, "wallet_pnl") == [(0, 10), (10, 20), (20, 30), (30, 40)]
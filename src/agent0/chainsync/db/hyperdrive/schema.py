@@ -4,7 +4,7 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Union
 
-from sqlalchemy import BigInteger, Boolean, DateTime, Integer, LargeBinary, Numeric, String
+from sqlalchemy import BigInteger, Boolean, DateTime, Index, Integer, LargeBinary, Numeric, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from agent0.chainsync.db.base import DBBase
@@ -98,6 +98,8 @@ class DBPoolInfo(DBBase):
     """
 
     __tablename__ = "pool_info"
+    # Composite index matching queries for a pool over a block range
+    __table_args__ = (Index("ix_pool_info_hyperdrive_address_block_number", "hyperdrive_address", "block_number"),)
 
     # Indices
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, init=False, autoincrement=True)
@@ -136,10 +138,65 @@ class DBPoolInfo(DBBase):
     fixed_rate: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
 
 
+class DBPoolInfoRollup(DBBase):
+    """Table/dataclass schema for time bucketed rollups of pool info.
+
+    Each row holds the open, high, low, and close values of the spot price, fixed rate,
+    variable rate, and vault share price for a pool within a single time bucket.
+    Rows are updated incrementally as pool info rows are added to the db.
+    """
+
+    __tablename__ = "pool_info_rollup"
+
+    # Indices
+    hyperdrive_address: Mapped[str] = mapped_column(String, primary_key=True)
+    """The hyperdrive address for the entry."""
+    bucket_size: Mapped[str] = mapped_column(String, primary_key=True)
+    """The size of the time bucket, as a pandas offset alias (e.g., `5min`, `1h`, `1D`)."""
+    timestamp: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    """The start time of the bucket."""
+
+    # Bookkeeping
+    first_block_number: Mapped[int] = mapped_column(BigInteger)
+    """The first pool info block number that was aggregated into this bucket."""
+    last_block_number: Mapped[int] = mapped_column(BigInteger)
+    """The last pool info block number that was aggregated into this bucket."""
+    num_samples: Mapped[int] = mapped_column(BigInteger, default=0)
+    """The number of pool info rows aggregated into this bucket."""
+
+    # Fields
+    spot_price_open: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    spot_price_high: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    spot_price_low: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    spot_price_close: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    fixed_rate_open: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    fixed_rate_high: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    fixed_rate_low: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    fixed_rate_close: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    variable_rate_open: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    variable_rate_high: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    variable_rate_low: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    variable_rate_close: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    vault_share_price_open: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    vault_share_price_high: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    vault_share_price_low: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    vault_share_price_close: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+
+
 class DBTradeEvent(DBBase):
     """Table for storing any transfer events emitted by the Hyperdrive contract."""
 
     __tablename__ = "trade_event"
+    # Composite indices matching queries for a pool (and wallet) over a block range
+    __table_args__ = (
+        Index("ix_trade_event_hyperdrive_address_block_number", "hyperdrive_address", "block_number"),
+        Index(
+            "ix_trade_event_hyperdrive_address_wallet_address_block_number",
+            "hyperdrive_address",
+            "wallet_address",
+            "block_number",
+        ),
+    )
     # Indices
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, init=False, autoincrement=True)
     """The unique identifier for the entry to the table."""
@@ -208,6 +265,16 @@ class DBPositionSnapshot(DBBase):
     """
 
     __tablename__ = "wallet_pnl"
+    # Composite indices matching queries for a pool (and wallet) over a block range
+    __table_args__ = (
+        Index("ix_wallet_pnl_hyperdrive_address_block_number", "hyperdrive_address", "block_number"),
+        Index(
+            "ix_wallet_pnl_hyperdrive_address_wallet_address_block_number",
+            "hyperdrive_address",
+            "wallet_address",
+            "block_number",
+        ),
+    )
 
     # Indices
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, init=False, autoincrement=True)
@@ -255,3 +322,29 @@ class DBPositionSnapshot(DBBase):
     """
     The last block number that this position's balance was updated.
     """
+
+
+class DBLeaderboard(DBBase):
+    """Table/dataclass schema for the materialized pnl leaderboard.
+
+    This table keeps one row per wallet per pool with the total pnl across all positions
+    of the wallet in the pool, as of the latest analyzed block. The table is refreshed
+    after each analysis batch, so reading the leaderboard doesn't need to scan the position snapshot table.
+    """
+
+    __tablename__ = "leaderboard"
+    __table_args__ = (Index("ix_leaderboard_hyperdrive_address_rank", "hyperdrive_address", "rank"),)
+
+    # Indices
+    hyperdrive_address: Mapped[str] = mapped_column(String, primary_key=True)
+    """The hyperdrive address for the entry."""
+    wallet_address: Mapped[str] = mapped_column(String, primary_key=True)
+    """The wallet address for the entry."""
+    block_number: Mapped[int] = mapped_column(BigInteger)
+    """The block number of the position snapshot this entry was computed from."""
+
+    # Fields
+    pnl: Mapped[Union[Decimal, None]] = mapped_column(FIXED_NUMERIC, default=None)
+    """The total pnl of the wallet across all positions in the pool, in units of base."""
+    rank: Mapped[Union[int, None]] = mapped_column(Integer, default=None)
+    """The rank of the wallet's pnl within the pool, starting at 1 for the highest pnl."""
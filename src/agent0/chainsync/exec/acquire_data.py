@@ -13,9 +13,12 @@ from agent0.chainsync.db.base import initialize_session
 from agent0.chainsync.db.hyperdrive import (
     add_hyperdrive_addr_to_name,
     checkpoint_events_to_db,
+    ensure_block_partitions,
+    get_latest_block_number_from_pool_info_table,
     init_data_chain_to_db,
     pool_info_to_db,
     trade_events_to_db,
+    update_pool_info_rollups,
 )
 from agent0.ethpy.hyperdrive import HyperdriveReadInterface
 
@@ -117,6 +120,9 @@ def acquire_data(
             start_block,
         )
 
+    # Make sure partitions exist for the blocks we're about to write, if the tables are partitioned
+    ensure_block_partitions(db_session, latest_mined_block)
+
     ## Collect initial data
     init_data_chain_to_db(interfaces, db_session)
 
@@ -128,6 +134,15 @@ def acquire_data(
     # Add all checkpoint events to the table
     checkpoint_events_to_db(interfaces, db_session=db_session)
 
+    # The first block of each pool that this pass may add pool info rows for
+    rollup_start_blocks = {
+        interface.hyperdrive_address: get_latest_block_number_from_pool_info_table(
+            db_session, hyperdrive_address=interface.hyperdrive_address
+        )
+        + 1
+        for interface in interfaces
+    }
+
     # Backfilling for blocks that need updating
     # Note `data_chain_to_db` takes care of handling duplicate rows
     if backfill:
@@ -161,6 +176,15 @@ def acquire_data(
     else:
         pool_info_to_db(interfaces, latest_mined_block, db_session)
 
+    # Aggregate the pool info rows added by this pass into the time bucketed rollups used by the dashboard
+    for hyperdrive_address, rollup_start_block in rollup_start_blocks.items():
+        update_pool_info_rollups(
+            db_session,
+            hyperdrive_address=hyperdrive_address,
+            start_block=rollup_start_block,
+            end_block=latest_mined_block + 1,
+        )
+
     # Clean up resources on clean exit
     # If this function made the db session, we close it here
     if db_session_init:
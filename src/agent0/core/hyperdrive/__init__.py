@@ -1,3 +1,11 @@
 """Objects for bots to interface with Hyperdrive contracts and the Rust interface."""
 
-from .agent import HyperdriveActionType, HyperdriveMarketAction, HyperdriveWallet, Long, Short, TradeResult
+from .agent import (
+    HyperdriveActionType,
+    HyperdriveMarketAction,
+    HyperdriveWallet,
+    Long,
+    Short,
+    TradeResult,
+    TradeResultView,
+)
@@ -3,8 +3,9 @@
 # Please enter the commit message for your changes. Lines starting
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Mapping
 
 if TYPE_CHECKING:
     from eth_account.signers.local import LocalAccount
@@ -80,5 +81,103 @@ class TradeResult:
     """The raw pool info."""
     raw_checkpoint: dict[str, Any] | None = None
     """The raw checkpoint info."""
-    anvil_state: str | None = None
-    """The dumped anvil state."""
+    anvil_state_file: str | None = None
+    """The path to the compressed anvil state file, from `write_anvil_state_dump`."""
+
+
+def _read_only(value: Any) -> Any:
+    # Dictionaries become read-only mapping proxies and lists become tuples, including nested ones
+    if isinstance(value, dict):
+        return MappingProxyType({key: _read_only(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_read_only(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+# Dataclass has lots of attributes
+# pylint: disable=too-many-instance-attributes
+class TradeResultView:
+    """A read-only snapshot of a trade result that's passed to a policy's `post_action`.
+
+    Dictionaries are copied into read-only mapping proxies and lists into tuples, and the wallet is copied,
+    so policies can't change the trade result used for crash reporting. The account, policy, trade object,
+    event, and exceptions are shared with the trade result.
+    """
+
+    trade_successful: bool
+    """The status of the trade."""
+    account: LocalAccount | None = None
+    """The agent that was executing the trade."""
+    wallet: HyperdriveWallet | None = None
+    """A copy of the wallet of the agent that was executing the trade."""
+    policy: HyperdriveBasePolicy | None = None
+    """The policy that was executing the trade."""
+    trade_object: Trade[HyperdriveMarketAction] | None = None
+    """The trade object for the trade."""
+    hyperdrive_event: BaseEvent | None = None
+    """The transaction receipt of the trade."""
+    contract_call: Mapping[str, Any] | None = None
+    """A read-only dictionary detailing the underlying contract call."""
+
+    # Flags for known errors
+    is_slippage: bool = False
+    """If the trade failed due to slippage."""
+    is_invalid_balance: bool = False
+    """If the trade failed due to invalid balance."""
+    is_insufficient_allowance: bool = False
+    """If the trade failed due to insufficient approval."""
+    is_min_txn_amount: bool = False
+    """If the trade failed due to minimum transaction amount."""
+    is_long_proceeds_less_than_fees: bool = False
+    """If the trade failed due long proceeds less than fees."""
+
+    # Optional fields for crash reporting
+    block_number: int | None = None
+    """The block number of the transaction."""
+    block_timestamp: int | None = None
+    """The block timestamp of the transaction."""
+    exception: Exception | None = None
+    """The exception that was thrown."""
+    orig_exception: BaseException | tuple[BaseException, ...] | None = None
+    """If exception was wrapped, the original exceptions that were thrown."""
+    pool_config: Mapping[str, Any] | None = None
+    """The pool config information."""
+    pool_info: Mapping[str, Any] | None = None
+    """The pool info information."""
+    checkpoint_info: Mapping[str, Any] | None = None
+    """The checkpoint info information."""
+    contract_addresses: Mapping[str, Any] | None = None
+    """The contract addresses."""
+    additional_info: Mapping[str, Any] | None = None
+    """Additional information used for crash reporting."""
+    # Machine readable states
+    raw_transaction: Mapping[str, Any] | None = None
+    """The raw transaction sent to the chain."""
+    raw_pool_config: Mapping[str, Any] | None = None
+    """The raw pool config."""
+    raw_pool_info: Mapping[str, Any] | None = None
+    """The raw pool info."""
+    raw_checkpoint: Mapping[str, Any] | None = None
+    """The raw checkpoint info."""
+    anvil_state_file: str | None = None
+    """The path to the compressed anvil state file, from `write_anvil_state_dump`."""
+
+    @classmethod
+    def from_trade_result(cls, trade_result: TradeResult) -> TradeResultView:
+        """Take a read-only snapshot of a trade result.
+
+        Arguments
+        ---------
+        trade_result: TradeResult
+            The trade result to take the snapshot of.
+
+        Returns
+        -------
+        TradeResultView
+            The read-only snapshot.
+        """
+        values = {field.name: _read_only(getattr(trade_result, field.name)) for field in fields(trade_result)}
+        if trade_result.wallet is not None:
+            values["wallet"] = trade_result.wallet.copy()
+        return cls(**values)
@@ -0,0 +1,107 @@
+"""Tests for read-only views of trade results."""
+
+from __future__ import annotations
+
+from dataclasses import FrozenInstanceError
+
+import pytest
+from fixedpointmath import FixedPoint
+from hexbytes import HexBytes
+from hyperdrivetypes import OpenLongEventFP
+from pypechain.core import PypechainCallException
+from web3.exceptions import ContractCustomError
+
+from .hyperdrive_actions import open_long_trade
+from .hyperdrive_wallet import HyperdriveWallet, Long
+from .trade_result import TradeResult, TradeResultView
+
+
+def _open_long_event() -> OpenLongEventFP:
+    return OpenLongEventFP(
+        log_index=0,
+        transaction_index=0,
+        transaction_hash=HexBytes("0x01"),
+        address="0x0000000000000000000000000000000000000000",  # type: ignore
+        block_hash=HexBytes("0x02"),
+        block_number=1,
+        args=OpenLongEventFP.OpenLongEventArgsFP(
+            trader="0x0000000000000000000000000000000000000000",  # type: ignore
+            asset_id=0,
+            maturity_time=100,
+            amount=FixedPoint(10),
+            vault_share_price=FixedPoint(1),
+            as_base=True,
+            bond_amount=FixedPoint(11),
+            extra_data=b"",
+        ),
+    )
+
+
+def _trade_result() -> TradeResult:
+    orig_exception = ContractCustomError("0xabcd", data="0xabcd")
+    return TradeResult(
+        trade_successful=False,
+        wallet=HyperdriveWallet(
+            address=HexBytes("0x00"),
+            lp_tokens=FixedPoint(100),
+            longs={100: Long(balance=FixedPoint(5), maturity_time=100)},
+        ),
+        trade_object=open_long_trade(FixedPoint(10)),
+        hyperdrive_event=_open_long_event(),
+        contract_call={"function_name": "openLong", "fn_args": [1, 2]},
+        exception=PypechainCallException(
+            "Failed to open long",
+            orig_exception=orig_exception,
+            decoded_error="InsufficientLiquidity()",
+            function_name="openLong",
+        ),
+        orig_exception=[orig_exception],
+        pool_info={"share_reserves": FixedPoint(1)},
+        is_slippage=True,
+    )
+
+
+def test_view_reads_trade_result():
+    """Policies can read every field of the trade result through the view."""
+    trade_result = _trade_result()
+    view = TradeResultView.from_trade_result(trade_result)
+    assert not view.trade_successful
+    assert view.is_slippage
+    assert view.contract_call is not None and view.contract_call["fn_args"] == (1, 2)
+    assert view.pool_info is not None and view.pool_info["share_reserves"] == FixedPoint(1)
+    assert view.checkpoint_info is None
+    assert view.trade_object is trade_result.trade_object
+    assert view.hyperdrive_event is trade_result.hyperdrive_event
+    assert view.exception is trade_result.exception
+    assert view.orig_exception == tuple(trade_result.orig_exception)  # type: ignore
+    assert view.wallet is not None and view.wallet.longs[100].balance == FixedPoint(5)
+
+
+def test_view_is_read_only():
+    """Writes through the view raise, and leave the trade result unchanged."""
+    trade_result = _trade_result()
+    view = TradeResultView.from_trade_result(trade_result)
+
+    with pytest.raises(FrozenInstanceError):
+        view.trade_successful = True  # type: ignore
+    with pytest.raises(FrozenInstanceError):
+        view.pool_info = {}  # type: ignore
+    assert view.pool_info is not None and view.contract_call is not None
+    with pytest.raises(TypeError):
+        view.pool_info["share_reserves"] = FixedPoint(2)  # type: ignore
+    with pytest.raises(TypeError):
+        view.contract_call["fn_args"][0] = 3  # type: ignore
+
+    # The wallet is a copy, so changing it doesn't change the trade result
+    assert view.wallet is not None
+    view.wallet.lp_tokens = FixedPoint(0)
+    view.wallet.longs[100].balance = FixedPoint(0)
+    assert trade_result.wallet is not None
+    assert trade_result.wallet.lp_tokens == FixedPoint(100)
+    assert trade_result.wallet.longs[100].balance == FixedPoint(5)
+
+    # The view is a snapshot, so later changes to the trade result don't show up in it
+    trade_result.pool_info["share_reserves"] = FixedPoint(3)  # type: ignore
+    trade_result.contract_call["fn_args"].append(3)  # type: ignore
+    assert view.pool_info["share_reserves"] == FixedPoint(1)
+    assert view.contract_call["fn_args"] == (1, 2)
@@ -1,9 +1,16 @@
 """Utilities for executing agents on Hyperdrive devnet."""
 
+from .anvil_state import (
+    DEFAULT_ANVIL_STATE_DIR,
+    load_anvil_state_dump,
+    read_anvil_state_dump,
+    write_anvil_state_dump,
+)
 from .crash_report import (
     build_crash_trade_result,
     get_anvil_state_dump,
     log_hyperdrive_crash_report,
     setup_hyperdrive_crash_report_logging,
 )
+from .crash_report_writer import CrashReportWriter, get_crash_signature
 from .known_error_checks import check_for_known_errors
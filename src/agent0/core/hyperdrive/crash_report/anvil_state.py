@@ -0,0 +1,123 @@
+"""Compressed anvil state dump files, deduplicated by content."""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from web3 import Web3
+from web3.types import RPCEndpoint
+
+from .crash_report import get_anvil_state_dump
+
+DEFAULT_ANVIL_STATE_DIR = ".crash_report/anvil_state"
+"""The default directory to write anvil state dumps to."""
+
+# Newer versions of anvil dump gzipped state, which we store as is.
+# Older versions dump plain json, which we gzip ourselves and decompress before loading.
+_GZIP_STATE_SUFFIX = ".anvil_state.gz"
+_JSON_STATE_SUFFIX = ".anvil_state.json.gz"
+_GZIP_MAGIC = b"\x1f\x8b"
+# The number of hex characters to decode and write at a time
+_HEX_CHUNK_SIZE = 1 << 23
+
+
+def write_anvil_state_dump(
+    web3: Web3, out_dir: str | Path = DEFAULT_ANVIL_STATE_DIR, compresslevel: int = 1
+) -> Path | None:
+    """Dump the anvil state to a compressed file named after the hash of its content.
+
+    The hex encoded state gets decoded and written to file in chunks, and dumps with the same content
+    share the same file, so repeated dumps of the same state only take disk space once.
+
+    Arguments
+    ---------
+    web3: Web3
+        Web3 provider object.
+    out_dir: str | Path, optional
+        The directory to write the state to. Defaults to `DEFAULT_ANVIL_STATE_DIR`.
+    compresslevel: int, optional
+        The gzip compression level used for uncompressed dumps. Defaults to 1, favoring speed.
+
+    Returns
+    -------
+    Path | None
+        The path to the state file, or None if dumping the state failed.
+    """
+    anvil_state_dump = get_anvil_state_dump(web3)
+    if not anvil_state_dump:
+        return None
+    out_dir = Path(out_dir)
+    tmp_file: Path | None = None
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        start = 2 if anvil_state_dump.startswith("0x") else 0
+        is_gzip = bytes.fromhex(anvil_state_dump[start : start + 4]) == _GZIP_MAGIC
+
+        content_hash = hashlib.sha256()
+        # The temp file gets a unique name so concurrent dumps from other threads or processes don't collide
+        with tempfile.NamedTemporaryFile(dir=out_dir, prefix=".", suffix=".anvil_state.tmp", delete=False) as raw_file:
+            tmp_file = Path(raw_file.name)
+            file = raw_file if is_gzip else gzip.GzipFile(fileobj=raw_file, mode="wb", compresslevel=compresslevel)
+            for i in range(start, len(anvil_state_dump), _HEX_CHUNK_SIZE):
+                chunk = bytes.fromhex(anvil_state_dump[i : i + _HEX_CHUNK_SIZE])
+                content_hash.update(chunk)
+                file.write(chunk)
+            if not is_gzip:
+                file.close()
+
+        state_file = out_dir / (content_hash.hexdigest() + (_GZIP_STATE_SUFFIX if is_gzip else _JSON_STATE_SUFFIX))
+        if state_file.exists():
+            # We already have this state
+            tmp_file.unlink()
+        else:
+            os.replace(tmp_file, state_file)
+    except (ValueError, OSError) as exc:
+        # This is best effort crash reporting
+        logging.warning("Failed to write anvil state dump: %s", repr(exc))
+        if tmp_file is not None:
+            tmp_file.unlink(missing_ok=True)
+        return None
+    return state_file
+
+
+def read_anvil_state_dump(state_file: str | Path) -> str:
+    """Read a state file written by `write_anvil_state_dump` into a hex string for `anvil_loadState`.
+
+    Arguments
+    ---------
+    state_file: str | Path
+        The path to the state file.
+
+    Returns
+    -------
+    str
+        The hex encoded anvil state.
+    """
+    state_file = Path(state_file)
+    if state_file.name.endswith(_JSON_STATE_SUFFIX):
+        with gzip.open(state_file, "rb") as file:
+            return "0x" + file.read().hex()
+    with open(state_file, "rb") as file:
+        return "0x" + file.read().hex()
+
+
+def load_anvil_state_dump(web3: Web3, state_file: str | Path) -> None:
+    """Load a state file written by `write_anvil_state_dump` into anvil.
+
+    Arguments
+    ---------
+    web3: Web3
+        Web3 provider object.
+    state_file: str | Path
+        The path to the state file.
+    """
+    response = web3.provider.make_request(
+        method=RPCEndpoint("anvil_loadState"), params=[read_anvil_state_dump(state_file)]
+    )
+    if "result" not in response:
+        raise KeyError("Response did not have a result.")
@@ -353,7 +353,7 @@ def log_hyperdrive_crash_report(
     dump_obj["raw_pool_config"] = trade_result.raw_pool_config  # type: ignore
     dump_obj["raw_pool_info"] = trade_result.raw_pool_info  # type: ignore
     dump_obj["raw_checkpoint"] = trade_result.raw_checkpoint  # type: ignore
-    dump_obj["anvil_dump_state"] = trade_result.anvil_state  # type: ignore
+    dump_obj["anvil_state_file"] = trade_result.anvil_state_file  # type: ignore
 
     env_details = {
         "environment": os.getenv("APP_ENV", "development"),  # e.g., 'production', 'development'
@@ -403,8 +403,6 @@ def log_hyperdrive_crash_report(
         and (rollbar_log_filter_func is None or not rollbar_log_filter_func(trade_result.exception))
     ):
         if rollbar_data is None:
-            # Don't log anvil dump state to rollbar
-            dump_obj["anvil_dump_state"] = None  # type: ignore
             rollbar_data = dump_obj
 
         # Link to original crash report file in rollbar
@@ -0,0 +1,213 @@
+"""A crash report sink that writes reports off the trading loop, deduplicated by crash signature."""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from collections import Counter
+from typing import TYPE_CHECKING, Any
+
+from pypechain.core import PypechainCallException
+
+from .crash_report import log_hyperdrive_crash_report
+
+if TYPE_CHECKING:
+    from agent0.core.hyperdrive.agent import TradeResult
+
+DEFAULT_MAX_QUEUE_SIZE = 64
+"""The default number of crash reports that can be waiting to be written."""
+
+
+def get_crash_signature(trade_result: TradeResult) -> str:
+    """Get a signature of a crash that is stable across crashes with the same cause.
+
+    The signature is built from the trade type, the exception type, and the contract error of the crash.
+    Amounts, addresses, and block numbers aren't part of the signature.
+
+    Arguments
+    ---------
+    trade_result: TradeResult
+        The trade result of the crash.
+
+    Returns
+    -------
+    str
+        The signature of the crash.
+    """
+    trade_type = None
+    if trade_result.trade_object is not None:
+        trade_type = trade_result.trade_object.market_action.action_type.name
+
+    exceptions: list[BaseException] = []
+    if trade_result.exception is not None:
+        exceptions.append(trade_result.exception)
+    if isinstance(trade_result.orig_exception, list):
+        exceptions.extend(trade_result.orig_exception)
+    elif trade_result.orig_exception is not None:
+        exceptions.append(trade_result.orig_exception)
+
+    contract_error = None
+    for exception in exceptions:
+        if isinstance(exception, PypechainCallException):
+            contract_error = exception.decoded_error_name or exception.decoded_error
+            if contract_error is None:
+                contract_error = type(exception.orig_exception).__name__
+            break
+
+    exception_type = type(trade_result.exception).__name__ if trade_result.exception is not None else None
+    return f"{trade_type}: {exception_type}: {contract_error}"
+
+
+class CrashReportWriter:
+    """Writes crash reports in a background thread, and only keeps the full details of the first few crashes of
+    each crash signature.
+
+    Submitting a crash only computes its signature and puts it on a bounded queue, so a burst of failing trades
+    doesn't slow down the trading loop. Crashes past the limit of their signature are only counted, and the counts
+    are logged when the writer is closed. If the queue is full, the crash is counted as dropped instead of blocking.
+
+    A thread is used instead of a process since trade results hold exceptions and tracebacks that can't be pickled.
+    Writing the report is mostly file and network IO, which doesn't hold the GIL.
+    """
+
+    def __init__(
+        self,
+        max_reports_per_signature: int | None = None,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        background: bool = True,
+    ) -> None:
+        """Initialize the writer and start the background thread.
+
+        Arguments
+        ---------
+        max_reports_per_signature: int | None, optional
+            The number of crashes of each signature to write full reports for. Defaults to reporting all crashes.
+        max_queue_size: int, optional
+            The number of crash reports that can be waiting to be written. Defaults to 64.
+        background: bool, optional
+            Whether to write reports in a background thread (if True), or when they're submitted (if False).
+            Defaults to True.
+        """
+        self.max_reports_per_signature = max_reports_per_signature
+        self._lock = threading.Lock()
+        self._signature_counts: Counter[str] = Counter()
+        self._num_dropped = 0
+
+        self._queue: queue.Queue[tuple[TradeResult, dict[str, Any]] | None] | None = None
+        self._thread: threading.Thread | None = None
+        if background:
+            self._queue = queue.Queue(maxsize=max_queue_size)
+            self._thread = threading.Thread(target=self._run, name="crash-report-writer", daemon=True)
+            self._thread.start()
+
+    @property
+    def signature_counts(self) -> dict[str, int]:
+        """The number of crashes submitted for each crash signature."""
+        with self._lock:
+            return dict(self._signature_counts)
+
+    @property
+    def num_dropped(self) -> int:
+        """The number of crash reports dropped because the queue was full."""
+        with self._lock:
+            return self._num_dropped
+
+    def should_write_details(self, trade_result: TradeResult) -> bool:
+        """Check if the next crash of the trade result's signature gets a full report.
+
+        This can be used to skip gathering expensive details, e.g., anvil state dumps, for crashes that will
+        only be counted.
+
+        Arguments
+        ---------
+        trade_result: TradeResult
+            The trade result of the crash.
+
+        Returns
+        -------
+        bool
+            Whether the crash would be written if it was submitted.
+        """
+        if self.max_reports_per_signature is None:
+            return True
+        signature = get_crash_signature(trade_result)
+        with self._lock:
+            return self._signature_counts[signature] < self.max_reports_per_signature
+
+    def submit(self, trade_result: TradeResult, **kwargs: Any) -> bool:
+        """Count a crash and write its report if it's within the limit of its signature.
+
+        Arguments
+        ---------
+        trade_result: TradeResult
+            The trade result that stores all crash information.
+        **kwargs: Any
+            Keyword arguments passed to `log_hyperdrive_crash_report`.
+
+        Returns
+        -------
+        bool
+            Whether the crash report was written or queued to be written.
+        """
+        signature = get_crash_signature(trade_result)
+        with self._lock:
+            self._signature_counts[signature] += 1
+            if (
+                self.max_reports_per_signature is not None
+                and self._signature_counts[signature] > self.max_reports_per_signature
+            ):
+                return False
+
+        if self._queue is None:
+            log_hyperdrive_crash_report(trade_result, **kwargs)
+            return True
+        try:
+            self._queue.put_nowait((trade_result, kwargs))
+        except queue.Full:
+            with self._lock:
+                self._num_dropped += 1
+            logging.warning("Crash report queue is full, dropping crash report for %s", signature)
+            return False
+        return True
+
+    def flush(self) -> None:
+        """Block until all queued crash reports are written."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Write any queued crash reports, stop the background thread, and log the crash counts."""
+        if self._queue is not None and self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._queue = None
+            self._thread = None
+
+        with self._lock:
+            for signature, count in self._signature_counts.items():
+                if self.max_reports_per_signature is not None and count > self.max_reports_per_signature:
+                    logging.info(
+                        "Crash signature %s: %s crashes, %s reported",
+                        signature,
+                        count,
+                        self.max_reports_per_signature,
+                    )
+            if self._num_dropped > 0:
+                logging.warning("Dropped %s crash reports due to a full queue", self._num_dropped)
+
+    def _run(self) -> None:
+        assert self._queue is not None
+        crash_queue = self._queue
+        while True:
+            item = crash_queue.get()
+            try:
+                if item is None:
+                    return
+                trade_result, kwargs = item
+                log_hyperdrive_crash_report(trade_result, **kwargs)
+            except Exception as exc:  # pylint: disable=broad-except
+                # This is best effort crash reporting, so we keep the writer alive
+                logging.error("Failed to write crash report: %s", repr(exc))
+            finally:
+                crash_queue.task_done()
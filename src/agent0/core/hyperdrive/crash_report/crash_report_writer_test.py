@@ -0,0 +1,76 @@
+"""Tests for writing crash reports off the trading loop."""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+from fixedpointmath import FixedPoint
+from pypechain.core import PypechainCallException
+
+from agent0.core.hyperdrive.agent import TradeResult, open_long_trade, open_short_trade
+
+from . import crash_report_writer
+from .crash_report_writer import CrashReportWriter, get_crash_signature
+
+
+def _crash(trade_amount: int, decoded_error_name: str | None = "InsufficientLiquidity", short: bool = False):
+    exception = PypechainCallException(
+        f"Failed to trade {trade_amount}",
+        orig_exception=ValueError("execution reverted"),
+        decoded_error_name=decoded_error_name,
+    )
+    trade = open_short_trade if short else open_long_trade
+    return TradeResult(trade_successful=False, trade_object=trade(FixedPoint(trade_amount)), exception=exception)
+
+
+def test_crash_signature():
+    """Crashes with the same cause share a signature regardless of amounts."""
+    assert get_crash_signature(_crash(1)) == get_crash_signature(_crash(2))
+    assert get_crash_signature(_crash(1)) == "OPEN_LONG: PypechainCallException: InsufficientLiquidity"
+    assert get_crash_signature(_crash(1, short=True)) == "OPEN_SHORT: PypechainCallException: InsufficientLiquidity"
+    assert get_crash_signature(_crash(1, decoded_error_name=None)) == "OPEN_LONG: PypechainCallException: ValueError"
+
+
+@pytest.mark.parametrize("background", [True, False])
+def test_deduplicates_crashes(monkeypatch: pytest.MonkeyPatch, background: bool):
+    """Only the first few crashes of each signature get a full report."""
+    written = []
+    monkeypatch.setattr(
+        crash_report_writer, "log_hyperdrive_crash_report", lambda trade_result, **kwargs: written.append(kwargs)
+    )
+    writer = CrashReportWriter(max_reports_per_signature=2, background=background)
+    results = [writer.submit(_crash(amount), log_level=amount) for amount in range(1, 6)]
+    assert not writer.should_write_details(_crash(1))
+    assert writer.should_write_details(_crash(1, short=True))
+    results.append(writer.submit(_crash(1, short=True), log_level=0))
+    writer.close()
+
+    assert results == [True, True, False, False, False, True]
+    assert written == [{"log_level": 1}, {"log_level": 2}, {"log_level": 0}]
+    assert writer.signature_counts == {
+        "OPEN_LONG: PypechainCallException: InsufficientLiquidity": 5,
+        "OPEN_SHORT: PypechainCallException: InsufficientLiquidity": 1,
+    }
+
+
+def test_full_queue_drops_reports(monkeypatch: pytest.MonkeyPatch):
+    """Submitting never blocks on the writer thread."""
+    release = threading.Event()
+    written = []
+
+    def _slow_write(trade_result, **_):
+        release.wait()
+        written.append(trade_result)
+
+    monkeypatch.setattr(crash_report_writer, "log_hyperdrive_crash_report", _slow_write)
+    writer = CrashReportWriter(max_queue_size=1)
+    results = [writer.submit(_crash(amount)) for amount in range(10)]
+    release.set()
+    writer.close()
+
+    # The writer thread may or may not have taken the first report off the queue before the queue filled
+    assert results[:2] == [True, True] or results[:2] == [True, False]
+    assert len(written) == sum(results)
+    assert writer.num_dropped == len(results) - len(written)
+    assert writer.signature_counts == {"OPEN_LONG: PypechainCallException: InsufficientLiquidity": 10}
@@ -1,6 +1,10 @@
 """Interactive hyperdrive"""
 
+from .anvil_pool import AnvilProcessPool
+from .block_builder import BlockBuilder, PendingActions
 from .chain import Chain
 from .hyperdrive import Hyperdrive
 from .local_chain import LocalChain
 from .local_hyperdrive import LocalHyperdrive
+from .simulated_hyperdrive import SimulatedHyperdrive, SimulatedHyperdriveAgent
+from .trade_replay import ReplayDivergence, ReplayResult, TradeReplay
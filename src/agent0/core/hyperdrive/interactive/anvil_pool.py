@@ -0,0 +1,367 @@
+"""A pool of warm anvil processes that get reused across local chains."""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import socket
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import requests
+from web3 import Web3
+from web3.types import RPCEndpoint
+
+from agent0.ethpy.base import initialize_web3_with_http_provider
+
+if TYPE_CHECKING:
+    from .local_chain import LocalChain
+
+# The number of times an instance gets relaunched on a new port when its port gets taken
+_MAX_LAUNCH_ATTEMPTS = 5
+
+
+def get_anvil_launch_args(
+    config: LocalChain.Config, fork_uri: str | None = None, fork_block_number: int | None = None
+) -> list[str]:
+    """Get the anvil command line arguments for a local chain, excluding `--host` and `--port`.
+
+    Arguments
+    ---------
+    config: LocalChain.Config
+        The local chain configuration.
+    fork_uri: str | None, optional
+        The URI of the chain to fork. Defaults to starting a chain from scratch.
+    fork_block_number: int | None, optional
+        The block number to fork at if fork_uri is set. Defaults to latest.
+
+    Returns
+    -------
+    list[str]
+        The command line arguments.
+    """
+    anvil_launch_args = [
+        "--code-size-limit",
+        "9999999999",
+        "--transaction-block-keeper",
+        str(config.transaction_block_keeper),
+    ]
+    if config.block_time is not None:
+        anvil_launch_args.extend(("--block-time", str(config.block_time)))
+
+    if config.chain_genesis_timestamp is not None:
+        anvil_launch_args.extend(("--timestamp", str(config.chain_genesis_timestamp)))
+
+    if fork_uri is not None:
+        anvil_launch_args.extend(["--fork-url", fork_uri])
+        if fork_block_number is not None:
+            anvil_launch_args.extend(["--fork-block-number", str(fork_block_number)])
+
+    if config.chain_id is not None:
+        anvil_launch_args.extend(("--chain-id", str(config.chain_id)))
+    return anvil_launch_args
+
+
+def get_free_port(host: str = "127.0.0.1") -> int:
+    """Find a free port on the host by binding to port 0.
+
+    The port is released before returning, so another process may still bind to it before the caller does.
+    Callers should retry on a new port if binding fails, e.g., with `is_port_in_use`.
+
+    Arguments
+    ---------
+    host: str, optional
+        The host to find a free port on. Defaults to localhost.
+
+    Returns
+    -------
+    int
+        The free port.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def is_port_in_use(port: int, host: str = "127.0.0.1") -> bool:
+    """Check if a port on the host is bound by another socket.
+
+    Arguments
+    ---------
+    port: int
+        The port to check.
+    host: str, optional
+        The host to check the port on. Defaults to localhost.
+
+    Returns
+    -------
+    bool
+        Whether binding to the port failed.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return True
+    return False
+
+
+def _get_pool_key(config: LocalChain.Config) -> tuple:
+    chain_host = "127.0.0.1" if config.chain_host is None else config.chain_host
+    return (tuple(get_anvil_launch_args(config)), chain_host, config.verbose)
+
+
+@dataclass(eq=False)
+class AnvilInstance:
+    """An anvil process owned by an `AnvilProcessPool`."""
+
+    process: subprocess.Popen
+    """The anvil subprocess."""
+    host: str
+    """The host the anvil process is bound to."""
+    port: int
+    """The port the anvil process is bound to."""
+    pool_key: tuple
+    """The launch arguments and output settings the process was launched with, excluding the port."""
+    web3: Web3 = field(init=False)
+    """The web3 object used by the pool to reset the process."""
+    genesis_snapshot_id: str | None = None
+    """The `evm_snapshot` id of the genesis state."""
+
+    def __post_init__(self):
+        self.web3 = initialize_web3_with_http_provider(self.rpc_uri)
+
+    @property
+    def rpc_uri(self) -> str:
+        """The rpc uri of the anvil process."""
+        return f"http://127.0.0.1:{self.port}"
+
+    def make_request(self, method: str, params: list) -> str | None:
+        """Make an rpc request to the anvil process.
+
+        Arguments
+        ---------
+        method: str
+            The rpc method to call.
+        params: list
+            The parameters of the call.
+
+        Returns
+        -------
+        str | None
+            The result of the call.
+        """
+        response = self.web3.provider.make_request(method=RPCEndpoint(method), params=params)
+        if "result" not in response:
+            raise KeyError(f"Response to {method} did not have a result.")
+        return response["result"]
+
+    def terminate(self) -> None:
+        """Terminate the anvil process."""
+        if self.process.stdout is not None:
+            self.process.stdout.close()
+        if self.process.stderr is not None:
+            self.process.stderr.close()
+        self.process.terminate()
+
+
+class AnvilProcessPool:
+    """Keeps anvil processes warm on free ports, so local chains don't pay for launching anvil.
+
+    Local chains acquire an instance launched with the same arguments from the pool, and release
+    the instance back to the pool on cleanup. Released instances get reset to their genesis state
+    with `evm_revert` instead of being killed, with pending transactions dropped and the launch mining
+    mode restored. Combined with `LocalChain.Config.deployment_cache_dir`,
+    instances start from genesis and load the cached deployment state.
+
+    Instances get launched on free ports. If another process takes the port before anvil binds to it,
+    the instance gets relaunched on a new port.
+
+    .. note::
+        Since instances get launched ahead of time, the genesis timestamp of an instance
+        is the time it was launched, unless `chain_genesis_timestamp` is set.
+    """
+
+    def __init__(self, size: int = 4, startup_timeout: float = 10) -> None:
+        """Initialize the pool.
+
+        Arguments
+        ---------
+        size: int, optional
+            The maximum number of idle instances to keep for each set of launch arguments. Defaults to 4.
+        startup_timeout: float, optional
+            The number of seconds to wait for a new anvil process to respond. Defaults to 10.
+        """
+        self.size = size
+        self.startup_timeout = startup_timeout
+        self._lock = threading.Lock()
+        self._idle_instances: dict[tuple, list[AnvilInstance]] = {}
+        self._active_instances: list[AnvilInstance] = []
+        atexit.register(self.shutdown)
+
+    def acquire(self, config: LocalChain.Config) -> AnvilInstance:
+        """Get an instance at genesis from the pool, launching a new process if there are no idle instances.
+
+        Arguments
+        ---------
+        config: LocalChain.Config
+            The configuration of the local chain to get an instance for.
+
+        Returns
+        -------
+        AnvilInstance
+            The instance to use.
+        """
+        pool_key = _get_pool_key(config)
+        with self._lock:
+            idle_instances = self._idle_instances.get(pool_key, [])
+            instance = idle_instances.pop() if idle_instances else None
+        if instance is None:
+            instance = self._launch_instances(pool_key, 1)[0]
+        with self._lock:
+            self._active_instances.append(instance)
+        return instance
+
+    def release(self, instance: AnvilInstance) -> None:
+        """Reset an instance to genesis and return it to the pool.
+
+        The instance gets terminated instead if the pool is full or if resetting fails.
+
+        Arguments
+        ---------
+        instance: AnvilInstance
+            The instance acquired from this pool.
+        """
+        with self._lock:
+            if instance in self._active_instances:
+                self._active_instances.remove(instance)
+            keep = len(self._idle_instances.get(instance.pool_key, [])) < self.size
+        if keep:
+            try:
+                self._reset(instance)
+            except Exception as exc:  # pylint: disable=broad-except
+                logging.warning("Failed to reset anvil on port %s, terminating: %s", instance.port, repr(exc))
+                keep = False
+        if not keep:
+            instance.terminate()
+            return
+        with self._lock:
+            self._idle_instances.setdefault(instance.pool_key, []).append(instance)
+
+    def prewarm(self, config: LocalChain.Config | None = None, num: int | None = None) -> None:
+        """Launch idle instances ahead of time.
+
+        Arguments
+        ---------
+        config: LocalChain.Config | None, optional
+            The configuration of the local chains to launch instances for. Defaults to the default configuration.
+        num: int | None, optional
+            The number of idle instances to have ready. Defaults to the pool size.
+        """
+        if config is None:
+            # Avoid a circular import at module load
+            from .local_chain import LocalChain  # pylint: disable=import-outside-toplevel
+
+            config = LocalChain.Config()
+        pool_key = _get_pool_key(config)
+        if num is None:
+            num = self.size
+        with self._lock:
+            num_missing = max(min(num, self.size) - len(self._idle_instances.get(pool_key, [])), 0)
+        instances = self._launch_instances(pool_key, num_missing)
+        with self._lock:
+            self._idle_instances.setdefault(pool_key, []).extend(instances)
+
+    def shutdown(self) -> None:
+        """Terminate all instances owned by the pool, including ones that haven't been released."""
+        with self._lock:
+            instances = self._active_instances + [
+                instance for idle_instances in self._idle_instances.values() for instance in idle_instances
+            ]
+            self._active_instances = []
+            self._idle_instances = {}
+        for instance in instances:
+            try:
+                instance.terminate()
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+    def _launch(self, pool_key: tuple) -> AnvilInstance:
+        launch_args, host, verbose = pool_key
+        port = get_free_port(host)
+        anvil_launch_args = ["anvil", "--host", host, "--port", str(port), *launch_args]
+        if verbose:
+            process = subprocess.Popen(anvil_launch_args, close_fds=True)  # pylint: disable=consider-using-with
+        else:
+            process = subprocess.Popen(  # pylint: disable=consider-using-with
+                anvil_launch_args,
+                # Suppressing output of anvil
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.STDOUT,
+                close_fds=True,
+            )
+        return AnvilInstance(process=process, host=host, port=port, pool_key=pool_key)
+
+    def _launch_instances(self, pool_key: tuple, num: int) -> list[AnvilInstance]:
+        # We launch all processes before waiting on any of them, so they start up in parallel
+        instances = [self._launch(pool_key) for _ in range(num)]
+        try:
+            for i, instance in enumerate(instances):
+                instances[i] = self._wait_for_instance(instance)
+        except Exception:
+            for instance in instances:
+                instance.terminate()
+            raise
+        return instances
+
+    def _wait_for_instance(self, instance: AnvilInstance) -> AnvilInstance:
+        attempt = 1
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            # Anvil exits if it can't bind to its port, in which case another process may be answering on the port
+            if instance.process.poll() is not None:
+                if attempt < _MAX_LAUNCH_ATTEMPTS and is_port_in_use(instance.port, instance.host):
+                    # Another process took the port between finding it and anvil binding to it
+                    logging.warning("Anvil port %s is in use, relaunching on a new port", instance.port)
+                    instance.terminate()
+                    instance = self._launch(instance.pool_key)
+                    attempt += 1
+                    deadline = time.monotonic() + self.startup_timeout
+                    continue
+                instance.terminate()
+                raise RuntimeError(f"Anvil on port {instance.port} failed to start.")
+            try:
+                instance.web3.eth.get_block_number()
+            except requests.exceptions.RequestException as exc:
+                if time.monotonic() > deadline:
+                    instance.terminate()
+                    raise RuntimeError(f"Anvil on port {instance.port} failed to start.") from exc
+                time.sleep(0.05)
+                continue
+            if instance.process.poll() is None:
+                break
+        instance.genesis_snapshot_id = instance.make_request("evm_snapshot", [])
+        return instance
+
+    def _reset(self, instance: AnvilInstance) -> None:
+        assert instance.genesis_snapshot_id is not None
+        # Drop pending transactions first, so they don't get mined when automine gets turned back on
+        instance.make_request("anvil_dropAllTransactions", [])
+        if not instance.make_request("evm_revert", [instance.genesis_snapshot_id]):
+            raise ValueError("Failed to revert to the genesis snapshot.")
+        # Reverting deletes the snapshot, so we take a new one to revert to next time
+        instance.genesis_snapshot_id = instance.make_request("evm_snapshot", [])
+        # Undo chain settings that aren't part of the state
+        instance.make_request("anvil_removeBlockTimestampInterval", [])
+        # Reverting leaves the mining mode alone, so we restore the mode anvil was launched with
+        launch_args = instance.pool_key[0]
+        if "--block-time" in launch_args:
+            instance.make_request("evm_setIntervalMining", [int(launch_args[launch_args.index("--block-time") + 1])])
+        else:
+            instance.make_request("evm_setIntervalMining", [0])
+            instance.make_request("evm_setAutomine", [True])
+        if instance.web3.eth.get_block_number() != 0:
+            raise ValueError("Anvil is not at genesis after reverting.")
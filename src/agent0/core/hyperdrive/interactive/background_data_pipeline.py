@@ -0,0 +1,232 @@
+"""A background worker that syncs the database of a local chain."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator
+
+from sqlalchemy.orm import Session
+
+from agent0.chainsync.db.base import initialize_session
+from agent0.chainsync.exec import acquire_data, analyze_data
+from agent0.ethpy.base import initialize_web3_with_http_provider
+from agent0.ethpy.hyperdrive import HyperdriveReadInterface
+
+if TYPE_CHECKING:
+    from .local_chain import LocalChain
+    from .local_hyperdrive import LocalHyperdrive
+
+# pylint: disable=protected-access
+
+
+class BackgroundDataPipeline:
+    """Runs the data pipeline of all pools deployed on a local chain in a background thread.
+
+    Trades and time advances request a sync up to the latest block, and return without waiting for
+    the database. The worker keeps track of a block watermark, i.e., the block that the database is
+    synced up to, and read functions wait until the watermark reaches the block they need.
+
+    Since sessions and the cached pool state in interfaces aren't thread safe, the worker uses its own
+    db session and read interfaces.
+    """
+
+    def __init__(self, chain: LocalChain) -> None:
+        """Initialize and start the background worker.
+
+        Arguments
+        ---------
+        chain: LocalChain
+            The local chain to sync the database of.
+        """
+        self.chain = chain
+
+        self._web3 = initialize_web3_with_http_provider(chain.rpc_uri, reset_provider=False)
+        self._session: Session | None = None
+        self._interfaces: dict[str, HyperdriveReadInterface] = {}
+
+        self._condition = threading.Condition()
+        # Held while running the pipeline, used to pause the worker
+        self._pipeline_lock = threading.Lock()
+        self._target_block = -1
+        self._watermark = -1
+        # The start block to use for the next sync of each pool
+        self._start_blocks: dict[str, int | None] = {}
+        self._exception: BaseException | None = None
+        self._stop = False
+
+        self._thread = threading.Thread(target=self._run, name="background-data-pipeline", daemon=True)
+        self._thread.start()
+
+    @property
+    def watermark(self) -> int:
+        """The block number the database is synced up to."""
+        with self._condition:
+            return self._watermark
+
+    def request_sync(self, pool: LocalHyperdrive, block_number: int, start_block: int | None = None) -> None:
+        """Request the worker to sync the database up to the given block.
+
+        Arguments
+        ---------
+        pool: LocalHyperdrive
+            The pool requesting the sync.
+        block_number: int
+            The block number to sync up to.
+        start_block: int | None, optional
+            The block number to start syncing the pool from. Defaults to ensuring all blocks are synced.
+        """
+        with self._condition:
+            self._raise_worker_exception()
+            # Skipping blocks for a pool persists until the next sync of that pool
+            if start_block is not None:
+                prev_start_block = self._start_blocks.get(pool.hyperdrive_address)
+                if prev_start_block is not None:
+                    start_block = max(prev_start_block, start_block)
+                self._start_blocks[pool.hyperdrive_address] = start_block
+            self._target_block = max(self._target_block, block_number)
+            self._condition.notify_all()
+
+    def wait_for_block(self, block_number: int, timeout: float | None = None) -> None:
+        """Block until the database is synced up to the given block.
+
+        Arguments
+        ---------
+        block_number: int
+            The block number to wait for.
+        timeout: float | None, optional
+            The number of seconds to wait for. Defaults to waiting forever.
+
+        Raises
+        ------
+        RuntimeError
+            If the worker was stopped before syncing up to the block.
+        TimeoutError
+            If the database isn't synced up to the block within the timeout.
+        """
+        with self._condition:
+            # Make sure the worker syncs up to this block
+            if self._target_block < block_number:
+                self._target_block = block_number
+                self._condition.notify_all()
+            synced = self._condition.wait_for(
+                lambda: self._watermark >= block_number or self._exception is not None or self._stop,
+                timeout=timeout,
+            )
+            self._raise_worker_exception()
+            if self._watermark < block_number and self._stop:
+                raise RuntimeError(
+                    f"The data pipeline was stopped before syncing block {block_number}, "
+                    f"synced up to block {self._watermark}."
+                )
+            if not synced:
+                raise TimeoutError(
+                    f"Timed out waiting for the data pipeline to sync block {block_number}, "
+                    f"currently synced up to block {self._watermark}."
+                )
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """Context manager that pauses the worker, e.g., while the database is being replaced.
+
+        Yields
+        ------
+        None
+            The worker doesn't run the pipeline within this context.
+        """
+        with self._pipeline_lock:
+            yield
+
+    def reset(self, block_number: int) -> None:
+        """Drop the worker's cached state and treat the database as synced up to the given block.
+
+        Used when the database gets loaded along with the chain state. This should be called while paused.
+
+        Arguments
+        ---------
+        block_number: int
+            The block number the loaded database is synced up to.
+        """
+        self._reset_state()
+        with self._condition:
+            self._watermark = block_number
+            self._target_block = block_number
+            self._start_blocks.clear()
+            self._condition.notify_all()
+
+    def stop(self) -> None:
+        """Stop the worker and close its db session."""
+        with self._condition:
+            self._stop = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._reset_state()
+
+    def _raise_worker_exception(self) -> None:
+        if self._exception is not None:
+            raise self._exception
+
+    def _reset_state(self) -> None:
+        if self._session is not None:
+            self._session.close()
+        self._session = None
+        self._interfaces = {}
+
+    def _get_interface(self, pool: LocalHyperdrive) -> HyperdriveReadInterface:
+        if pool.hyperdrive_address not in self._interfaces:
+            self._interfaces[pool.hyperdrive_address] = HyperdriveReadInterface(
+                pool.hyperdrive_address, web3=self._web3
+            )
+        return self._interfaces[pool.hyperdrive_address]
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._stop or self._target_block > self._watermark)
+                if self._stop:
+                    return
+            with self._pipeline_lock:
+                with self._condition:
+                    # The target may have been reset while paused
+                    target_block = self._target_block
+                    if target_block <= self._watermark:
+                        continue
+                    start_blocks = self._start_blocks
+                    self._start_blocks = {}
+                try:
+                    # The latest block may be past the target, in which case we sync further
+                    synced_block = max(target_block, self._web3.eth.block_number)
+                    self._sync(start_blocks)
+                except BaseException as exc:  # pylint: disable=broad-except
+                    logging.error("Background data pipeline failed: %s", repr(exc))
+                    with self._condition:
+                        self._exception = exc
+                        self._condition.notify_all()
+                    return
+            with self._condition:
+                self._watermark = max(self._watermark, synced_block)
+                self._condition.notify_all()
+
+    def _sync(self, start_blocks: dict[str, int | None]) -> None:
+        if self._session is None:
+            self._session = initialize_session(self.chain.postgres_config, ensure_database_created=True)
+        # Pools can get deployed from the main thread while syncing
+        for pool in list(self.chain._deployed_hyperdrive_pools):
+            start_block = start_blocks.get(pool.hyperdrive_address)
+            if start_block is None:
+                start_block = pool._data_start_block
+            interface = self._get_interface(pool)
+            acquire_data(
+                start_block=start_block,
+                interfaces=[interface],
+                db_session=self._session,
+                backfill=self.chain.config.backfill_pool_info,
+            )
+            analyze_data(
+                start_block=start_block,
+                interfaces=[interface],
+                db_session=self._session,
+                calc_pnl=pool.calc_pnl,
+                backfill=self.chain.config.backfill_pool_info,
+            )
@@ -0,0 +1,128 @@
+"""Tests for the background data pipeline."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Iterator
+
+import pytest
+from fixedpointmath import FixedPoint
+
+from .background_data_pipeline import BackgroundDataPipeline
+from .local_chain import LocalChain
+from .local_hyperdrive import LocalHyperdrive
+
+# pylint: disable=protected-access
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture(scope="function")
+def data_pipeline_chain(fast_chain_fixture: LocalChain) -> Iterator[LocalChain]:
+    """The fast chain fixture with a background data pipeline, as if launched with `background_data_pipeline=True`.
+
+    Arguments
+    ---------
+    fast_chain_fixture: LocalChain
+        Function scoped chain fixture.
+
+    Yield
+    -----
+    LocalChain
+        Local chain instance with a background data pipeline.
+    """
+    fast_chain_fixture._data_pipeline = BackgroundDataPipeline(fast_chain_fixture)
+    yield fast_chain_fixture
+    # The fast chain fixture loads its snapshot after this, which uses the blocking data pipeline again
+    fast_chain_fixture._data_pipeline.stop()
+    fast_chain_fixture._data_pipeline = None
+
+
+def test_wait_for_block_after_stop():
+    """Waiting on a stopped worker raises instead of returning as if the block was synced."""
+    # The worker doesn't touch the chain until a sync is requested
+    data_pipeline = BackgroundDataPipeline(SimpleNamespace(rpc_uri="http://127.0.0.1:8545"))  # type: ignore
+    data_pipeline.reset(1)
+    data_pipeline.stop()
+
+    # Blocks that were already synced don't need the worker
+    data_pipeline.wait_for_block(1)
+    with pytest.raises(RuntimeError):
+        data_pipeline.wait_for_block(2, timeout=1)
+
+
+@pytest.mark.docker
+@pytest.mark.anvil
+def test_watermark_advances(data_pipeline_chain: LocalChain):
+    """Trades request a sync without waiting, and the watermark reaches the latest block after the sync."""
+    data_pipeline = data_pipeline_chain._data_pipeline
+    assert data_pipeline is not None
+
+    hyperdrive = LocalHyperdrive(data_pipeline_chain, LocalHyperdrive.Config())
+    agent = data_pipeline_chain.init_agent(base=FixedPoint(1_000_000), eth=FixedPoint(100), pool=hyperdrive)
+    _ = agent.open_long(base=FixedPoint(1_000))
+    data_pipeline_chain.mine_blocks(3)
+
+    block_number = data_pipeline_chain.block_number()
+    data_pipeline.wait_for_block(block_number, timeout=60)
+    assert data_pipeline.watermark >= block_number
+    # The synced database has the trade
+    assert len(agent.get_trade_events()) == 1
+    assert hyperdrive.get_pool_info()["block_number"].max() == block_number
+
+
+@pytest.mark.docker
+@pytest.mark.anvil
+def test_wait_for_block_timeout(data_pipeline_chain: LocalChain):
+    """Waiting for a block times out while the worker is paused, and succeeds once it resumes."""
+    data_pipeline = data_pipeline_chain._data_pipeline
+    assert data_pipeline is not None
+
+    with data_pipeline.paused():
+        data_pipeline_chain.mine_blocks(2)
+        block_number = data_pipeline_chain.block_number()
+        with pytest.raises(TimeoutError):
+            data_pipeline.wait_for_block(block_number, timeout=0.5)
+        assert data_pipeline.watermark < block_number
+    data_pipeline.wait_for_block(block_number, timeout=60)
+    assert data_pipeline.watermark >= block_number
+
+
+@pytest.mark.docker
+@pytest.mark.anvil
+def test_sync_exception(data_pipeline_chain: LocalChain, monkeypatch: pytest.MonkeyPatch):
+    """Exceptions raised while syncing reach the threads that wait for or request a sync."""
+    data_pipeline = data_pipeline_chain._data_pipeline
+    assert data_pipeline is not None
+
+    def _failing_sync(start_blocks):
+        raise ValueError("sync failed")
+
+    monkeypatch.setattr(data_pipeline, "_sync", _failing_sync)
+    data_pipeline_chain.mine_blocks(1)
+    with pytest.raises(ValueError, match="sync failed"):
+        data_pipeline.wait_for_block(data_pipeline_chain.block_number(), timeout=60)
+    pool = SimpleNamespace(hyperdrive_address="0x0")
+    with pytest.raises(ValueError, match="sync failed"):
+        data_pipeline.request_sync(pool, data_pipeline_chain.block_number())  # type: ignore
+
+
+@pytest.mark.docker
+@pytest.mark.anvil
+def test_load_snapshot_resets_pipeline(data_pipeline_chain: LocalChain):
+    """Loading a snapshot resets the watermark to the snapshot block, and the worker keeps syncing after."""
+    data_pipeline = data_pipeline_chain._data_pipeline
+    assert data_pipeline is not None
+
+    # The fast chain fixture saved a snapshot at this block
+    snapshot_block = data_pipeline_chain.block_number()
+    data_pipeline_chain.mine_blocks(5)
+    data_pipeline.wait_for_block(data_pipeline_chain.block_number(), timeout=60)
+    assert data_pipeline.watermark >= snapshot_block + 5
+
+    data_pipeline_chain.load_snapshot()
+    assert data_pipeline_chain.block_number() == snapshot_block
+    assert data_pipeline.watermark == snapshot_block
+
+    data_pipeline_chain.mine_blocks(2)
+    data_pipeline.wait_for_block(data_pipeline_chain.block_number(), timeout=60)
+    assert data_pipeline.watermark >= snapshot_block + 2
@@ -0,0 +1,220 @@
+"""Builds blocks out of the trades of many agents on a local chain."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from hyperdrivetypes import BaseEvent
+
+from agent0.core.base import Trade
+from agent0.core.hyperdrive import HyperdriveMarketAction
+from agent0.core.hyperdrive.agent import TradeResult
+
+if TYPE_CHECKING:
+    from .local_chain import LocalChain
+    from .local_hyperdrive import LocalHyperdrive
+    from .local_hyperdrive_agent import LocalHyperdriveAgent
+
+# pylint: disable=protected-access
+
+# The number of seconds between checks of the transaction pool while building a block
+_TXPOOL_POLL_INTERVAL = 0.001
+
+
+@dataclass(eq=False)
+class PendingActions:
+    """The actions of an agent that are waiting on a block to get built."""
+
+    agent: LocalHyperdriveAgent
+    """The agent executing the actions."""
+    pool: LocalHyperdrive
+    """The pool the actions are executed on."""
+    actions: list[Trade[HyperdriveMarketAction]]
+    """The actions to execute."""
+    trade_results: list[TradeResult] = field(default_factory=list)
+    """The results of the executed actions, set once the block is built."""
+    events: list[BaseEvent] | None = None
+    """The events of the successful actions, set once the block is built."""
+    exception: BaseException | None = None
+    """The exception raised when handling the results, if any."""
+
+    def result(self) -> list[BaseEvent]:
+        """Get the events of the executed actions.
+
+        This mirrors the return value of `execute_action`, including raising the exception
+        `execute_action` would have raised.
+
+        Returns
+        -------
+        list[BaseEvent]
+            The events of the executed actions.
+        """
+        if self.exception is not None:
+            raise self.exception
+        if self.events is None:
+            raise ValueError("The block containing these actions hasn't been built yet.")
+        return self.events
+
+
+class BlockBuilder:
+    """Collects the actions of many agents and mines all of them in a single block.
+
+    Automine gets turned off while building, every agent submits their transactions concurrently,
+    and the block gets mined once the transaction pool stops growing. Nonces are read from the pending
+    block, which includes the transactions already submitted to the block being built.
+
+    Policy actions are computed when added, i.e., every agent sees the state at the start of the block.
+
+    .. note::
+        Agents submit their transactions from a single event loop, so this doesn't need any locking
+        around the agents or the database. Transactions that get stuck due to nonce gaps are dropped
+        from the transaction pool, and the waiting agents fail with a timeout.
+
+    Example
+    -------
+    >>> with chain.build_block() as block_builder:
+    >>>     pending = [block_builder.add_policy_action(agent, pool) for agent in agents]
+    >>> events = [p.result() for p in pending]
+    """
+
+    def __init__(self, chain: LocalChain) -> None:
+        """Initialize the block builder.
+
+        Arguments
+        ---------
+        chain: LocalChain
+            The local chain to build the block on.
+        """
+        if chain.config.block_time is not None:
+            raise ValueError("Building blocks requires the chain to not use interval mining.")
+        self.chain = chain
+        self._pending: list[PendingActions] = []
+        self._built = False
+
+    def __enter__(self) -> BlockBuilder:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # We don't build the block if the context exited with an exception
+        if exc_type is None:
+            self.build()
+
+    def add_policy_action(self, agent: LocalHyperdriveAgent, pool: LocalHyperdrive | None = None) -> PendingActions:
+        """Add the policy actions of an agent to the block.
+
+        Arguments
+        ---------
+        agent: LocalHyperdriveAgent
+            The agent to get the policy actions of.
+        pool: LocalHyperdrive | None, optional
+            The pool to interact with. Defaults to the agent's active pool.
+
+        Returns
+        -------
+        PendingActions
+            The pending actions, resolved when the block gets built.
+        """
+        return self.add_action(agent, agent.get_policy_action(pool), pool)
+
+    def add_action(
+        self,
+        agent: LocalHyperdriveAgent,
+        actions: list[Trade[HyperdriveMarketAction]],
+        pool: LocalHyperdrive | None = None,
+    ) -> PendingActions:
+        """Add actions of an agent to the block.
+
+        Arguments
+        ---------
+        agent: LocalHyperdriveAgent
+            The agent executing the actions.
+        actions: list[Trade[HyperdriveMarketAction]]
+            The actions to execute.
+        pool: LocalHyperdrive | None, optional
+            The pool to interact with. Defaults to the agent's active pool.
+
+        Returns
+        -------
+        PendingActions
+            The pending actions, resolved when the block gets built.
+        """
+        if self._built:
+            raise ValueError("Can't add actions to a block that has already been built.")
+        if agent.chain is not self.chain:
+            raise ValueError("The agent must be on the chain the block is built on.")
+        pool = agent._ensure_pool_type(pool)
+        if pool is None:
+            raise ValueError("Executing actions requires an active pool.")
+        # Approvals are their own transaction, so we set them before building the block
+        agent._ensure_approval_set(pool)
+        pending_actions = PendingActions(agent=agent, pool=pool, actions=actions)
+        self._pending.append(pending_actions)
+        return pending_actions
+
+    def build(self) -> None:
+        """Submit all added actions and mine them in a single block.
+
+        This gets called when exiting the context.
+        """
+        if self._built:
+            raise ValueError("The block has already been built.")
+        self._built = True
+        pending_with_actions = [pending for pending in self._pending if len(pending.actions) > 0]
+
+        results: list[list[TradeResult] | BaseException] = []
+        if len(pending_with_actions) > 0:
+            self.chain._set_automine(False)
+            try:
+                results = asyncio.run(self._async_build(pending_with_actions))
+            finally:
+                # Transactions left over from a failed build shouldn't get mined in a later block
+                self.chain._drop_pending_transactions()
+                self.chain._set_automine(True)
+
+        for pending in self._pending:
+            pending.events = []
+        for pending, result in zip(pending_with_actions, results):
+            if isinstance(result, BaseException):
+                pending.exception = result
+                continue
+            pending.trade_results = result
+            try:
+                pending.events = pending.agent._handle_trade_results(result, pending.pool)
+            except Exception as exc:  # pylint: disable=broad-except
+                pending.exception = exc
+
+        # We sync the database once per pool after the block is mined
+        pools: list[LocalHyperdrive] = []
+        for pending in pending_with_actions:
+            if pending.pool not in pools:
+                pools.append(pending.pool)
+        for pool in pools:
+            pool._maybe_run_blocking_data_pipeline()
+
+    async def _async_build(self, pending_with_actions: list[PendingActions]) -> list[list[TradeResult] | BaseException]:
+        tasks = [
+            asyncio.create_task(pending.agent._async_execute_action(pending.actions, pending.pool))
+            for pending in pending_with_actions
+        ]
+        await self._async_mine_until_done(tasks)
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _async_mine_until_done(self, tasks: list[asyncio.Task]) -> None:
+        prev_num_pending = -1
+        while not all(task.done() for task in tasks):
+            # Agents submit transactions before waiting on receipts, so we wait for the
+            # transaction pool to stop growing before mining the block.
+            await asyncio.sleep(_TXPOOL_POLL_INTERVAL)
+            num_pending, num_queued = self.chain._get_txpool_status()
+            if num_pending > 0 and num_pending == prev_num_pending:
+                self.chain._mine_chain_blocks(1)
+                prev_num_pending = -1
+                continue
+            if num_pending == 0 and num_queued > 0:
+                # Queued transactions have a nonce gap, and would never get mined
+                logging.warning("Dropping %s queued transactions with nonce gaps from the block.", num_queued)
+                self.chain._drop_pending_transactions()
+            prev_num_pending = num_pending
@@ -25,6 +25,7 @@ from agent0.chainsync.db.base import get_addr_to_username, initialize_session
 from agent0.chainsync.db.hyperdrive import get_hyperdrive_addr_to_name
 from agent0.chainsync.db.hyperdrive.import_export_data import export_db_to_file, import_to_db
 from agent0.chainsync.postgres_config import build_postgres_config_from_env
+from agent0.core.hyperdrive.crash_report import CrashReportWriter
 from agent0.core.hyperdrive.policies import HyperdriveBasePolicy
 from agent0.ethpy.base import initialize_web3_with_http_provider
 from agent0.hyperlogs import close_logging, setup_logging
@@ -59,6 +60,13 @@ class Chain:
         """Log formatter object. Defaults to None."""
         keep_previous_handlers: bool = False
         """Whether to keep previous handlers. Defaults to False."""
+        log_with_queue: bool = False
+        """
+        Whether to write logs from a background thread fed by a queue, so logging doesn't wait on formatting
+        and writing to stdout or file. Defaults to False.
+        """
+        log_json_lines: bool = False
+        """Whether to format logs as compact json lines, ignoring `log_format_string`. Defaults to False."""
 
         # Execution config
         exception_on_policy_error: bool = True
@@ -101,6 +109,29 @@ class Chain:
         """
         log_anvil_state_dump: bool = False
         """Whether to log the anvil state dump in crash reports. Defaults to False."""
+        crash_report_in_background: bool = False
+        """
+        Whether to write crash reports in a background thread, so failing trades don't wait on
+        serializing and writing the report. Defaults to False.
+        """
+        crash_report_max_per_signature: int | None = None
+        """
+        The number of crashes with the same signature (i.e., trade type, exception type, and contract error)
+        to write full crash reports for. Further crashes are only counted, and the counts are logged on cleanup.
+        Defaults to writing full reports for all crashes.
+        """
+        use_wallet_ledger: bool = False
+        """
+        If True, agents keep track of their wallets in memory, updated from the events of their trades,
+        instead of syncing and querying the database every time the wallet is read. This allows agents that
+        only trade to run without postgres. Defaults to False.
+        """
+        wallet_ledger_reconcile_interval: int | None = 100
+        """
+        The number of wallet reads between reconciling an agent's wallet ledger with the chain.
+        Only used if `use_wallet_ledger` is True. If None, will only reconcile when the ledger
+        gets invalidated. Defaults to 100.
+        """
 
         # Data pipeline parameters
         calc_pnl: bool = True
@@ -184,12 +215,22 @@ class Chain:
             log_stdout=config.log_to_stdout,
             log_format_string=config.log_format_string,
             keep_previous_handlers=config.keep_previous_handlers,
+            log_with_queue=config.log_with_queue,
+            log_json_lines=config.log_json_lines,
         )
 
         self.rpc_uri = rpc_uri
         # Initialize web3 here for rpc calls
         self._web3 = initialize_web3_with_http_provider(self.rpc_uri, reset_provider=False)
 
+        # Crash reports go through a writer if they're written in the background or deduplicated
+        self._crash_report_writer: CrashReportWriter | None = None
+        if config.crash_report_in_background or config.crash_report_max_per_signature is not None:
+            self._crash_report_writer = CrashReportWriter(
+                max_reports_per_signature=config.crash_report_max_per_signature,
+                background=config.crash_report_in_background,
+            )
+
         self.docker_client = None
         self.postgres_container = None
         self.db_session = None
@@ -305,6 +346,14 @@ class Chain:
         except Exception:  # pylint: disable=broad-except
             pass
 
+        # Write any queued crash reports before tearing down
+        try:
+            if self._crash_report_writer is not None:
+                self._crash_report_writer.close()
+                self._crash_report_writer = None
+        except Exception:  # pylint: disable=broad-except
+            pass
+
         db_engine = None
         if self.db_session is not None:
             db_engine = self.db_session.get_bind()
@@ -513,18 +562,21 @@ class Chain:
         out.insert(df.columns.get_loc(addr_column), "hyperdrive_name", hyperdrive_name)  # type: ignore
         return out
 
-    def dump_db(self, save_dir: Path) -> None:
+    def dump_db(self, save_dir: Path, since_block: int | None = None) -> None:
         """Export the managed database to file.
 
         Arguments
         ---------
         save_dir: Path
             The output directory to dump the data to.
+        since_block: int | None, optional
+            If set, will only export trade events, pool info, and position snapshots from this block
+            onwards, adding to a previous full dump in `save_dir`. Defaults to dumping the full database.
         """
         if self.db_session is not None:
             # TODO parameterize the save path
             os.makedirs(save_dir, exist_ok=True)
-            export_db_to_file(save_dir, self.db_session)
+            export_db_to_file(save_dir, self.db_session, since_block=since_block)
 
     def load_db(self, load_dir: Path) -> None:
         """Import the managed database from file.
@@ -0,0 +1,256 @@
+"""A cache of local hyperdrive deployments, stored as anvil state dumps."""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import dill
+from hyperdrivetypes.types import (
+    ERC20ForwarderFactoryContract,
+    ERC20MintableContract,
+    ERC4626HyperdriveCoreDeployerContract,
+    ERC4626HyperdriveDeployerCoordinatorContract,
+    ERC4626Target0DeployerContract,
+    ERC4626Target1DeployerContract,
+    ERC4626Target2DeployerContract,
+    ERC4626Target3DeployerContract,
+    ERC4626Target4DeployerContract,
+    HyperdriveFactoryContract,
+    IHyperdriveContract,
+    LPMathContract,
+    MockERC4626Contract,
+    MockLidoContract,
+    StETHHyperdriveCoreDeployerContract,
+    StETHHyperdriveDeployerCoordinatorContract,
+    StETHTarget0DeployerContract,
+    StETHTarget1DeployerContract,
+    StETHTarget2DeployerContract,
+    StETHTarget3DeployerContract,
+    StETHTarget4DeployerContract,
+)
+from web3 import Web3
+
+from agent0.core.hyperdrive.crash_report import load_anvil_state_dump, write_anvil_state_dump
+from agent0.ethpy.base import ETH_CONTRACT_ADDRESS
+from agent0.ethpy.hyperdrive import DeployedHyperdriveFactory, DeployedHyperdrivePool, HyperdriveDeployType
+
+if TYPE_CHECKING:
+    from .local_chain import LocalChain
+    from .local_hyperdrive import LocalHyperdrive
+
+DEPLOYMENT_CACHE_VERSION = 3
+"""Bump this when the layout of cached deployments or the deploy steps change to invalidate existing caches."""
+
+_DEPLOYMENT_FILE = "deployment.pkl"
+
+# The contracts deployed by `deploy_hyperdrive_from_factory`, whose artifacts determine the deployed chain state
+_DEPLOYED_CONTRACTS = [
+    ERC20ForwarderFactoryContract,
+    ERC20MintableContract,
+    ERC4626HyperdriveCoreDeployerContract,
+    ERC4626HyperdriveDeployerCoordinatorContract,
+    ERC4626Target0DeployerContract,
+    ERC4626Target1DeployerContract,
+    ERC4626Target2DeployerContract,
+    ERC4626Target3DeployerContract,
+    ERC4626Target4DeployerContract,
+    HyperdriveFactoryContract,
+    LPMathContract,
+    MockERC4626Contract,
+    MockLidoContract,
+    StETHHyperdriveCoreDeployerContract,
+    StETHHyperdriveDeployerCoordinatorContract,
+    StETHTarget0DeployerContract,
+    StETHTarget1DeployerContract,
+    StETHTarget2DeployerContract,
+    StETHTarget3DeployerContract,
+    StETHTarget4DeployerContract,
+]
+
+
+@cache
+def _contract_artifacts_digest() -> str:
+    # Hash the abi and unlinked bytecode of every deployed contract
+    digest = hashlib.sha256()
+    for contract in _DEPLOYED_CONTRACTS:
+        # Pypechain keeps the unlinked bytecode in `_raw_bytecode`, and `bytecode` gets linked in place on deploy
+        bytecode = getattr(contract, "_raw_bytecode", None) or contract.bytecode
+        digest.update(contract.__name__.encode("utf-8"))
+        digest.update(json.dumps(contract.abi, sort_keys=True).encode("utf-8"))
+        digest.update(str(bytecode).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def get_deployment_cache_key(chain: LocalChain, config: LocalHyperdrive.Config) -> str:
+    """Get the key of a deployment in the cache.
+
+    The key covers everything that affects the resulting chain state, i.e., the pool config,
+    the abi and bytecode of the deployed contracts, the anvil version, and the chain config.
+
+    Arguments
+    ---------
+    chain: LocalChain
+        The local chain to deploy on.
+    config: LocalHyperdrive.Config
+        The configuration of the pool to deploy.
+
+    Returns
+    -------
+    str
+        The hex digest identifying the deployment.
+    """
+    key_items = {
+        "cache_version": DEPLOYMENT_CACHE_VERSION,
+        "contract_artifacts": _contract_artifacts_digest(),
+        "anvil": chain._web3.client_version,  # pylint: disable=protected-access
+        "chain_id": chain.chain_id,
+        "chain_genesis_timestamp": chain.config.chain_genesis_timestamp,
+        "block_timestamp_interval": chain.config.block_timestamp_interval,
+        "deployer": chain.get_deployer_address(),
+        "pool_config": sorted(asdict(config).items()),
+    }
+    return hashlib.sha256(repr(key_items).encode("utf-8")).hexdigest()
+
+
+def _has_block_history(anvil_state_file: Path) -> bool:
+    # State files are gzipped json. Older versions of anvil only dump the account state,
+    # which would lose the deploy events and block number when loaded.
+    try:
+        with gzip.open(anvil_state_file, "rb") as file:
+            state = json.load(file)
+    except (ValueError, OSError):
+        return False
+    return isinstance(state, dict) and bool(state.get("blocks"))
+
+
+def save_cached_deployment(
+    chain: LocalChain,
+    cache_dir: Path,
+    key: str,
+    deployed_hyperdrive_factory: DeployedHyperdriveFactory,
+    deployed_hyperdrive_pool: DeployedHyperdrivePool,
+    deploy_type: HyperdriveDeployType,
+) -> bool:
+    """Dump the chain state after a deployment to the cache.
+
+    Arguments
+    ---------
+    chain: LocalChain
+        The local chain the pool was deployed on.
+    cache_dir: Path
+        The directory of the deployment cache.
+    key: str
+        The key of the deployment, from `get_deployment_cache_key`.
+    deployed_hyperdrive_factory: DeployedHyperdriveFactory
+        The deployed factory.
+    deployed_hyperdrive_pool: DeployedHyperdrivePool
+        The deployed pool.
+    deploy_type: HyperdriveDeployType
+        The deploy type of the pool.
+
+    Returns
+    -------
+    bool
+        True if the deployment was cached.
+    """
+    entry_dir = cache_dir / key
+    # State files are named after their content, so concurrent test processes never write the same file
+    anvil_state_file = write_anvil_state_dump(chain._web3, entry_dir)  # pylint: disable=protected-access
+    if anvil_state_file is None or not _has_block_history(anvil_state_file):
+        logging.warning("Anvil state dump doesn't contain block history, skipping the deployment cache.")
+        return False
+
+    deployment = {
+        "anvil_state_file": anvil_state_file.name,
+        "deploy_type": deploy_type,
+        "base_token_address": deployed_hyperdrive_pool.base_token_contract.address,
+        "vault_shares_token_address": deployed_hyperdrive_pool.vault_shares_token_contract.address,
+        "factory_address": deployed_hyperdrive_factory.factory_contract.address,
+        "deployer_coordinator_address": deployed_hyperdrive_factory.deployer_coordinator_contract.address,
+        "factory_deploy_config": deployed_hyperdrive_factory.factory_deploy_config,
+        "hyperdrive_address": deployed_hyperdrive_pool.hyperdrive_contract.address,
+        "deploy_block_number": deployed_hyperdrive_pool.deploy_block_number,
+        "pool_deploy_config": deployed_hyperdrive_pool.pool_deploy_config,
+    }
+
+    # Write to a temporary file and move it in place, so that concurrent test processes
+    # never read a partially written entry. The deployment file marks the entry as complete.
+    tmp_suffix = f".tmp{os.getpid()}"
+    with open(entry_dir / (_DEPLOYMENT_FILE + tmp_suffix), "wb") as file:
+        dill.dump(deployment, file, protocol=dill.HIGHEST_PROTOCOL)
+    os.replace(entry_dir / (_DEPLOYMENT_FILE + tmp_suffix), entry_dir / _DEPLOYMENT_FILE)
+    return True
+
+
+def load_cached_deployment(
+    chain: LocalChain, cache_dir: Path, key: str
+) -> tuple[DeployedHyperdriveFactory, DeployedHyperdrivePool] | None:
+    """Load a cached deployment onto the chain.
+
+    Arguments
+    ---------
+    chain: LocalChain
+        The local chain to load the deployment onto.
+    cache_dir: Path
+        The directory of the deployment cache.
+    key: str
+        The key of the deployment, from `get_deployment_cache_key`.
+
+    Returns
+    -------
+    tuple[DeployedHyperdriveFactory, DeployedHyperdrivePool] | None
+        The deployed factory and pool, or None if the deployment isn't cached.
+    """
+    entry_dir = cache_dir / key
+    if not (entry_dir / _DEPLOYMENT_FILE).exists():
+        return None
+    with open(entry_dir / _DEPLOYMENT_FILE, "rb") as file:
+        deployment = dill.load(file)
+
+    web3 = chain._web3  # pylint: disable=protected-access
+    load_anvil_state_dump(web3, entry_dir / deployment["anvil_state_file"])
+    if web3.eth.block_number < deployment["deploy_block_number"]:
+        raise ValueError(
+            f"Loading the cached deployment in {entry_dir} didn't restore the deploy block, "
+            "delete the deployment cache and try again."
+        )
+
+    deploy_type: HyperdriveDeployType = deployment["deploy_type"]
+    match deploy_type:
+        case HyperdriveDeployType.ERC4626:
+            base_token_contract = ERC20MintableContract.factory(w3=web3)(deployment["base_token_address"])
+            vault_shares_token_contract = MockERC4626Contract.factory(w3=web3)(deployment["vault_shares_token_address"])
+            deployer_coordinator_contract = ERC4626HyperdriveDeployerCoordinatorContract.factory(w3=web3)(
+                deployment["deployer_coordinator_address"]
+            )
+        case HyperdriveDeployType.STETH:
+            base_token_contract = web3.eth.contract(address=Web3.to_checksum_address(ETH_CONTRACT_ADDRESS))
+            vault_shares_token_contract = MockLidoContract.factory(w3=web3)(deployment["vault_shares_token_address"])
+            deployer_coordinator_contract = StETHHyperdriveDeployerCoordinatorContract.factory(w3=web3)(
+                deployment["deployer_coordinator_address"]
+            )
+
+    deployer_account = chain.get_deployer_account()
+    deployed_hyperdrive_factory = DeployedHyperdriveFactory(
+        deployer_account=deployer_account,
+        factory_contract=HyperdriveFactoryContract.factory(w3=web3)(deployment["factory_address"]),
+        deployer_coordinator_contract=deployer_coordinator_contract,
+        factory_deploy_config=deployment["factory_deploy_config"],
+    )
+    deployed_hyperdrive_pool = DeployedHyperdrivePool(
+        deployer_account=deployer_account,
+        hyperdrive_contract=IHyperdriveContract.factory(w3=web3)(deployment["hyperdrive_address"]),
+        base_token_contract=base_token_contract,
+        vault_shares_token_contract=vault_shares_token_contract,
+        deploy_block_number=deployment["deploy_block_number"],
+        pool_deploy_config=deployment["pool_deploy_config"],
+    )
+    return deployed_hyperdrive_factory, deployed_hyperdrive_pool
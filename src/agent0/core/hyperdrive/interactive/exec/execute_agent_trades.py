@@ -4,7 +4,6 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from copy import deepcopy
 from typing import Callable
 
 from eth_account.signers.local import LocalAccount
@@ -13,7 +12,13 @@ from pypechain.core import BaseEvent
 from web3.types import Nonce
 
 from agent0.core.base import MarketType, Trade
-from agent0.core.hyperdrive import HyperdriveActionType, HyperdriveMarketAction, HyperdriveWallet, TradeResult
+from agent0.core.hyperdrive import (
+    HyperdriveActionType,
+    HyperdriveMarketAction,
+    HyperdriveWallet,
+    TradeResult,
+    TradeResultView,
+)
 from agent0.core.hyperdrive.agent import (
     close_long_trade,
     close_short_trade,
@@ -21,7 +26,7 @@ from agent0.core.hyperdrive.agent import (
     remove_liquidity_trade,
 )
 from agent0.core.hyperdrive.crash_report import build_crash_trade_result, check_for_known_errors
-from agent0.core.hyperdrive.policies import HyperdriveBasePolicy
+from agent0.core.hyperdrive.policies import HyperdriveBasePolicy, PolicyContext
 from agent0.core.test_utils import assert_never
 from agent0.ethpy.hyperdrive import HyperdriveReadInterface, HyperdriveReadWriteInterface
 
@@ -83,6 +88,7 @@ def get_trades(
     policy: HyperdriveBasePolicy,
     wallet: HyperdriveWallet,
     default_gas_limit: int | None = None,
+    context: PolicyContext | None = None,
 ) -> list[Trade[HyperdriveMarketAction]]:
     """Get trades from the policy.
 
@@ -96,6 +102,10 @@ def get_trades(
         The wallet of the account.
     default_gas_limit: int | None
         The default gas limit to use if not provided by the policy.
+    context: PolicyContext | None, optional
+        The context of the tick to pass to the policy, e.g., shared with other agents on the same block.
+        Defaults to building the context from the interface's current pool state.
+        Policies that implement `action` are called with the interface and wallet instead.
 
     Returns
     -------
@@ -108,7 +118,13 @@ def get_trades(
     actions: list[Trade[HyperdriveMarketAction]] = []
     # Short circuit if the done_trading flag is set
     if not policy._done_trading:  # pylint: disable=protected-access
-        actions, policy._done_trading = policy.action(interface, wallet)
+        if not policy.acts_on_context():
+            # Subclasses that override `action` are called through it, even if a parent acts on the context
+            actions, policy._done_trading = policy.action(interface, wallet)
+        else:
+            if context is None:
+                context = PolicyContext.build(interface, wallet)
+            actions, policy._done_trading = policy.action_with_context(context)
 
     # Policy action checking
     for action in actions:
@@ -206,13 +222,12 @@ async def async_execute_agent_trades(
     # way down
     if isinstance(policy, HyperdriveBasePolicy):
         # Calls the agent with the trade results in case the policy needs to do bookkeeping.
-        # We copy a trade results to avoid changing the original trade result for crash reporting.
-
-        # TODO deepcopy may be inefficient here when copying, e.g., trade_result.agent.
-        # If this is the case, we can selectively create a new TradeResult object with a subset of data.
+        # We pass read-only views to avoid changing the original trade result for crash reporting.
         #
         # TODO can't put post_action in agent due to circular import, so we call the policy post_action here
-        policy.post_action(interface, deepcopy(trade_results))
+        policy.post_action(
+            interface, [TradeResultView.from_trade_result(trade_result) for trade_result in trade_results]
+        )
 
     return trade_results
 
@@ -288,13 +303,12 @@ async def async_execute_single_trade(
     # way down
     if execute_policy_post_action and policy is not None:
         # Calls the agent with the trade results in case the policy needs to do bookkeeping.
-        # We copy a trade results to avoid changing the original trade result for crash reporting.
-
-        # TODO deepcopy may be inefficient here when copying, e.g., trade_result.agent.
-        # If this is the case, we can selectively create a new TradeResult object with a subset of data.
+        # We pass read-only views to avoid changing the original trade result for crash reporting.
         #
         # TODO can't put post_action in agent due to circular import, so we call the policy post_action here
-        policy.post_action(interface, deepcopy(trade_results))
+        policy.post_action(
+            interface, [TradeResultView.from_trade_result(trade_result) for trade_result in trade_results]
+        )
 
     return trade_results[0]
 
@@ -57,6 +57,7 @@ from agent0.core.hyperdrive.policies import HyperdriveBasePolicy
 from agent0.ethpy.base import get_account_balance, set_account_balance
 
 from .exec import async_execute_agent_trades, async_execute_single_trade, get_liquidation_trades, get_trades
+from .wallet_ledger import WalletLedger
 
 if TYPE_CHECKING:
     from agent0.ethpy.hyperdrive import HyperdriveReadInterface
@@ -150,6 +151,12 @@ class HyperdriveAgent:
         self.nonce_lock = threading.Lock()
         self.current_nonce = 0
 
+        self._wallet_ledger: WalletLedger | None = None
+        if self.chain.config.use_wallet_ledger:
+            self._wallet_ledger = WalletLedger(
+                self.address, reconcile_interval=self.chain.config.wallet_ledger_reconcile_interval
+            )
+
     def _get_nonce_safe(self) -> Nonce:
         """Get agent nonces in a thread-safe manner.
 
@@ -306,6 +313,10 @@ class HyperdriveAgent:
                     signer_account, validate_transaction=True
                 )
 
+            if self._wallet_ledger is not None:
+                # The base balance in the ledger is no longer valid
+                self._wallet_ledger.invalidate(pool.hyperdrive_address, base_only=True)
+
     def set_max_approval(self, pool: Hyperdrive | None = None) -> None:
         """Sets the max approval to the hyperdrive contract.
 
@@ -769,17 +780,23 @@ class HyperdriveAgent:
         if len(actions) == 0:
             return []
 
-        trade_results: list[TradeResult] = asyncio.run(
-            async_execute_agent_trades(
-                actions,
-                pool.interface,
-                self.account,
-                partial(self.get_wallet, pool),
-                # We pass in policy here for `post_action`. Post action is ignored if policy not set.
-                policy=self._active_policy,
-                preview_before_trade=self.chain.config.preview_before_trade,
-            )
+        trade_results = asyncio.run(self._async_execute_action(actions, pool))
+        return self._handle_trade_results(trade_results, pool)
+
+    async def _async_execute_action(
+        self, actions: list[Trade[HyperdriveMarketAction]], pool: Hyperdrive
+    ) -> list[TradeResult]:
+        return await async_execute_agent_trades(
+            actions,
+            pool.interface,
+            self.account,
+            partial(self.get_wallet, pool),
+            # We pass in policy here for `post_action`. Post action is ignored if policy not set.
+            policy=self._active_policy,
+            preview_before_trade=self.chain.config.preview_before_trade,
         )
+
+    def _handle_trade_results(self, trade_results: list[TradeResult], pool: Hyperdrive) -> list[BaseEvent]:
         out_events = []
         # The underlying policy can execute multiple actions in one step
         for trade_result in trade_results:
@@ -841,20 +858,27 @@ class HyperdriveAgent:
         self, trade_result: TradeResult, pool: Hyperdrive, always_throw_exception: bool
     ) -> BaseEvent | None:
         if not trade_result.trade_successful:
+            if self._wallet_ledger is not None:
+                # We don't know the state of the wallet after a failed trade, so we reconcile on the next read
+                self._wallet_ledger.invalidate(pool.hyperdrive_address)
             # Defaults to CRITICAL
             assert trade_result.exception is not None
-            log_hyperdrive_crash_report(
-                trade_result,
-                log_level=self.chain.config.crash_log_level,
-                crash_report_to_file=True,
-                crash_report_stdout_summary=self.chain.config.crash_report_stdout_summary,
-                crash_report_file_prefix="interactive_hyperdrive",
-                log_to_rollbar=self.chain.config.log_to_rollbar,
-                rollbar_log_level_threshold=self.chain.config.rollbar_log_level_threshold,
-                rollbar_log_prefix=self.chain.config.rollbar_log_prefix,
-                rollbar_log_filter_func=self.chain.config.rollbar_log_filter_func,
-                additional_info=pool._crash_report_additional_info,
-            )
+            crash_report_kwargs = {
+                "log_level": self.chain.config.crash_log_level,
+                "crash_report_to_file": True,
+                "crash_report_stdout_summary": self.chain.config.crash_report_stdout_summary,
+                "crash_report_file_prefix": "interactive_hyperdrive",
+                "log_to_rollbar": self.chain.config.log_to_rollbar,
+                "rollbar_log_level_threshold": self.chain.config.rollbar_log_level_threshold,
+                "rollbar_log_prefix": self.chain.config.rollbar_log_prefix,
+                "rollbar_log_filter_func": self.chain.config.rollbar_log_filter_func,
+                "additional_info": pool._crash_report_additional_info,
+            }
+            crash_report_writer = self.chain._crash_report_writer
+            if crash_report_writer is not None:
+                crash_report_writer.submit(trade_result, **crash_report_kwargs)
+            else:
+                log_hyperdrive_crash_report(trade_result, **crash_report_kwargs)
 
             if self.chain.config.exception_on_policy_error:
                 # Check for slippage and if we want to throw an exception on slippage
@@ -869,6 +893,8 @@ class HyperdriveAgent:
             return None
         hyperdrive_event = trade_result.hyperdrive_event
         assert hyperdrive_event is not None
+        if self._wallet_ledger is not None:
+            self._wallet_ledger.apply_event(pool.interface, hyperdrive_event)
         return hyperdrive_event
 
     ################
@@ -903,6 +929,9 @@ class HyperdriveAgent:
         if pool is None:
             raise ValueError("Getting wallet object requires an active pool.")
 
+        if self._wallet_ledger is not None:
+            return self._wallet_ledger.get_wallet(pool.interface)
+
         self._sync_events(pool)
         hyperdrive_address = pool.interface.hyperdrive_address
 
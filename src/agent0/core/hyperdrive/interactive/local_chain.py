@@ -19,11 +19,15 @@ from eth_account.signers.local import LocalAccount
 from fixedpointmath import FixedPoint
 from hyperdrivetypes import CreateCheckpointEventFP
 from IPython.display import IFrame
-from web3.types import RPCEndpoint
+from web3.types import RPCEndpoint, TxParams
 
-from agent0.core.hyperdrive.crash_report import get_anvil_state_dump
+from agent0.chainsync.db.hyperdrive import load_db_snapshot, save_db_snapshot
+from agent0.core.hyperdrive.crash_report import write_anvil_state_dump
 from agent0.core.hyperdrive.policies import HyperdriveBasePolicy
 
+from .anvil_pool import AnvilInstance, AnvilProcessPool, get_anvil_launch_args
+from .background_data_pipeline import BackgroundDataPipeline
+from .block_builder import BlockBuilder
 from .chain import Chain
 from .local_hyperdrive import LocalHyperdrive
 from .local_hyperdrive_agent import LocalHyperdriveAgent
@@ -35,6 +39,25 @@ if TYPE_CHECKING:
 # pylint: disable=too-many-instance-attributes
 # pylint: disable=protected-access
 
+DEFAULT_CHAIN_PORT = 10_000
+"""The port to launch anvil on if `LocalChain.Config.chain_port` isn't set."""
+
+
+@dataclass
+class _SnapshotBookkeeping:
+    """The bookkeeping of pools, agents, and policies saved along with a snapshot."""
+
+    pool_addresses: list[str]
+    """The addresses of the deployed pools."""
+    agent_addresses: list[str]
+    """The addresses of the agents on the chain."""
+    active_pool_addresses: dict[str, str | None]
+    """The address of the active pool of each agent."""
+    max_approval_pools: dict[str, dict[str, bool]]
+    """The pools each agent has set max approval for."""
+    policies: dict[str, bytes]
+    """The serialized active policy of each agent."""
+
 
 class LocalChain(Chain):
     """Launches a local anvil chain in a subprocess, along with a postgres container."""
@@ -59,9 +82,11 @@ class LocalChain(Chain):
         """The host to bind for the anvil chain. Defaults to `127.0.0.1`."""
         chain_id: int | None = None
         """The chain ID for the local anvil chain."""
-        # TODO allow chain_port to be None to allow for automatically finding an open port within range.
-        chain_port: int = 10_000
-        """The port to bind for the anvil chain. Will fail if this port is being used."""
+        chain_port: int | None = None
+        """
+        The port to bind for the anvil chain. Will fail if this port is being used. Can't be set with
+        `anvil_pool`, since pooled chains run on ports chosen by the pool. Defaults to 10000.
+        """
         chain_genesis_timestamp: int | None = None
         """The genesis timestamp (in epoch seconds) for the anvil chain. If None, uses the current time."""
         transaction_block_keeper: int = 10_000
@@ -86,6 +111,35 @@ class LocalChain(Chain):
         to getting the user's wallet, including any policy actions that require a wallet. Otherwise,
         the wallet may be out of date. Use this at your own risk.
         """
+        background_data_pipeline: bool = False
+        """
+        If True, runs the data pipeline in a background thread instead of syncing the database after every trade.
+        Trades return without waiting for the database, and functions reading from the database wait
+        until the database is synced up to the latest block. Ignored if `manual_database_sync` is set
+        or if running without postgres. Defaults to False.
+        """
+
+        deployment_cache_dir: str | None = None
+        """
+        The directory to cache pool deployments in. If set, the first pool deployed on a fresh chain
+        gets loaded from a cached anvil state dump of a previous deployment with the same config,
+        and gets cached otherwise. Since the state includes the block history, the chain's block number
+        and time continue from the cached deployment. Defaults to not caching deployments.
+        """
+
+        anvil_pool: AnvilProcessPool | None = None
+        """
+        The pool of warm anvil processes to take the chain from, instead of launching a new anvil process.
+        The process gets reset and returned to the pool on cleanup. If set, the chain runs on a port chosen
+        by the pool, so `chain_port` can't be set. Ignored when forking. Defaults to launching a new process.
+        """
+
+        in_memory_snapshot: bool = False
+        """
+        If True, `save_snapshot` copies the database to snapshot tables within the database and keeps the
+        bookkeeping of pools, agents, and policies in memory, instead of exporting everything to `snapshot_dir`.
+        This makes saving and loading snapshots much faster. Defaults to False.
+        """
 
         crash_log_ticker: bool = False
         """Whether to log the trade ticker in crash reports. Defaults to False."""
@@ -113,66 +167,64 @@ class LocalChain(Chain):
         if config is None:
             config = self.Config()
 
-        if config.chain_host is None:
-            chain_host = "127.0.0.1"
-        else:
-            chain_host = config.chain_host
-
-        anvil_launch_args = [
-            "anvil",
-            "--host",
-            chain_host,
-            "--port",
-            str(config.chain_port),
-            "--code-size-limit",
-            "9999999999",
-            "--transaction-block-keeper",
-            str(config.transaction_block_keeper),
-        ]
-        if config.block_time is not None:
-            anvil_launch_args.extend(("--block-time", str(config.block_time)))
-
-        if config.chain_genesis_timestamp is not None:
-            anvil_launch_args.extend(("--timestamp", str(config.chain_genesis_timestamp)))
-
-        if fork_uri is not None:
-            anvil_launch_args.extend(["--fork-url", fork_uri])
-            if fork_block_number is not None:
-                anvil_launch_args.extend(["--fork-block-number", str(fork_block_number)])
-
-        if config.chain_id is not None:
-            anvil_launch_args.extend(("--chain-id", str(config.chain_id)))
-
-        # This process never stops, so we run this in the background and explicitly clean up later
-        if config.verbose:
-            self.anvil_process = subprocess.Popen(  # pylint: disable=consider-using-with
-                anvil_launch_args,
-                close_fds=True,
-            )
+        self._anvil_instance: AnvilInstance | None = None
+        if config.anvil_pool is not None and fork_uri is None:
+            if config.chain_port is not None:
+                raise ValueError("Can't set `chain_port` with `anvil_pool`, pooled chains run on ports from the pool.")
+            # Pooled anvil processes are already running and reset to genesis
+            self._anvil_instance = config.anvil_pool.acquire(config)
+            self.anvil_process = self._anvil_instance.process
+            try:
+                super().__init__(self._anvil_instance.rpc_uri, config)
+            except Exception:
+                # Return the instance if e.g. postgres fails to start, since cleanup can't be called
+                config.anvil_pool.release(self._anvil_instance)
+                raise
         else:
-            self.anvil_process = subprocess.Popen(  # pylint: disable=consider-using-with
-                anvil_launch_args,
-                # Suppressing output of anvil
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.STDOUT,
-                close_fds=True,
-            )
-
-        # Since the superclass doesn't actually make any requests,
-        # we can initialize the super class before attempting to connect to anvil
-        super().__init__(f"http://127.0.0.1:{str(config.chain_port)}", config)
+            if config.chain_host is None:
+                chain_host = "127.0.0.1"
+            else:
+                chain_host = config.chain_host
+            chain_port = DEFAULT_CHAIN_PORT if config.chain_port is None else config.chain_port
+
+            anvil_launch_args = [
+                "anvil",
+                "--host",
+                chain_host,
+                "--port",
+                str(chain_port),
+                *get_anvil_launch_args(config, fork_uri, fork_block_number),
+            ]
+            # This process never stops, so we run this in the background and explicitly clean up later
+            if config.verbose:
+                self.anvil_process = subprocess.Popen(  # pylint: disable=consider-using-with
+                    anvil_launch_args,
+                    close_fds=True,
+                )
+            else:
+                self.anvil_process = subprocess.Popen(  # pylint: disable=consider-using-with
+                    anvil_launch_args,
+                    # Suppressing output of anvil
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.STDOUT,
+                    close_fds=True,
+                )
 
-        # Wait for anvil to spin up
-        num_conn_retries = 5
-        for i in range(num_conn_retries):
-            try:
-                self.block_number()
-                break
-            except requests.exceptions.ConnectionError as e:
-                logging.warning("No anvil connection, retrying")
-                if i == num_conn_retries - 1:
-                    raise e
-                time.sleep(1)
+            # Since the superclass doesn't actually make any requests,
+            # we can initialize the super class before attempting to connect to anvil
+            super().__init__(f"http://127.0.0.1:{str(chain_port)}", config)
+
+            # Wait for anvil to spin up
+            num_conn_retries = 5
+            for i in range(num_conn_retries):
+                try:
+                    self.block_number()
+                    break
+                except requests.exceptions.ConnectionError as e:
+                    logging.warning("No anvil connection, retrying")
+                    if i == num_conn_retries - 1:
+                        raise e
+                    time.sleep(1)
 
         # Snapshot bookkeeping
         # Put chain_id as a separate directory to avoid conflicts
@@ -183,6 +235,8 @@ class LocalChain(Chain):
 
         self._saved_snapshot_id: str
         self._has_saved_snapshot = False
+        # The bookkeeping of the saved snapshot if saved in memory
+        self._saved_bookkeeping: _SnapshotBookkeeping | None = None
         self._deployed_hyperdrive_pools: list[LocalHyperdrive] = []
         self._chain_agents: list[LocalHyperdriveAgent] = []
 
@@ -195,14 +249,33 @@ class LocalChain(Chain):
         self.config = config
         self.dashboard_subprocess: subprocess.Popen | None = None
 
+        self._data_pipeline: BackgroundDataPipeline | None = None
+        if config.background_data_pipeline and not config.manual_database_sync and self.db_session is not None:
+            self._data_pipeline = BackgroundDataPipeline(self)
+
         # TODO hack, wait for chain to init
-        time.sleep(1)
+        if self._anvil_instance is None:
+            time.sleep(1)
 
     def cleanup(self):
         """Kills the subprocess in this class' destructor."""
         # Runs cleanup on all deployed pools
+        # The background data pipeline needs the chain and db, so we stop it first
         try:
-            if self.anvil_process is not None:
+            if self._data_pipeline is not None:
+                self._data_pipeline.stop()
+                self._data_pipeline = None
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+        try:
+            if self._anvil_instance is not None:
+                # Pooled anvil processes get reset and reused instead of terminated
+                assert self.config.anvil_pool is not None
+                self.config.anvil_pool.release(self._anvil_instance)
+                self._anvil_instance = None
+                self.anvil_process = None
+            elif self.anvil_process is not None:
                 if self.anvil_process.stdout is not None:
                     self.anvil_process.stdout.close()
                 if self.anvil_process.stderr is not None:
@@ -273,12 +346,34 @@ class LocalChain(Chain):
         if latest_blocktime is None:
             raise AssertionError("The provided block has no timestamp")
         next_blocktime = latest_blocktime + time_delta
-        response = self._web3.provider.make_request(method=RPCEndpoint("evm_mine"), params=[next_blocktime])
+        self._mine_block_at(next_blocktime)
+
+    def _mine_block_at(self, block_timestamp: int) -> None:
+        response = self._web3.provider.make_request(method=RPCEndpoint("evm_mine"), params=[block_timestamp])
+        # ensure response is valid
+        if "result" not in response:
+            raise KeyError("Response did not have a result.")
+
+    def _set_automine(self, automine: bool) -> None:
+        response = self._web3.provider.make_request(method=RPCEndpoint("evm_setAutomine"), params=[automine])
+        # ensure response is valid
+        if "result" not in response:
+            raise KeyError("Response did not have a result.")
 
+    def _drop_pending_transactions(self) -> None:
+        response = self._web3.provider.make_request(method=RPCEndpoint("anvil_dropAllTransactions"), params=[])
         # ensure response is valid
         if "result" not in response:
             raise KeyError("Response did not have a result.")
 
+    def _get_txpool_status(self) -> tuple[int, int]:
+        response = self._web3.provider.make_request(method=RPCEndpoint("txpool_status"), params=[])
+        # ensure response is valid
+        if "result" not in response:
+            raise KeyError("Response did not have a result.")
+        # Returns the number of pending and queued transactions
+        return int(response["result"]["pending"], 16), int(response["result"]["queued"], 16)
+
     def _set_block_timestamp_interval(self, timestamp_interval: int) -> None:
         response = self._web3.provider.make_request(
             method=RPCEndpoint("anvil_setBlockTimestampInterval"), params=[timestamp_interval]
@@ -314,9 +409,28 @@ class LocalChain(Chain):
         for pool in self._deployed_hyperdrive_pools:
             pool._maybe_run_blocking_data_pipeline()  # pylint: disable=protected-access
 
+    def build_block(self) -> BlockBuilder:
+        """Get a block builder that mines the actions of many agents in a single block.
+
+        The block gets mined when exiting the context, and the events of each agent's actions
+        are available from the pending actions returned when adding them.
+
+        Example
+        -------
+        >>> with chain.build_block() as block_builder:
+        >>>     pending = [block_builder.add_policy_action(agent) for agent in agents]
+        >>> events = [p.result() for p in pending]
+
+        Returns
+        -------
+        BlockBuilder
+            The block builder, to be used as a context manager.
+        """
+        return BlockBuilder(self)
+
     # pylint: disable=too-many-branches
     def advance_time(
-        self, time_delta: int | timedelta, create_checkpoints: bool = True
+        self, time_delta: int | timedelta, create_checkpoints: bool = True, batch_checkpoints: bool = False
     ) -> dict[LocalHyperdrive, list[CreateCheckpointEventFP]]:
         """Advance time for this chain using the `evm_mine` RPC call.
 
@@ -338,6 +452,12 @@ class LocalChain(Chain):
             The amount of time to advance. Can either be a `datetime.timedelta` object or an integer in seconds.
         create_checkpoints: bool, optional
             If set to true, will create intermediate checkpoints between advance times. Defaults to True.
+        batch_checkpoints: bool, optional
+            If set to true, submits the checkpoint transactions of all pools for each checkpoint together
+            and mines them in a single block at the exact checkpoint time, instead of waiting on each transaction.
+            This is much faster when advancing over many checkpoints, and advances time exactly, but
+            doesn't preview the checkpoint transactions. Ignored if the chain has a `block_time` set.
+            Defaults to False.
 
         Returns
         -------
@@ -387,6 +507,10 @@ class LocalChain(Chain):
             advance_iterations = int(time_delta / checkpoint_duration)
             last_advance_time = time_delta % checkpoint_duration
             offset = 0
+            if batch_checkpoints and self.config.block_time is None:
+                # Batched checkpoints are mined at exact timestamps, so there's no offset
+                self._create_batched_checkpoints(checkpoint_duration, advance_iterations, out_dict)
+                advance_iterations = 0
             for _ in range(advance_iterations):
                 # Advance the chain time by the checkpoint duration
                 self._advance_chain_time(checkpoint_duration - offset)
@@ -422,6 +546,78 @@ class LocalChain(Chain):
 
         return out_dict
 
+    def _create_batched_checkpoints(
+        self,
+        checkpoint_duration: int,
+        num_checkpoints: int,
+        out_dict: dict[LocalHyperdrive, list[CreateCheckpointEventFP]],
+    ) -> None:
+        # With automine disabled, we submit the checkpoint transactions of all pools for a checkpoint
+        # and mine them in one block at the checkpoint's timestamp. Events are read from the logs
+        # at the end instead of waiting on receipts.
+        if num_checkpoints == 0:
+            return
+        pools = self._deployed_hyperdrive_pools
+        deployer_account = self.get_deployer_account()
+        latest_block = self._web3.eth.get_block("latest")
+        start_block_number = latest_block.get("number")
+        start_block_time = latest_block.get("timestamp")
+        block_gas_limit = latest_block.get("gasLimit")
+        assert start_block_number is not None and start_block_time is not None and block_gas_limit is not None
+
+        # Checkpoints get created at a future timestamp, so we can't estimate gas.
+        # Instead, we split the block gas limit between pools.
+        gas_limit = self.config.gas_limit if self.config.gas_limit is not None else block_gas_limit // len(pools)
+        nonce = self._web3.eth.get_transaction_count(deployer_account.address, "pending")
+        # The transaction fields other than the call data are the same for all transactions,
+        # so we only fill them in once
+        tx_params = (
+            pools[0]
+            .interface.hyperdrive_contract.functions.checkpoint(0, 0)
+            .build_transaction(TxParams({"from": deployer_account.address, "gas": gas_limit, "nonce": nonce}))
+        )
+        tx_params.pop("data", None)
+        tx_params.pop("to", None)
+
+        self._set_automine(False)
+        try:
+            for i in range(num_checkpoints):
+                block_time = start_block_time + (i + 1) * checkpoint_duration
+                for pool in pools:
+                    checkpoint_time = pool.interface.calc_checkpoint_id(checkpoint_duration, block_time)
+                    tx_params["nonce"] = nonce
+                    # 0 is the max iterations for distribute excess idle, where it will default to
+                    # the default max iterations
+                    raw_transaction = pool.interface.hyperdrive_contract.functions.checkpoint(
+                        checkpoint_time, 0
+                    ).build_transaction(tx_params)
+                    signed_transaction = deployer_account.sign_transaction(raw_transaction)  # type: ignore
+                    self._web3.eth.send_raw_transaction(signed_transaction.raw_transaction)
+                    nonce += 1
+                self._mine_block_at(block_time)
+        except Exception:
+            # Don't leave checkpoint transactions in the mempool
+            self._drop_pending_transactions()
+            raise
+        finally:
+            self._set_automine(True)
+
+        end_block_number = self._web3.eth.get_block_number()
+        for pool in pools:
+            checkpoint_events = [
+                CreateCheckpointEventFP.from_pypechain(event)
+                for event in pool.interface.hyperdrive_contract.events.CreateCheckpoint.get_logs_typed(
+                    from_block=start_block_number + 1, to_block=end_block_number
+                )
+            ]
+            # These checkpoints should never fail
+            if len(checkpoint_events) != num_checkpoints:
+                raise ValueError(
+                    f"Expected {num_checkpoints} checkpoints for pool {pool.name}, "
+                    f"found {len(checkpoint_events)} checkpoint events."
+                )
+            out_dict[pool].extend(checkpoint_events)
+
     ##########
     # Saving and Loading
     ##########
@@ -452,12 +648,10 @@ class LocalChain(Chain):
                 save_dir = Path(".interactive_state/") / (save_prefix + "_" + fn_time_str)
 
         self.dump_db(save_dir)
-        anvil_state_dump = get_anvil_state_dump(self._web3)
-        assert anvil_state_dump is not None
-        anvil_state_dump_file = save_dir / "anvil_state.dump"
-
-        with open(anvil_state_dump_file, "w", encoding="utf-8") as f:
-            f.write(anvil_state_dump)
+        # The state gets written to a compressed file named after its content hash,
+        # which can be loaded back with `load_anvil_state_dump`
+        anvil_state_file = write_anvil_state_dump(self._web3, save_dir)
+        assert anvil_state_file is not None
 
         # TODO pickle all interactive objects and their underlying agents, see `load_state`
 
@@ -490,16 +684,29 @@ class LocalChain(Chain):
         """Saves a snapshot using the `evm_snapshot` RPC call.
         The chain can store one snapshot at a time, saving another snapshot overwrites the previous snapshot.
         Saving/loading snapshot only persist on the same chain, not across chains.
+
+        .. note::
+            If `in_memory_snapshot` is set in the config, the database gets copied to snapshot tables
+            within the database and the bookkeeping is kept in memory, instead of round tripping through files.
         """
-        self._anvil_save_snapshot()
+        # Ensure the db is synced with the chain before saving
+        for pool in self._deployed_hyperdrive_pools:
+            pool._wait_for_data_pipeline()
 
-        # Save the db state
-        self.dump_db(self._snapshot_dir)
+        self._anvil_save_snapshot()
 
-        # Save all states
-        self._save_pool_bookkeeping(self._snapshot_dir)
-        self._save_agent_bookkeeping(self._snapshot_dir)  # pylint: disable=protected-access
-        self._save_policy_state(self._snapshot_dir)  # pylint: disable=protected-access
+        # Save the db state and all bookkeeping
+        bookkeeping = self._get_snapshot_bookkeeping()
+        if self.config.in_memory_snapshot:
+            if self.db_session is not None:
+                save_db_snapshot(self.db_session)
+            self._saved_bookkeeping = bookkeeping
+        else:
+            self.dump_db(self._snapshot_dir)
+            with open(self._snapshot_dir / "bookkeeping.pkl", "wb") as file:
+                # We use dill, as pickle can't store local objects
+                dill.dump(bookkeeping, file, protocol=dill.HIGHEST_PROTOCOL)
+            self._saved_bookkeeping = None
 
         self._has_saved_snapshot = True
 
@@ -521,27 +728,39 @@ class LocalChain(Chain):
         if not self._has_saved_snapshot:
             raise ValueError("No saved snapshot to load")
 
+        if self._data_pipeline is not None:
+            # Pause the background data pipeline while replacing the db, and resume from the snapshot block
+            with self._data_pipeline.paused():
+                self._load_snapshot()
+                self._data_pipeline.reset(self.block_number())
+        else:
+            self._load_snapshot()
+
+    def _load_snapshot(self) -> None:
         response = self._web3.provider.make_request(method=RPCEndpoint("evm_revert"), params=[self._saved_snapshot_id])
         if "result" not in response:
             raise KeyError("Response did not have a result.")
 
-        # Load the bookkeeping of deployed pools
-        # NOTE: existing pool objects initialized after snapshot will no longer be valid.
-        self._load_pool_bookkeeping(self._snapshot_dir)
-        # load snapshot database state
-        self.load_db(self._snapshot_dir)
-        # Update pool's agent bookkeeping
-        # Note this will wipe the agent's active pool.
-        self._load_agent_bookkeeping(self._snapshot_dir)
+        # load snapshot database state and bookkeeping
+        if self._saved_bookkeeping is not None:
+            # The snapshot was saved in memory
+            bookkeeping = self._saved_bookkeeping
+            if self.db_session is not None:
+                load_db_snapshot(self.db_session)
+        else:
+            with open(self._snapshot_dir / "bookkeeping.pkl", "rb") as file:
+                # We use dill, as pickle can't store local objects
+                bookkeeping = dill.load(file)
+            self.load_db(self._snapshot_dir)
+
+        # Note this will set the agent's active pools and policies to the ones before the snapshot.
+        # NOTE: existing pool and agent objects initialized after snapshot will no longer be valid.
+        self._restore_snapshot_bookkeeping(bookkeeping)
 
         # The hyperdrive interface in deployed pools need to wipe their cache
         for pool in self._deployed_hyperdrive_pools:
             pool._reinit_state_after_load_snapshot()  # pylint: disable=protected-access
 
-        # This loads the agent's active policy
-        # Note that this will set the active policy to the one before the snapshot.
-        self._load_policy_state(self._snapshot_dir)
-
         # Save another anvil snapshot since reverting consumes the snapshot
         self._anvil_save_snapshot()
 
@@ -555,99 +774,66 @@ class LocalChain(Chain):
     def _add_deployed_pool_to_bookkeeping(self, pool: LocalHyperdrive):
         self._deployed_hyperdrive_pools.append(pool)
 
-    def _save_pool_bookkeeping(self, save_dir: Path) -> None:
-        # Save bookkeeping of deployed pools
-        # We save the addresses of deployed pools for loading
-        pool_filename = save_dir / "pools.pkl"
-        pool_addr_list = [pool.hyperdrive_address for pool in self._deployed_hyperdrive_pools]
-        with open(pool_filename, "wb") as file:
-            dill.dump(pool_addr_list, file, dill.HIGHEST_PROTOCOL)
-
-    def _load_pool_bookkeeping(self, load_dir: Path) -> None:
-        pool_filename = load_dir / "pools.pkl"
-        with open(pool_filename, "rb") as file:
-            hyperdrive_pools: list[str] = dill.load(file)
+    def _get_snapshot_bookkeeping(self) -> _SnapshotBookkeeping:
+        return _SnapshotBookkeeping(
+            pool_addresses=[pool.hyperdrive_address for pool in self._deployed_hyperdrive_pools],
+            agent_addresses=[agent.address for agent in self._chain_agents],
+            active_pool_addresses={
+                agent.address: None if agent._active_pool is None else agent._active_pool.hyperdrive_address
+                for agent in self._chain_agents
+            },
+            max_approval_pools={agent.address: dict(agent._max_approval_pools) for agent in self._chain_agents},
+            # We use dill, as pickle can't store local objects
+            # This should also store None if there is no active policy
+            policies={
+                agent.address: dill.dumps(agent._active_policy, protocol=dill.HIGHEST_PROTOCOL)
+                for agent in self._chain_agents
+            },
+        )
 
+    def _restore_snapshot_bookkeeping(self, bookkeeping: _SnapshotBookkeeping) -> None:
         # Given the current list of deployed hyperdrive pools, we throw away any pools deployed
         # after the snapshot
         self._deployed_hyperdrive_pools = [
-            p for p in self._deployed_hyperdrive_pools if p.hyperdrive_address in hyperdrive_pools
+            p for p in self._deployed_hyperdrive_pools if p.hyperdrive_address in bookkeeping.pool_addresses
         ]
-
-    def _save_agent_bookkeeping(self, save_dir: Path) -> None:
-        policy_file = save_dir / "agents.pkl"
-
-        agents = [agent.address for agent in self._chain_agents]
-        with open(policy_file, "wb") as file:
-            # We use dill, as pickle can't store local objects
-            dill.dump(agents, file, protocol=dill.HIGHEST_PROTOCOL)
-        for agent in self._chain_agents:
-            active_pool_file = save_dir / (agent.address + "-active-pool.pkl")
-            if agent._active_pool is not None:
-                with open(active_pool_file, "wb") as file:
-                    dill.dump(agent._active_pool.hyperdrive_address, file, protocol=dill.HIGHEST_PROTOCOL)
-            max_approval_file = save_dir / (agent.address + "-max-approval.pkl")
-            with open(max_approval_file, "wb") as file:
-                dill.dump(agent._max_approval_pools, file, protocol=dill.HIGHEST_PROTOCOL)
-
-    def _load_agent_bookkeeping(self, load_dir: Path) -> None:
-        policy_file = load_dir / "agents.pkl"
-        with open(policy_file, "rb") as file:
-            # We use dill, as pickle can't store local objects
-            load_agents = dill.load(file)
         # Remove references of all agents added after snapshot
-        # NOTE: existing agent objects initialized after snapshot will no longer be valid.
-        self._chain_agents = [agent for agent in self._chain_agents if agent.address in load_agents]
-        # Clear the _max_approval_pools to ensure we call approval
-        # NOTE this might be a duplicate approval, which should be okay
+        self._chain_agents = [agent for agent in self._chain_agents if agent.address in bookkeeping.agent_addresses]
+
         for agent in self._chain_agents:
-            active_pool_file = load_dir / (agent.address + "-active-pool.pkl")
-            # If the file doesn't exist, there was no active pool at time of snapshot
-            if not os.path.isfile(active_pool_file):
+            hyperdrive_address = bookkeeping.active_pool_addresses[agent.address]
+            # There was no active pool at time of snapshot
+            if hyperdrive_address is None:
                 agent._active_pool = None
             else:
-                with open(active_pool_file, "rb") as file:
-                    # We use dill, as pickle can't store local objects
-                    hyperdrive_address = dill.load(file)
-                    # Find the pool in the list of deployed pools
-                    target_pool = None
-                    for pool in self._deployed_hyperdrive_pools:
-                        if pool.hyperdrive_address == hyperdrive_address:
-                            target_pool = pool
-                            break
-                    if target_pool is None:
-                        raise ValueError("Saved active pool not found in list of deployed pools.")
-                    agent._active_pool = target_pool
+                # Find the pool in the list of deployed pools
+                target_pool = None
+                for pool in self._deployed_hyperdrive_pools:
+                    if pool.hyperdrive_address == hyperdrive_address:
+                        target_pool = pool
+                        break
+                if target_pool is None:
+                    raise ValueError("Saved active pool not found in list of deployed pools.")
+                agent._active_pool = target_pool
             # Reset the agent's nonce handler
             agent._reset_nonce()
+            # The wallet ledger needs to be rebuilt from the reverted chain
+            if agent._wallet_ledger is not None:
+                agent._wallet_ledger.invalidate()
 
             # Keep track of which pools we set max approval for already
-            max_approval_file = load_dir / (agent.address + "-max-approval.pkl")
-            with open(max_approval_file, "rb") as file:
-                agent._max_approval_pools = dill.load(file)
-
-    def _save_policy_state(self, save_dir: Path) -> None:
-        for agent in self._chain_agents:
-            policy_file = save_dir / (agent.address + ".pkl")
-            with open(policy_file, "wb") as file:
-                # We use dill, as pickle can't store local objects
-                # This should also store None if there is no active policy
-                dill.dump(agent._active_policy, file, protocol=dill.HIGHEST_PROTOCOL)
-
-    def _load_policy_state(self, load_dir: Path) -> None:
-        for agent in self._chain_agents:
-            policy_file = load_dir / (agent.address + ".pkl")
-            with open(policy_file, "rb") as file:
-                # If we don't load rng, we get the current RNG state and set it after loading
-                rng = None
-                if not self.config.load_rng_on_snapshot and agent._active_policy is not None:
-                    rng = agent._active_policy.rng
-                # We use dill, as pickle can't store local objects
-                agent._active_policy = dill.load(file)
-                if not self.config.load_rng_on_snapshot and agent._active_policy is not None:
-                    # For type checking
-                    assert rng is not None
-                    agent._active_policy.rng = rng
+            agent._max_approval_pools = dict(bookkeeping.max_approval_pools[agent.address])
+
+            # If we don't load rng, we get the current RNG state and set it after loading
+            rng = None
+            if not self.config.load_rng_on_snapshot and agent._active_policy is not None:
+                rng = agent._active_policy.rng
+            # Policies are deserialized on every load, so loading multiple times starts from the same state
+            agent._active_policy = dill.loads(bookkeeping.policies[agent.address])
+            if not self.config.load_rng_on_snapshot and agent._active_policy is not None:
+                # For type checking
+                assert rng is not None
+                agent._active_policy.rng = rng
 
     ################
     # Agent functions
@@ -1,9 +1,14 @@
 """Tests for convenience functions in the Local Chain."""
 
+import socket
+
 import numpy as np
 import pytest
+from fixedpointmath import FixedPoint
 
 from agent0 import LocalChain
+from agent0.core.hyperdrive.interactive import AnvilProcessPool, anvil_pool as anvil_pool_module
+from agent0.core.hyperdrive.interactive.anvil_pool import get_free_port, is_port_in_use
 
 
 @pytest.mark.docker
@@ -42,3 +47,85 @@ def test_mine_blocks(fast_chain_fixture: LocalChain):
 
         previous_block_number = current_block_number
         previous_block_time = current_block_time
+
+
+@pytest.mark.anvil
+def test_anvil_pool():
+    """Test that chains from an anvil pool reuse processes that get reset to genesis."""
+    anvil_pool = AnvilProcessPool(size=1)
+    chain_config = LocalChain.Config(db_port=6000, manual_database_sync=True, anvil_pool=anvil_pool)
+    anvil_pool.prewarm(chain_config)
+    try:
+        with LocalChain(chain_config) as chain:
+            anvil_process = chain.anvil_process
+            chain.mine_blocks(10)
+            agent = chain.init_agent(eth=FixedPoint(10))
+            assert chain.block_number() > 10
+
+        # The released process gets reused, and is back at genesis
+        with LocalChain(chain_config) as chain:
+            assert chain.anvil_process is anvil_process
+            assert chain.block_number() == 0
+            assert chain._web3.eth.get_balance(agent.address) == 0  # pylint: disable=protected-access
+    finally:
+        anvil_pool.shutdown()
+
+
+@pytest.mark.anvil
+def test_anvil_pool_resets_mining():
+    """Instances released with automine off get handed out mining again."""
+    anvil_pool = AnvilProcessPool(size=1)
+    try:
+        instance = anvil_pool.acquire(LocalChain.Config())
+        instance.make_request("evm_setAutomine", [False])
+        instance.make_request("evm_setIntervalMining", [1000])
+        # A pending transaction that would get mined once automine is back on
+        accounts = instance.web3.eth.accounts
+        instance.web3.eth.send_transaction({"from": accounts[0], "to": accounts[1], "value": 1})
+        anvil_pool.release(instance)
+
+        assert anvil_pool.acquire(LocalChain.Config()) is instance
+        assert instance.web3.eth.get_block_number() == 0
+        tx_hash = instance.web3.eth.send_transaction({"from": accounts[0], "to": accounts[1], "value": 1})
+        # With automine on, the transaction gets mined on its own, and the dropped transaction doesn't
+        receipt = instance.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=5)
+        assert receipt["blockNumber"] == 1
+        assert len(instance.web3.eth.get_block(1)["transactions"]) == 1
+    finally:
+        anvil_pool.shutdown()
+
+
+def test_anvil_pool_chain_port():
+    """Pooled chains run on ports chosen by the pool, so a chain port can't be set."""
+    anvil_pool = AnvilProcessPool(size=1)
+    with pytest.raises(ValueError):
+        LocalChain(LocalChain.Config(chain_port=6000, anvil_pool=anvil_pool))
+
+
+def test_is_port_in_use():
+    """Ports bound by another socket are in use."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        assert is_port_in_use(port)
+    assert not is_port_in_use(port)
+
+
+@pytest.mark.anvil
+def test_anvil_pool_port_in_use(monkeypatch: pytest.MonkeyPatch):
+    """Anvil gets relaunched on a new port if its port was taken before it started."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        taken_port = sock.getsockname()[1]
+        ports = [taken_port]
+        monkeypatch.setattr(
+            anvil_pool_module, "get_free_port", lambda host: ports.pop() if len(ports) > 0 else get_free_port(host)
+        )
+
+        anvil_pool = AnvilProcessPool(size=1)
+        try:
+            instance = anvil_pool.acquire(LocalChain.Config())
+            assert instance.port != taken_port
+            assert instance.web3.eth.get_block_number() == 0
+        finally:
+            anvil_pool.shutdown()
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass
+from pathlib import Path
 from typing import TYPE_CHECKING, Sequence
 
 import pandas as pd
@@ -33,6 +34,7 @@ from agent0.ethpy.hyperdrive import (
     deploy_hyperdrive_from_factory,
 )
 
+from .deployment_cache import get_deployment_cache_key, load_cached_deployment, save_cached_deployment
 from .hyperdrive import Hyperdrive
 
 if TYPE_CHECKING:
@@ -58,7 +60,10 @@ class LocalHyperdrive(Hyperdrive):
 
         # Environment variables
         data_pipeline_timeout: int = 60
-        """The timeout for the data pipeline. Defaults to 60 seconds."""
+        """
+        The timeout for waiting on the background data pipeline when reading from the database.
+        Only used if the chain's `background_data_pipeline` flag is set. Defaults to 60 seconds.
+        """
 
         # Initial pool variables
         initial_liquidity: FixedPoint = FixedPoint(100_000_000)
@@ -340,7 +345,6 @@ class LocalHyperdrive(Hyperdrive):
         chain._add_deployed_pool_to_bookkeeping(self)
         self.chain = chain
 
-        # Run the data pipeline in background threads if experimental mode
         self.data_pipeline_timeout = self.config.data_pipeline_timeout
 
         if backfill_data_start_block is not None:
@@ -390,6 +394,16 @@ class LocalHyperdrive(Hyperdrive):
         else:
             backfill = self.chain.config.backfill_pool_info
 
+        if self.chain._data_pipeline is not None:
+            # The background data pipeline writes to the same tables, so we pause it while syncing
+            with self.chain._data_pipeline.paused():
+                self._run_data_pipeline(start_block, progress_bar, backfill, backfill_sample_period)
+        else:
+            self._run_data_pipeline(start_block, progress_bar, backfill, backfill_sample_period)
+
+    def _run_data_pipeline(
+        self, start_block: int, progress_bar: bool, backfill: bool, backfill_sample_period: int | None
+    ) -> None:
         acquire_data(
             start_block=start_block,
             interfaces=[self.interface],
@@ -410,9 +424,20 @@ class LocalHyperdrive(Hyperdrive):
 
     def _maybe_run_blocking_data_pipeline(self, start_block: int | None = None, progress_bar: bool = False) -> None:
         # Checks the chain config to see if manual sync is on. Noop if it is.
-        if not self.chain.config.manual_database_sync:
+        if self.chain.config.manual_database_sync:
+            return
+        # Hand off to the background data pipeline if it's running, otherwise sync here
+        if self.chain._data_pipeline is not None:
+            self.chain._data_pipeline.request_sync(self, self.chain.block_number(), start_block)
+        else:
             self.sync_database(start_block, progress_bar)
 
+    def _wait_for_data_pipeline(self) -> None:
+        # Read functions call this to wait for the background data pipeline, if it's running,
+        # to sync the database up to the latest block.
+        if self.chain._data_pipeline is not None and not self.chain.config.manual_database_sync:
+            self.chain._data_pipeline.wait_for_block(self.chain.block_number(), timeout=self.data_pipeline_timeout)
+
     # We overwrite these dunder methods to allow this object to be used as a dictionary key
     # This is used to allow chain's `advance_time` function to return this object as a key.
     def __hash__(self):
@@ -427,6 +452,30 @@ class LocalHyperdrive(Hyperdrive):
 
     def _deploy_hyperdrive(
         self, config: Config, chain: LocalChain
+    ) -> tuple[DeployedHyperdriveFactory, DeployedHyperdrivePool]:
+        # The deployment cache only applies to pristine chains, since the cached state replaces the chain state
+        if chain.config.deployment_cache_dir is None or chain.block_number() != 0:
+            return self._deploy_hyperdrive_contracts(config, chain)
+
+        cache_dir = Path(chain.config.deployment_cache_dir)
+        cache_key = get_deployment_cache_key(chain, config)
+        deployed = load_cached_deployment(chain, cache_dir, cache_key)
+        if deployed is not None:
+            return deployed
+
+        deployed_hyperdrive_factory, deployed_hyperdrive_pool = self._deploy_hyperdrive_contracts(config, chain)
+        save_cached_deployment(
+            chain,
+            cache_dir,
+            cache_key,
+            deployed_hyperdrive_factory,
+            deployed_hyperdrive_pool,
+            config.deploy_type,
+        )
+        return (deployed_hyperdrive_factory, deployed_hyperdrive_pool)
+
+    def _deploy_hyperdrive_contracts(
+        self, config: Config, chain: LocalChain
     ) -> tuple[DeployedHyperdriveFactory, DeployedHyperdrivePool]:
         # sanity check (also for type checking), should get set in __post_init__
         assert config.minimum_share_reserves is not None
@@ -579,13 +628,16 @@ class LocalHyperdrive(Hyperdrive):
             raise ValueError("Pool config doesn't exist in the db.")
         return pool_config.iloc[0]
 
-    def get_pool_info(self, coerce_float: bool = False) -> pd.DataFrame:
+    def get_pool_info(self, coerce_float: bool = False, max_points: int | None = None) -> pd.DataFrame:
         """Get the pool info (and additional info) per block and returns as a pandas dataframe.
 
         Arguments
         ---------
         coerce_float: bool
             If True, will coerce underlying Decimals to floats.
+        max_points: int | None, optional
+            If set, will downsample the pool info on the db side to at most this many rows.
+            Defaults to returning every block.
 
         Returns
         -------
@@ -594,8 +646,12 @@ class LocalHyperdrive(Hyperdrive):
         """
         if self.chain.db_session is None:
             raise ValueError("Function requires postgres.")
+        self._wait_for_data_pipeline()
         pool_info = get_pool_info(
-            self.chain.db_session, hyperdrive_address=self.hyperdrive_address, coerce_float=coerce_float
+            self.chain.db_session,
+            hyperdrive_address=self.hyperdrive_address,
+            coerce_float=coerce_float,
+            max_points=max_points,
         ).drop("id", axis=1)
         return pool_info
 
@@ -614,6 +670,7 @@ class LocalHyperdrive(Hyperdrive):
         """
         if self.chain.db_session is None:
             raise ValueError("Function requires postgres.")
+        self._wait_for_data_pipeline()
         return get_checkpoint_info(
             self.chain.db_session, hyperdrive_address=self.hyperdrive_address, coerce_float=coerce_float
         )
@@ -652,6 +709,7 @@ class LocalHyperdrive(Hyperdrive):
         """
         if self.chain.db_session is None:
             raise ValueError("Function requires postgres.")
+        self._wait_for_data_pipeline()
         position_snapshot = get_position_snapshot(
             self.chain.db_session,
             hyperdrive_address=self.interface.hyperdrive_address,
@@ -693,6 +751,7 @@ class LocalHyperdrive(Hyperdrive):
         """
         if self.chain.db_session is None:
             raise ValueError("Function requires postgres.")
+        self._wait_for_data_pipeline()
         # TODO add logical name for pool
         position_snapshot = get_position_snapshot(
             self.chain.db_session, hyperdrive_address=self.interface.hyperdrive_address, coerce_float=coerce_float
@@ -723,6 +782,7 @@ class LocalHyperdrive(Hyperdrive):
         """
         if self.chain.db_session is None:
             raise ValueError("Function requires postgres.")
+        self._wait_for_data_pipeline()
         # TODO add timestamp back in
         out = get_trade_events(
             self.chain.db_session,
@@ -734,13 +794,16 @@ class LocalHyperdrive(Hyperdrive):
         out = self.chain._add_hyperdrive_name_to_dataframe(out, "hyperdrive_address")
         return out
 
-    def get_historical_pnl(self, coerce_float: bool = False) -> pd.DataFrame:
+    def get_historical_pnl(self, coerce_float: bool = False, max_points: int | None = None) -> pd.DataFrame:
         """Gets total pnl for each wallet for each block, aggregated across all open positions.
 
         Arguments
         ---------
         coerce_float: bool
             If True, will coerce underlying Decimals to floats.
+        max_points: int | None, optional
+            If set, will downsample the pnl on the db side to at most this many rows per wallet.
+            Defaults to returning every block.
 
         Returns
         -------
@@ -749,7 +812,8 @@ class LocalHyperdrive(Hyperdrive):
         """
         if self.chain.db_session is None:
             raise ValueError("Function requires postgres.")
-        out = get_total_pnl_over_time(self.chain.db_session, coerce_float=coerce_float)
+        self._wait_for_data_pipeline()
+        out = get_total_pnl_over_time(self.chain.db_session, coerce_float=coerce_float, max_points=max_points)
         out = self.chain._add_username_to_dataframe(out, "wallet_address")
         return out
 
@@ -23,7 +23,7 @@ from agent0.core.base import Trade
 from agent0.core.base.make_key import make_private_key
 from agent0.core.hyperdrive import HyperdriveMarketAction
 from agent0.core.hyperdrive.agent import TradeResult
-from agent0.core.hyperdrive.crash_report import get_anvil_state_dump
+from agent0.core.hyperdrive.crash_report import write_anvil_state_dump
 from agent0.core.hyperdrive.interactive.hyperdrive import Hyperdrive
 from agent0.core.hyperdrive.policies import HyperdriveBasePolicy
 
@@ -497,9 +497,15 @@ class LocalHyperdriveAgent(HyperdriveAgent):
             # TODO we likely want to explicitly check for slippage here and not
             # get anvil state dump if it's a slippage error and the user wants to
             # ignore slippage errors
-            if self.chain.config.log_anvil_state_dump:
-                trade_result.anvil_state = get_anvil_state_dump(self.chain._web3)  # pylint: disable=protected-access
-            if self.chain.config.crash_log_ticker:
+            # Crashes that will only be counted don't need the expensive details
+            crash_report_writer = self.chain._crash_report_writer  # pylint: disable=protected-access
+            write_details = crash_report_writer is None or crash_report_writer.should_write_details(trade_result)
+            if write_details and self.chain.config.log_anvil_state_dump:
+                # The state is written to a compressed file, and the crash report links to the file
+                anvil_state_file = write_anvil_state_dump(self.chain._web3)  # pylint: disable=protected-access
+                if anvil_state_file is not None:
+                    trade_result.anvil_state_file = str(anvil_state_file)
+            if write_details and self.chain.config.crash_log_ticker:
                 if trade_result.additional_info is None:
                     trade_result.additional_info = {"trade_events": self.get_trade_events()}
                 else:
@@ -567,6 +573,7 @@ class LocalHyperdriveAgent(HyperdriveAgent):
             # Proper fix here is to switch `list` to `Sequence`
             pool_filter_arg = self.chain._deployed_hyperdrive_pools  # type: ignore # pylint: disable=protected-access
 
+        self._sync_events(pool_filter_arg)
         return self._get_positions(
             pool_filter=pool_filter_arg,
             show_closed_positions=show_closed_positions,
@@ -610,13 +617,20 @@ class LocalHyperdriveAgent(HyperdriveAgent):
                         raise TypeError("Pool must be an instance of LocalHyperdrive for a LocalHyperdriveAgent")
             elif not isinstance(pool_filter, LocalHyperdrive):
                 raise TypeError("Pool must be an instance of LocalHyperdrive for a LocalHyperdriveAgent")
+            self._sync_events(pool_filter)
+        else:
+            self._sync_events(self.chain._deployed_hyperdrive_pools)  # type: ignore # pylint: disable=protected-access
         return self._get_trade_events(
             pool_filter=pool_filter, all_token_deltas=all_token_deltas, coerce_float=coerce_float
         )
 
     def _sync_events(self, pool: Hyperdrive | list[Hyperdrive]) -> None:
-        # No need to sync in local hyperdrive, we sync when we run the data pipeline
-        pass
+        # No need to sync in local hyperdrive, we sync when we run the data pipeline.
+        # We only wait for the background data pipeline to catch up if it's running.
+        pools = pool if isinstance(pool, list) else [pool]
+        for local_pool in pools:
+            assert isinstance(local_pool, LocalHyperdrive)
+            local_pool._wait_for_data_pipeline()  # pylint: disable=protected-access
 
     def _sync_snapshot(self, pool: Hyperdrive | list[Hyperdrive]) -> None:
         # No need to sync in local hyperdrive, we sync when we run the data pipeline
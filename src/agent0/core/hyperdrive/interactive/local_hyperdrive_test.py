@@ -6,6 +6,7 @@ import json
 import logging
 from datetime import timedelta
 from decimal import Decimal
+from pathlib import Path
 from typing import Type
 
 import numpy as np
@@ -30,6 +31,8 @@ from agent0.chainsync.dashboard import build_pool_dashboard, build_wallet_dashbo
 from agent0.core.base import Trade
 from agent0.core.base.make_key import make_private_key
 from agent0.core.hyperdrive import HyperdriveMarketAction, HyperdriveWallet
+from agent0.core.hyperdrive.agent import open_long_trade, open_short_trade
+from agent0.core.hyperdrive.crash_report import load_anvil_state_dump, write_anvil_state_dump
 from agent0.core.hyperdrive.policies import HyperdriveBasePolicy, PolicyZoo
 from agent0.core.test_utils import CycleTradesPolicy
 from agent0.ethpy.hyperdrive import AssetIdPrefix, HyperdriveReadInterface, encode_asset_id
@@ -536,6 +539,100 @@ def test_no_loss_in_precision():
         _ensure_db_wallet_matches_agent_wallet_and_chain(hyperdrive, agent0)
 
 
+@pytest.mark.anvil
+def test_background_data_pipeline():
+    """Tests that reads wait for the background data pipeline to sync the trades."""
+    with LocalChain(LocalChain.Config(db_port=6000, chain_port=6001, background_data_pipeline=True)) as chain:
+        hyperdrive = LocalHyperdrive(chain, config=LocalHyperdrive.Config())
+        agent0 = chain.init_agent(eth=FixedPoint(1_000), name="agent0", pool=hyperdrive)
+        agent0.add_funds(base=FixedPoint(1_000_000))
+        _ = agent0.open_long(base=FixedPoint(1_000))
+        _ = agent0.open_short(bonds=FixedPoint(1_000))
+        chain.mine_blocks(5)
+
+        # Reads return data up to the latest block
+        assert len(agent0.get_trade_events()) == 2
+        assert hyperdrive.get_pool_info()["block_number"].max() == chain.block_number()
+        assert chain._data_pipeline is not None  # pylint: disable=protected-access
+        assert chain._data_pipeline.watermark >= chain.block_number()  # pylint: disable=protected-access
+        _ensure_db_wallet_matches_agent_wallet_and_chain(hyperdrive, agent0)
+
+        # Snapshots resume the pipeline from the snapshot block
+        chain.save_snapshot()
+        _ = agent0.close_long(maturity_time=agent0.get_longs()[0].maturity_time, bonds=agent0.get_longs()[0].balance)
+        assert len(agent0.get_trade_events()) == 3
+        chain.load_snapshot()
+        assert len(agent0.get_trade_events()) == 2
+        _ = agent0.open_long(base=FixedPoint(1_000))
+        assert len(agent0.get_trade_events()) == 3
+        _ensure_db_wallet_matches_agent_wallet_and_chain(hyperdrive, agent0)
+
+
+@pytest.mark.anvil
+def test_wallet_ledger():
+    """Tests that the in-memory wallet ledger matches the db and the chain."""
+    with LocalChain(
+        LocalChain.Config(db_port=6000, chain_port=6001, use_wallet_ledger=True, wallet_ledger_reconcile_interval=None)
+    ) as chain:
+        hyperdrive = LocalHyperdrive(chain, config=LocalHyperdrive.Config())
+        agent0 = chain.init_agent(eth=FixedPoint(1_000), name="agent0", pool=hyperdrive)
+        agent0.add_funds(base=FixedPoint(1_000_000))
+        _ensure_db_wallet_matches_agent_wallet_and_chain(hyperdrive, agent0)
+
+        open_long_event = agent0.open_long(base=FixedPoint(1_000))
+        open_short_event = agent0.open_short(bonds=FixedPoint(1_000))
+        _ = agent0.add_liquidity(base=FixedPoint(10_000))
+        _ensure_db_wallet_matches_agent_wallet_and_chain(hyperdrive, agent0)
+
+        _ = agent0.close_long(open_long_event.args.maturity_time, open_long_event.args.bond_amount / FixedPoint(2))
+        _ = agent0.close_short(open_short_event.args.maturity_time, open_short_event.args.bond_amount)
+        _ = agent0.remove_liquidity(shares=agent0.get_lp())
+        if agent0.get_withdrawal_shares() > FixedPoint(0):
+            _ = agent0.redeem_withdrawal_shares(shares=agent0.get_withdrawal_shares())
+        _ensure_db_wallet_matches_agent_wallet_and_chain(hyperdrive, agent0)
+
+        # Rebuilding the ledger from the chain results in the same wallet
+        wallet = agent0.get_wallet()
+        assert agent0._wallet_ledger is not None  # pylint: disable=protected-access
+        agent0._wallet_ledger.invalidate()  # pylint: disable=protected-access
+        assert agent0.get_wallet() == wallet
+
+
+@pytest.mark.anvil
+def test_deployment_cache(tmp_path: Path):
+    """Tests that a cached deployment results in the same pool as deploying from scratch."""
+    config = LocalHyperdrive.Config(initial_fixed_apr=FixedPoint("0.04"))
+    chain_config = LocalChain.Config(
+        db_port=6000, chain_port=6001, manual_database_sync=True, deployment_cache_dir=str(tmp_path)
+    )
+    # The first chain deploys and caches the deployment
+    with LocalChain(chain_config) as chain:
+        deployed_hyperdrive = LocalHyperdrive(chain, config=config)
+        deployed_pool_config = deployed_hyperdrive.interface.pool_config
+        deployed_pool_info = deployed_hyperdrive.interface.current_pool_state.pool_info
+        deploy_block_number = chain.block_number()
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # The second chain loads the cached deployment
+    with LocalChain(chain_config) as chain:
+        cached_hyperdrive = LocalHyperdrive(chain, config=config)
+        assert cached_hyperdrive.hyperdrive_address == deployed_hyperdrive.hyperdrive_address
+        assert cached_hyperdrive.interface.pool_config == deployed_pool_config
+        assert cached_hyperdrive.interface.current_pool_state.pool_info == deployed_pool_info
+        assert chain.block_number() == deploy_block_number
+
+        # The loaded pool is usable, and its deploy events are in the db
+        agent = chain.init_agent(base=FixedPoint(10_000), eth=FixedPoint(10), pool=cached_hyperdrive)
+        _ = agent.open_long(base=FixedPoint(1_000))
+        cached_hyperdrive.sync_database()
+        assert len(cached_hyperdrive.get_trade_events()) > 1
+        assert len(agent.get_positions()) == 1
+
+        # Pools deployed after the first aren't cached
+        _ = LocalHyperdrive(chain, config=config)
+    assert len(list(tmp_path.iterdir())) == 1
+
+
 def _to_unscaled_decimal(fp_val: FixedPoint) -> Decimal:
     return Decimal(str(fp_val))
 
@@ -875,6 +972,89 @@ def test_advance_time_with_checkpoints(fast_chain_fixture: LocalChain):
     # then check `hyperdrive_interface.get_checkpoint_info` for proper checkpoints.
 
 
+@pytest.mark.anvil
+def test_advance_time_with_batched_checkpoints(fast_chain_fixture: LocalChain):
+    """Batched checkpoint creation with advance time across multiple pools."""
+    fast_chain_fixture._set_block_timestamp_interval(1)  # pylint: disable=protected-access
+    config = LocalHyperdrive.Config(checkpoint_duration=3600)
+    pools = [LocalHyperdrive(fast_chain_fixture, config), LocalHyperdrive(fast_chain_fixture, config)]
+    # Ensure the current checkpoint exists, so only the checkpoints being advanced over get created
+    fast_chain_fixture.advance_time(0, create_checkpoints=True)
+
+    pre_time = fast_chain_fixture.block_time()
+    checkpoint_events = fast_chain_fixture.advance_time(
+        timedelta(hours=24, minutes=30), create_checkpoints=True, batch_checkpoints=True
+    )
+    # Batched checkpoints are mined at exact timestamps
+    assert fast_chain_fixture.block_time() - pre_time == 24 * 3600 + 30 * 60
+
+    for pool in pools:
+        assert len(checkpoint_events[pool]) == 24
+        checkpoint_times = [event.args.checkpoint_time for event in checkpoint_events[pool]]
+        assert checkpoint_times == sorted(set(checkpoint_times))
+        for checkpoint_time in checkpoint_times:
+            checkpoint = pool.interface.hyperdrive_contract.functions.getCheckpoint(checkpoint_time).call()
+            assert checkpoint.vaultSharePrice > 0
+
+    # Transactions get mined as usual afterwards
+    agent = fast_chain_fixture.init_agent(base=FixedPoint(10_000), eth=FixedPoint(10), pool=pools[0])
+    _ = agent.open_long(base=FixedPoint(1_000))
+
+
+@pytest.mark.anvil
+def test_build_block(fast_chain_fixture: LocalChain):
+    """Trades of multiple agents mined in a single block."""
+    interactive_hyperdrive = LocalHyperdrive(fast_chain_fixture, LocalHyperdrive.Config())
+    agents = [
+        fast_chain_fixture.init_agent(base=FixedPoint(100_000), eth=FixedPoint(10), pool=interactive_hyperdrive)
+        for _ in range(3)
+    ]
+    random_agent = fast_chain_fixture.init_agent(
+        base=FixedPoint(100_000),
+        eth=FixedPoint(10),
+        pool=interactive_hyperdrive,
+        policy=PolicyZoo.random,
+        policy_config=PolicyZoo.random.Config(trade_chance=FixedPoint(1), rng_seed=1234),
+    )
+    # Set approvals ahead of time, so the only transactions are the trades
+    for agent in [*agents, random_agent]:
+        agent.set_max_approval()
+
+    pre_block_number = fast_chain_fixture.block_number()
+    with fast_chain_fixture.build_block() as block_builder:
+        pending_longs = [
+            block_builder.add_action(agent, [open_long_trade(FixedPoint(1_000 * (i + 1)))])
+            for i, agent in enumerate(agents)
+        ]
+        # Multiple actions from the same agent go into the same block
+        pending_shorts = block_builder.add_action(
+            agents[0], [open_short_trade(FixedPoint(1_000)), open_short_trade(FixedPoint(2_000))]
+        )
+        pending_policy = block_builder.add_policy_action(random_agent)
+        pending_empty = block_builder.add_action(agents[1], [])
+    assert fast_chain_fixture.block_number() == pre_block_number + 1
+
+    for i, pending in enumerate(pending_longs):
+        events = pending.result()
+        assert len(events) == 1
+        assert isinstance(events[0], OpenLongEventFP)
+        assert events[0].args.amount == FixedPoint(1_000 * (i + 1))
+        assert events[0].block_number == pre_block_number + 1
+    short_events = pending_shorts.result()
+    assert len(short_events) == 2
+    assert all(isinstance(event, OpenShortEventFP) for event in short_events)
+    assert all(event.block_number == pre_block_number + 1 for event in pending_policy.result())
+    assert len(pending_empty.result()) == 0
+
+    # The wallets reflect the trades in the block
+    assert len(agents[0].get_longs()) == 1
+    assert len(agents[0].get_shorts()) == 1
+
+    # Automine is turned back on
+    _ = agents[2].open_long(base=FixedPoint(1_000))
+    assert fast_chain_fixture.block_number() == pre_block_number + 2
+
+
 # We use session chain here to avoid snapshotting since
 # we use snapshotting in the test
 @pytest.mark.anvil
@@ -1034,6 +1214,46 @@ def test_save_load_snapshot(chain_fixture: LocalChain):
     assert check_pool_state_on_db.equals(init_pool_state_on_db)
 
 
+@pytest.mark.docker
+@pytest.mark.anvil
+def test_save_load_in_memory_snapshot():
+    """Save and load snapshots kept in memory and in the db."""
+    with LocalChain(LocalChain.Config(db_port=6000, chain_port=6001, in_memory_snapshot=True)) as chain:
+        interactive_hyperdrive = LocalHyperdrive(chain, LocalHyperdrive.Config())
+        hyperdrive_agent = chain.init_agent(
+            base=FixedPoint(111_111),
+            eth=FixedPoint(111),
+            pool=interactive_hyperdrive,
+            policy=PolicyZoo.random,
+            policy_config=PolicyZoo.random.Config(rng_seed=1234),
+        )
+        open_long_event = hyperdrive_agent.open_long(base=FixedPoint(2_222))
+        chain.save_snapshot()
+
+        init_agent_wallet = hyperdrive_agent.get_wallet().copy()
+        init_db_wallet = interactive_hyperdrive.get_positions(coerce_float=False).copy()
+        init_trade_events = interactive_hyperdrive.get_trade_events(coerce_float=False).copy()
+        init_rng_value = hyperdrive_agent._active_policy.rng.random()  # pylint: disable=protected-access
+        chain.load_snapshot()
+
+        for _ in range(2):
+            # Make trades and agents after the snapshot
+            hyperdrive_agent.close_long(bonds=FixedPoint(222), maturity_time=open_long_event.args.maturity_time)
+            hyperdrive_agent.open_short(bonds=FixedPoint(333))
+            _ = chain.init_agent(base=FixedPoint(1_000), eth=FixedPoint(10), pool=interactive_hyperdrive)
+            assert hyperdrive_agent.get_wallet() != init_agent_wallet
+            assert len(chain._chain_agents) == 2  # pylint: disable=protected-access
+
+            chain.load_snapshot()
+            assert hyperdrive_agent.get_wallet() == init_agent_wallet
+            assert interactive_hyperdrive.get_positions(coerce_float=False).equals(init_db_wallet)
+            assert interactive_hyperdrive.get_trade_events(coerce_float=False).equals(init_trade_events)
+            assert len(chain._chain_agents) == 1  # pylint: disable=protected-access
+            # The policy's rng state gets loaded from the snapshot every time
+            assert hyperdrive_agent._active_policy.rng.random() == init_rng_value  # pylint: disable=protected-access
+            chain.load_snapshot()
+
+
 @pytest.mark.anvil
 def test_set_variable_rate(fast_chain_fixture: LocalChain):
     """Set the variable rate."""
@@ -1765,9 +1985,16 @@ def test_anvil_dump_state(capsys):
         # Read the json file
         with open(crash_report_file, "r", encoding="utf-8") as f:
             crash_report_dict = json.load(f)
-        assert "anvil_dump_state" in crash_report_dict
-        assert crash_report_dict["anvil_dump_state"] is not None
-        assert len(crash_report_dict["anvil_dump_state"]) > 0
+        # The state is written to a compressed file instead of embedded in the crash report
+        assert "anvil_state_file" in crash_report_dict
+        anvil_state_file = Path(crash_report_dict["anvil_state_file"])
+        assert anvil_state_file.exists()
+
+        # Dumps of the same state are deduplicated
+        assert write_anvil_state_dump(chain._web3) == anvil_state_file  # pylint: disable=protected-access
+
+        # The state can be loaded back
+        load_anvil_state_dump(chain._web3, anvil_state_file)  # pylint: disable=protected-access
 
 
 @pytest.mark.anvil
@@ -0,0 +1,596 @@
+"""Defines the simulated hyperdrive class, which runs a hyperdrive pool in memory for backtesting policies."""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from typing import Any, Coroutine, Type
+
+import numpy as np
+from eth_account import Account
+from eth_account.signers.local import LocalAccount
+from eth_typing import ChecksumAddress
+from fixedpointmath import FixedPoint
+from hexbytes import HexBytes
+from hyperdrivetypes import (
+    AddLiquidityEventFP,
+    BaseEvent,
+    CloseLongEventFP,
+    CloseShortEventFP,
+    CreateCheckpointEventFP,
+    FeesFP,
+    OpenLongEventFP,
+    OpenShortEventFP,
+    PoolConfigFP,
+    RedeemWithdrawalSharesEventFP,
+    RemoveLiquidityEventFP,
+)
+from numpy.random import Generator
+from web3.constants import ADDRESS_ZERO
+
+from agent0.core.base import Quantity, TokenType, Trade
+from agent0.core.base.make_key import make_private_key
+from agent0.core.hyperdrive import HyperdriveMarketAction, HyperdriveWallet, Long, Short, TradeResult, TradeResultView
+from agent0.core.hyperdrive.agent import (
+    add_liquidity_trade,
+    close_long_trade,
+    close_short_trade,
+    open_long_trade,
+    open_short_trade,
+    redeem_withdraw_shares_trade,
+    remove_liquidity_trade,
+)
+from agent0.core.hyperdrive.policies import HyperdriveBasePolicy
+from agent0.ethpy.hyperdrive import AssetIdPrefix, SimulatedHyperdriveInterface, decode_asset_id
+
+from .exec import get_liquidation_trades, get_trades
+from .exec.execute_agent_trades import _async_match_contract_call_to_trade
+
+# We only worry about protected access for anyone outside of this folder.
+# pylint: disable=protected-access
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-positional-arguments
+
+
+class SimulatedHyperdrive:
+    """Hyperdrive pool that lives in memory, for backtesting policies without a chain.
+
+    Agents trade with the same policies and trade objects as `LocalHyperdrive`, but trades get applied
+    to an in-memory pool state by `SimulatedHyperdriveInterface` instead of being sent to anvil.
+    There is no database, so trade events are only returned to the caller. The simulated accounting
+    is not bit-exact with the contracts; see `SimulatedHyperdriveInterface` for the approximations.
+    """
+
+    # Lots of config
+    # pylint: disable=too-many-instance-attributes
+    @dataclass(kw_only=True)
+    class Config:
+        """The configuration for the simulated hyperdrive pool."""
+
+        # Simulation variables
+        rng_seed: int | None = None
+        """The seed for the random number generator. Defaults to None."""
+        rng: Generator | None = None
+        """
+        The experiment's stateful random number generator. Defaults to creating a generator from
+        the provided random seed if not set.
+        """
+        exception_on_policy_error: bool = True
+        """When executing agent policies, whether to throw an exception if a trade fails. Defaults to True."""
+        start_timestamp: int | None = None
+        """The timestamp of the first simulated block. Defaults to the current time."""
+        block_time: int = 1
+        """The number of seconds between simulated blocks. Each trade is mined in its own block. Defaults to 1."""
+
+        # Initial pool variables
+        initial_liquidity: FixedPoint = FixedPoint(100_000_000)
+        """The amount of money to be provided by the deployer for initial pool liquidity."""
+        initial_variable_rate: FixedPoint = FixedPoint("0.05")
+        """The starting variable rate for the simulated yield source."""
+        initial_fixed_apr: FixedPoint = FixedPoint("0.05")
+        """The fixed rate of the pool on initialization."""
+        initial_time_stretch_apr: FixedPoint = FixedPoint("0.05")
+        """The rate to target for the time stretch."""
+        initial_vault_share_price: FixedPoint = FixedPoint(1)
+        """The vault share price of the simulated yield source on initialization."""
+
+        # Pool config variables
+        minimum_share_reserves: FixedPoint = FixedPoint(10)
+        """The minimum share reserves."""
+        minimum_transaction_amount: FixedPoint = FixedPoint("0.001")
+        """The minimum amount of tokens that a position can be opened or closed with."""
+        circuit_breaker_delta: FixedPoint = FixedPoint(2)
+        """The circuit breaker delta. This is reported in the pool config, but isn't enforced by the simulation."""
+        position_duration: int = 604_800  # 1 week
+        """The duration of a position prior to maturity (in seconds)."""
+        checkpoint_duration: int = 3_600  # 1 hour
+        """The duration of a checkpoint (in seconds)."""
+        curve_fee: FixedPoint = FixedPoint("0.01")  # 1%
+        """The LP fee applied to the curve portion of a trade."""
+        flat_fee: FixedPoint = FixedPoint(scaled_value=int(FixedPoint("0.0005").scaled_value / 52))
+        """The LP fee applied to the flat portion of a trade in annualized rates."""
+        governance_lp_fee: FixedPoint = FixedPoint("0.15")  # 15%
+        """The portion of the LP fee that goes to governance."""
+        governance_zombie_fee: FixedPoint = FixedPoint("0.03")  # 3%
+        """The portion of the zombie interest that is given to governance as a fee."""
+
+        def __post_init__(self):
+            if self.checkpoint_duration > self.position_duration:
+                raise ValueError("Checkpoint duration must be less than or equal to position duration")
+            if self.position_duration % self.checkpoint_duration != 0:
+                raise ValueError("Position duration must be a multiple of checkpoint duration")
+            if self.rng is None:
+                self.rng = np.random.default_rng(self.rng_seed)
+
+        @property
+        def _pool_config(self) -> PoolConfigFP:
+            return PoolConfigFP(
+                base_token=ADDRESS_ZERO,
+                vault_shares_token=ADDRESS_ZERO,
+                linker_factory=ADDRESS_ZERO,
+                linker_code_hash=bytes(32),
+                initial_vault_share_price=self.initial_vault_share_price,
+                minimum_share_reserves=self.minimum_share_reserves,
+                minimum_transaction_amount=self.minimum_transaction_amount,
+                circuit_breaker_delta=self.circuit_breaker_delta,
+                position_duration=self.position_duration,
+                checkpoint_duration=self.checkpoint_duration,
+                # The time stretch gets computed from `initial_time_stretch_apr` by the interface
+                time_stretch=FixedPoint(0),
+                governance=ADDRESS_ZERO,
+                fee_collector=ADDRESS_ZERO,
+                sweep_collector=ADDRESS_ZERO,
+                checkpoint_rewarder=ADDRESS_ZERO,
+                fees=FeesFP(
+                    curve=self.curve_fee,
+                    flat=self.flat_fee,
+                    governance_lp=self.governance_lp_fee,
+                    governance_zombie=self.governance_zombie_fee,
+                ),
+            )
+
+    def __init__(self, config: Config | None = None) -> None:
+        """Initialize and seed the simulated pool.
+
+        Arguments
+        ---------
+        config: SimulatedHyperdrive.Config | None, optional
+            The configuration for the simulated pool. Defaults to the default configuration.
+        """
+        if config is None:
+            config = self.Config()
+        self.config = config
+
+        self.interface = SimulatedHyperdriveInterface(
+            pool_config=config._pool_config,
+            initial_variable_rate=config.initial_variable_rate,
+            time_stretch_apr=config.initial_time_stretch_apr,
+            start_timestamp=config.start_timestamp,
+            block_time=config.block_time,
+        )
+        self.hyperdrive_address: ChecksumAddress = self.interface.hyperdrive_address
+
+        self._deploy_account: LocalAccount = Account().from_key(make_private_key())
+        self.interface.fund_account(self._deploy_account.address, base=config.initial_liquidity)
+        self.interface.initialize(self._deploy_account, config.initial_liquidity, config.initial_fixed_apr)
+
+    def init_agent(
+        self,
+        base: FixedPoint | None = None,
+        eth: FixedPoint | None = None,
+        policy: Type[HyperdriveBasePolicy] | None = None,
+        policy_config: HyperdriveBasePolicy.Config | None = None,
+        name: str | None = None,
+    ) -> SimulatedHyperdriveAgent:
+        """Create an agent that trades on the simulated pool.
+
+        Arguments
+        ---------
+        base: FixedPoint | None, optional
+            The amount of base to fund the agent with. Defaults to 0.
+        eth: FixedPoint | None, optional
+            The amount of eth to fund the agent with. Defaults to 0.
+        policy: Type[HyperdriveBasePolicy] | None, optional
+            An optional policy to attach to this agent.
+        policy_config: HyperdriveBasePolicy.Config | None, optional
+            The configuration for the attached policy.
+        name: str | None, optional
+            The name of the agent. Defaults to the wallet address.
+
+        Returns
+        -------
+        SimulatedHyperdriveAgent
+            The agent object for a user to execute trades with.
+        """
+        active_policy = None
+        if policy is not None:
+            # Policy config might be frozen, we create a new one while setting these variables
+            if policy_config is None:
+                policy_config = policy.Config(rng=self.config.rng)
+            elif policy_config.rng is None and policy_config.rng_seed is None:
+                policy_config = policy.Config(**{**asdict(policy_config), "rng": self.config.rng})
+            active_policy = policy(policy_config)
+        agent = SimulatedHyperdriveAgent(
+            pool=self, account=Account().from_key(make_private_key()), policy=active_policy, name=name
+        )
+        agent.add_funds(base=base, eth=eth)
+        return agent
+
+    def advance_time(
+        self, time_delta: int | timedelta, create_checkpoints: bool = True
+    ) -> list[CreateCheckpointEventFP]:
+        """Advance the simulated time, accruing variable interest along the way.
+
+        Arguments
+        ---------
+        time_delta: int | timedelta
+            The amount of time to advance, in seconds if an int.
+        create_checkpoints: bool, optional
+            Whether to create the checkpoints that are passed over. Defaults to True.
+
+        Returns
+        -------
+        list[CreateCheckpointEventFP]
+            The checkpoints that were created.
+        """
+        if isinstance(time_delta, timedelta):
+            time_delta = int(time_delta.total_seconds())
+        return self.interface.advance_time(time_delta, create_checkpoints=create_checkpoints)
+
+    def set_variable_rate(self, variable_rate: FixedPoint) -> None:
+        """Set the variable rate of the simulated yield source.
+
+        Arguments
+        ---------
+        variable_rate: FixedPoint
+            The new variable rate.
+        """
+        self.interface.set_variable_rate(self._deploy_account, variable_rate)
+
+
+class SimulatedHyperdriveAgent:
+    """Agent that trades on a `SimulatedHyperdrive` pool."""
+
+    def __init__(
+        self,
+        pool: SimulatedHyperdrive,
+        account: LocalAccount,
+        policy: HyperdriveBasePolicy | None,
+        name: str | None,
+    ) -> None:
+        """Constructor for the simulated hyperdrive agent.
+
+        Use `SimulatedHyperdrive.init_agent` to create agents.
+
+        Arguments
+        ---------
+        pool: SimulatedHyperdrive
+            The simulated pool the agent trades on.
+        account: LocalAccount
+            The account of the agent.
+        policy: HyperdriveBasePolicy | None
+            The policy of the agent.
+        name: str | None
+            The name of the agent. Defaults to the wallet address.
+        """
+        self.pool = pool
+        self.account = account
+        self.address = account.address
+        self.name = account.address if name is None else name
+        self._active_policy = policy
+
+    @property
+    def policy_done_trading(self) -> bool:
+        """Return whether the agent's policy is done trading."""
+        if self._active_policy is None:
+            return False
+        return self._active_policy._done_trading
+
+    def add_funds(self, base: FixedPoint | None = None, eth: FixedPoint | None = None) -> None:
+        """Adds additional funds to the agent.
+
+        Arguments
+        ---------
+        base: FixedPoint | None, optional
+            The amount of base to fund the agent with. Defaults to 0.
+        eth: FixedPoint | None, optional
+            The amount of eth to fund the agent with. Defaults to 0.
+        """
+        self.pool.interface.fund_account(self.address, base=base, eth=eth)
+
+    def get_wallet(self) -> HyperdriveWallet:
+        """Returns the agent's current wallet.
+
+        Returns
+        -------
+        HyperdriveWallet
+            The agent's current wallet.
+        """
+        asset_balances = self.pool.interface.get_asset_balances(self.address)
+        longs: dict[int, Long] = {}
+        shorts: dict[int, Short] = {}
+        lp_tokens = FixedPoint(0)
+        withdraw_shares = FixedPoint(0)
+        for asset_id, balance in asset_balances.items():
+            prefix, maturity_time = decode_asset_id(asset_id)
+            if prefix == AssetIdPrefix.LONG:
+                longs[maturity_time] = Long(balance=balance, maturity_time=maturity_time)
+            elif prefix == AssetIdPrefix.SHORT:
+                shorts[maturity_time] = Short(balance=balance, maturity_time=maturity_time)
+            elif prefix == AssetIdPrefix.LP:
+                lp_tokens = balance
+            elif prefix == AssetIdPrefix.WITHDRAWAL_SHARE:
+                withdraw_shares = balance
+        _, base_balance = self.pool.interface.get_eth_base_balances(self.account)
+        return HyperdriveWallet(
+            address=HexBytes(self.address),
+            balance=Quantity(amount=base_balance, unit=TokenType.BASE),
+            lp_tokens=lp_tokens,
+            withdraw_shares=withdraw_shares,
+            longs=longs,
+            shorts=shorts,
+        )
+
+    ################
+    # Trades
+    ################
+
+    def open_long(self, base: FixedPoint) -> OpenLongEventFP:
+        """Opens a long for this agent.
+
+        Arguments
+        ---------
+        base: FixedPoint
+            The amount of longs to open in units of base.
+
+        Returns
+        -------
+        OpenLongEventFP
+            The emitted event of the open long call.
+        """
+        hyperdrive_event = self._execute_single_trade(open_long_trade(base))
+        assert isinstance(hyperdrive_event, OpenLongEventFP)
+        return hyperdrive_event
+
+    def close_long(self, maturity_time: int, bonds: FixedPoint) -> CloseLongEventFP:
+        """Closes a long for this agent.
+
+        Arguments
+        ---------
+        maturity_time: int
+            The maturity time of the bonds to close. This is the identifier of the long tokens.
+        bonds: FixedPoint
+            The amount of longs to close in units of bonds.
+
+        Returns
+        -------
+        CloseLongEventFP
+            The emitted event of the close long call.
+        """
+        hyperdrive_event = self._execute_single_trade(close_long_trade(bonds, maturity_time))
+        assert isinstance(hyperdrive_event, CloseLongEventFP)
+        return hyperdrive_event
+
+    def open_short(self, bonds: FixedPoint) -> OpenShortEventFP:
+        """Opens a short for this agent.
+
+        Arguments
+        ---------
+        bonds: FixedPoint
+            The amount of shorts to open in units of bonds.
+
+        Returns
+        -------
+        OpenShortEventFP
+            The emitted event of the open short call.
+        """
+        hyperdrive_event = self._execute_single_trade(open_short_trade(bonds))
+        assert isinstance(hyperdrive_event, OpenShortEventFP)
+        return hyperdrive_event
+
+    def close_short(self, maturity_time: int, bonds: FixedPoint) -> CloseShortEventFP:
+        """Closes a short for this agent.
+
+        Arguments
+        ---------
+        maturity_time: int
+            The maturity time of the bonds to close. This is the identifier of the short tokens.
+        bonds: FixedPoint
+            The amount of shorts to close in units of bonds.
+
+        Returns
+        -------
+        CloseShortEventFP
+            The emitted event of the close short call.
+        """
+        hyperdrive_event = self._execute_single_trade(close_short_trade(bonds, maturity_time))
+        assert isinstance(hyperdrive_event, CloseShortEventFP)
+        return hyperdrive_event
+
+    def add_liquidity(self, base: FixedPoint) -> AddLiquidityEventFP:
+        """Adds liquidity for this agent.
+
+        Arguments
+        ---------
+        base: FixedPoint
+            The amount of liquidity to add in units of base.
+
+        Returns
+        -------
+        AddLiquidityEventFP
+            The emitted event of the add liquidity call.
+        """
+        hyperdrive_event = self._execute_single_trade(add_liquidity_trade(base))
+        assert isinstance(hyperdrive_event, AddLiquidityEventFP)
+        return hyperdrive_event
+
+    def remove_liquidity(self, shares: FixedPoint) -> RemoveLiquidityEventFP:
+        """Removes liquidity for this agent.
+
+        Arguments
+        ---------
+        shares: FixedPoint
+            The amount of liquidity to remove in units of shares.
+
+        Returns
+        -------
+        RemoveLiquidityEventFP
+            The emitted event of the remove liquidity call.
+        """
+        hyperdrive_event = self._execute_single_trade(remove_liquidity_trade(shares))
+        assert isinstance(hyperdrive_event, RemoveLiquidityEventFP)
+        return hyperdrive_event
+
+    def redeem_withdrawal_shares(self, shares: FixedPoint) -> RedeemWithdrawalSharesEventFP:
+        """Redeems withdrawal shares for this agent.
+
+        Arguments
+        ---------
+        shares: FixedPoint
+            The amount of withdrawal shares to redeem in units of shares.
+
+        Returns
+        -------
+        RedeemWithdrawalSharesEventFP
+            The emitted event of the redeem withdrawal shares call.
+        """
+        hyperdrive_event = self._execute_single_trade(redeem_withdraw_shares_trade(shares))
+        assert isinstance(hyperdrive_event, RedeemWithdrawalSharesEventFP)
+        return hyperdrive_event
+
+    ################
+    # Policies
+    ################
+
+    def get_policy_action(self) -> list[Trade[HyperdriveMarketAction]]:
+        """Gets the underlying policy actions.
+
+        Returns
+        -------
+        list[Trade[HyperdriveMarketAction]]
+            The actions of the underlying policy.
+        """
+        if self._active_policy is None:
+            raise ValueError("No active policy set.")
+        return get_trades(interface=self.pool.interface, policy=self._active_policy, wallet=self.get_wallet())
+
+    def get_liquidate_action(self, randomize: bool = False) -> list[Trade[HyperdriveMarketAction]]:
+        """Gets the liquidate actions for this agent.
+
+        Arguments
+        ---------
+        randomize: bool, optional
+            Whether to randomize the order of the liquidate actions.
+
+        Returns
+        -------
+        list[Trade[HyperdriveMarketAction]]
+            The liquidate actions of the agent.
+        """
+        assert self.pool.config.rng is not None
+        return get_liquidation_trades(
+            interface=self.pool.interface,
+            wallet=self.get_wallet(),
+            randomize_trades=randomize,
+            rng=self.pool.config.rng,
+        )
+
+    def execute_action(self, actions: list[Trade[HyperdriveMarketAction]]) -> list[BaseEvent]:
+        """Executes the specified actions, one block per action.
+
+        Failed trades raise an exception if the pool's `exception_on_policy_error` is set,
+        and are otherwise logged and skipped.
+
+        Arguments
+        ---------
+        actions: list[Trade[HyperdriveMarketAction]]
+            The actions to execute. This is the return value of `get_policy_action` or `get_liquidate_action`.
+
+        Returns
+        -------
+        list[BaseEvent]
+            Events of the executed actions.
+        """
+        trade_results = [self._execute_trade(trade_object) for trade_object in actions]
+        if self._active_policy is not None and len(trade_results) > 0:
+            self._active_policy.post_action(
+                self.pool.interface, [TradeResultView.from_trade_result(trade_result) for trade_result in trade_results]
+            )
+
+        out_events = []
+        for trade_result in trade_results:
+            if not trade_result.trade_successful:
+                assert trade_result.exception is not None
+                if self.pool.config.exception_on_policy_error:
+                    raise trade_result.exception
+                logging.warning("Simulated trade failed for agent %s: %s", self.name, repr(trade_result.exception))
+                continue
+            assert trade_result.hyperdrive_event is not None
+            out_events.append(trade_result.hyperdrive_event)
+        return out_events
+
+    def execute_policy_action(self) -> list[BaseEvent]:
+        """Gets the underlying policy action and executes them.
+
+        Returns
+        -------
+        list[BaseEvent]
+            Events of the executed actions.
+        """
+        return self.execute_action(self.get_policy_action())
+
+    def execute_liquidate(self, randomize: bool = False) -> list[BaseEvent]:
+        """Gets the agent's liquidate actions and executes them.
+
+        Arguments
+        ---------
+        randomize: bool, optional
+            Whether to randomize liquidation trades. Defaults to False.
+
+        Returns
+        -------
+        list[BaseEvent]
+            Events of the executed actions.
+        """
+        return self.execute_action(self.get_liquidate_action(randomize))
+
+    def _execute_single_trade(self, trade_object: Trade[HyperdriveMarketAction]) -> BaseEvent:
+        trade_result = self._execute_trade(trade_object)
+        if not trade_result.trade_successful:
+            assert trade_result.exception is not None
+            raise trade_result.exception
+        assert trade_result.hyperdrive_event is not None
+        return trade_result.hyperdrive_event
+
+    def _execute_trade(self, trade_object: Trade[HyperdriveMarketAction]) -> TradeResult:
+        try:
+            hyperdrive_event = _run_to_completion(
+                _async_match_contract_call_to_trade(
+                    self.account, self.pool.interface, trade_object, preview_before_trade=False
+                )
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            return TradeResult(
+                trade_successful=False,
+                account=self.account,
+                wallet=self.get_wallet(),
+                policy=self._active_policy,
+                trade_object=trade_object,
+                exception=exc,
+                block_number=self.pool.interface.get_block_number(self.pool.interface.get_current_block()),
+            )
+        return TradeResult(
+            trade_successful=True, account=self.account, trade_object=trade_object, hyperdrive_event=hyperdrive_event
+        )
+
+
+def _run_to_completion(coroutine: Coroutine[Any, Any, BaseEvent]) -> BaseEvent:
+    """Run a coroutine that never awaits, without the overhead of an event loop."""
+    # The simulated interface never awaits, so the trade completes on the first step
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise AssertionError("Simulated trades are expected to complete without awaiting.")
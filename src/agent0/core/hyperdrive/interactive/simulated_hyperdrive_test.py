@@ -0,0 +1,218 @@
+"""Tests for the simulated hyperdrive pool."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+from fixedpointmath import FixedPoint
+from pypechain.core import PypechainCallException
+
+from agent0.core.hyperdrive.policies import PolicyZoo
+
+from .local_chain import LocalChain
+from .local_hyperdrive import LocalHyperdrive
+from .simulated_hyperdrive import SimulatedHyperdrive
+
+# ruff: noqa: PLR2004 (comparison against magic values (literals like numbers))
+
+
+def _check_pool_accounting(pool: SimulatedHyperdrive) -> None:
+    pool_state = pool.interface.current_pool_state
+    assert pool_state.pool_info.share_reserves >= pool_state.pool_config.minimum_share_reserves
+    assert pool_state.vault_shares >= FixedPoint(0)
+    assert pool.interface.calc_solvency(pool_state) >= FixedPoint(0)
+
+
+def test_simulated_trades():
+    """Runs every trade through the simulated pool and checks the agent's wallet."""
+    pool = SimulatedHyperdrive(SimulatedHyperdrive.Config(rng_seed=1234, start_timestamp=1_700_000_000))
+    agent = pool.init_agent(base=FixedPoint(1_000_000))
+
+    open_long = agent.open_long(FixedPoint(10_000))
+    assert open_long.args.bond_amount > FixedPoint(10_000)
+    open_short = agent.open_short(FixedPoint(10_000))
+    add_liquidity = agent.add_liquidity(FixedPoint(100_000))
+    wallet = agent.get_wallet()
+    assert wallet.longs[open_long.args.maturity_time].balance == open_long.args.bond_amount
+    assert wallet.shorts[open_short.args.maturity_time].balance == FixedPoint(10_000)
+    assert wallet.lp_tokens == add_liquidity.args.lp_amount
+    assert wallet.balance.amount == FixedPoint(1_000_000) - FixedPoint(110_000) - open_short.args.amount
+    _check_pool_accounting(pool)
+
+    close_long = agent.close_long(open_long.args.maturity_time, open_long.args.bond_amount)
+    assert close_long.args.amount < FixedPoint(10_000)
+    agent.close_short(open_short.args.maturity_time, open_short.args.bond_amount)
+    remove_liquidity = agent.remove_liquidity(add_liquidity.args.lp_amount)
+    wallet = agent.get_wallet()
+    assert len(wallet.longs) == 0
+    assert len(wallet.shorts) == 0
+    assert wallet.lp_tokens == FixedPoint(0)
+    assert wallet.withdraw_shares == remove_liquidity.args.withdrawal_share_amount
+    _check_pool_accounting(pool)
+
+    # Trades that the contracts would revert raise the same way contract calls do,
+    # and don't mine a block or change the pool
+    pool_state = pool.interface.current_pool_state
+    with pytest.raises(PypechainCallException) as exc_info:
+        agent.open_long(FixedPoint("0.0001"))
+    assert exc_info.value.decoded_error == "MinimumTransactionAmount()"
+    with pytest.raises(PypechainCallException) as exc_info:
+        agent.open_long(FixedPoint(100_000_000))
+    assert exc_info.value.decoded_error == "InsufficientBalance()"
+    assert pool.interface.get_block_number(pool.interface.get_block("latest")) == pool_state.block_number
+    assert pool.interface.current_pool_state.pool_info == pool_state.pool_info
+    assert agent.get_wallet().balance.amount == wallet.balance.amount
+
+
+def test_simulated_maturity():
+    """Positions held to maturity close at their face value plus the accrued interest."""
+    pool = SimulatedHyperdrive(
+        SimulatedHyperdrive.Config(
+            rng_seed=1234, start_timestamp=1_700_000_000, initial_variable_rate=FixedPoint("0.1")
+        )
+    )
+    agent = pool.init_agent(base=FixedPoint(1_000_000))
+    open_long = agent.open_long(FixedPoint(10_000))
+    open_short = agent.open_short(FixedPoint(10_000))
+
+    checkpoint_events = pool.advance_time(timedelta(weeks=1))
+    assert len(checkpoint_events) >= 168
+    assert any(event.args.matured_longs == open_long.args.bond_amount for event in checkpoint_events)
+    vault_share_price = pool.interface.current_pool_state.pool_info.vault_share_price
+    assert vault_share_price > FixedPoint(1)
+
+    close_long = agent.close_long(open_long.args.maturity_time, open_long.args.bond_amount)
+    assert float(close_long.args.amount) == pytest.approx(float(open_long.args.bond_amount), rel=1e-3)
+    close_short = agent.close_short(open_short.args.maturity_time, open_short.args.bond_amount)
+    # The short earns the variable interest on the bonds
+    assert close_short.args.amount > FixedPoint(0)
+    _check_pool_accounting(pool)
+
+
+def test_simulated_random_policies():
+    """Runs random policies through the simulated pool."""
+    pool = SimulatedHyperdrive(
+        SimulatedHyperdrive.Config(rng_seed=1234, start_timestamp=1_700_000_000, exception_on_policy_error=False)
+    )
+    agents = [
+        pool.init_agent(
+            base=FixedPoint(1_000_000),
+            policy=PolicyZoo.random,
+            policy_config=PolicyZoo.random.Config(slippage_tolerance=None),
+        )
+        for _ in range(5)
+    ]
+
+    num_trades = 0
+    for _ in range(50):
+        for agent in agents:
+            num_trades += len(agent.execute_policy_action())
+        pool.advance_time(timedelta(hours=6))
+        _check_pool_accounting(pool)
+    assert num_trades > 0
+
+    for agent in agents:
+        agent.execute_liquidate()
+    _check_pool_accounting(pool)
+
+
+def _assert_close(simulated: FixedPoint, local: FixedPoint, rel: float = 1e-3, abs_tol: float = 1e-6) -> None:
+    assert float(simulated) == pytest.approx(float(local), rel=rel, abs=abs_tol)
+
+
+def _assert_pool_info_close(simulated_pool: SimulatedHyperdrive, local_pool: LocalHyperdrive) -> None:
+    simulated_info = simulated_pool.interface.current_pool_state.pool_info
+    local_info = local_pool.interface.current_pool_state.pool_info
+    for field_name in [
+        "share_reserves",
+        "share_adjustment",
+        "bond_reserves",
+        "vault_share_price",
+        "longs_outstanding",
+        "shorts_outstanding",
+        "long_exposure",
+        "zombie_share_reserves",
+        "withdrawal_shares_ready_to_withdraw",
+    ]:
+        _assert_close(getattr(simulated_info, field_name), getattr(local_info, field_name))
+    _assert_close(
+        simulated_pool.interface.calc_spot_rate(simulated_pool.interface.current_pool_state),
+        local_pool.interface.calc_spot_rate(local_pool.interface.current_pool_state),
+    )
+
+
+@pytest.mark.anvil
+def test_simulated_matches_local(fast_chain_fixture: LocalChain):
+    """Runs the same trades on the simulated pool and a deployed pool, and compares the pools and the trades."""
+    # Match the deployed pool's config and the chain's clock
+    config = {
+        "initial_liquidity": FixedPoint(1_000_000),
+        "initial_variable_rate": FixedPoint("0.05"),
+        "initial_fixed_apr": FixedPoint("0.05"),
+        "initial_time_stretch_apr": FixedPoint("0.05"),
+        "position_duration": 604_800,
+        "checkpoint_duration": 3_600,
+    }
+    local_pool = LocalHyperdrive(fast_chain_fixture, LocalHyperdrive.Config(**config))
+    local_pool_state = local_pool.interface.current_pool_state
+    simulated_pool = SimulatedHyperdrive(
+        SimulatedHyperdrive.Config(
+            rng_seed=1234,
+            start_timestamp=local_pool_state.block_time,
+            block_time=fast_chain_fixture.config.block_timestamp_interval or 1,
+            initial_vault_share_price=local_pool_state.pool_info.vault_share_price,
+            **config,
+        )
+    )
+    _assert_pool_info_close(simulated_pool, local_pool)
+
+    local_agent = fast_chain_fixture.init_agent(base=FixedPoint(1_000_000), eth=FixedPoint(10), pool=local_pool)
+    simulated_agent = simulated_pool.init_agent(base=FixedPoint(1_000_000))
+
+    open_longs = [agent.open_long(FixedPoint(10_000)) for agent in (simulated_agent, local_agent)]
+    _assert_close(open_longs[0].args.bond_amount, open_longs[1].args.bond_amount)
+    _assert_pool_info_close(simulated_pool, local_pool)
+
+    open_shorts = [agent.open_short(FixedPoint(10_000)) for agent in (simulated_agent, local_agent)]
+    _assert_close(open_shorts[0].args.amount, open_shorts[1].args.amount)
+    _assert_pool_info_close(simulated_pool, local_pool)
+
+    add_liquidities = [agent.add_liquidity(FixedPoint(100_000)) for agent in (simulated_agent, local_agent)]
+    _assert_close(add_liquidities[0].args.lp_amount, add_liquidities[1].args.lp_amount)
+    _assert_pool_info_close(simulated_pool, local_pool)
+
+    # Reverted trades leave both pools untouched
+    local_block_number = fast_chain_fixture.block_number()
+    simulated_pool_info = simulated_pool.interface.current_pool_state.pool_info
+    for agent in (simulated_agent, local_agent):
+        with pytest.raises(PypechainCallException) as exc_info:
+            agent.open_long(FixedPoint("0.0001"))
+        assert exc_info.value.decoded_error == "MinimumTransactionAmount()"
+    assert fast_chain_fixture.block_number() == local_block_number
+    assert simulated_pool.interface.current_pool_state.pool_info == simulated_pool_info
+    _assert_pool_info_close(simulated_pool, local_pool)
+
+    simulated_pool.advance_time(timedelta(days=1))
+    fast_chain_fixture.advance_time(timedelta(days=1))
+    _assert_pool_info_close(simulated_pool, local_pool)
+
+    close_longs = [
+        agent.close_long(open_long.args.maturity_time, open_long.args.bond_amount)
+        for agent, open_long in zip((simulated_agent, local_agent), open_longs)
+    ]
+    _assert_close(close_longs[0].args.amount, close_longs[1].args.amount)
+    close_shorts = [
+        agent.close_short(open_short.args.maturity_time, open_short.args.bond_amount)
+        for agent, open_short in zip((simulated_agent, local_agent), open_shorts)
+    ]
+    _assert_close(close_shorts[0].args.amount, close_shorts[1].args.amount)
+    remove_liquidities = [
+        agent.remove_liquidity(add_liquidity.args.lp_amount)
+        for agent, add_liquidity in zip((simulated_agent, local_agent), add_liquidities)
+    ]
+    _assert_close(remove_liquidities[0].args.amount, remove_liquidities[1].args.amount)
+    _assert_close(
+        remove_liquidities[0].args.withdrawal_share_amount, remove_liquidities[1].args.withdrawal_share_amount
+    )
+    _assert_pool_info_close(simulated_pool, local_pool)
@@ -0,0 +1,564 @@
+"""Replays the trades of a pool's history on a fresh local pool."""
+
+from __future__ import annotations
+
+import logging
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+import pandas as pd
+from fixedpointmath import FixedPoint
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from agent0.chainsync.db.hyperdrive import iter_block_table_chunks
+from agent0.chainsync.db.hyperdrive.import_export_data import DEFAULT_CHUNK_SIZE
+from agent0.chainsync.db.hyperdrive.schema import DBPoolInfo, DBTradeEvent
+from agent0.core.base import Trade
+from agent0.core.hyperdrive.agent import (
+    HyperdriveMarketAction,
+    TradeResult,
+    add_liquidity_trade,
+    close_long_trade,
+    close_short_trade,
+    open_long_trade,
+    open_short_trade,
+    redeem_withdraw_shares_trade,
+    remove_liquidity_trade,
+)
+
+if TYPE_CHECKING:
+    from .local_hyperdrive import LocalHyperdrive
+    from .local_hyperdrive_agent import LocalHyperdriveAgent
+
+# The event arguments of the amount going into and coming out of each replayed trade
+_TRADE_AMOUNT_ARGS: dict[str, tuple[str, str]] = {
+    "OpenLong": ("amount", "bond_amount"),
+    "CloseLong": ("bond_amount", "amount"),
+    "OpenShort": ("bond_amount", "amount"),
+    "CloseShort": ("bond_amount", "amount"),
+    "AddLiquidity": ("amount", "lp_amount"),
+    "RemoveLiquidity": ("lp_amount", "amount"),
+    "RedeemWithdrawalShares": ("withdrawal_share_amount", "amount"),
+}
+REPLAYED_EVENT_TYPES = tuple(_TRADE_AMOUNT_ARGS)
+"""The trade events that get replayed. Other events, e.g., `Initialize` and transfers, are skipped."""
+
+# Trades where the trader pays in base, as opposed to tokens
+_BASE_IN_EVENT_TYPES = ("OpenLong", "AddLiquidity")
+
+
+@dataclass
+class HistoricalTrade:
+    """A trade from the `trade_event` table."""
+
+    block_number: int
+    """The block number of the trade."""
+    transaction_hash: str
+    """The transaction hash of the trade."""
+    wallet_address: str
+    """The trader."""
+    event_type: str
+    """The trade event, one of `REPLAYED_EVENT_TYPES`."""
+    token_type: str
+    """The token type of the trade, one of `LONG`, `SHORT`, `LP`, or `WITHDRAWAL_SHARE`."""
+    maturity_time: int | None
+    """The maturity time of longs and shorts."""
+    amount_in: FixedPoint
+    """The amount the trader paid, in base for opening longs and adding liquidity, and in tokens otherwise."""
+    amount_out: FixedPoint
+    """The amount the trader received, in tokens for opening longs and adding liquidity, and in base otherwise."""
+    fraction_of_position: FixedPoint = FixedPoint(1)
+    """The fraction of the trader's position the trade closed, for trades that close positions."""
+
+
+@dataclass
+class ReplayDivergence:
+    """A replayed trade that diverged from its historical trade."""
+
+    trade: HistoricalTrade
+    """The historical trade."""
+    reason: str
+    """Why the replayed trade diverged."""
+    historical_rate: FixedPoint | None = None
+    """The amount out per amount in of the historical trade."""
+    replayed_rate: FixedPoint | None = None
+    """The amount out per amount in of the replayed trade."""
+    exception: BaseException | None = None
+    """The exception of the replayed trade, if it failed."""
+
+
+@dataclass
+class ReplayResult:
+    """The summary of a replay."""
+
+    num_blocks: int = 0
+    """The number of historical blocks with trades that got replayed."""
+    num_mined_blocks: int = 0
+    """The number of blocks mined for the replayed trades."""
+    num_trades: int = 0
+    """The number of replayed trades."""
+    num_skipped_events: int = 0
+    """The number of historical events that aren't replayed trades, e.g., `Initialize` and transfers."""
+    divergences: list[ReplayDivergence] = field(default_factory=list)
+    """The replayed trades that failed or diverged from their historical trades."""
+
+
+class TradeReplay:
+    """Replays historical trades from the `trade_event` table on a fresh local pool.
+
+    Every historical trader gets a local agent, and trades are streamed in block order. The trades of
+    each historical block are mined together in one block using the chain's block builder, with time
+    advanced such that blocks are mined at the historical block timestamps, shifted to the chain's time.
+    Trades of a trader that depend on the trader's earlier trades in the same block get mined in
+    subsequent blocks.
+
+    Opening trades and adding liquidity replay the historical amount. Trades that close positions replay
+    the historical fraction of the trader's position, since the size of the replayed position depends
+    on the pool. A replayed trade diverges if it fails, or if its amount out per amount in differs
+    from the historical trade by more than the configured tolerance.
+
+    .. note::
+        Replays are much faster with `manual_database_sync` or `background_data_pipeline` set on
+        the chain, since otherwise the database gets synced after every mined block.
+
+    Example
+    -------
+    >>> pool = LocalHyperdrive(chain, LocalHyperdrive.Config(position_duration=..., checkpoint_duration=...))
+    >>> result = TradeReplay(pool).replay_export(Path("exported_db"), hyperdrive_address="0x...")
+    >>> for divergence in result.divergences:
+    >>>     print(divergence.trade.block_number, divergence.reason)
+    """
+
+    @dataclass(kw_only=True)
+    class Config:
+        """The configuration for a trade replay."""
+
+        agent_base: FixedPoint = FixedPoint(1_000_000_000)
+        """The amount of base to fund replay agents with, and to top up with when they run low."""
+        agent_eth: FixedPoint = FixedPoint(1_000)
+        """The amount of eth to fund replay agents with."""
+        divergence_tolerance: FixedPoint = FixedPoint("0.01")
+        """The relative difference in amount out per amount in at which a replayed trade diverges."""
+        match_block_timestamps: bool = True
+        """Whether to advance time between blocks to match the historical block timestamps."""
+
+    def __init__(self, pool: LocalHyperdrive, config: Config | None = None) -> None:
+        """Initialize the trade replay.
+
+        Arguments
+        ---------
+        pool: LocalHyperdrive
+            The fresh pool to replay the trades on. The pool's config should match the historical pool's config.
+        config: TradeReplay.Config | None, optional
+            The configuration for the replay. Defaults to the default config.
+        """
+        if config is None:
+            config = self.Config()
+        self.config = config
+        self.pool = pool
+        self.chain = pool.chain
+
+        self._agents: dict[str, LocalHyperdriveAgent] = {}
+        # Base balances are tracked from the trades, so agents get topped up without querying the chain
+        self._agent_base: dict[str, FixedPoint] = {}
+        # Balances keyed by wallet and token id. Historical and replayed longs and shorts
+        # are keyed by their own maturity times.
+        self._historical_balances: dict[tuple[str, str], FixedPoint] = {}
+        self._replayed_balances: dict[tuple[str, str, int | None], FixedPoint] = {}
+        # Maps historical maturity times to the maturity times of the replayed positions
+        self._maturity_times: dict[tuple[str, str, int], int] = {}
+        # The historical time gets shifted by a multiple of the checkpoint duration onto the chain's time
+        self._time_offset: int | None = None
+
+    @property
+    def agents(self) -> dict[str, LocalHyperdriveAgent]:
+        """The replay agents, keyed by the address of the historical trader they replay."""
+        return self._agents
+
+    def replay_export(
+        self, in_dir: Path, hyperdrive_address: str | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> ReplayResult:
+        """Replay the trades exported with `export_db_to_file`.
+
+        Arguments
+        ---------
+        in_dir: Path
+            The directory of the export.
+        hyperdrive_address: str | None, optional
+            The pool to replay the trades of. Required if the export contains multiple pools.
+        chunk_size: int, optional
+            The number of rows to read from file at a time. Defaults to `DEFAULT_CHUNK_SIZE`.
+
+        Returns
+        -------
+        ReplayResult
+            The summary of the replay.
+        """
+        return self.replay(
+            iter_block_table_chunks(in_dir, "trade_event", chunk_size),
+            _iter_block_timestamps(iter_block_table_chunks(in_dir, "pool_info", chunk_size), hyperdrive_address),
+            hyperdrive_address,
+        )
+
+    def replay_db(
+        self, db_session: Session, hyperdrive_address: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> ReplayResult:
+        """Replay the trades of a pool from the database.
+
+        Arguments
+        ---------
+        db_session: Session
+            The database session to stream the trades from.
+        hyperdrive_address: str
+            The pool to replay the trades of.
+        chunk_size: int, optional
+            The number of rows to read from the db at a time. Defaults to `DEFAULT_CHUNK_SIZE`.
+
+        Returns
+        -------
+        ReplayResult
+            The summary of the replay.
+        """
+        # The two streams need their own connections, since they're read interleaved
+        with Session(db_session.get_bind()) as timestamp_session:
+            return self.replay(
+                _iter_db_chunks(db_session, DBTradeEvent, hyperdrive_address, chunk_size),
+                _iter_block_timestamps(
+                    _iter_db_chunks(timestamp_session, DBPoolInfo, hyperdrive_address, chunk_size), hyperdrive_address
+                ),
+                hyperdrive_address,
+            )
+
+    def replay(
+        self,
+        trade_events: Iterable[pd.DataFrame],
+        block_timestamps: Iterable[tuple[int, int]] | None = None,
+        hyperdrive_address: str | None = None,
+    ) -> ReplayResult:
+        """Replay trades from chunks of the `trade_event` table.
+
+        Arguments
+        ---------
+        trade_events: Iterable[pd.DataFrame]
+            Chunks of rows of the `trade_event` table, sorted by block number.
+        block_timestamps: Iterable[tuple[int, int]] | None, optional
+            The historical (block number, timestamp) pairs, sorted by block number. Time doesn't get
+            advanced to match the historical blocks if None.
+        hyperdrive_address: str | None, optional
+            The pool to replay the trades of. Required if the trade events contain multiple pools.
+
+        Returns
+        -------
+        ReplayResult
+            The summary of the replay.
+        """
+        result = ReplayResult()
+        timestamps = _BlockTimestamps(block_timestamps) if block_timestamps is not None else None
+        for block_number, rows in _iter_blocks(trade_events, hyperdrive_address):
+            trades = _to_historical_trades(rows, self._historical_balances, result)
+            if len(trades) == 0:
+                continue
+            result.num_blocks += 1
+            if timestamps is not None and self.config.match_block_timestamps:
+                self._advance_to(timestamps.get(block_number))
+            for sub_block in _split_by_trader(trades):
+                self._replay_block(sub_block, result)
+            if result.num_blocks % 1000 == 0:
+                logging.info("Replayed %s blocks up to block %s", result.num_blocks, block_number)
+        return result
+
+    def _advance_to(self, historical_timestamp: int) -> None:
+        latest_timestamp = self.chain.block_time()
+        block_interval = self.chain.config.block_timestamp_interval or 0
+        if self._time_offset is None:
+            checkpoint_duration = self.pool.interface.pool_config.checkpoint_duration
+            self._time_offset = (
+                math.ceil((latest_timestamp + block_interval - historical_timestamp) / checkpoint_duration)
+                * checkpoint_duration
+            )
+        # The block builder mines the next block one block interval after the latest block
+        time_delta = historical_timestamp + self._time_offset - block_interval - latest_timestamp
+        if time_delta > 0:
+            self.chain.advance_time(time_delta, create_checkpoints=True, batch_checkpoints=True)
+
+    def _replay_block(self, trades: list[HistoricalTrade], result: ReplayResult) -> None:
+        actions: list[tuple[HistoricalTrade, Trade[HyperdriveMarketAction]]] = []
+        for trade in trades:
+            action = self._to_action(trade)
+            if action is None:
+                result.divergences.append(ReplayDivergence(trade, "The trader has no replayed position to close."))
+                continue
+            actions.append((trade, action))
+        if len(actions) == 0:
+            return
+
+        for trade, action in actions:
+            if trade.event_type in ("OpenLong", "OpenShort", "AddLiquidity"):
+                self._ensure_funded(trade.wallet_address, action.market_action.trade_amount)
+        with self.chain.build_block() as block_builder:
+            pending = [
+                block_builder.add_action(self._agents[trade.wallet_address], [action], self.pool)
+                for trade, action in actions
+            ]
+        result.num_mined_blocks += 1
+
+        for (trade, _), pending_actions in zip(actions, pending):
+            result.num_trades += 1
+            trade_result = pending_actions.trade_results[0] if len(pending_actions.trade_results) > 0 else None
+            self._check_trade(trade, trade_result, pending_actions.exception, result)
+
+    def _to_action(self, trade: HistoricalTrade) -> Trade[HyperdriveMarketAction] | None:
+        # pylint: disable=too-many-return-statements
+        wallet_address = trade.wallet_address
+        if wallet_address not in self._agents:
+            self._agents[wallet_address] = self.chain.init_agent(
+                pool=self.pool,
+                base=self.config.agent_base,
+                eth=self.config.agent_eth,
+                name=f"replay_{wallet_address}",
+            )
+            self._agent_base[wallet_address] = self.config.agent_base
+
+        match trade.event_type:
+            case "OpenLong":
+                return open_long_trade(trade.amount_in)
+            case "OpenShort":
+                return open_short_trade(trade.amount_in)
+            case "AddLiquidity":
+                return add_liquidity_trade(trade.amount_in)
+
+        maturity_time = None
+        if trade.maturity_time is not None:
+            maturity_time = self._replayed_maturity_time(wallet_address, trade.token_type, trade.maturity_time)
+        balance = self._replayed_balances.get((wallet_address, trade.token_type, maturity_time), FixedPoint(0))
+        amount = balance * trade.fraction_of_position
+        if amount <= FixedPoint(0):
+            return None
+        match trade.event_type:
+            case "CloseLong":
+                assert maturity_time is not None
+                return close_long_trade(amount, maturity_time)
+            case "CloseShort":
+                assert maturity_time is not None
+                return close_short_trade(amount, maturity_time)
+            case "RemoveLiquidity":
+                return remove_liquidity_trade(amount)
+            case "RedeemWithdrawalShares":
+                return redeem_withdraw_shares_trade(amount)
+        raise ValueError(f"Unknown trade event type {trade.event_type}")
+
+    def _replayed_maturity_time(self, wallet_address: str, token_type: str, maturity_time: int) -> int:
+        replayed_maturity_time = self._maturity_times.get((wallet_address, token_type, maturity_time), None)
+        if replayed_maturity_time is not None:
+            return replayed_maturity_time
+        # Positions opened before the replay started get closed at the shifted maturity time
+        return maturity_time + (self._time_offset or 0)
+
+    def _ensure_funded(self, wallet_address: str, trade_amount: FixedPoint) -> None:
+        # Shorts pay less than the bond amount, so the trade amount bounds the base needed for any trade
+        if self._agent_base[wallet_address] < trade_amount:
+            top_up = max(self.config.agent_base, trade_amount)
+            self._agents[wallet_address].add_funds(base=top_up)
+            self._agent_base[wallet_address] += top_up
+
+    def _check_trade(
+        self,
+        trade: HistoricalTrade,
+        trade_result: TradeResult | None,
+        exception: BaseException | None,
+        result: ReplayResult,
+    ) -> None:
+        if trade_result is None or not trade_result.trade_successful or trade_result.hyperdrive_event is None:
+            if trade_result is not None and trade_result.exception is not None:
+                exception = trade_result.exception
+            result.divergences.append(ReplayDivergence(trade, "The replayed trade failed.", exception=exception))
+            return
+
+        event_args = trade_result.hyperdrive_event.args
+        in_arg, out_arg = _TRADE_AMOUNT_ARGS[trade.event_type]
+        amount_in: FixedPoint = getattr(event_args, in_arg)
+        amount_out: FixedPoint = getattr(event_args, out_arg)
+        self._update_replayed_balances(trade, event_args, amount_in, amount_out)
+
+        if trade.amount_in <= FixedPoint(0) or amount_in <= FixedPoint(0):
+            return
+        historical_rate = trade.amount_out / trade.amount_in
+        replayed_rate = amount_out / amount_in
+        if abs(replayed_rate - historical_rate) > historical_rate * self.config.divergence_tolerance:
+            result.divergences.append(
+                ReplayDivergence(
+                    trade,
+                    "The replayed trade's amount out per amount in differs from the historical trade.",
+                    historical_rate=historical_rate,
+                    replayed_rate=replayed_rate,
+                )
+            )
+
+    def _update_replayed_balances(
+        self, trade: HistoricalTrade, event_args: Any, amount_in: FixedPoint, amount_out: FixedPoint
+    ) -> None:
+        wallet_address = trade.wallet_address
+        maturity_time: int | None = getattr(event_args, "maturity_time", None)
+        if trade.event_type in ("OpenLong", "OpenShort"):
+            assert trade.maturity_time is not None and maturity_time is not None
+            self._maturity_times[(wallet_address, trade.token_type, trade.maturity_time)] = maturity_time
+
+        def _add(token_type: str, token_maturity_time: int | None, delta: FixedPoint) -> None:
+            key = (wallet_address, token_type, token_maturity_time)
+            self._replayed_balances[key] = self._replayed_balances.get(key, FixedPoint(0)) + delta
+
+        match trade.event_type:
+            case "OpenLong" | "AddLiquidity":
+                _add(trade.token_type, maturity_time, amount_out)
+                self._agent_base[wallet_address] -= amount_in
+            case "OpenShort":
+                _add(trade.token_type, maturity_time, amount_in)
+                self._agent_base[wallet_address] -= amount_out
+            case "RemoveLiquidity":
+                _add("LP", None, -amount_in)
+                _add("WITHDRAWAL_SHARE", None, event_args.withdrawal_share_amount)
+                self._agent_base[wallet_address] += amount_out
+            case _:
+                _add(trade.token_type, maturity_time, -amount_in)
+                self._agent_base[wallet_address] += amount_out
+
+
+class _BlockTimestamps:
+    """Looks up the timestamps of increasing block numbers from a sorted stream of block timestamps."""
+
+    def __init__(self, block_timestamps: Iterable[tuple[int, int]]) -> None:
+        self._iter = iter(block_timestamps)
+        self._latest: tuple[int, int] | None = None
+        self._next: tuple[int, int] | None = next(self._iter, None)
+
+    def get(self, block_number: int) -> int:
+        # Blocks missing from the stream use the timestamp of the closest previous block
+        while self._next is not None and self._next[0] <= block_number:
+            self._latest = self._next
+            self._next = next(self._iter, None)
+        if self._latest is not None:
+            return self._latest[1]
+        if self._next is not None:
+            return self._next[1]
+        raise ValueError(f"No block timestamps found for block {block_number}.")
+
+
+def _to_historical_trades(
+    rows: list[dict[str, Any]], historical_balances: dict[tuple[str, str], FixedPoint], result: ReplayResult
+) -> list[HistoricalTrade]:
+    """Convert trade event rows to trades, updating the historical balances of the traders."""
+    trades = []
+    for row in rows:
+        event_type = row["event_type"]
+        token_key = (row["wallet_address"], row["token_id"])
+        balance = historical_balances.get(token_key, FixedPoint(0))
+        token_delta = _to_fixed_point(row["token_delta"])
+        historical_balances[token_key] = balance + token_delta
+        if event_type not in REPLAYED_EVENT_TYPES:
+            result.num_skipped_events += 1
+            continue
+        # Removing liquidity has an extra row for the withdrawal shares the trader received
+        if event_type == "RemoveLiquidity" and row["token_type"] == "WITHDRAWAL_SHARE":
+            continue
+
+        base_delta = _to_fixed_point(row["base_delta"])
+        as_base = row["as_base"]
+        if as_base is not None and not pd.isna(as_base) and not as_base:
+            # Trades in vault shares get replayed in base
+            base_delta = _to_fixed_point(row["vault_share_delta"]) * _to_fixed_point(row["vault_share_price"])
+        amount_in, amount_out = (
+            (abs(base_delta), abs(token_delta))
+            if event_type in _BASE_IN_EVENT_TYPES
+            else (abs(token_delta), abs(base_delta))
+        )
+        trade = HistoricalTrade(
+            block_number=int(row["block_number"]),
+            transaction_hash=row["transaction_hash"],
+            wallet_address=row["wallet_address"],
+            event_type=event_type,
+            token_type=row["token_type"],
+            maturity_time=None if pd.isna(row["maturity_time"]) else int(row["maturity_time"]),
+            amount_in=amount_in,
+            amount_out=amount_out,
+        )
+        if token_delta < FixedPoint(0) and balance > FixedPoint(0):
+            trade.fraction_of_position = min(-token_delta / balance, FixedPoint(1))
+        trades.append(trade)
+    return trades
+
+
+def _to_fixed_point(value: Any) -> FixedPoint:
+    if value is None or pd.isna(value):
+        return FixedPoint(0)
+    return FixedPoint(str(value))
+
+
+def _iter_db_chunks(
+    db_session: Session, schema_obj: type[DBTradeEvent] | type[DBPoolInfo], hyperdrive_address: str, chunk_size: int
+) -> Iterator[pd.DataFrame]:
+    query = (
+        select(schema_obj)
+        .where(schema_obj.hyperdrive_address == hyperdrive_address)
+        .order_by(schema_obj.block_number, schema_obj.id)
+        # We use a server side cursor to avoid loading the whole table into memory
+        .execution_options(stream_results=True, max_row_buffer=chunk_size)
+    )
+    yield from pd.read_sql(query, con=db_session.connection(), coerce_float=False, chunksize=chunk_size)
+
+
+def _iter_block_timestamps(
+    pool_info_chunks: Iterable[pd.DataFrame], hyperdrive_address: str | None
+) -> Iterator[tuple[int, int]]:
+    for chunk in pool_info_chunks:
+        if hyperdrive_address is not None:
+            chunk = chunk[chunk["hyperdrive_address"] == hyperdrive_address]
+        for block_number, epoch_timestamp, timestamp in zip(
+            chunk["block_number"], chunk["epoch_timestamp"], chunk["timestamp"]
+        ):
+            # Older rows don't have the epoch timestamp
+            if pd.isna(epoch_timestamp):
+                epoch_timestamp = pd.Timestamp(timestamp).timestamp()
+            yield int(block_number), int(epoch_timestamp)
+
+
+def _iter_blocks(
+    trade_events: Iterable[pd.DataFrame], hyperdrive_address: str | None
+) -> Iterator[tuple[int, list[dict[str, Any]]]]:
+    """Group streamed trade event rows by block, including blocks that span chunks."""
+    block_number: int | None = None
+    block_rows: list[dict[str, Any]] = []
+    pool_addresses: set[str] = set()
+    for chunk in trade_events:
+        if hyperdrive_address is not None:
+            chunk = chunk[chunk["hyperdrive_address"] == hyperdrive_address]
+        else:
+            pool_addresses.update(chunk["hyperdrive_address"].unique())
+            if len(pool_addresses) > 1:
+                raise ValueError("Trade events contain multiple pools, a hyperdrive address must be provided.")
+        for row in chunk.to_dict("records"):
+            if block_number is not None and row["block_number"] != block_number:
+                yield block_number, block_rows
+                block_rows = []
+            block_number = int(row["block_number"])
+            block_rows.append(row)
+    if block_number is not None and len(block_rows) > 0:
+        yield block_number, block_rows
+
+
+def _split_by_trader(trades: list[HistoricalTrade]) -> list[list[HistoricalTrade]]:
+    """Split the trades of a block such that each trader has at most one trade per block.
+
+    The n-th trade of a trader in the block goes into the n-th block, which keeps the order of each trader's trades.
+    """
+    blocks: list[list[HistoricalTrade]] = []
+    num_trades: dict[str, int] = {}
+    for trade in trades:
+        index = num_trades.get(trade.wallet_address, 0)
+        num_trades[trade.wallet_address] = index + 1
+        if index == len(blocks):
+            blocks.append([])
+        blocks[index].append(trade)
+    return blocks
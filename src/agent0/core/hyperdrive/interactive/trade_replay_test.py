@@ -0,0 +1,126 @@
+"""Tests for replaying historical trades."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fixedpointmath import FixedPoint
+
+from .local_chain import LocalChain
+from .local_hyperdrive import LocalHyperdrive
+from .trade_replay import (
+    HistoricalTrade,
+    ReplayResult,
+    TradeReplay,
+    _BlockTimestamps,
+    _iter_blocks,
+    _split_by_trader,
+    _to_historical_trades,
+)
+
+
+def _trade(wallet_address: str, event_type: str) -> HistoricalTrade:
+    return HistoricalTrade(
+        block_number=1,
+        transaction_hash="0x",
+        wallet_address=wallet_address,
+        event_type=event_type,
+        token_type="LONG",
+        maturity_time=None,
+        amount_in=FixedPoint(1),
+        amount_out=FixedPoint(1),
+    )
+
+
+def test_iter_blocks():
+    """Rows of a block that span chunks are grouped together."""
+    chunks = [
+        pd.DataFrame({"hyperdrive_address": ["0xa", "0xa", "0xb"], "block_number": [1, 2, 2]}),
+        pd.DataFrame({"hyperdrive_address": ["0xa", "0xa"], "block_number": [2, 5]}),
+    ]
+    blocks = [(block_number, len(rows)) for block_number, rows in _iter_blocks(chunks, "0xa")]
+    assert blocks == [(1, 1), (2, 2), (5, 1)]
+    with pytest.raises(ValueError):
+        _ = list(_iter_blocks(chunks, None))
+
+
+def test_split_by_trader():
+    """Each trader has at most one trade per replayed block, in order."""
+    trades = [_trade("0x1", "OpenLong"), _trade("0x2", "OpenLong"), _trade("0x1", "CloseLong")]
+    blocks = _split_by_trader(trades)
+    assert [[trade.event_type for trade in block] for block in blocks] == [["OpenLong", "OpenLong"], ["CloseLong"]]
+    assert blocks[1][0].wallet_address == "0x1"
+
+
+def test_block_timestamps():
+    """Blocks missing from the timestamps use the closest previous block."""
+    timestamps = _BlockTimestamps([(10, 100), (12, 124), (13, 136)])
+    assert timestamps.get(5) == 100
+    assert timestamps.get(11) == 100
+    assert timestamps.get(13) == 136
+    assert timestamps.get(20) == 136
+
+
+def test_historical_trades():
+    """Closing trades replay the historical fraction of the position."""
+    rows = [
+        {
+            "block_number": 1,
+            "transaction_hash": f"0x{i}",
+            "wallet_address": "0x1",
+            "event_type": event_type,
+            "token_type": "LONG",
+            "token_id": "LONG-100",
+            "maturity_time": Decimal(100),
+            "token_delta": Decimal(token_delta),
+            "base_delta": Decimal(base_delta),
+            "vault_share_delta": Decimal(0),
+            "vault_share_price": Decimal(1),
+            "as_base": True,
+        }
+        for i, (event_type, token_delta, base_delta) in enumerate(
+            [("OpenLong", 110, -100), ("CloseLong", -55, 50), ("CloseLong", -55, 49)]
+        )
+    ]
+    trades = _to_historical_trades(rows, {}, ReplayResult())
+    assert trades[0].amount_in == FixedPoint(100)
+    assert trades[0].amount_out == FixedPoint(110)
+    assert trades[1].fraction_of_position == FixedPoint("0.5")
+    assert trades[2].fraction_of_position == FixedPoint(1)
+    assert trades[2].amount_out == FixedPoint(49)
+
+
+@pytest.mark.anvil
+@pytest.mark.docker
+def test_replay_export(fast_chain_fixture: LocalChain, tmp_path: Path):
+    """Trades exported from one pool replay on a fresh pool."""
+    historical_pool = LocalHyperdrive(fast_chain_fixture, LocalHyperdrive.Config())
+    agents = [
+        fast_chain_fixture.init_agent(base=FixedPoint(1_000_000), eth=FixedPoint(10), pool=historical_pool)
+        for _ in range(2)
+    ]
+    open_long = agents[0].open_long(FixedPoint(10_000))
+    agents[1].add_liquidity(FixedPoint(100_000))
+    fast_chain_fixture.advance_time(timedelta(hours=5))
+    open_short = agents[1].open_short(FixedPoint(5_000))
+    agents[0].close_long(open_long.args.maturity_time, open_long.args.bond_amount / FixedPoint(2))
+    fast_chain_fixture.advance_time(timedelta(hours=3))
+    agents[1].close_short(open_short.args.maturity_time, open_short.args.bond_amount)
+    agents[1].remove_liquidity(agents[1].get_wallet().lp_tokens)
+    fast_chain_fixture.dump_db(tmp_path)
+
+    replay_pool = LocalHyperdrive(fast_chain_fixture, LocalHyperdrive.Config())
+    trade_replay = TradeReplay(replay_pool)
+    result = trade_replay.replay_export(tmp_path, historical_pool.hyperdrive_address)
+    assert result.num_trades == 6
+    assert result.num_mined_blocks == 6
+    assert not any(divergence.exception is not None for divergence in result.divergences)
+
+    replayed_longs = trade_replay.agents[agents[0].address].get_longs(pool=replay_pool)
+    assert len(replayed_longs) == 1
+    # Half of the replayed long remains open
+    assert float(replayed_longs[0].balance) == pytest.approx(float(open_long.args.bond_amount) / 2, rel=0.01)
@@ -0,0 +1,248 @@
+"""An in-memory ledger of an agent's wallet, updated from the agent's trade events."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from fixedpointmath import FixedPoint
+from hexbytes import HexBytes
+from hyperdrivetypes import (
+    AddLiquidityEventFP,
+    BaseEvent,
+    CloseLongEventFP,
+    CloseShortEventFP,
+    OpenLongEventFP,
+    OpenShortEventFP,
+    RedeemWithdrawalSharesEventFP,
+    RemoveLiquidityEventFP,
+)
+
+from agent0.chainsync.db.hyperdrive import get_event_logs_for_db
+from agent0.core.base import Quantity, TokenType
+from agent0.core.hyperdrive.agent import HyperdriveWallet
+from agent0.core.hyperdrive.agent.hyperdrive_wallet import Long, Short
+from agent0.ethpy.hyperdrive import AssetIdPrefix, decode_asset_id, encode_asset_id
+
+if TYPE_CHECKING:
+    from agent0.ethpy.hyperdrive import HyperdriveReadInterface
+
+LP_ASSET_ID = encode_asset_id(AssetIdPrefix.LP, 0)
+WITHDRAWAL_SHARE_ASSET_ID = encode_asset_id(AssetIdPrefix.WITHDRAWAL_SHARE, 0)
+
+
+@dataclass
+class _PoolLedger:
+    """The ledger of a wallet for a single pool."""
+
+    asset_balances: dict[int, FixedPoint] = field(default_factory=dict)
+    """The balance of each hyperdrive token held by the wallet, keyed by asset id."""
+    base_balance: FixedPoint | None = None
+    """The base balance of the wallet. None if it needs to be read from the chain."""
+    last_scanned_block: int | None = None
+    """The latest block scanned for token transfers of this wallet."""
+    reads_since_reconcile: int = 0
+    """The number of wallet reads since the last reconciliation with the chain."""
+
+
+class WalletLedger:
+    """Keeps track of an agent's wallet in memory, so reading the wallet doesn't need to query the chain or the db.
+
+    The ledger of a pool is built from the chain the first time the wallet of that pool is read,
+    and is updated directly from the events of the agent's trades afterwards. Since the wallet can
+    also change outside of the agent's trades (e.g., transfers, or minting base), the ledger gets
+    reconciled with the chain every `reconcile_interval` reads, or when invalidated.
+    """
+
+    def __init__(self, address: str, reconcile_interval: int | None = None) -> None:
+        """Initialize the ledger.
+
+        Arguments
+        ---------
+        address: str
+            The address of the wallet.
+        reconcile_interval: int | None, optional
+            The number of wallet reads between reconciling the ledger with the chain.
+            Defaults to only reconciling when the ledger gets invalidated.
+        """
+        self.address = address
+        self.reconcile_interval = reconcile_interval
+        self._pool_ledgers: dict[str, _PoolLedger] = {}
+
+    def get_wallet(self, interface: HyperdriveReadInterface) -> HyperdriveWallet:
+        """Get the wallet for a pool from the ledger.
+
+        Arguments
+        ---------
+        interface: HyperdriveReadInterface
+            The interface of the pool to get the wallet for.
+
+        Returns
+        -------
+        HyperdriveWallet
+            The wallet of the pool.
+        """
+        pool_ledger = self._pool_ledgers.get(interface.hyperdrive_address)
+        if pool_ledger is None or (
+            self.reconcile_interval is not None and pool_ledger.reads_since_reconcile >= self.reconcile_interval
+        ):
+            pool_ledger = self.reconcile(interface)
+        elif pool_ledger.base_balance is None:
+            pool_ledger = self.reconcile(interface, base_only=True)
+        assert pool_ledger.base_balance is not None
+        pool_ledger.reads_since_reconcile += 1
+
+        # We build new objects every time to avoid the caller changing the ledger
+        longs: dict[int, Long] = {}
+        shorts: dict[int, Short] = {}
+        for asset_id, balance in pool_ledger.asset_balances.items():
+            prefix, maturity_time = decode_asset_id(asset_id)
+            if prefix == AssetIdPrefix.LONG:
+                longs[maturity_time] = Long(balance=balance, maturity_time=maturity_time)
+            elif prefix == AssetIdPrefix.SHORT:
+                shorts[maturity_time] = Short(balance=balance, maturity_time=maturity_time)
+
+        return HyperdriveWallet(
+            address=HexBytes(self.address),
+            balance=Quantity(amount=pool_ledger.base_balance, unit=TokenType.BASE),
+            lp_tokens=pool_ledger.asset_balances.get(LP_ASSET_ID, FixedPoint(0)),
+            withdraw_shares=pool_ledger.asset_balances.get(WITHDRAWAL_SHARE_ASSET_ID, FixedPoint(0)),
+            longs=longs,
+            shorts=shorts,
+        )
+
+    def apply_event(self, interface: HyperdriveReadInterface, event: BaseEvent) -> None:
+        """Update the ledger of a pool with the event of a trade made by this wallet.
+
+        Arguments
+        ---------
+        interface: HyperdriveReadInterface
+            The interface of the pool the trade was made on.
+        event: BaseEvent
+            The emitted event of the trade.
+        """
+        pool_ledger = self._pool_ledgers.get(interface.hyperdrive_address)
+        # The ledger gets built from the chain on the next read, which includes this trade
+        if pool_ledger is None:
+            return
+
+        # Base deltas are in units of base only if the trade was made with base.
+        # Base deltas from steth pools are in units of lido shares, so we read the balance from the chain instead.
+        track_base = (
+            pool_ledger.base_balance is not None
+            and interface.hyperdrive_kind != interface.HyperdriveKind.STETH
+            and getattr(event.args, "as_base", False)
+        )
+        base_delta = FixedPoint(0)
+        match event:
+            case OpenLongEventFP() | OpenShortEventFP():
+                self._add_asset_delta(pool_ledger, event.args.asset_id, event.args.bond_amount)
+                base_delta = -event.args.amount
+            case CloseLongEventFP() | CloseShortEventFP():
+                self._add_asset_delta(pool_ledger, event.args.asset_id, -event.args.bond_amount)
+                base_delta = event.args.amount
+                track_base = track_base and event.args.destination == self.address
+            case AddLiquidityEventFP():
+                self._add_asset_delta(pool_ledger, LP_ASSET_ID, event.args.lp_amount)
+                base_delta = -event.args.amount
+            case RemoveLiquidityEventFP():
+                self._add_asset_delta(pool_ledger, LP_ASSET_ID, -event.args.lp_amount)
+                self._add_asset_delta(pool_ledger, WITHDRAWAL_SHARE_ASSET_ID, event.args.withdrawal_share_amount)
+                base_delta = event.args.amount
+                track_base = track_base and event.args.destination == self.address
+            case RedeemWithdrawalSharesEventFP():
+                self._add_asset_delta(pool_ledger, WITHDRAWAL_SHARE_ASSET_ID, -event.args.withdrawal_share_amount)
+                base_delta = event.args.amount
+                track_base = track_base and event.args.destination == self.address
+            case _:
+                # Unknown events invalidate the ledger
+                self.invalidate(interface.hyperdrive_address)
+                return
+
+        if track_base:
+            assert pool_ledger.base_balance is not None
+            pool_ledger.base_balance += base_delta
+        else:
+            pool_ledger.base_balance = None
+
+    def invalidate(self, hyperdrive_address: str | None = None, base_only: bool = False) -> None:
+        """Invalidate the ledger, resulting in the ledger being reconciled with the chain on the next read.
+
+        Arguments
+        ---------
+        hyperdrive_address: str | None, optional
+            The pool to invalidate the ledger of. Defaults to invalidating all pools.
+        base_only: bool, optional
+            If True, will only read the base balance from the chain on the next read. Defaults to False.
+        """
+        if hyperdrive_address is None:
+            hyperdrive_addresses = list(self._pool_ledgers.keys())
+        else:
+            hyperdrive_addresses = [hyperdrive_address]
+        for address in hyperdrive_addresses:
+            if address not in self._pool_ledgers:
+                continue
+            if base_only:
+                self._pool_ledgers[address].base_balance = None
+            else:
+                del self._pool_ledgers[address]
+
+    def reconcile(self, interface: HyperdriveReadInterface, base_only: bool = False) -> _PoolLedger:
+        """Reconcile the ledger of a pool with the chain.
+
+        New positions are found by scanning the token transfers of this wallet since the last scanned block,
+        and balances of all positions are read from the chain.
+
+        Arguments
+        ---------
+        interface: HyperdriveReadInterface
+            The interface of the pool to reconcile.
+        base_only: bool, optional
+            If True, will only read the base balance from the chain. Ignored if the ledger of the pool
+            hasn't been built yet. Defaults to False.
+
+        Returns
+        -------
+        _PoolLedger
+            The reconciled ledger of the pool.
+        """
+        pool_ledger = self._pool_ledgers.setdefault(interface.hyperdrive_address, _PoolLedger())
+
+        if not base_only or pool_ledger.last_scanned_block is None:
+            current_block = interface.get_block_number(interface.get_current_block())
+            from_block = None if pool_ledger.last_scanned_block is None else pool_ledger.last_scanned_block + 1
+            asset_ids = set(pool_ledger.asset_balances.keys())
+            for argument_filters in ({"to": self.address}, {"from": self.address}):
+                transfer_events = get_event_logs_for_db(
+                    interface,
+                    interface.hyperdrive_contract.events.TransferSingle,
+                    trade_base_unit_conversion=False,
+                    from_block=from_block,
+                    argument_filters=argument_filters,
+                    numeric_args_as_str=False,
+                )
+                asset_ids.update(int(event["args"]["id"]) for event in transfer_events)
+
+            asset_balances = {}
+            for asset_id in asset_ids:
+                balance = FixedPoint(
+                    scaled_value=interface.hyperdrive_contract.functions.balanceOf(asset_id, self.address).call()
+                )
+                if balance > FixedPoint(0):
+                    asset_balances[asset_id] = balance
+            pool_ledger.asset_balances = asset_balances
+            pool_ledger.last_scanned_block = current_block
+            pool_ledger.reads_since_reconcile = 0
+
+        pool_ledger.base_balance = FixedPoint(
+            scaled_value=interface.base_token_contract.functions.balanceOf(self.address).call()
+        )
+        return pool_ledger
+
+    @staticmethod
+    def _add_asset_delta(pool_ledger: _PoolLedger, asset_id: int, delta: FixedPoint) -> None:
+        balance = pool_ledger.asset_balances.get(asset_id, FixedPoint(0)) + delta
+        if balance > FixedPoint(0):
+            pool_ledger.asset_balances[asset_id] = balance
+        else:
+            pool_ledger.asset_balances.pop(asset_id, None)
@@ -1,4 +1,5 @@
 """Policies for expert system trading bots."""
 
 from .hyperdrive_policy import HyperdriveBasePolicy
+from .policy_context import PolicyContext, PolicyContextCache
 from .zoo import PolicyZoo
@@ -12,8 +12,10 @@ from agent0.core.hyperdrive.agent import HyperdriveWallet, close_long_trade, clo
 from agent0.ethpy.hyperdrive import HyperdriveReadInterface
 from agent0.ethpy.hyperdrive.state import PoolState
 
+from .policy_context import PolicyContext
+
 if TYPE_CHECKING:
-    from agent0.core.hyperdrive import HyperdriveMarketAction, TradeResult
+    from agent0.core.hyperdrive import HyperdriveMarketAction, TradeResultView
 
 
 class HyperdriveBasePolicy(BasePolicy[HyperdriveReadInterface, HyperdriveWallet]):
@@ -53,7 +55,10 @@ class HyperdriveBasePolicy(BasePolicy[HyperdriveReadInterface, HyperdriveWallet]
     def action(
         self, interface: HyperdriveReadInterface, wallet: HyperdriveWallet
     ) -> tuple[list[Trade[HyperdriveMarketAction]], bool]:
-        """Return an empty list, indicating no action.
+        """Specify actions.
+
+        Policies implement either this or `action_with_context`. By default, this builds the context for the
+        current block and calls `action_with_context`.
 
         Arguments
         ---------
@@ -62,6 +67,24 @@ class HyperdriveBasePolicy(BasePolicy[HyperdriveReadInterface, HyperdriveWallet]
         wallet: HyperdriveWallet
             The agent's wallet.
 
+        Returns
+        -------
+        tuple[list[MarketAction], bool]
+            A tuple where the first element is a list of actions,
+            and the second element defines if the agent is done trading.
+        """
+        return self.action_with_context(PolicyContext.build(interface, wallet))
+
+    def action_with_context(self, context: PolicyContext) -> tuple[list[Trade[HyperdriveMarketAction]], bool]:
+        """Specify actions from the pool state, block, and wallet of a tick.
+
+        Policies implement either this or `action`.
+
+        Arguments
+        ---------
+        context: PolicyContext
+            The pool state, block, and wallet to act on, with memoized values derived from the pool state.
+
         Returns
         -------
         tuple[list[MarketAction], bool]
@@ -70,7 +93,25 @@ class HyperdriveBasePolicy(BasePolicy[HyperdriveReadInterface, HyperdriveWallet]
         """
         raise NotImplementedError
 
-    def post_action(self, interface: HyperdriveReadInterface, trade_results: list[TradeResult]) -> None:
+    def acts_on_context(self) -> bool:
+        """Check if the policy's most derived action implementation is `action_with_context`.
+
+        This is False for policies that implement `action`, including subclasses that override `action`
+        of a policy that implements `action_with_context`.
+
+        Returns
+        -------
+        bool
+            True if the policy's actions should be specified with `action_with_context`, False for `action`.
+        """
+        for cls in type(self).__mro__:
+            if "action_with_context" in vars(cls):
+                return True
+            if "action" in vars(cls):
+                return False
+        return False
+
+    def post_action(self, interface: HyperdriveReadInterface, trade_results: list[TradeResultView]) -> None:
         """Execute any behavior after after the actions specified by the `action` function have been executed.
 
         This allows the policy to e.g., do additional bookkeeping based on the results of the executed actions.
@@ -79,10 +120,10 @@ class HyperdriveBasePolicy(BasePolicy[HyperdriveReadInterface, HyperdriveWallet]
         ---------
         interface: MarketInterface
             The trading market interface.
-        trade_results: list[HyperdriveTradeResult]
-            A list of HyperdriveTradeResult objects, one for each trade made by the agent.
+        trade_results: list[TradeResultView]
+            A list of read-only TradeResultView objects, one for each trade made by the agent.
             The order of the list matches the original order of `agent.action`.
-            HyperdriveTradeResult contains any information about the trade,
+            TradeResultView contains any information about the trade,
             as well as any errors that the trade resulted in.
         """
         # Default post action is noop
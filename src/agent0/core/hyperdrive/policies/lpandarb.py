@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import logging
-from copy import deepcopy
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
@@ -18,6 +17,7 @@ from agent0.core.hyperdrive.agent import (
     open_short_trade,
 )
 from agent0.core.hyperdrive.utilities.predict import predict_long, predict_short
+from agent0.core.hyperdrive.utilities.target_rate import calc_trade_for_target_rate
 from agent0.ethpy.hyperdrive.state import PoolState
 
 from .hyperdrive_policy import HyperdriveBasePolicy
@@ -26,6 +26,8 @@ if TYPE_CHECKING:
     from agent0.core.hyperdrive import HyperdriveMarketAction, HyperdriveWallet
     from agent0.ethpy.hyperdrive import HyperdriveReadInterface
 
+    from .policy_context import PolicyContext
+
 # constants
 TOLERANCE = 1e-18
 MAX_ITER = 50
@@ -48,6 +50,7 @@ def arb_fixed_rate_down(
     slippage_tolerance: FixedPoint | None = None,
     base_fee_multiple: float | None = None,
     priority_fee_multiple: float | None = None,
+    variable_rate: FixedPoint | None = None,
 ) -> list[Trade[HyperdriveMarketAction]]:
     """Return an action list for arbitraging the fixed rate down to the variable rate.
 
@@ -69,6 +72,8 @@ def arb_fixed_rate_down(
         The base fee multiple for transactions. Defaults to None.
     priority_fee_multiple: float | None, optional
         The priority fee multiple for transactions. Defaults to None.
+    variable_rate: FixedPoint | None, optional
+        The variable rate to arbitrage the fixed rate to. Defaults to getting the yield source's rate.
 
     Returns
     -------
@@ -77,7 +82,8 @@ def arb_fixed_rate_down(
     """
     action_list = []
 
-    variable_rate = interface.get_variable_rate()
+    if variable_rate is None:
+        variable_rate = interface.get_variable_rate()
     # Variable rate can be None if underlying yield doesn't have a `getRate` function
     if variable_rate is None:
         variable_rate = interface.get_standardized_variable_rate()
@@ -133,6 +139,7 @@ def arb_fixed_rate_up(
     slippage_tolerance: FixedPoint | None = None,
     base_fee_multiple: float | None = None,
     priority_fee_multiple: float | None = None,
+    variable_rate: FixedPoint | None = None,
 ) -> list[Trade[HyperdriveMarketAction]]:
     """Return an action list for arbitraging the fixed rate up to the variable rate.
 
@@ -154,6 +161,8 @@ def arb_fixed_rate_up(
         The base fee multiple for transactions. Defaults to None.
     priority_fee_multiple: float | None, optional
         The priority fee multiple for transactions. Defaults to None.
+    variable_rate: FixedPoint | None, optional
+        The variable rate to arbitrage the fixed rate to. Defaults to getting the yield source's rate.
 
     Returns
     -------
@@ -162,7 +171,8 @@ def arb_fixed_rate_up(
     """
     action_list = []
 
-    variable_rate = interface.get_variable_rate()
+    if variable_rate is None:
+        variable_rate = interface.get_variable_rate()
     # Variable rate can be None if underlying yield doesn't have a `getRate` function
     if variable_rate is None:
         variable_rate = interface.get_standardized_variable_rate()
@@ -304,6 +314,54 @@ def calc_reserves_to_hit_target_rate(
 ) -> tuple[FixedPoint, FixedPoint]:
     """Calculate the bonds and shares needed to hit the target fixed rate.
 
+    This solves for the trade on the YieldSpace curve directly, see
+    :func:`~agent0.core.hyperdrive.utilities.target_rate.calc_trade_for_target_rate`.
+    The bonds are the trade amount that the arbitrage functions consume, excluding fees.
+
+    Arguments
+    ---------
+    interface: HyperdriveReadInterface
+        The Hyperdrive API interface object.
+    pool_state: PoolState
+        The current pool state.
+    target_rate: FixedPoint
+        The target rate the pool will have after the calculated change in bonds and shares.
+    min_trade_amount_bonds: FixedPoint
+        The minimum amount of bonds needed to open a trade.
+
+    Returns
+    -------
+    tuple[FixedPoint, FixedPoint]
+        total_shares_needed: FixedPoint
+            Total amount of shares needed to be added into the pool to hit the target rate.
+        total_bonds_needed: FixedPoint
+            Total amount of bonds the trade moves into the pool along the curve to hit the target rate.
+            Positive amounts are the bonds of a short, and negative amounts are the bonds bought by a long.
+    """
+    # The interface is kept so this is interchangeable with the iterative solver
+    # pylint: disable=unused-argument
+    total_shares_needed, total_bonds_needed = calc_trade_for_target_rate(
+        pool_state, target_rate, min_trade_amount_bonds
+    )
+    logging.info(
+        "Targeting %.2f: d_bonds=%s d_shares=%s",
+        float(target_rate),
+        format(float(total_bonds_needed), "27,.18f"),
+        format(float(total_shares_needed), "27,.18f"),
+    )
+    return total_shares_needed, total_bonds_needed
+
+
+def calc_reserves_to_hit_target_rate_iteratively(
+    interface: HyperdriveReadInterface,
+    pool_state: PoolState,
+    target_rate: FixedPoint,
+    min_trade_amount_bonds: FixedPoint,
+) -> tuple[FixedPoint, FixedPoint]:
+    """Calculate the bonds and shares needed to hit the target fixed rate by iteratively predicting trades.
+
+    This is much slower than `calc_reserves_to_hit_target_rate`, and is kept as a reference to compare against.
+
     Arguments
     ---------
     interface: HyperdriveReadInterface
@@ -324,7 +382,7 @@ def calc_reserves_to_hit_target_rate(
             Total amount of bonds needed to be added into the pool to hit the target rate.
     """
     predicted_rate = FixedPoint(0)
-    temp_pool_state = deepcopy(pool_state)
+    temp_pool_state = pool_state
     iteration = 0
     total_shares_needed = FixedPoint(0)
     total_bonds_needed = FixedPoint(0)
@@ -337,9 +395,8 @@ def calc_reserves_to_hit_target_rate(
             interface, temp_pool_state, target_rate, min_trade_amount_bonds
         )
         # get the fixed rate for an updated pool state, without storing the state variable
-        # TODO: This deepcopy is slow. https://github.com/delvtech/agent0/issues/1355
         predicted_rate = interface.calc_spot_rate(
-            apply_step_to_pool_state(deepcopy(temp_pool_state), bonds_needed, shares_needed)
+            apply_step_to_pool_state(temp_pool_state, bonds_needed, shares_needed)
         )
         # adjust guess up or down based on how much the first guess overshot or undershot
         overshoot_or_undershoot = FixedPoint(0)
@@ -400,13 +457,9 @@ def apply_step_to_pool_state(
     delta_bonds: FixedPoint,
     delta_shares: FixedPoint,
 ) -> PoolState:
-    """Save a single convergence step into the pool info.
+    """Derive the pool state after a single convergence step.
 
-    .. todo::
-        This function updates the pool_state argument _and_ returns it.
-        This is a bad pattern because it obscures that the input argument is modified in-place.
-        We should either always return a new instance (either via deepcopy or constructing from scratch)
-        or always modify the provided variable in-place.
+    The pool state argument isn't modified; the returned state shares everything but the pool info with it.
 
     Arguments
     ---------
@@ -425,9 +478,10 @@ def apply_step_to_pool_state(
     new_share_reserves, new_bond_reserves = apply_step_to_reserves(
         pool_state.pool_info.share_reserves, delta_shares, pool_state.pool_info.bond_reserves, delta_bonds
     )
-    setattr(pool_state.pool_info, "share_reserves", new_share_reserves)
-    setattr(pool_state.pool_info, "bond_reserves", new_bond_reserves)
-    return pool_state
+    return pool_state.with_pool_info_deltas(
+        share_reserves=new_share_reserves - pool_state.pool_info.share_reserves,
+        bond_reserves=new_bond_reserves - pool_state.pool_info.bond_reserves,
+    )
 
 
 # TODO this should maybe subclass from arbitrage policy, but perhaps making it swappable
@@ -493,17 +547,13 @@ class LPandArb(HyperdriveBasePolicy):
         self.min_trade_amount_bonds = policy_config.min_trade_amount_bonds
         super().__init__(policy_config)
 
-    def action(
-        self, interface: HyperdriveReadInterface, wallet: HyperdriveWallet
-    ) -> tuple[list[Trade[HyperdriveMarketAction]], bool]:
+    def action_with_context(self, context: PolicyContext) -> tuple[list[Trade[HyperdriveMarketAction]], bool]:
         """Specify actions.
 
         Arguments
         ---------
-        interface: HyperdriveReadInterface
-            Interface for the market on which this agent will be executing trades (MarketActions).
-        wallet: HyperdriveWallet
-            The agent's wallet.
+        context: PolicyContext
+            The pool state, block, and wallet to act on.
 
         Returns
         -------
@@ -513,9 +563,11 @@ class LPandArb(HyperdriveBasePolicy):
         """
         action_list = []
 
-        # compute these once to avoid race conditions
-        current_pool_state = interface.current_pool_state
-        current_fixed_rate = interface.calc_spot_rate(current_pool_state)
+        # the context pins these to one block to avoid race conditions
+        interface = context.interface
+        wallet = context.wallet
+        current_pool_state = context.pool_state
+        current_fixed_rate = context.spot_rate
 
         # close matured positions
         self.close_matured_positions(wallet, current_pool_state, self.min_trade_amount_bonds)
@@ -536,10 +588,7 @@ class LPandArb(HyperdriveBasePolicy):
             )
             max_trade_amount_base -= lp_amount
 
-        variable_rate = interface.get_variable_rate()
-        # Variable rate can be None if underlying yield doesn't have a `getRate` function
-        if variable_rate is None:
-            variable_rate = interface.get_standardized_variable_rate()
+        variable_rate = context.variable_rate
 
         # arbitrage from here on out
         # check for a high fixed rate
@@ -554,6 +603,7 @@ class LPandArb(HyperdriveBasePolicy):
                     self.slippage_tolerance,
                     self.config.base_fee_multiple,
                     self.config.priority_fee_multiple,
+                    variable_rate,
                 )
             )
 
@@ -569,6 +619,7 @@ class LPandArb(HyperdriveBasePolicy):
                     self.slippage_tolerance,
                     self.config.base_fee_multiple,
                     self.config.priority_fee_multiple,
+                    variable_rate,
                 )
             )
 
@@ -8,9 +8,11 @@ import pytest
 from fixedpointmath import FixedPoint
 from hyperdrivetypes import AddLiquidityEventFP, CloseLongEventFP, CloseShortEventFP, OpenLongEventFP, OpenShortEventFP
 
+from agent0.core.hyperdrive import HyperdriveActionType
 from agent0.core.hyperdrive.interactive import LocalChain, LocalHyperdrive
 from agent0.core.hyperdrive.interactive.local_hyperdrive_agent import LocalHyperdriveAgent
 from agent0.core.hyperdrive.policies import PolicyZoo
+from agent0.core.hyperdrive.policies.lpandarb import arb_fixed_rate_down, arb_fixed_rate_up
 
 # avoid unnecessary warning from using fixtures defined in outer scope
 # pylint: disable=redefined-outer-name
@@ -169,6 +171,34 @@ def test_open_short(
     assert abs_diff < PRECISION
 
 
+@pytest.mark.anvil
+@pytest.mark.parametrize("target_rate", [FixedPoint("0.02"), FixedPoint("0.08")])
+def test_arb_hits_target_rate(
+    interactive_hyperdrive: LocalHyperdrive, manual_agent: LocalHyperdriveAgent, target_rate: FixedPoint
+):
+    """Executing the trades from the arbitrage functions moves the fixed rate to the target rate."""
+    interface = interactive_hyperdrive.interface
+    pool_state = interface.current_pool_state
+    arb_fixed_rate = arb_fixed_rate_up if target_rate > interface.calc_spot_rate(pool_state) else arb_fixed_rate_down
+    trades = arb_fixed_rate(
+        interface,
+        pool_state,
+        manual_agent.get_wallet(),
+        max_trade_amount_base=FixedPoint(1e9),
+        min_trade_amount_bonds=interface.pool_config.minimum_transaction_amount,
+        variable_rate=target_rate,
+    )
+    assert len(trades) == 1
+    market_action = trades[0].market_action
+    if market_action.action_type == HyperdriveActionType.OPEN_LONG:
+        manual_agent.open_long(base=market_action.trade_amount)
+    else:
+        assert market_action.action_type == HyperdriveActionType.OPEN_SHORT
+        manual_agent.open_short(bonds=market_action.trade_amount)
+    # The vault share price accrues interest between blocks, so the rate is only close to the target
+    assert float(interface.calc_spot_rate()) == pytest.approx(float(target_rate), abs=1e-6)
+
+
 # pylint: disable=too-many-locals
 @pytest.mark.anvil
 @pytest.mark.parametrize("trade_amount", [0.003, 10])
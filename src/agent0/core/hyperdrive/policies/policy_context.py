@@ -0,0 +1,229 @@
+"""An immutable view of the pool and the agent's wallet that policies act on."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Callable, Hashable, TypeVar
+from weakref import WeakKeyDictionary
+
+from fixedpointmath import FixedPoint
+
+if TYPE_CHECKING:
+    from web3.types import BlockData
+
+    from agent0.core.hyperdrive.agent import HyperdriveWallet
+    from agent0.ethpy.hyperdrive import HyperdriveReadInterface
+    from agent0.ethpy.hyperdrive.state import PoolState
+    from agent0.ethpy.hyperdrive.state.pool_state import PoolConfigFP, PoolInfoFP
+
+T = TypeVar("T")
+
+
+class PolicyContextCache:
+    """Memoized values derived from a pool state, shared by the contexts of all agents on the same block."""
+
+    def __init__(self) -> None:
+        """Initialize an empty cache."""
+        self._values: dict[Hashable, object] = {}
+        self.hits = 0
+        """The number of lookups that were served from the cache."""
+        self.misses = 0
+        """The number of lookups that had to compute the value."""
+
+    def get(self, key: Hashable, compute: Callable[[], T]) -> T:
+        """Get a memoized value, computing it on the first lookup.
+
+        Values aren't memoized if computing them raises.
+
+        Arguments
+        ---------
+        key: Hashable
+            The key of the value.
+        compute: Callable[[], T]
+            Computes the value if it isn't memoized yet.
+
+        Returns
+        -------
+        T
+            The value.
+        """
+        if key in self._values:
+            self.hits += 1
+            return self._values[key]  # type: ignore
+        self.misses += 1
+        value = compute()
+        self._values[key] = value
+        return value
+
+
+# The latest pool state and cache per interface, so contexts built for the same block share one cache
+_LATEST_CACHES: WeakKeyDictionary[HyperdriveReadInterface, tuple[PoolState, PolicyContextCache]] = WeakKeyDictionary()
+
+
+@dataclass(frozen=True)
+class PolicyContext:
+    """The pool state, block, and wallet a policy acts on for one tick.
+
+    Quantities derived from the pool state, e.g., the spot rate or the max long, are computed on first use and
+    memoized. Contexts built from the same interface on the same block share their memoized values, so agents
+    acting on the same block don't repeat RPCs or math.
+
+    .. note::
+        The pool state is shared between contexts and must not be modified. Derive hypothetical states with
+        `PoolState.with_pool_info_deltas` instead.
+    """
+
+    interface: HyperdriveReadInterface
+    """The interface to the pool."""
+    pool_state: PoolState
+    """The state of the pool at the context's block."""
+    wallet: HyperdriveWallet
+    """The agent's wallet."""
+    cache: PolicyContextCache = field(default_factory=PolicyContextCache, repr=False, compare=False)
+    """The memoized values derived from the pool state."""
+
+    @classmethod
+    def build(
+        cls, interface: HyperdriveReadInterface, wallet: HyperdriveWallet, pool_state: PoolState | None = None
+    ) -> PolicyContext:
+        """Build the context for the current block.
+
+        Arguments
+        ---------
+        interface: HyperdriveReadInterface
+            The interface to the pool.
+        wallet: HyperdriveWallet
+            The agent's wallet.
+        pool_state: PoolState | None, optional
+            The state of the pool. Defaults to the interface's current pool state.
+
+        Returns
+        -------
+        PolicyContext
+            The context, sharing memoized values with other contexts of the same pool state.
+        """
+        if pool_state is None:
+            pool_state = interface.current_pool_state
+        latest = _LATEST_CACHES.get(interface)
+        if latest is not None and latest[0] is pool_state:
+            cache = latest[1]
+        else:
+            cache = PolicyContextCache()
+            _LATEST_CACHES[interface] = (pool_state, cache)
+        return cls(interface=interface, pool_state=pool_state, wallet=wallet, cache=cache)
+
+    def with_wallet(self, wallet: HyperdriveWallet) -> PolicyContext:
+        """Get the context of another agent on the same block, sharing the memoized values.
+
+        Arguments
+        ---------
+        wallet: HyperdriveWallet
+            The other agent's wallet.
+
+        Returns
+        -------
+        PolicyContext
+            The context with the wallet replaced.
+        """
+        return replace(self, wallet=wallet)
+
+    @property
+    def block(self) -> BlockData:
+        """The block of the context."""
+        return self.pool_state.block
+
+    @property
+    def block_number(self) -> int:
+        """The block number of the context."""
+        return self.pool_state.block_number
+
+    @property
+    def block_time(self) -> int:
+        """The block timestamp of the context."""
+        return self.pool_state.block_time
+
+    @property
+    def pool_config(self) -> PoolConfigFP:
+        """The pool config."""
+        return self.pool_state.pool_config
+
+    @property
+    def pool_info(self) -> PoolInfoFP:
+        """The pool info at the context's block."""
+        return self.pool_state.pool_info
+
+    @property
+    def cache_hits(self) -> int:
+        """The number of memoized lookups served from the shared cache."""
+        return self.cache.hits
+
+    @property
+    def cache_misses(self) -> int:
+        """The number of memoized lookups that computed their value."""
+        return self.cache.misses
+
+    @property
+    def spot_price(self) -> FixedPoint:
+        """The spot price of the pool."""
+        return self.cache.get("spot_price", lambda: self.interface.calc_spot_price(self.pool_state))
+
+    @property
+    def spot_rate(self) -> FixedPoint:
+        """The spot fixed rate of the pool."""
+        return self.cache.get("spot_rate", lambda: self.interface.calc_spot_rate(self.pool_state))
+
+    @property
+    def variable_rate(self) -> FixedPoint:
+        """The variable rate of the yield source.
+
+        Uses the standardized variable rate from the vault share prices of checkpoints if the
+        yield source doesn't have a `getRate` function.
+        """
+
+        def _variable_rate() -> FixedPoint:
+            variable_rate = self.interface.get_variable_rate(self.block_number)
+            if variable_rate is None:
+                variable_rate = self.interface.get_standardized_variable_rate()
+            return variable_rate
+
+        return self.cache.get("variable_rate", _variable_rate)
+
+    @property
+    def minimum_transaction_amount(self) -> FixedPoint:
+        """The minimum amount of a trade paid in the pool's deposit token, i.e., vault shares if base is yield."""
+        if not self.interface.base_is_yield:
+            return self.pool_config.minimum_transaction_amount
+        return self.cache.get(
+            "minimum_transaction_amount_shares",
+            lambda: self.interface.get_minimum_transaction_amount_shares(self.block_number),
+        )
+
+    def calc_max_long(self, budget: FixedPoint) -> FixedPoint:
+        """Calculate the maximum long the pool allows for a budget.
+
+        Arguments
+        ---------
+        budget: FixedPoint
+            The maximum amount of base to spend.
+
+        Returns
+        -------
+        FixedPoint
+            The maximum amount of base for the long.
+        """
+        return self.cache.get(("max_long", budget), lambda: self.interface.calc_max_long(budget, self.pool_state))
+
+    def calc_max_short(self, budget: FixedPoint) -> FixedPoint:
+        """Calculate the maximum short the pool allows for a budget.
+
+        Arguments
+        ---------
+        budget: FixedPoint
+            The maximum amount of base to spend.
+
+        Returns
+        -------
+        FixedPoint
+            The maximum amount of bonds for the short.
+        """
+        return self.cache.get(("max_short", budget), lambda: self.interface.calc_max_short(budget, self.pool_state))
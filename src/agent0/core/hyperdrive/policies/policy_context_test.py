@@ -0,0 +1,127 @@
+"""Tests for the policy context."""
+
+from __future__ import annotations
+
+from dataclasses import FrozenInstanceError
+from types import SimpleNamespace
+
+import pytest
+from fixedpointmath import FixedPoint
+
+from agent0.core.hyperdrive.agent import HyperdriveActionType
+from agent0.core.hyperdrive.interactive.exec.execute_agent_trades import get_trades
+
+from .hyperdrive_policy import HyperdriveBasePolicy
+from .policy_context import PolicyContext
+from .random import Random
+
+# pylint: disable=missing-class-docstring, missing-function-docstring
+
+
+class _FakeInterface:
+    """Counts the calls policies make to the interface."""
+
+    def __init__(self) -> None:
+        self.current_pool_state = SimpleNamespace(block_number=1, block_time=12)
+        self.num_calls = 0
+
+    def calc_spot_rate(self, pool_state) -> FixedPoint:
+        assert pool_state is self.current_pool_state
+        self.num_calls += 1
+        return FixedPoint("0.05")
+
+    def calc_max_long(self, budget: FixedPoint, pool_state) -> FixedPoint:
+        assert pool_state is self.current_pool_state
+        self.num_calls += 1
+        if budget <= FixedPoint(0):
+            raise ValueError("budget must be positive")
+        return budget / FixedPoint(2)
+
+
+def test_shared_memo():
+    """Contexts built on the same block share their memoized values."""
+    interface = _FakeInterface()
+    alice = PolicyContext.build(interface, "alice")  # type: ignore
+    bob = PolicyContext.build(interface, "bob")  # type: ignore
+    assert alice.spot_rate == FixedPoint("0.05")
+    assert bob.spot_rate == FixedPoint("0.05")
+    assert bob.with_wallet("carol").calc_max_long(FixedPoint(10)) == FixedPoint(5)  # type: ignore
+    assert alice.calc_max_long(FixedPoint(10)) == FixedPoint(5)
+    assert interface.num_calls == 2
+    assert (alice.cache_hits, alice.cache_misses) == (2, 2)
+
+    # Exceptions aren't memoized
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            alice.calc_max_long(FixedPoint(0))
+    assert interface.num_calls == 4
+
+    # A new block gets a new memo
+    interface.current_pool_state = SimpleNamespace(block_number=2, block_time=24)
+    next_block = PolicyContext.build(interface, "alice")  # type: ignore
+    assert next_block.spot_rate == FixedPoint("0.05")
+    assert interface.num_calls == 5
+    assert (next_block.cache_hits, next_block.cache_misses) == (0, 1)
+
+    with pytest.raises(FrozenInstanceError):
+        next_block.wallet = "bob"  # type: ignore
+
+
+def test_policy_actions():
+    """Policies implement either `action` or `action_with_context`."""
+
+    class _ActionPolicy(HyperdriveBasePolicy):
+        def action(self, interface, wallet):
+            return [], wallet == "alice"
+
+    class _ContextPolicy(HyperdriveBasePolicy):
+        def action_with_context(self, context):
+            return [], context.spot_rate == FixedPoint("0.05")
+
+    interface = _FakeInterface()
+    context_policy = _ContextPolicy(_ContextPolicy.Config())
+    assert context_policy.acts_on_context()
+    assert context_policy.action(interface, "alice") == ([], True)  # type: ignore
+    assert not _ActionPolicy(_ActionPolicy.Config()).acts_on_context()
+    with pytest.raises(NotImplementedError):
+        HyperdriveBasePolicy(HyperdriveBasePolicy.Config()).action(interface, "alice")  # type: ignore
+
+
+def test_get_trades_calls_action_overrides():
+    """Subclasses that override `action` of a policy that acts on the context get their trades from `action`."""
+
+    class _ActionRandom(Random):
+        def action(self, interface, wallet):
+            trades, _ = super().action(interface, wallet)
+            return trades, True
+
+    interface = _FakeInterface()
+    policy = _ActionRandom(_ActionRandom.Config(rng_seed=0, trade_chance=FixedPoint(0)))
+    assert not policy.acts_on_context()
+    context = PolicyContext.build(interface, "alice")  # type: ignore
+    assert get_trades(interface, policy, "alice", context=context) == []  # type: ignore
+    assert policy._done_trading  # pylint: disable=protected-access
+
+
+def test_random_helpers():
+    """Random policy helpers act on the context of `action_with_context`, and subclasses can override them."""
+
+    class _CloseLongRandom(Random):
+        def __init__(self, policy_config):
+            self.contexts = []
+            super().__init__(policy_config)
+
+        def get_available_actions(self, wallet, interface):
+            self.contexts.append(self._get_context(interface, wallet))
+            return [HyperdriveActionType.CLOSE_LONG] if wallet == "alice" else []
+
+        def close_random_long(self, interface, wallet):
+            return [f"{wallet} closes a long"]
+
+    interface = _FakeInterface()
+    policy = _CloseLongRandom(_CloseLongRandom.Config(rng_seed=0))
+    context = PolicyContext.build(interface, "alice")  # type: ignore
+    assert policy.action_with_context(context) == (["alice closes a long"], False)
+    assert policy.contexts[-1] is context
+    assert policy.action(interface, "bob") == ([], False)  # type: ignore
+    assert policy.contexts[-1].wallet == "bob"
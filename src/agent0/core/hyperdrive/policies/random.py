@@ -23,11 +23,11 @@ from agent0.core.hyperdrive.agent import (
 from agent0.core.hyperdrive.crash_report import build_crash_trade_result, log_hyperdrive_crash_report
 
 from .hyperdrive_policy import HyperdriveBasePolicy
+from .policy_context import PolicyContext
 
 if TYPE_CHECKING:
     from agent0.core.hyperdrive import HyperdriveMarketAction, HyperdriveWallet
     from agent0.ethpy.hyperdrive import HyperdriveReadInterface
-    from agent0.ethpy.hyperdrive.state import PoolState
 
 # We can allow unused arguments here because this is a template and extendable class.
 # pylint: disable=unused-argument
@@ -91,8 +91,33 @@ class Random(HyperdriveBasePolicy):
         self.allowable_actions = policy_config.allowable_actions
         self.randomly_ignore_slippage_tolerance = policy_config.randomly_ignore_slippage_tolerance
         self.gas_limit = policy_config.gas_limit
+        # The context of the tick that `action_with_context` is acting on, used by the helpers
+        self._context: PolicyContext | None = None
         super().__init__(policy_config)
 
+    def _get_context(self, interface: HyperdriveReadInterface, wallet: HyperdriveWallet) -> PolicyContext:
+        """Get the context of the tick that is being acted on.
+
+        Helpers called from `action_with_context` act on its context, e.g., one shared with other agents
+        on the same block. Otherwise, the context is built for the interface's current block.
+
+        Arguments
+        ---------
+        interface: HyperdriveReadInterface
+            The interface to the Hyperdrive contract.
+        wallet: HyperdriveWallet
+            The agent's wallet.
+
+        Returns
+        -------
+        PolicyContext
+            The context to act on.
+        """
+        context = self._context
+        if context is not None and context.interface is interface and context.wallet is wallet:
+            return context
+        return PolicyContext.build(interface, wallet)
+
     def get_available_actions(
         self,
         wallet: HyperdriveWallet,
@@ -112,13 +137,11 @@ class Random(HyperdriveBasePolicy):
         list[HyperdriveActionType]
             A list containing all of the available actions.
         """
-        pool_state = interface.current_pool_state
+        context = self._get_context(interface, wallet)
+        pool_state = context.pool_state
         # The minimum transaction amount is dependent on if we're trading with
         # base or vault shares. The config's min transaction amount is in units of base.
-        if interface.base_is_yield:
-            minimum_transaction_amount = interface.get_minimum_transaction_amount_shares()
-        else:
-            minimum_transaction_amount = pool_state.pool_config.minimum_transaction_amount
+        minimum_transaction_amount = context.minimum_transaction_amount
 
         # prevent accidental override
         # compile a list of all actions
@@ -160,14 +183,15 @@ class Random(HyperdriveBasePolicy):
         list[Trade[HyperdriveMarketAction]]
             A list with a single Trade element for opening a Hyperdrive short.
         """
+        context = self._get_context(interface, wallet)
         # Shorts take units of bonds, which is always checked against the minimum transaction amount
         # as defined in pool config.
-        minimum_transaction_amount = interface.pool_config.minimum_transaction_amount
+        minimum_transaction_amount = context.pool_config.minimum_transaction_amount
 
         # Calc max short is crashing, we surround in try catch to log
         # TODO fix all crashes in calc_max_short and calc_max_long and instead return 0 for max short
         try:
-            maximum_trade_amount = interface.calc_max_short(wallet.balance.amount, interface.current_pool_state)
+            maximum_trade_amount = context.calc_max_short(wallet.balance.amount)
         # TODO pyo3 throws a PanicException here, which is derived from BaseException
         # Ideally, we would import the exact exception in python here, but pyo3 doesn't
         # expose this exception. Need to (1) fix the underlying calc_max_short bug, or
@@ -180,10 +204,10 @@ class Random(HyperdriveBasePolicy):
                 orig_exception=orig_exception,
                 contract_call_type="call",
                 function_name="rust::calc_max_short",
-                fn_args=(wallet.balance.amount, interface.current_pool_state),
+                fn_args=(wallet.balance.amount, context.pool_state),
             )
 
-            crash_report = build_crash_trade_result(exception, interface)
+            crash_report = build_crash_trade_result(exception, context.interface)
             # TODO get these parameters from config
             log_hyperdrive_crash_report(
                 crash_report,
@@ -272,22 +296,16 @@ class Random(HyperdriveBasePolicy):
         list[Trade[HyperdriveMarketAction]]
             A list with a single Trade element for opening a Hyperdrive long.
         """
-
-        pool_state = interface.current_pool_state
+        context = self._get_context(interface, wallet)
         # open long's minimum transaction amount is dependent on if we're trading with
         # base or vault shares
-        if interface.base_is_yield:
-            minimum_transaction_amount = interface.get_minimum_transaction_amount_shares()
-        else:
-            minimum_transaction_amount = pool_state.pool_config.minimum_transaction_amount
+        minimum_transaction_amount = context.minimum_transaction_amount
 
         # TODO fix all crashes in calc_max_short and calc_max_long and instead return 0 for max short
         try:
             # There's an issue around calc_max_long where it overestimates the max trade amount
             # Hence, we multiply it by 0.9 to go under
-            maximum_trade_amount = interface.calc_max_long(
-                wallet.balance.amount, interface.current_pool_state
-            ) * FixedPoint(0.9)
+            maximum_trade_amount = context.calc_max_long(wallet.balance.amount) * FixedPoint(0.9)
         # TODO pyo3 throws a PanicException here, which is derived from BaseException
         # Ideally, we would import the exact exception in python here, but pyo3 doesn't
         # expose this exception. Need to (1) fix the underlying calc_max_short bug, or
@@ -300,9 +318,9 @@ class Random(HyperdriveBasePolicy):
                 orig_exception=orig_exception,
                 contract_call_type="call",
                 function_name="rust::calc_max_long",
-                fn_args=(wallet.balance.amount, interface.current_pool_state),
+                fn_args=(wallet.balance.amount, context.pool_state),
             )
-            crash_report = build_crash_trade_result(exception, interface)
+            crash_report = build_crash_trade_result(exception, context.interface)
             # TODO get these parameters from config
             log_hyperdrive_crash_report(
                 crash_report,
@@ -390,8 +408,9 @@ class Random(HyperdriveBasePolicy):
         list[Trade[HyperdriveMarketAction]]
             A list with a single Trade element for adding liquidity to a Hyperdrive pool.
         """
+        context = self._get_context(interface, wallet)
         # The minimum transaction amount input is always compared against the pool config's minimum transaction amount
-        minimum_transaction_amount = interface.pool_config.minimum_transaction_amount
+        minimum_transaction_amount = context.pool_config.minimum_transaction_amount
 
         # take a guess at the trade amount, which should be about 10% of the agent’s budget
         initial_trade_amount = FixedPoint(
@@ -423,9 +442,10 @@ class Random(HyperdriveBasePolicy):
         list[Trade[HyperdriveMarketAction]]
             A list with a single Trade element for removing liquidity from a Hyperdrive pool.
         """
+        context = self._get_context(interface, wallet)
         # LP is in units of LP, which is always checked against the minimum transaction amount
         # as defined in pool config.
-        minimum_transaction_amount = interface.pool_config.minimum_transaction_amount
+        minimum_transaction_amount = context.pool_config.minimum_transaction_amount
 
         # take a guess at the trade amount, which should be about 10% of the agent’s budget
         initial_trade_amount = FixedPoint(
@@ -463,6 +483,7 @@ class Random(HyperdriveBasePolicy):
         list[Trade[HyperdriveMarketAction]]
             A list with a single Trade element for redeeming the LP withdraw shares.
         """
+        context = self._get_context(interface, wallet)
         # take a guess at the trade amount, which should be about 10% of the agent’s budget
         # TODO we may want to use a different mean/std here, as this is based on the agent's base balance
         # but we're trying to redeem withdraw shares here.
@@ -471,7 +492,7 @@ class Random(HyperdriveBasePolicy):
         )
         shares_available_to_withdraw = min(
             wallet.withdraw_shares,
-            interface.current_pool_state.pool_info.withdrawal_shares_ready_to_withdraw,
+            context.pool_info.withdrawal_shares_ready_to_withdraw,
         )
 
         # trade_amount <= withdraw_shares
@@ -484,9 +505,7 @@ class Random(HyperdriveBasePolicy):
             )
         ]
 
-    def action(
-        self, interface: HyperdriveReadInterface, wallet: HyperdriveWallet
-    ) -> tuple[list[Trade[HyperdriveMarketAction]], bool]:
+    def action_with_context(self, context: PolicyContext) -> tuple[list[Trade[HyperdriveMarketAction]], bool]:
         """Implement a random user strategy.
 
         The agent performs one of four possible trades:
@@ -497,10 +516,8 @@ class Random(HyperdriveBasePolicy):
 
         Arguments
         ---------
-        interface: HyperdriveReadInterface
-            Interface for the market on which this agent will be executing trades (MarketActions).
-        wallet: HyperdriveWallet
-            The agent's wallet.
+        context: PolicyContext
+            The pool state, block, and wallet to act on.
 
         Returns
         -------
@@ -515,27 +532,35 @@ class Random(HyperdriveBasePolicy):
         if not gonna_trade:
             return [], False
 
-        # user can always open a trade, and can close a trade if one is open
-        available_actions = self.get_available_actions(wallet, interface)
-        if not available_actions:  # it's possible that no actions are available at this time
+        # The helpers take the interface and wallet so that subclasses can override them,
+        # and act on this context through `_get_context`
+        interface = context.interface
+        wallet = context.wallet
+        self._context = context
+        try:
+            # user can always open a trade, and can close a trade if one is open
+            available_actions = self.get_available_actions(wallet, interface)
+            if not available_actions:  # it's possible that no actions are available at this time
+                return [], False
+
+            # randomly choose one of the possible actions
+            action_type = available_actions[self.rng.integers(len(available_actions))]
+
+            # trade amount is also randomly chosen to be close to 10% of the agent's budget
+            if action_type == HyperdriveActionType.OPEN_SHORT:
+                return self.open_short_with_random_amount(interface, wallet), False
+            if action_type == HyperdriveActionType.CLOSE_SHORT:
+                return self.close_random_short(interface, wallet), False
+            if action_type == HyperdriveActionType.OPEN_LONG:
+                return self.open_long_with_random_amount(interface, wallet), False
+            if action_type == HyperdriveActionType.CLOSE_LONG:
+                return self.close_random_long(interface, wallet), False
+            if action_type == HyperdriveActionType.ADD_LIQUIDITY:
+                return self.add_liquidity_with_random_amount(interface, wallet), False
+            if action_type == HyperdriveActionType.REMOVE_LIQUIDITY:
+                return self.remove_liquidity_with_random_amount(interface, wallet), False
+            if action_type == HyperdriveActionType.REDEEM_WITHDRAW_SHARE:
+                return self.redeem_withdraw_shares_with_random_amount(interface, wallet), False
             return [], False
-
-        # randomly choose one of the possible actions
-        action_type = available_actions[self.rng.integers(len(available_actions))]
-
-        # trade amount is also randomly chosen to be close to 10% of the agent's budget
-        if action_type == HyperdriveActionType.OPEN_SHORT:
-            return self.open_short_with_random_amount(interface, wallet), False
-        if action_type == HyperdriveActionType.CLOSE_SHORT:
-            return self.close_random_short(interface, wallet), False
-        if action_type == HyperdriveActionType.OPEN_LONG:
-            return self.open_long_with_random_amount(interface, wallet), False
-        if action_type == HyperdriveActionType.CLOSE_LONG:
-            return self.close_random_long(interface, wallet), False
-        if action_type == HyperdriveActionType.ADD_LIQUIDITY:
-            return self.add_liquidity_with_random_amount(interface, wallet), False
-        if action_type == HyperdriveActionType.REMOVE_LIQUIDITY:
-            return self.remove_liquidity_with_random_amount(interface, wallet), False
-        if action_type == HyperdriveActionType.REDEEM_WITHDRAW_SHARE:
-            return (self.redeem_withdraw_shares_with_random_amount(interface, wallet), False)
-        return [], False
+        finally:
+            self._context = None
@@ -14,7 +14,7 @@ from agent0.core.hyperdrive.agent import HyperdriveActionType, close_long_trade,
 from .random import Random
 
 if TYPE_CHECKING:
-    from agent0.core.hyperdrive import HyperdriveMarketAction, HyperdriveWallet, TradeResult
+    from agent0.core.hyperdrive import HyperdriveMarketAction, HyperdriveWallet, TradeResultView
     from agent0.ethpy.hyperdrive import HyperdriveReadInterface
 
 
@@ -119,13 +119,11 @@ class RandomHold(Random):
             A list containing all of the available actions.
         """
         # pylint: disable=too-many-branches
-        pool_state = interface.current_pool_state
+        context = self._get_context(interface, wallet)
+        pool_state = context.pool_state
         # The amount of minimum transaction amount is dependent on if we're trading with
         # base or vault shares
-        if interface.base_is_yield:
-            minimum_transaction_amount = interface.get_minimum_transaction_amount_shares()
-        else:
-            minimum_transaction_amount = pool_state.pool_config.minimum_transaction_amount
+        minimum_transaction_amount = context.minimum_transaction_amount
 
         # Initialize list of open positions
         if interface.hyperdrive_address not in self.open_positions:
@@ -253,17 +251,17 @@ class RandomHold(Random):
             slippage = self.slippage_tolerance
         return [close_short_trade(short_to_close.bond_amount, short_to_close.maturity_time, slippage, self.gas_limit)]
 
-    def post_action(self, interface: HyperdriveReadInterface, trade_results: list[TradeResult]) -> None:
+    def post_action(self, interface: HyperdriveReadInterface, trade_results: list[TradeResultView]) -> None:
         """Random hold updates open position bookkeeping based on which positions were closed.
 
         Arguments
         ---------
         interface: HyperdriveReadInterface
             The hyperdrive trading market interface.
-        trade_results: list[TradeResult]
-            A list of TradeResult objects, one for each trade made by the agent.
+        trade_results: list[TradeResultView]
+            A list of read-only TradeResultView objects, one for each trade made by the agent.
             The order of the list matches the original order of `agent.action`.
-            TradeResult contains any information about the trade,
+            TradeResultView contains any information about the trade,
             as well as any errors that the trade resulted in.
         """
         # NOTE this function is assuming no more than one close per step
@@ -14,9 +14,11 @@ from agent0.core.hyperdrive.agent import add_liquidity_trade, remove_liquidity_t
 from .hyperdrive_policy import HyperdriveBasePolicy
 
 if TYPE_CHECKING:
-    from agent0.core.hyperdrive import HyperdriveMarketAction, HyperdriveWallet, TradeResult
+    from agent0.core.hyperdrive import HyperdriveMarketAction, TradeResultView
     from agent0.ethpy.hyperdrive import HyperdriveReadInterface
 
+    from .policy_context import PolicyContext
+
 # policy definitions can be more verbose, allowing for more local variables
 # pylint: disable=too-many-locals
 
@@ -80,17 +82,13 @@ class SimpleLP(HyperdriveBasePolicy):
         self.pnl_history: list[tuple[FixedPoint, FixedPoint]] = []
         self.total_base_spent: FixedPoint = FixedPoint(0)
 
-    def action(
-        self, interface: HyperdriveReadInterface, wallet: HyperdriveWallet
-    ) -> tuple[list[Trade[HyperdriveMarketAction]], bool]:
+    def action_with_context(self, context: PolicyContext) -> tuple[list[Trade[HyperdriveMarketAction]], bool]:
         """Specify actions.
 
         Arguments
         ---------
-        interface: HyperdriveReadInterface
-            Interface for the market on which this agent will be executing trades (MarketActions).
-        wallet: HyperdriveWallet
-            The agent's wallet.
+        context: PolicyContext
+            The pool state, block, and wallet to act on.
 
         Returns
         -------
@@ -99,8 +97,8 @@ class SimpleLP(HyperdriveBasePolicy):
             and the second element defines if the agent is done trading.
         """
         # Get the current state of the pool & the bot's position
-        current_block = interface.get_current_block()
-        pool_state = interface.get_hyperdrive_state(block_data=current_block)
+        wallet = context.wallet
+        pool_state = context.pool_state
         lp_base_holding = wallet.lp_tokens * pool_state.pool_info.lp_share_price
 
         # Need to be in the game to play it
@@ -110,7 +108,7 @@ class SimpleLP(HyperdriveBasePolicy):
 
         # Get current PNL
         pnl = lp_base_holding - self.total_base_spent
-        self.pnl_history.append((FixedPoint(interface.get_block_timestamp(current_block)), pnl))
+        self.pnl_history.append((FixedPoint(context.block_time), pnl))
         # Prune history
         if FixedPoint(len(self.pnl_history)) > self.policy_config.lookback_length:
             self.pnl_history = self.pnl_history[-self.policy_config.lookback_length :]
@@ -147,17 +145,17 @@ class SimpleLP(HyperdriveBasePolicy):
 
         return action_list, False
 
-    def post_action(self, interface: HyperdriveReadInterface, trade_results: list[TradeResult]) -> None:
+    def post_action(self, interface: HyperdriveReadInterface, trade_results: list[TradeResultView]) -> None:
         """Keep track of money spent.
 
         Arguments
         ---------
         interface: MarketInterface
             The trading market interface.
-        trade_results: list[HyperdriveTradeResult]
-            A list of HyperdriveTradeResult objects, one for each trade made by the agent.
+        trade_results: list[TradeResultView]
+            A list of read-only TradeResultView objects, one for each trade made by the agent.
             The order of the list matches the original order of `agent.action`.
-            HyperdriveTradeResult contains any information about the trade,
+            TradeResultView contains any information about the trade,
             as well as any errors that the trade resulted in.
         """
         if len(trade_results) > 0:
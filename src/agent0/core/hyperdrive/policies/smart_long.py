@@ -13,8 +13,9 @@ from agent0.core.hyperdrive.agent import close_long_trade, open_long_trade
 from .hyperdrive_policy import HyperdriveBasePolicy
 
 if TYPE_CHECKING:
-    from agent0.core.hyperdrive import HyperdriveMarketAction, HyperdriveWallet
-    from agent0.ethpy.hyperdrive import HyperdriveReadInterface
+    from agent0.core.hyperdrive import HyperdriveMarketAction
+
+    from .policy_context import PolicyContext
 
 # pylint: disable=too-few-public-methods
 
@@ -69,17 +70,13 @@ class SmartLong(HyperdriveBasePolicy):
 
         super().__init__(policy_config)
 
-    def action(
-        self, interface: HyperdriveReadInterface, wallet: HyperdriveWallet
-    ) -> tuple[list[Trade[HyperdriveMarketAction]], bool]:
+    def action_with_context(self, context: PolicyContext) -> tuple[list[Trade[HyperdriveMarketAction]], bool]:
         """Implement a Long Louie user strategy
 
         Arguments
         ---------
-        interface: HyperdriveReadInterface
-            Interface for the market on which this agent will be executing trades (MarketActions).
-        wallet: HyperdriveWallet
-            The agent's wallet.
+        context: PolicyContext
+            The pool state, block, and wallet to act on.
 
         Returns
         -------
@@ -91,7 +88,9 @@ class SmartLong(HyperdriveBasePolicy):
         gonna_trade = self.rng.choice([True, False], p=[float(self.trade_chance), 1 - float(self.trade_chance)])
         if not gonna_trade:
             return ([], False)
-        pool_state = interface.current_pool_state
+        interface = context.interface
+        wallet = context.wallet
+        pool_state = context.pool_state
         action_list = []
         for long_time in wallet.longs:  # loop over longs # pylint: disable=consider-using-dict-items
             # if any long is mature
@@ -103,27 +102,24 @@ class SmartLong(HyperdriveBasePolicy):
         long_balances = [long.balance for long in wallet.longs.values()]
         has_opened_long = bool(any(long_balance > 0 for long_balance in long_balances))
 
-        variable_rate = interface.get_variable_rate()
-        # Variable rate can be None if underlying yield doesn't have a `getRate` function
-        if variable_rate is None:
-            variable_rate = interface.get_standardized_variable_rate()
+        variable_rate = context.variable_rate
 
         # only open a long if the fixed rate is higher than variable rate
-        if (interface.calc_spot_rate() - variable_rate) > self.risk_threshold and not has_opened_long:
+        if (context.spot_rate - variable_rate) > self.risk_threshold and not has_opened_long:
             # calculate the total number of bonds we want to see in the pool
-            total_bonds_to_match_variable_apr = interface.calc_bonds_given_shares_and_rate(target_rate=variable_rate)
+            total_bonds_to_match_variable_apr = interface.calc_bonds_given_shares_and_rate(
+                target_rate=variable_rate, pool_state=pool_state
+            )
             # get the delta bond amount & convert units
             bond_reserves: FixedPoint = pool_state.pool_info.bond_reserves
             # calculate how many bonds we take out of the pool
-            new_bonds_to_match_variable_apr = (
-                bond_reserves - total_bonds_to_match_variable_apr
-            ) * interface.calc_spot_price()
+            new_bonds_to_match_variable_apr = (bond_reserves - total_bonds_to_match_variable_apr) * context.spot_price
             # calculate how much base we pay for the new bonds
             new_base_to_match_variable_apr = interface.calc_bonds_out_given_shares_in_down(
-                new_bonds_to_match_variable_apr
+                new_bonds_to_match_variable_apr, pool_state
             )
             # get the maximum amount the agent can long given the market and the agent's wallet
-            max_base = interface.calc_max_long(wallet.balance.amount, pool_state)
+            max_base = context.calc_max_long(wallet.balance.amount)
             # don't want to trade more than the agent has or more than the market can handle
             trade_amount = minimum(max_base, new_base_to_match_variable_apr)
             if trade_amount > WEI and wallet.balance.amount > WEI:
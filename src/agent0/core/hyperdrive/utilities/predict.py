@@ -23,7 +23,6 @@ For example:
 
 from __future__ import annotations
 
-from copy import deepcopy
 from typing import NamedTuple
 
 from fixedpointmath import FixedPoint
@@ -60,7 +59,7 @@ TradeDeltas = NamedTuple(
 
 def _get_vars(hyperdrive_interface, pool_state):
     if pool_state is None:
-        pool_state = deepcopy(hyperdrive_interface.current_pool_state)
+        pool_state = hyperdrive_interface.current_pool_state
     spot_price = hyperdrive_interface.calc_spot_price(pool_state)
     price_discount = FixedPoint(1) - spot_price
     curve_fee = pool_state.pool_config.fees.curve
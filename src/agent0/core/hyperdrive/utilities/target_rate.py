@@ -0,0 +1,356 @@
+r"""Solve for the trade that moves the pool's fixed rate to a target rate.
+
+The spot price of a Hyperdrive pool is
+
+.. math::
+    p = \left( \frac{\mu z_e}{y} \right)^{t_s}
+
+and trades move the reserves along the YieldSpace invariant
+
+.. math::
+    k = \frac{c}{\mu} (\mu z_e)^{1 - t_s} + y^{1 - t_s}
+
+Ignoring fees, the reserves with the target rate are where the invariant intersects the reserve ratio of the target
+price, which has a closed form. Fees move the reserves slightly off the invariant, so the closed form is the initial
+guess for a bracketed Newton refinement on the fee-adjusted reserves. Everything is computed on a float view of the
+pool state, so solving doesn't call into rust or copy the pool state.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cached_property
+
+from fixedpointmath import FixedPoint
+
+from agent0.ethpy.hyperdrive.state import PoolState
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+MAX_ITER = 50
+RATE_TOLERANCE = 1e-14
+
+
+@dataclass(frozen=True)
+class ReservesView:
+    """A float view of the pool state that's needed to trade on the YieldSpace curve."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    share_reserves: float
+    """The pool's share reserves, z."""
+    share_adjustment: float
+    """The pool's share adjustment, zeta."""
+    bond_reserves: float
+    """The pool's bond reserves, y."""
+    vault_share_price: float
+    """The vault share price, c."""
+    initial_vault_share_price: float
+    """The initial vault share price, mu."""
+    time_stretch: float
+    """The time stretch, t_s."""
+    annualized_position_duration: float
+    """The position duration in years."""
+    curve_fee: float
+    """The curve fee."""
+    governance_lp_fee: float
+    """The portion of the curve fee that goes to governance."""
+    minimum_share_reserves: float
+    """The minimum share reserves of the pool."""
+
+    @classmethod
+    def from_pool_state(cls, pool_state: PoolState) -> ReservesView:
+        """Build the view of a pool state.
+
+        Arguments
+        ---------
+        pool_state: PoolState
+            The state of the pool.
+
+        Returns
+        -------
+        ReservesView
+            The view of the pool state.
+        """
+        pool_config = pool_state.pool_config
+        pool_info = pool_state.pool_info
+        return cls(
+            share_reserves=float(pool_info.share_reserves),
+            share_adjustment=float(pool_info.share_adjustment),
+            bond_reserves=float(pool_info.bond_reserves),
+            vault_share_price=float(pool_info.vault_share_price),
+            initial_vault_share_price=float(pool_config.initial_vault_share_price),
+            time_stretch=float(pool_config.time_stretch),
+            annualized_position_duration=pool_config.position_duration / SECONDS_PER_YEAR,
+            curve_fee=float(pool_config.fees.curve),
+            governance_lp_fee=float(pool_config.fees.governance_lp),
+            minimum_share_reserves=float(pool_config.minimum_share_reserves),
+        )
+
+    @cached_property
+    def effective_share_reserves(self) -> float:
+        """The pool's effective share reserves, z_e = z - zeta."""
+        return self.share_reserves - self.share_adjustment
+
+    @cached_property
+    def invariant(self) -> float:
+        """The YieldSpace invariant, k, of the reserves."""
+        one_minus_ts = 1 - self.time_stretch
+        mu = self.initial_vault_share_price
+        return (self.vault_share_price / mu) * (mu * self.effective_share_reserves) ** one_minus_ts + (
+            self.bond_reserves**one_minus_ts
+        )
+
+    @cached_property
+    def spot_price(self) -> float:
+        """The spot price of bonds in base."""
+        return self.calc_spot_price(self.share_reserves, self.bond_reserves)
+
+    @cached_property
+    def spot_rate(self) -> float:
+        """The spot fixed rate."""
+        return self.calc_spot_rate(self.share_reserves, self.bond_reserves)
+
+    def calc_spot_price(self, share_reserves: float, bond_reserves: float) -> float:
+        """Calculate the spot price of bonds for other reserves of the pool.
+
+        Arguments
+        ---------
+        share_reserves: float
+            The share reserves.
+        bond_reserves: float
+            The bond reserves.
+
+        Returns
+        -------
+        float
+            The spot price of bonds in base.
+        """
+        effective_share_reserves = share_reserves - self.share_adjustment
+        return (self.initial_vault_share_price * effective_share_reserves / bond_reserves) ** self.time_stretch
+
+    def calc_spot_rate(self, share_reserves: float, bond_reserves: float) -> float:
+        """Calculate the spot fixed rate for other reserves of the pool.
+
+        Arguments
+        ---------
+        share_reserves: float
+            The share reserves.
+        bond_reserves: float
+            The bond reserves.
+
+        Returns
+        -------
+        float
+            The spot fixed rate.
+        """
+        spot_price = self.calc_spot_price(share_reserves, bond_reserves)
+        return (1 - spot_price) / (spot_price * self.annualized_position_duration)
+
+    def _bond_reserves_on_curve(self, effective_share_reserves: float) -> float:
+        mu = self.initial_vault_share_price
+        one_minus_ts = 1 - self.time_stretch
+        return (self.invariant - (self.vault_share_price / mu) * (mu * effective_share_reserves) ** one_minus_ts) ** (
+            1 / one_minus_ts
+        )
+
+    def _effective_share_reserves_on_curve(self, bond_reserves: float) -> float:
+        mu = self.initial_vault_share_price
+        one_minus_ts = 1 - self.time_stretch
+        return ((self.invariant - bond_reserves**one_minus_ts) / (self.vault_share_price / mu)) ** (
+            1 / one_minus_ts
+        ) / mu
+
+    def calc_reserves_after_trade(self, bond_amount: float) -> tuple[float, float]:
+        """Calculate the reserves after a trade, including fees.
+
+        Arguments
+        ---------
+        bond_amount: float
+            The bonds the trade moves into the pool along the curve.
+            Positive amounts open shorts and negative amounts open longs.
+
+        Returns
+        -------
+        tuple[float, float]
+            The share reserves and bond reserves after the trade.
+        """
+        if bond_amount >= 0:
+            # Shorts sell bonds to the pool and pay the curve fee in shares, less the governance fee
+            shares_out = self.effective_share_reserves - self._effective_share_reserves_on_curve(
+                self.bond_reserves + bond_amount
+            )
+            curve_fee = self.curve_fee * (1 - self.spot_price) * bond_amount / self.vault_share_price
+            share_reserves = self.share_reserves - shares_out + curve_fee * (1 - self.governance_lp_fee)
+            return share_reserves, self.bond_reserves + bond_amount
+        # Longs buy bonds from the pool and pay the curve fee in bonds, less the governance fee paid in shares
+        bond_reserves = self.bond_reserves + bond_amount
+        shares_in = self._effective_share_reserves_on_curve(bond_reserves) - self.effective_share_reserves
+        curve_fee = self.curve_fee * (1 / self.spot_price - 1) * shares_in * self.vault_share_price
+        governance_fee_shares = curve_fee * self.governance_lp_fee * self.spot_price / self.vault_share_price
+        return (
+            self.share_reserves + shares_in - governance_fee_shares,
+            bond_reserves + curve_fee * (1 - self.governance_lp_fee),
+        )
+
+    def calc_spot_rate_after_trade(self, bond_amount: float) -> float:
+        """Calculate the spot fixed rate after a trade, including fees.
+
+        Arguments
+        ---------
+        bond_amount: float
+            The bonds the trade moves into the pool along the curve.
+            Positive amounts open shorts and negative amounts open longs.
+
+        Returns
+        -------
+        float
+            The spot fixed rate after the trade.
+        """
+        return self.calc_spot_rate(*self.calc_reserves_after_trade(bond_amount))
+
+    def calc_bond_amount_for_target_rate(
+        self, target_rate: float, tolerance: float = RATE_TOLERANCE, max_iterations: int = MAX_ITER
+    ) -> float:
+        """Calculate the trade that moves the spot fixed rate to the target rate.
+
+        If the target rate can't be reached without the share reserves dropping below the minimum, this returns
+        the largest short that can be opened.
+
+        Arguments
+        ---------
+        target_rate: float
+            The target fixed rate.
+        tolerance: float, optional
+            The tolerance of the rate after the trade. Defaults to 1e-14.
+        max_iterations: int, optional
+            The maximum number of refinement steps. Defaults to 50.
+
+        Returns
+        -------
+        float
+            The bonds the trade moves into the pool along the curve.
+            Positive amounts open shorts and negative amounts open longs.
+        """
+        rate_error = self.spot_rate - target_rate
+        if abs(rate_error) <= tolerance:
+            return 0.0
+
+        # Bracket the trade; the rate after a trade increases with the bonds moved into the pool
+        if rate_error < 0:
+            lower = 0.0
+            effective_share_reserves_floor = max(self.minimum_share_reserves - self.share_adjustment, 0.0)
+            upper = self._bond_reserves_on_curve(max(effective_share_reserves_floor, 1e-18)) - self.bond_reserves
+            if upper <= 0:
+                return 0.0
+            if self.calc_spot_rate_after_trade(upper) <= target_rate:
+                return upper
+        else:
+            lower = -self.bond_reserves * (1 - 1e-9)
+            upper = 0.0
+            if self.calc_spot_rate_after_trade(lower) >= target_rate:
+                return lower
+
+        # The reserves without fees are where the invariant intersects the reserve ratio of the target price
+        mu = self.initial_vault_share_price
+        one_minus_ts = 1 - self.time_stretch
+        target_price = 1 / (1 + target_rate * self.annualized_position_duration)
+        target_ratio = target_price ** (1 / self.time_stretch) / mu
+        target_bond_reserves = (
+            self.invariant / ((self.vault_share_price / mu) * (mu * target_ratio) ** one_minus_ts + 1)
+        ) ** (1 / one_minus_ts)
+        bond_amount = target_bond_reserves - self.bond_reserves
+        if not lower < bond_amount < upper:
+            bond_amount = (lower + upper) / 2
+
+        # Refine with Newton steps on the fee-adjusted rate, using the secant through the previous step as the
+        # derivative, and fall back to bisection when a step leaves the bracket
+        previous_bond_amount, previous_rate_error = 0.0, rate_error
+        for _ in range(max_iterations):
+            rate_error = self.calc_spot_rate_after_trade(bond_amount) - target_rate
+            if abs(rate_error) <= tolerance:
+                break
+            if rate_error < 0:
+                lower = bond_amount
+            else:
+                upper = bond_amount
+            if rate_error != previous_rate_error:
+                next_bond_amount = bond_amount - rate_error * (bond_amount - previous_bond_amount) / (
+                    rate_error - previous_rate_error
+                )
+            else:
+                next_bond_amount = (lower + upper) / 2
+            if not lower < next_bond_amount < upper:
+                next_bond_amount = (lower + upper) / 2
+            previous_bond_amount, previous_rate_error = bond_amount, rate_error
+            if next_bond_amount == bond_amount:
+                break
+            bond_amount = next_bond_amount
+        return bond_amount
+
+
+def _solve_for_target_rate(
+    pool_state: PoolState, target_rate: FixedPoint, min_trade_amount_bonds: FixedPoint
+) -> tuple[ReservesView, float]:
+    view = ReservesView.from_pool_state(pool_state)
+    bond_amount = view.calc_bond_amount_for_target_rate(float(target_rate))
+    if abs(bond_amount) <= float(min_trade_amount_bonds):
+        bond_amount = 0.0
+    return view, bond_amount
+
+
+def calc_trade_for_target_rate(
+    pool_state: PoolState, target_rate: FixedPoint, min_trade_amount_bonds: FixedPoint = FixedPoint(0)
+) -> tuple[FixedPoint, FixedPoint]:
+    """Calculate the trade that moves the fixed rate to the target rate.
+
+    Arguments
+    ---------
+    pool_state: PoolState
+        The state of the pool.
+    target_rate: FixedPoint
+        The target fixed rate.
+    min_trade_amount_bonds: FixedPoint, optional
+        The minimum amount of bonds to trade. Smaller trades are skipped. Defaults to 0.
+
+    Returns
+    -------
+    tuple[FixedPoint, FixedPoint]
+        The change in share reserves, and the bonds the trade moves into the pool along the curve, excluding fees.
+        Positive bond amounts are the bonds of a short to open, and negative bond amounts are the bonds
+        a long buys from the curve, i.e., the bonds out for `calc_shares_in_given_bonds_out_down`.
+    """
+    view, bond_amount = _solve_for_target_rate(pool_state, target_rate, min_trade_amount_bonds)
+    if bond_amount == 0:
+        return FixedPoint(0), FixedPoint(0)
+    share_reserves, _ = view.calc_reserves_after_trade(bond_amount)
+    return FixedPoint(share_reserves - view.share_reserves), FixedPoint(bond_amount)
+
+
+def calc_reserve_deltas_for_target_rate(
+    pool_state: PoolState, target_rate: FixedPoint, min_trade_amount_bonds: FixedPoint = FixedPoint(0)
+) -> tuple[FixedPoint, FixedPoint]:
+    """Calculate the change in the pool's reserves from the trade that moves the fixed rate to the target rate.
+
+    The change in bond reserves includes the fees the trade pays, so it differs from the trade's bond amount
+    for longs. Use `calc_trade_for_target_rate` to get the amount to trade.
+
+    Arguments
+    ---------
+    pool_state: PoolState
+        The state of the pool.
+    target_rate: FixedPoint
+        The target fixed rate.
+    min_trade_amount_bonds: FixedPoint, optional
+        The minimum amount of bonds to trade. Smaller trades are skipped. Defaults to 0.
+
+    Returns
+    -------
+    tuple[FixedPoint, FixedPoint]
+        The change in share reserves and bond reserves.
+        Positive bond changes open shorts and negative bond changes open longs.
+    """
+    view, bond_amount = _solve_for_target_rate(pool_state, target_rate, min_trade_amount_bonds)
+    if bond_amount == 0:
+        return FixedPoint(0), FixedPoint(0)
+    share_reserves, bond_reserves = view.calc_reserves_after_trade(bond_amount)
+    return FixedPoint(share_reserves - view.share_reserves), FixedPoint(bond_reserves - view.bond_reserves)
@@ -0,0 +1,134 @@
+"""Tests for solving for the trade that hits a target rate."""
+
+from __future__ import annotations
+
+from dataclasses import replace
+from types import SimpleNamespace
+
+import pytest
+from fixedpointmath import FixedPoint
+
+from agent0.core.hyperdrive.interactive import LocalChain, LocalHyperdrive
+from agent0.core.hyperdrive.policies.lpandarb import apply_step_to_pool_state
+
+from .target_rate import ReservesView, calc_reserve_deltas_for_target_rate, calc_trade_for_target_rate
+
+# ruff: noqa: PLR2004 (comparison against magic values (literals like numbers))
+
+YEAR_IN_SECONDS = 31_536_000
+
+
+def _reserves_view(fixed_rate: float, vault_share_price: float = 1.2, curve_fee: float = 0.01) -> ReservesView:
+    """Build the reserves of a one year pool with a 5% time stretch at the fixed rate."""
+    time_stretch = 5 * 0.04665 / 5.24592
+    effective_share_reserves = 10_000_000.0
+    spot_price = 1 / (1 + fixed_rate)
+    return ReservesView(
+        share_reserves=effective_share_reserves - 100_000.0,
+        share_adjustment=-100_000.0,
+        bond_reserves=effective_share_reserves / spot_price ** (1 / time_stretch),
+        vault_share_price=vault_share_price,
+        initial_vault_share_price=1.0,
+        time_stretch=time_stretch,
+        annualized_position_duration=1.0,
+        curve_fee=curve_fee,
+        governance_lp_fee=0.15,
+        minimum_share_reserves=10.0,
+    )
+
+
+@pytest.mark.parametrize("target_rate", [0.001, 0.03, 0.0501, 0.1, 0.3])
+def test_hits_target_rate(target_rate: float):
+    """The trade moves the spot rate to the target rate, with or without fees."""
+    view = _reserves_view(0.05)
+    assert view.spot_rate == pytest.approx(0.05)
+    bond_amount = view.calc_bond_amount_for_target_rate(target_rate)
+    assert (bond_amount > 0) == (target_rate > 0.05)
+    assert view.calc_spot_rate_after_trade(bond_amount) == pytest.approx(target_rate, abs=1e-12)
+
+    # Without fees, the closed form is exact and the reserves stay on the invariant
+    no_fee_view = replace(view, curve_fee=0.0)
+    no_fee_bond_amount = no_fee_view.calc_bond_amount_for_target_rate(target_rate, max_iterations=0)
+    assert no_fee_view.calc_spot_rate_after_trade(no_fee_bond_amount) == pytest.approx(target_rate, abs=1e-12)
+    share_reserves, bond_reserves = no_fee_view.calc_reserves_after_trade(no_fee_bond_amount)
+    assert replace(no_fee_view, share_reserves=share_reserves, bond_reserves=bond_reserves).invariant == pytest.approx(
+        no_fee_view.invariant
+    )
+    # Fees dampen the change in rate, so it takes a larger trade to hit the target
+    assert abs(bond_amount) > abs(no_fee_bond_amount)
+
+
+def test_unreachable_target_rate():
+    """Targets that would drain the share reserves return the largest short."""
+    view = _reserves_view(0.05)
+    bond_amount = view.calc_bond_amount_for_target_rate(10.0)
+    share_reserves, _ = view.calc_reserves_after_trade(bond_amount)
+    assert share_reserves >= view.minimum_share_reserves
+    assert view.calc_spot_rate_after_trade(bond_amount) < 10.0
+
+
+def test_min_trade_amount():
+    """Trades smaller than the minimum trade amount are skipped, and trade amounts exclude fees."""
+    view = _reserves_view(0.05)
+    pool_state = SimpleNamespace(
+        pool_config=SimpleNamespace(
+            initial_vault_share_price=FixedPoint(1),
+            time_stretch=FixedPoint(view.time_stretch),
+            position_duration=YEAR_IN_SECONDS,
+            fees=SimpleNamespace(curve=FixedPoint("0.01"), governance_lp=FixedPoint("0.15")),
+            minimum_share_reserves=FixedPoint(10),
+        ),
+        pool_info=SimpleNamespace(
+            share_reserves=FixedPoint(view.share_reserves),
+            share_adjustment=FixedPoint(view.share_adjustment),
+            bond_reserves=FixedPoint(view.bond_reserves),
+            vault_share_price=FixedPoint(view.vault_share_price),
+        ),
+    )
+    shares_needed, bonds_needed = calc_reserve_deltas_for_target_rate(
+        pool_state, FixedPoint("0.051"), FixedPoint(10)  # type: ignore
+    )
+    assert shares_needed < FixedPoint(0) < bonds_needed
+    assert calc_reserve_deltas_for_target_rate(
+        pool_state, FixedPoint("0.051"), bonds_needed + FixedPoint(1)  # type: ignore
+    ) == (FixedPoint(0), FixedPoint(0))
+
+    # The trade excludes the curve fee that longs leave in the bond reserves
+    _, bond_amount = calc_trade_for_target_rate(pool_state, FixedPoint("0.03"))  # type: ignore
+    _, bonds_needed = calc_reserve_deltas_for_target_rate(pool_state, FixedPoint("0.03"))  # type: ignore
+    assert float(bond_amount) == pytest.approx(view.calc_bond_amount_for_target_rate(0.03))
+    assert bond_amount < bonds_needed < FixedPoint(0)
+
+
+@pytest.mark.anvil
+@pytest.mark.parametrize("target_rate", [FixedPoint("0.02"), FixedPoint("0.08")])
+def test_matches_pool(fast_chain_fixture: LocalChain, target_rate: FixedPoint):
+    """Executing the solved trade on the pool moves the pool's spot rate to the target rate."""
+    pool = LocalHyperdrive(
+        fast_chain_fixture,
+        LocalHyperdrive.Config(
+            position_duration=YEAR_IN_SECONDS,
+            initial_fixed_apr=FixedPoint("0.05"),
+            initial_liquidity=FixedPoint(1_000_000),
+        ),
+    )
+    agent = fast_chain_fixture.init_agent(base=FixedPoint(10_000_000), eth=FixedPoint(10), pool=pool)
+    agent.open_short(FixedPoint(10_000))
+    pool_state = pool.interface.current_pool_state
+    view = ReservesView.from_pool_state(pool_state)
+    assert view.spot_rate == pytest.approx(float(pool.interface.calc_spot_rate(pool_state)), abs=1e-12)
+
+    shares_needed, bonds_needed = calc_reserve_deltas_for_target_rate(pool_state, target_rate)
+    # Applying a step takes unsigned shares, adding them for longs and removing them for shorts
+    target_pool_state = apply_step_to_pool_state(pool_state, bonds_needed, abs(shares_needed))
+    assert float(pool.interface.calc_spot_rate(target_pool_state)) == pytest.approx(float(target_rate), abs=1e-9)
+
+    # The bonds moved along the curve are the short's bonds, or the bonds bought by the long's shares
+    bond_amount = view.calc_bond_amount_for_target_rate(float(target_rate))
+    if bond_amount > 0:
+        agent.open_short(FixedPoint(bond_amount))
+    else:
+        shares_in = pool.interface.calc_shares_in_given_bonds_out_down(FixedPoint(-bond_amount), pool_state)
+        agent.open_long(shares_in * pool_state.pool_info.vault_share_price)
+    # The vault share price accrues interest between blocks, so the rate is only close to the target
+    assert float(pool.interface.calc_spot_rate()) == pytest.approx(float(target_rate), abs=1e-6)
@@ -15,7 +15,7 @@ from .deploy import (
     deploy_hyperdrive_from_factory,
 )
 from .get_expected_hyperdrive_version import check_hyperdrive_version, get_minimum_hyperdrive_version
-from .interface import HyperdriveReadInterface, HyperdriveReadWriteInterface
+from .interface import HyperdriveReadInterface, HyperdriveReadWriteInterface, SimulatedHyperdriveInterface
 from .transactions import (
     get_hyperdrive_checkpoint,
     get_hyperdrive_checkpoint_exposure,
@@ -2,3 +2,4 @@
 
 from .read_interface import HyperdriveReadInterface
 from .read_write_interface import HyperdriveReadWriteInterface
+from .simulated_interface import SimulatedHyperdriveInterface
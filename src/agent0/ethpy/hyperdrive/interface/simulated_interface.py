@@ -0,0 +1,1524 @@
+"""An in-memory Hyperdrive pool that runs trades without a chain."""
+
+from __future__ import annotations
+
+import functools
+import time
+from dataclasses import replace
+from typing import TYPE_CHECKING, Any, Callable, NoReturn, TypeVar, cast
+
+from eth_typing import BlockNumber, ChecksumAddress
+from fixedpointmath import FixedPoint
+from hexbytes import HexBytes
+from hyperdrivetypes import (
+    AddLiquidityEventFP,
+    CheckpointFP,
+    CloseLongEventFP,
+    CloseShortEventFP,
+    CreateCheckpointEventFP,
+    OpenLongEventFP,
+    OpenShortEventFP,
+    PoolConfigFP,
+    PoolInfoFP,
+    RedeemWithdrawalSharesEventFP,
+    RemoveLiquidityEventFP,
+)
+from pypechain.core import PypechainCallException
+from web3 import Web3
+from web3.exceptions import ContractCustomError
+from web3.types import BlockData, BlockIdentifier, Timestamp
+
+from agent0.ethpy.hyperdrive.assets import AssetIdPrefix, encode_asset_id
+from agent0.ethpy.hyperdrive.state import PoolState
+
+from ._mock_contract import (
+    _calc_bonds_given_shares_and_rate,
+    _calc_checkpoint_id,
+    _calc_close_long,
+    _calc_close_short,
+    _calc_open_long,
+    _calc_open_short,
+    _calc_pool_deltas_after_open_long,
+    _calc_pool_share_delta_after_open_short,
+    _calc_present_value,
+    _calc_shares_in_given_bonds_out_up,
+    _calc_shares_out_given_bonds_in_down,
+    _calc_spot_price,
+    _calc_spot_rate,
+    _calc_time_stretch,
+)
+from .read_write_interface import HyperdriveReadWriteInterface
+
+if TYPE_CHECKING:
+    from eth_account.signers.local import LocalAccount
+    from web3.types import Nonce
+
+    from .read_interface import HyperdriveReadInterface
+
+# We have no control over the number of arguments since it is specified by the read write interface
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-positional-arguments
+# pylint: disable=too-many-instance-attributes
+# pylint: disable=too-many-locals
+# pylint: disable=too-many-lines
+# ruff: noqa: PLR0913
+# We only worry about protected access for anyone outside of this folder.
+# pylint: disable=protected-access
+
+SECONDS_PER_YEAR = 60 * 60 * 24 * 365
+LP_ASSET_ID = encode_asset_id(AssetIdPrefix.LP, 0)
+WITHDRAWAL_SHARE_ASSET_ID = encode_asset_id(AssetIdPrefix.WITHDRAWAL_SHARE, 0)
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+SIMULATED_HYPERDRIVE_ADDRESS = Web3.to_checksum_address("0x" + "5" * 40)
+
+T = TypeVar("T")
+
+
+def _reverts_atomically(func: Callable[..., T]) -> Callable[..., T]:
+    """Undo every change a write made to the simulated chain if it reverts.
+
+    Reverted transactions don't mine a block on a chain, so a reverted write mustn't advance the block,
+    accrue interest, or create checkpoints, even though writes do so before checking for reverts.
+    """
+
+    @functools.wraps(func)
+    def wrapper(self: SimulatedHyperdriveInterface, *args: Any, **kwargs: Any) -> T:
+        snapshot = self._snapshot()
+        try:
+            return func(self, *args, **kwargs)
+        except PypechainCallException:
+            self._restore(snapshot)
+            raise
+
+    return wrapper
+
+
+class SimulatedHyperdriveInterface(HyperdriveReadWriteInterface):
+    """A Hyperdrive pool that lives in memory, for backtesting policies without anvil.
+
+    Trades update an in-memory pool state using the hyperdrivepy math, and each write mines a new
+    simulated block. The accounting mirrors the Hyperdrive contracts closely enough for policy research,
+    but is not bit-exact. Notably, the circuit breaker, negative interest, and the flat fee
+    on matured positions are not modeled, and governance fees are estimated from the spot price.
+    Since trades execute atomically, slippage guards never trigger. Reverted writes leave the simulated
+    chain untouched, as on a chain.
+    """
+
+    def __init__(
+        self,
+        pool_config: PoolConfigFP,
+        initial_variable_rate: FixedPoint,
+        time_stretch_apr: FixedPoint | None = None,
+        start_timestamp: int | None = None,
+        block_time: int = 1,
+        hyperdrive_address: ChecksumAddress = SIMULATED_HYPERDRIVE_ADDRESS,
+        txn_signature: bytes | None = None,
+    ) -> None:
+        """Initialize an empty simulated pool. The pool needs to be initialized with `initialize` before trading.
+
+        Arguments
+        ---------
+        pool_config: PoolConfigFP
+            The configuration of the simulated pool.
+        initial_variable_rate: FixedPoint
+            The starting variable rate of the simulated yield source.
+        time_stretch_apr: FixedPoint | None, optional
+            If given, the time stretch of the pool config gets computed from this rate, as done when deploying a pool.
+        start_timestamp: int | None, optional
+            The timestamp of the first simulated block. Defaults to the current time.
+        block_time: int, optional
+            The number of seconds between simulated blocks. Each write mines a block. Defaults to 1.
+        hyperdrive_address: ChecksumAddress, optional
+            The address used to identify the simulated pool.
+        txn_signature: bytes | None, optional
+            The signature for transactions. Only kept for compatibility with the read write interface.
+        """
+        # pylint: disable=super-init-not-called
+        # We don't call the parent constructor, as it connects to a deployed pool.
+        self.hyperdrive_address = hyperdrive_address
+        self.txn_signature = bytes.fromhex("a0") if txn_signature is None else txn_signature
+        self.txn_receipt_timeout = None
+        if time_stretch_apr is not None:
+            pool_config = replace(
+                pool_config,
+                time_stretch=_calc_time_stretch(time_stretch_apr, FixedPoint(pool_config.position_duration)),
+            )
+        self.pool_config = pool_config
+        self.hyperdrive_kind = self.HyperdriveKind.ERC4626
+        self.hyperdrive_name = "Simulated Hyperdrive"
+        self.base_is_yield = False
+
+        # Lazily fill in state cache
+        self._current_pool_state = None
+        self.last_state_block_number = -1
+        self._read_interface = None
+
+        # Simulated chain
+        self.block_time = block_time
+        self._block_number = 0
+        self._timestamp = int(time.time()) if start_timestamp is None else start_timestamp
+        self._deploy_block = BlockNumber(0)
+        self._deploy_block_checked = True
+
+        # Simulated yield source
+        self._variable_rate = initial_variable_rate
+        self._vault_shares = FixedPoint(0)
+
+        # Simulated pool
+        self._pool_info = PoolInfoFP(
+            share_reserves=FixedPoint(0),
+            share_adjustment=FixedPoint(0),
+            zombie_base_proceeds=FixedPoint(0),
+            zombie_share_reserves=FixedPoint(0),
+            bond_reserves=FixedPoint(0),
+            lp_total_supply=FixedPoint(0),
+            vault_share_price=pool_config.initial_vault_share_price,
+            longs_outstanding=FixedPoint(0),
+            long_average_maturity_time=FixedPoint(0),
+            shorts_outstanding=FixedPoint(0),
+            short_average_maturity_time=FixedPoint(0),
+            withdrawal_shares_ready_to_withdraw=FixedPoint(0),
+            withdrawal_shares_proceeds=FixedPoint(0),
+            lp_share_price=FixedPoint(0),
+            long_exposure=FixedPoint(0),
+        )
+        self._gov_fees_accrued = FixedPoint(0)
+        self._checkpoints: dict[int, CheckpointFP] = {}
+        self._checkpoint_events: dict[int, CreateCheckpointEventFP] = {}
+        # Exposure is keyed by the checkpoint the positions were opened in
+        self._exposure: dict[int, FixedPoint] = {}
+        self._last_checkpoint_time: int | None = None
+        self._is_initialized = False
+
+        # Simulated accounts
+        self._base_balances: dict[str, FixedPoint] = {}
+        self._eth_balances: dict[str, FixedPoint] = {}
+        self._asset_balances: dict[str, dict[int, FixedPoint]] = {}
+        self._total_supplies: dict[int, FixedPoint] = {}
+
+    ################
+    # Simulation controls
+    ################
+
+    def fund_account(self, address: str, base: FixedPoint | None = None, eth: FixedPoint | None = None) -> None:
+        """Mint base and eth to an account.
+
+        Arguments
+        ---------
+        address: str
+            The address of the account.
+        base: FixedPoint | None, optional
+            The amount of base to mint.
+        eth: FixedPoint | None, optional
+            The amount of eth to mint. Eth isn't used by the simulation, and only gets reported in balances.
+        """
+        if base is not None:
+            self._base_balances[address] = self._base_balances.get(address, FixedPoint(0)) + base
+        if eth is not None:
+            self._eth_balances[address] = self._eth_balances.get(address, FixedPoint(0)) + eth
+
+    def get_asset_balances(self, address: str) -> dict[int, FixedPoint]:
+        """Get the nonzero hyperdrive token balances of an account.
+
+        Arguments
+        ---------
+        address: str
+            The address of the account.
+
+        Returns
+        -------
+        dict[int, FixedPoint]
+            The balances of the account, keyed by asset id.
+        """
+        return {
+            asset_id: balance
+            for asset_id, balance in self._asset_balances.get(address, {}).items()
+            if balance > FixedPoint(0)
+        }
+
+    @_reverts_atomically
+    def initialize(self, sender: LocalAccount, contribution: FixedPoint, apr: FixedPoint) -> None:
+        """Initialize the pool with liquidity from the sender.
+
+        Arguments
+        ---------
+        sender: LocalAccount
+            The account providing the initial liquidity.
+        contribution: FixedPoint
+            The amount of base to initialize the pool with.
+        apr: FixedPoint
+            The initial fixed rate of the pool.
+        """
+        if self._is_initialized:
+            self._revert("initialize", "PoolAlreadyInitialized()")
+        self._mine_block()
+        minimum_share_reserves = self.pool_config.minimum_share_reserves
+        shares = contribution / self._pool_info.vault_share_price
+        if shares < minimum_share_reserves * FixedPoint(2):
+            self._revert("initialize", "BelowMinimumContribution()")
+        self._check_base_balance("initialize", sender.address, contribution)
+        self._transfer_base_in(sender.address, contribution)
+
+        self._pool_info.share_reserves = shares
+        self._pool_info.bond_reserves = _calc_bonds_given_shares_and_rate(
+            self._build_pool_state(), apr, target_shares=shares
+        )
+        # The minimum share reserves get locked in the pool by minting lp shares to the zero address
+        self._mint(ZERO_ADDRESS, LP_ASSET_ID, minimum_share_reserves)
+        self._mint(sender.address, LP_ASSET_ID, shares - minimum_share_reserves * FixedPoint(2))
+        self._is_initialized = True
+        self._apply_checkpoints()
+
+    def advance_time(self, time_delta: int, create_checkpoints: bool = True) -> list[CreateCheckpointEventFP]:
+        """Advance the simulated time, accruing variable interest along the way.
+
+        Arguments
+        ---------
+        time_delta: int
+            The number of seconds to advance time by.
+        create_checkpoints: bool, optional
+            Whether to create the checkpoints that are passed over. If False, missed checkpoints get
+            created on the next trade, using the vault share price at that time. Defaults to True.
+
+        Returns
+        -------
+        list[CreateCheckpointEventFP]
+            The checkpoints that were created.
+        """
+        end_time = self._timestamp + time_delta
+        checkpoint_events = []
+        if create_checkpoints and self._is_initialized:
+            checkpoint_duration = self.pool_config.checkpoint_duration
+            next_checkpoint_time = _calc_checkpoint_id(checkpoint_duration, Timestamp(self._timestamp))
+            next_checkpoint_time += checkpoint_duration
+            while next_checkpoint_time <= end_time:
+                self._accrue_interest(next_checkpoint_time - self._timestamp)
+                self._timestamp = next_checkpoint_time
+                self._block_number += 1
+                checkpoint_events.extend(self._apply_checkpoints())
+                next_checkpoint_time += checkpoint_duration
+        self._accrue_interest(end_time - self._timestamp)
+        self._timestamp = end_time
+        self._block_number += 1
+        return checkpoint_events
+
+    ################
+    # Reads
+    ################
+
+    def get_read_interface(self) -> HyperdriveReadInterface:
+        """Return the current instance, as the simulated pool is both the read and write interface.
+
+        Returns
+        -------
+        HyperdriveReadInterface
+            This instantiated object.
+        """
+        return self
+
+    def get_deploy_block_number(self) -> BlockNumber | None:
+        """Get the simulated block that the pool was created in.
+
+        Returns
+        -------
+        BlockNumber | None
+            The block number that the simulated pool was created in.
+        """
+        return self._deploy_block
+
+    def get_block(self, block_identifier: BlockIdentifier) -> BlockData:
+        """Get the simulated block. Only the latest block is kept.
+
+        Arguments
+        ---------
+        block_identifier: BlockIdentifier
+            Either "latest" or the number of the latest block.
+
+        Returns
+        -------
+        BlockData
+            The simulated block, with only the number and timestamp set.
+        """
+        if block_identifier not in ("latest", "pending", self._block_number):
+            raise ValueError(f"The simulated interface only keeps the latest block, got {block_identifier=}")
+        return cast(
+            BlockData,
+            {"number": BlockNumber(self._block_number), "timestamp": Timestamp(self._timestamp)},
+        )
+
+    def get_hyperdrive_state(
+        self, block_identifier: BlockIdentifier | None = None, block_data: BlockData | None = None
+    ) -> PoolState:
+        """Get the simulated pool state. Only the latest block is kept.
+
+        Arguments
+        ---------
+        block_identifier: BlockIdentifier, optional
+            Either "latest" or the number of the latest block.
+        block_data: BlockData, optional
+            The latest block. Can't provide both block_identifier and block_data at the same time.
+
+        Returns
+        -------
+        PoolState
+            A dataclass containing PoolInfo, PoolConfig, Checkpoint, and Block information.
+        """
+        if block_identifier is not None and block_data is not None:
+            raise ValueError("Can't provide both block_identifier and block_data.")
+        if block_data is None:
+            block_data = self.get_block("latest" if block_identifier is None else block_identifier)
+        elif self.get_block_number(block_data) != self._block_number:
+            raise ValueError("The simulated interface only keeps the latest block.")
+        return self._build_pool_state(block_data)
+
+    def get_checkpoint(
+        self, checkpoint_time: Timestamp, block_identifier: BlockIdentifier | None = None
+    ) -> CheckpointFP:
+        """Get the checkpoint info of the simulated pool for a given checkpoint time.
+
+        Arguments
+        ---------
+        checkpoint_time: Timestamp
+            The block timestamp that indexes the checkpoint to get.
+        block_identifier: BlockIdentifier, optional
+            Unused, as only the latest block is kept.
+
+        Returns
+        -------
+        CheckpointFP
+            The checkpoint, with zero values if the checkpoint doesn't exist.
+        """
+        return self._checkpoints.get(
+            checkpoint_time,
+            CheckpointFP(
+                weighted_spot_price=FixedPoint(0),
+                last_weighted_spot_price_update_time=0,
+                vault_share_price=FixedPoint(0),
+            ),
+        )
+
+    def get_minimum_transaction_amount_shares(self, block_identifier: BlockIdentifier | None = None) -> FixedPoint:
+        """Get the minimum transaction amount in units of shares.
+
+        Arguments
+        ---------
+        block_identifier: BlockIdentifier, optional
+            Unused, as only the latest block is kept.
+
+        Returns
+        -------
+        FixedPoint
+            The minimum transaction amount in units of shares.
+        """
+        return self.pool_config.minimum_transaction_amount.div_up(self._pool_info.vault_share_price)
+
+    def get_total_supply_withdrawal_shares(self, block_identifier: BlockIdentifier | None = None) -> FixedPoint:
+        """Get the total supply of withdrawal shares in the simulated pool.
+
+        Arguments
+        ---------
+        block_identifier: BlockIdentifier, optional
+            Unused, as only the latest block is kept.
+
+        Returns
+        -------
+        FixedPoint
+            The total supply of withdrawal shares.
+        """
+        return self._total_supplies.get(WITHDRAWAL_SHARE_ASSET_ID, FixedPoint(0))
+
+    def get_vault_shares(self, block_identifier: BlockIdentifier | None = None) -> FixedPoint:
+        """Get the vault shares held by the simulated pool.
+
+        Arguments
+        ---------
+        block_identifier: BlockIdentifier, optional
+            Unused, as only the latest block is kept.
+
+        Returns
+        -------
+        FixedPoint
+            The vault shares held by the simulated pool.
+        """
+        return self._vault_shares
+
+    def get_variable_rate(self, block_identifier: BlockIdentifier | None = None) -> FixedPoint | None:
+        """Get the variable rate of the simulated yield source.
+
+        Arguments
+        ---------
+        block_identifier: BlockIdentifier, optional
+            Unused, as only the latest block is kept.
+
+        Returns
+        -------
+        FixedPoint | None
+            The variable rate of the simulated yield source.
+        """
+        return self._variable_rate
+
+    def get_eth_base_balances(self, agent: LocalAccount) -> tuple[FixedPoint, FixedPoint]:
+        """Get the simulated eth and base balances of an account.
+
+        Arguments
+        ---------
+        agent: LocalAccount
+            The account to get the balances for.
+
+        Returns
+        -------
+        tuple[FixedPoint]
+            A tuple containing the [agent_eth_balance, agent_base_balance].
+        """
+        return (
+            self._eth_balances.get(agent.address, FixedPoint(0)),
+            self._base_balances.get(agent.address, FixedPoint(0)),
+        )
+
+    def get_hyperdrive_eth_balance(self) -> FixedPoint:
+        """Get the eth balance of the simulated pool, which is always zero.
+
+        Returns
+        -------
+        FixedPoint
+            The eth balance of the simulated pool.
+        """
+        return FixedPoint(0)
+
+    def get_hyperdrive_base_balance(self, block_identifier: BlockIdentifier | None = None) -> FixedPoint:
+        """Get the base balance of the simulated pool, which is always zero since base is deposited in the vault.
+
+        Arguments
+        ---------
+        block_identifier: BlockIdentifier, optional
+            Unused, as only the latest block is kept.
+
+        Returns
+        -------
+        FixedPoint
+            The base balance of the simulated pool.
+        """
+        return FixedPoint(0)
+
+    def get_gov_fees_accrued(self, block_identifier: BlockIdentifier | None = None) -> FixedPoint:
+        """Get the uncollected governance fees of the simulated pool, in shares.
+
+        Arguments
+        ---------
+        block_identifier: BlockIdentifier, optional
+            Unused, as only the latest block is kept.
+
+        Returns
+        -------
+        FixedPoint
+            The uncollected governance fees.
+        """
+        return self._gov_fees_accrued
+
+    def get_long_total_supply(self, maturity_time: int, block_identifier: BlockIdentifier | None = None) -> FixedPoint:
+        """Get the total supply of long tokens with the given maturity time.
+
+        Arguments
+        ---------
+        maturity_time: int
+            The maturity time in seconds.
+        block_identifier: BlockIdentifier, optional
+            Unused, as only the latest block is kept.
+
+        Returns
+        -------
+        FixedPoint
+            The total supply of long tokens with the given maturity time.
+        """
+        return self._total_supplies.get(encode_asset_id(AssetIdPrefix.LONG, maturity_time), FixedPoint(0))
+
+    def get_short_total_supply(self, maturity_time: int, block_identifier: BlockIdentifier | None = None) -> FixedPoint:
+        """Get the total supply of short tokens with the given maturity time.
+
+        Arguments
+        ---------
+        maturity_time: int
+            The maturity time in seconds.
+        block_identifier: BlockIdentifier, optional
+            Unused, as only the latest block is kept.
+
+        Returns
+        -------
+        FixedPoint
+            The total supply of short tokens with the given maturity time.
+        """
+        return self._total_supplies.get(encode_asset_id(AssetIdPrefix.SHORT, maturity_time), FixedPoint(0))
+
+    def get_pool_is_paused(self) -> bool:
+        """Get whether or not the simulated pool is paused, which is never the case.
+
+        Returns
+        -------
+        bool
+            Whether or not the pool is paused.
+        """
+        return False
+
+    ################
+    # Writes
+    ################
+
+    @_reverts_atomically
+    def create_checkpoint(
+        self,
+        sender: LocalAccount,
+        checkpoint_time: int | None = None,
+        preview: bool = False,
+        gas_limit: int | None = None,
+        nonce_func: Callable[[], Nonce] | None = None,
+    ) -> CreateCheckpointEventFP:
+        """Create the checkpoints up to the latest checkpoint in the simulated pool.
+
+        See `HyperdriveReadWriteInterface.create_checkpoint` for the arguments.
+        Only checkpoints that aren't in the future can be created.
+
+        Returns
+        -------
+        CreateCheckpointEventFP
+            The event of the checkpoint.
+        """
+        if not self._is_initialized:
+            self._revert("checkpoint", "NotPayable()")
+        self._mine_block()
+        self._apply_checkpoints()
+        if checkpoint_time is None:
+            checkpoint_time = self._latest_checkpoint_time()
+        if checkpoint_time not in self._checkpoint_events:
+            self._revert("checkpoint", "InvalidCheckpointTime()")
+        return self._checkpoint_events[checkpoint_time]
+
+    def set_variable_rate(self, sender: LocalAccount, new_rate: FixedPoint) -> None:
+        """Set the variable rate of the simulated yield source.
+
+        Arguments
+        ---------
+        sender: LocalAccount
+            Unused, as anyone can set the simulated rate.
+        new_rate: FixedPoint
+            The new variable rate for the yield source.
+        """
+        self._mine_block()
+        self._variable_rate = new_rate
+
+    async def async_open_long(
+        self,
+        sender: LocalAccount,
+        trade_amount: FixedPoint,
+        slippage_tolerance: FixedPoint | None = None,
+        gas_limit: int | None = None,
+        txn_options_base_fee_multiple: float | None = None,
+        txn_options_priority_fee_multiple: float | None = None,
+        nonce_func: Callable[[], Nonce] | None = None,
+        preview_before_trade: bool = False,
+    ) -> OpenLongEventFP:
+        """Open a long in the simulated pool.
+
+        See `HyperdriveReadWriteInterface.async_open_long` for the arguments.
+        Transaction options are ignored.
+
+        Returns
+        -------
+        OpenLongEventFP
+            The event of the trade.
+        """
+        return self.open_long(sender, trade_amount)
+
+    async def async_close_long(
+        self,
+        sender: LocalAccount,
+        trade_amount: FixedPoint,
+        maturity_time: int,
+        slippage_tolerance: FixedPoint | None = None,
+        gas_limit: int | None = None,
+        txn_options_base_fee_multiple: float | None = None,
+        txn_options_priority_fee_multiple: float | None = None,
+        nonce_func: Callable[[], Nonce] | None = None,
+        preview_before_trade: bool = False,
+    ) -> CloseLongEventFP:
+        """Close a long in the simulated pool.
+
+        See `HyperdriveReadWriteInterface.async_close_long` for the arguments.
+        Transaction options are ignored.
+
+        Returns
+        -------
+        CloseLongEventFP
+            The event of the trade.
+        """
+        return self.close_long(sender, trade_amount, maturity_time)
+
+    async def async_open_short(
+        self,
+        sender: LocalAccount,
+        trade_amount: FixedPoint,
+        slippage_tolerance: FixedPoint | None = None,
+        gas_limit: int | None = None,
+        txn_options_base_fee_multiple: float | None = None,
+        txn_options_priority_fee_multiple: float | None = None,
+        nonce_func: Callable[[], Nonce] | None = None,
+        preview_before_trade: bool = False,
+    ) -> OpenShortEventFP:
+        """Open a short in the simulated pool.
+
+        See `HyperdriveReadWriteInterface.async_open_short` for the arguments.
+        Transaction options are ignored.
+
+        Returns
+        -------
+        OpenShortEventFP
+            The event of the trade.
+        """
+        return self.open_short(sender, trade_amount)
+
+    async def async_close_short(
+        self,
+        sender: LocalAccount,
+        trade_amount: FixedPoint,
+        maturity_time: int,
+        slippage_tolerance: FixedPoint | None = None,
+        gas_limit: int | None = None,
+        txn_options_base_fee_multiple: float | None = None,
+        txn_options_priority_fee_multiple: float | None = None,
+        nonce_func: Callable[[], Nonce] | None = None,
+        preview_before_trade: bool = False,
+    ) -> CloseShortEventFP:
+        """Close a short in the simulated pool.
+
+        See `HyperdriveReadWriteInterface.async_close_short` for the arguments.
+        Transaction options are ignored.
+
+        Returns
+        -------
+        CloseShortEventFP
+            The event of the trade.
+        """
+        return self.close_short(sender, trade_amount, maturity_time)
+
+    async def async_add_liquidity(
+        self,
+        sender: LocalAccount,
+        trade_amount: FixedPoint,
+        min_apr: FixedPoint,
+        max_apr: FixedPoint,
+        slippage_tolerance: FixedPoint | None = None,
+        gas_limit: int | None = None,
+        txn_options_base_fee_multiple: float | None = None,
+        txn_options_priority_fee_multiple: float | None = None,
+        nonce_func: Callable[[], Nonce] | None = None,
+        preview_before_trade: bool = False,
+    ) -> AddLiquidityEventFP:
+        """Add liquidity to the simulated pool.
+
+        See `HyperdriveReadWriteInterface.async_add_liquidity` for the arguments.
+        Transaction options are ignored.
+
+        Returns
+        -------
+        AddLiquidityEventFP
+            The event of the trade.
+        """
+        return self.add_liquidity(sender, trade_amount, min_apr, max_apr)
+
+    async def async_remove_liquidity(
+        self,
+        sender: LocalAccount,
+        trade_amount: FixedPoint,
+        gas_limit: int | None = None,
+        txn_options_base_fee_multiple: float | None = None,
+        txn_options_priority_fee_multiple: float | None = None,
+        nonce_func: Callable[[], Nonce] | None = None,
+        preview_before_trade: bool = False,
+    ) -> RemoveLiquidityEventFP:
+        """Remove liquidity from the simulated pool.
+
+        See `HyperdriveReadWriteInterface.async_remove_liquidity` for the arguments.
+        Transaction options are ignored.
+
+        Returns
+        -------
+        RemoveLiquidityEventFP
+            The event of the trade.
+        """
+        return self.remove_liquidity(sender, trade_amount)
+
+    async def async_redeem_withdraw_shares(
+        self,
+        sender: LocalAccount,
+        trade_amount: FixedPoint,
+        gas_limit: int | None = None,
+        txn_options_base_fee_multiple: float | None = None,
+        txn_options_priority_fee_multiple: float | None = None,
+        nonce_func: Callable[[], Nonce] | None = None,
+        preview_before_trade: bool = False,
+    ) -> RedeemWithdrawalSharesEventFP:
+        """Redeem withdrawal shares from the simulated pool.
+
+        See `HyperdriveReadWriteInterface.async_redeem_withdraw_shares` for the arguments.
+        Transaction options are ignored.
+
+        Returns
+        -------
+        RedeemWithdrawalSharesEventFP
+            The event of the trade.
+        """
+        return self.redeem_withdraw_shares(sender, trade_amount)
+
+    @_reverts_atomically
+    def open_long(self, sender: LocalAccount, base: FixedPoint) -> OpenLongEventFP:
+        """Open a long in the simulated pool.
+
+        Arguments
+        ---------
+        sender: LocalAccount
+            The account opening the long.
+        base: FixedPoint
+            The amount of base to open the long with.
+
+        Returns
+        -------
+        OpenLongEventFP
+            The event of the trade.
+        """
+        fn_name = "openLong"
+        self._start_trade(fn_name, base)
+        pool_state = self._build_pool_state()
+        vault_share_price = self._pool_info.vault_share_price
+        bond_amount, (share_reserves_delta, bond_reserves_delta) = self._call_math(
+            fn_name,
+            lambda: (
+                _calc_open_long(pool_state, base),
+                _calc_pool_deltas_after_open_long(pool_state, base),
+            ),
+        )
+        self._check_base_balance(fn_name, sender.address, base)
+        maturity_time = self._latest_checkpoint_time() + self.pool_config.position_duration
+        self._check_solvency(
+            fn_name,
+            self._pool_info.share_reserves + share_reserves_delta,
+            self._long_exposure_after(self._latest_checkpoint_time(), bond_amount),
+        )
+
+        self._transfer_base_in(sender.address, base)
+        # The governance fee is the part of the trader's deposit that doesn't go into the reserves
+        self._gov_fees_accrued += base / vault_share_price - share_reserves_delta
+        self._pool_info.share_reserves += share_reserves_delta
+        self._pool_info.bond_reserves -= bond_reserves_delta
+        self._pool_info.long_average_maturity_time = _update_average(
+            self._pool_info.long_average_maturity_time,
+            self._pool_info.longs_outstanding,
+            FixedPoint(maturity_time),
+            bond_amount,
+        )
+        self._pool_info.longs_outstanding += bond_amount
+        self._update_exposure(self._latest_checkpoint_time(), bond_amount)
+
+        asset_id = encode_asset_id(AssetIdPrefix.LONG, maturity_time)
+        self._mint(sender.address, asset_id, bond_amount)
+        return OpenLongEventFP(
+            **self._event_fields(),
+            args=OpenLongEventFP.OpenLongEventArgsFP(
+                trader=sender.address,
+                asset_id=asset_id,
+                maturity_time=maturity_time,
+                amount=base,
+                vault_share_price=vault_share_price,
+                as_base=True,
+                bond_amount=bond_amount,
+                extra_data=self.txn_signature,
+            ),
+        )
+
+    @_reverts_atomically
+    def close_long(self, sender: LocalAccount, bond_amount: FixedPoint, maturity_time: int) -> CloseLongEventFP:
+        """Close a long in the simulated pool.
+
+        Arguments
+        ---------
+        sender: LocalAccount
+            The account closing the long.
+        bond_amount: FixedPoint
+            The amount of bonds to close.
+        maturity_time: int
+            The maturity time of the long.
+
+        Returns
+        -------
+        CloseLongEventFP
+            The event of the trade.
+        """
+        fn_name = "closeLong"
+        self._start_trade(fn_name, bond_amount)
+        asset_id = encode_asset_id(AssetIdPrefix.LONG, maturity_time)
+        self._check_asset_balance(fn_name, sender.address, asset_id, bond_amount)
+        pool_state = self._build_pool_state()
+        vault_share_price = self._pool_info.vault_share_price
+        share_proceeds = self._call_math(
+            fn_name, lambda: _calc_close_long(pool_state, bond_amount, maturity_time, self._timestamp)
+        )
+
+        self._burn(sender.address, asset_id, bond_amount)
+        if maturity_time <= self._timestamp:
+            # The pool moved the matured longs out of the reserves when applying the maturity checkpoint
+            self._pool_info.zombie_base_proceeds = _sub_floor(self._pool_info.zombie_base_proceeds, bond_amount)
+            self._pool_info.zombie_share_reserves = _sub_floor(self._pool_info.zombie_share_reserves, share_proceeds)
+        else:
+            curve_bonds, flat_bonds = self._split_bonds(bond_amount, maturity_time)
+            curve_shares = self._call_math(
+                fn_name, lambda: _calc_shares_out_given_bonds_in_down(pool_state, curve_bonds)
+            )
+            curve_fee, flat_fee = self._calc_fees(pool_state, curve_bonds, flat_bonds)
+            governance_fee = (curve_fee + flat_fee) * self.pool_config.fees.governance_lp
+            # The curve part of the trade updates the effective share reserves, and the flat part
+            # gets paid out of the share reserves through the share adjustment.
+            shares_out = share_proceeds + governance_fee
+            effective_shares_out = curve_shares - (curve_fee - curve_fee * self.pool_config.fees.governance_lp)
+            self._pool_info.share_reserves -= shares_out
+            self._pool_info.share_adjustment -= shares_out - effective_shares_out
+            self._pool_info.bond_reserves += curve_bonds
+            self._gov_fees_accrued += governance_fee
+            self._pool_info.long_average_maturity_time = _update_average(
+                self._pool_info.long_average_maturity_time,
+                self._pool_info.longs_outstanding,
+                FixedPoint(maturity_time),
+                -bond_amount,
+            )
+            self._pool_info.longs_outstanding -= bond_amount
+            self._update_exposure(maturity_time - self.pool_config.position_duration, -bond_amount)
+
+        base_proceeds = self._transfer_shares_out(sender.address, share_proceeds)
+        return CloseLongEventFP(
+            **self._event_fields(),
+            args=CloseLongEventFP.CloseLongEventArgsFP(
+                trader=sender.address,
+                destination=sender.address,
+                asset_id=asset_id,
+                maturity_time=maturity_time,
+                amount=base_proceeds,
+                vault_share_price=vault_share_price,
+                as_base=True,
+                bond_amount=bond_amount,
+                extra_data=self.txn_signature,
+            ),
+        )
+
+    @_reverts_atomically
+    def open_short(self, sender: LocalAccount, bond_amount: FixedPoint) -> OpenShortEventFP:
+        """Open a short in the simulated pool.
+
+        Arguments
+        ---------
+        sender: LocalAccount
+            The account opening the short.
+        bond_amount: FixedPoint
+            The amount of bonds to short.
+
+        Returns
+        -------
+        OpenShortEventFP
+            The event of the trade.
+        """
+        fn_name = "openShort"
+        self._start_trade(fn_name, bond_amount)
+        pool_state = self._build_pool_state()
+        vault_share_price = self._pool_info.vault_share_price
+        latest_checkpoint_time = self._latest_checkpoint_time()
+        open_vault_share_price = self._checkpoints[latest_checkpoint_time].vault_share_price
+        trader_deposit, share_reserves_delta = self._call_math(
+            fn_name,
+            lambda: (
+                _calc_open_short(pool_state, bond_amount, open_vault_share_price),
+                _calc_pool_share_delta_after_open_short(pool_state, bond_amount),
+            ),
+        )
+        self._check_base_balance(fn_name, sender.address, trader_deposit)
+        self._check_solvency(
+            fn_name,
+            self._pool_info.share_reserves - share_reserves_delta,
+            self._long_exposure_after(latest_checkpoint_time, -bond_amount),
+        )
+
+        self._transfer_base_in(sender.address, trader_deposit)
+        curve_fee, _ = self._calc_fees(pool_state, bond_amount, FixedPoint(0))
+        self._gov_fees_accrued += curve_fee * self.pool_config.fees.governance_lp
+        self._pool_info.share_reserves -= share_reserves_delta
+        self._pool_info.bond_reserves += bond_amount
+        maturity_time = latest_checkpoint_time + self.pool_config.position_duration
+        self._pool_info.short_average_maturity_time = _update_average(
+            self._pool_info.short_average_maturity_time,
+            self._pool_info.shorts_outstanding,
+            FixedPoint(maturity_time),
+            bond_amount,
+        )
+        self._pool_info.shorts_outstanding += bond_amount
+        self._update_exposure(latest_checkpoint_time, -bond_amount)
+
+        asset_id = encode_asset_id(AssetIdPrefix.SHORT, maturity_time)
+        self._mint(sender.address, asset_id, bond_amount)
+        return OpenShortEventFP(
+            **self._event_fields(),
+            args=OpenShortEventFP.OpenShortEventArgsFP(
+                trader=sender.address,
+                asset_id=asset_id,
+                maturity_time=maturity_time,
+                amount=trader_deposit,
+                vault_share_price=vault_share_price,
+                as_base=True,
+                base_proceeds=share_reserves_delta * vault_share_price,
+                bond_amount=bond_amount,
+                extra_data=self.txn_signature,
+            ),
+        )
+
+    @_reverts_atomically
+    def close_short(self, sender: LocalAccount, bond_amount: FixedPoint, maturity_time: int) -> CloseShortEventFP:
+        """Close a short in the simulated pool.
+
+        Arguments
+        ---------
+        sender: LocalAccount
+            The account closing the short.
+        bond_amount: FixedPoint
+            The amount of bonds to close.
+        maturity_time: int
+            The maturity time of the short.
+
+        Returns
+        -------
+        CloseShortEventFP
+            The event of the trade.
+        """
+        fn_name = "closeShort"
+        self._start_trade(fn_name, bond_amount)
+        asset_id = encode_asset_id(AssetIdPrefix.SHORT, maturity_time)
+        self._check_asset_balance(fn_name, sender.address, asset_id, bond_amount)
+        pool_state = self._build_pool_state()
+        vault_share_price = self._pool_info.vault_share_price
+        is_mature = maturity_time <= self._timestamp
+        open_vault_share_price = self.get_checkpoint(
+            Timestamp(maturity_time - self.pool_config.position_duration)
+        ).vault_share_price
+        close_vault_share_price = (
+            self.get_checkpoint(Timestamp(maturity_time)).vault_share_price if is_mature else vault_share_price
+        )
+        share_proceeds = self._call_math(
+            fn_name,
+            lambda: _calc_close_short(
+                pool_state, bond_amount, open_vault_share_price, close_vault_share_price, maturity_time
+            ),
+        )
+
+        self._burn(sender.address, asset_id, bond_amount)
+        if is_mature:
+            # The pool received the face value of the matured shorts when applying the maturity checkpoint
+            share_payment = bond_amount / vault_share_price
+        else:
+            curve_bonds, flat_bonds = self._split_bonds(bond_amount, maturity_time)
+            curve_shares = self._call_math(fn_name, lambda: _calc_shares_in_given_bonds_out_up(pool_state, curve_bonds))
+            curve_fee, flat_fee = self._calc_fees(pool_state, curve_bonds, flat_bonds)
+            governance_fee = (curve_fee + flat_fee) * self.pool_config.fees.governance_lp
+            share_payment = curve_shares + flat_bonds / vault_share_price + curve_fee + flat_fee
+            # The curve part of the trade updates the effective share reserves, and the flat part
+            # gets paid into the share reserves through the share adjustment.
+            shares_in = share_payment - governance_fee
+            effective_shares_in = curve_shares + curve_fee - curve_fee * self.pool_config.fees.governance_lp
+            self._pool_info.share_reserves += shares_in
+            self._pool_info.share_adjustment += shares_in - effective_shares_in
+            self._pool_info.bond_reserves -= curve_bonds
+            self._gov_fees_accrued += governance_fee
+            self._pool_info.short_average_maturity_time = _update_average(
+                self._pool_info.short_average_maturity_time,
+                self._pool_info.shorts_outstanding,
+                FixedPoint(maturity_time),
+                -bond_amount,
+            )
+            self._pool_info.shorts_outstanding -= bond_amount
+            self._update_exposure(maturity_time - self.pool_config.position_duration, bond_amount)
+
+        base_proceeds = self._transfer_shares_out(sender.address, share_proceeds)
+        return CloseShortEventFP(
+            **self._event_fields(),
+            args=CloseShortEventFP.CloseShortEventArgsFP(
+                trader=sender.address,
+                destination=sender.address,
+                asset_id=asset_id,
+                maturity_time=maturity_time,
+                amount=base_proceeds,
+                vault_share_price=vault_share_price,
+                as_base=True,
+                base_payment=share_payment * vault_share_price,
+                bond_amount=bond_amount,
+                extra_data=self.txn_signature,
+            ),
+        )
+
+    @_reverts_atomically
+    def add_liquidity(
+        self, sender: LocalAccount, base: FixedPoint, min_apr: FixedPoint, max_apr: FixedPoint
+    ) -> AddLiquidityEventFP:
+        """Add liquidity to the simulated pool.
+
+        Arguments
+        ---------
+        sender: LocalAccount
+            The account adding liquidity.
+        base: FixedPoint
+            The amount of base to add.
+        min_apr: FixedPoint
+            The minimum fixed rate the pool can have to add liquidity.
+        max_apr: FixedPoint
+            The maximum fixed rate the pool can have to add liquidity.
+
+        Returns
+        -------
+        AddLiquidityEventFP
+            The event of the trade.
+        """
+        fn_name = "addLiquidity"
+        self._start_trade(fn_name, base)
+        pool_state = self._build_pool_state()
+        vault_share_price = self._pool_info.vault_share_price
+        spot_rate = self._call_math(fn_name, lambda: _calc_spot_rate(pool_state))
+        if spot_rate < min_apr or spot_rate > max_apr:
+            self._revert(fn_name, "InvalidApr()")
+        self._check_base_balance(fn_name, sender.address, base)
+
+        lp_total_supply = pool_state.pool_info.lp_total_supply
+        starting_present_value = self._call_math(fn_name, lambda: _calc_present_value(pool_state, self._timestamp))
+        # Compute the present value after the deposit on a copy of the reserves so that reverts leave the pool as is
+        reserves = (self._pool_info.share_reserves, self._pool_info.share_adjustment, self._pool_info.bond_reserves)
+        self._update_liquidity(base / vault_share_price)
+        ending_state = self._build_pool_state()
+        (
+            self._pool_info.share_reserves,
+            self._pool_info.share_adjustment,
+            self._pool_info.bond_reserves,
+        ) = reserves
+        ending_present_value = self._call_math(fn_name, lambda: _calc_present_value(ending_state, self._timestamp))
+        if ending_present_value < starting_present_value:
+            self._revert(fn_name, "DecreasedPresentValueWhenAddingLiquidity()")
+        lp_shares = (ending_present_value - starting_present_value) * lp_total_supply / starting_present_value
+        if lp_shares < self.pool_config.minimum_transaction_amount:
+            self._revert(fn_name, "MinimumTransactionAmount()")
+
+        self._transfer_base_in(sender.address, base)
+        self._update_liquidity(base / vault_share_price)
+        self._mint(sender.address, LP_ASSET_ID, lp_shares)
+        return AddLiquidityEventFP(
+            **self._event_fields(),
+            args=AddLiquidityEventFP.AddLiquidityEventArgsFP(
+                provider=sender.address,
+                lp_amount=lp_shares,
+                amount=base,
+                vault_share_price=vault_share_price,
+                as_base=True,
+                lp_share_price=ending_state.pool_info.lp_share_price,
+                extra_data=self.txn_signature,
+            ),
+        )
+
+    @_reverts_atomically
+    def remove_liquidity(self, sender: LocalAccount, lp_shares: FixedPoint) -> RemoveLiquidityEventFP:
+        """Remove liquidity from the simulated pool.
+
+        The lp shares get converted to withdrawal shares, which get redeemed as far as the idle liquidity allows.
+
+        Arguments
+        ---------
+        sender: LocalAccount
+            The account removing liquidity.
+        lp_shares: FixedPoint
+            The amount of lp shares to remove.
+
+        Returns
+        -------
+        RemoveLiquidityEventFP
+            The event of the trade.
+        """
+        fn_name = "removeLiquidity"
+        self._start_trade(fn_name, lp_shares)
+        self._check_asset_balance(fn_name, sender.address, LP_ASSET_ID, lp_shares)
+        self._burn(sender.address, LP_ASSET_ID, lp_shares)
+        self._mint(sender.address, WITHDRAWAL_SHARE_ASSET_ID, lp_shares)
+        lp_share_price = self._build_pool_state().pool_info.lp_share_price
+        self._distribute_excess_idle()
+        redeemed_shares, base_proceeds = self._redeem_withdrawal_shares(sender.address, lp_shares)
+        return RemoveLiquidityEventFP(
+            **self._event_fields(),
+            args=RemoveLiquidityEventFP.RemoveLiquidityEventArgsFP(
+                provider=sender.address,
+                destination=sender.address,
+                lp_amount=lp_shares,
+                amount=base_proceeds,
+                vault_share_price=self._pool_info.vault_share_price,
+                as_base=True,
+                withdrawal_share_amount=lp_shares - redeemed_shares,
+                lp_share_price=lp_share_price,
+                extra_data=self.txn_signature,
+            ),
+        )
+
+    @_reverts_atomically
+    def redeem_withdraw_shares(
+        self, sender: LocalAccount, withdrawal_shares: FixedPoint
+    ) -> RedeemWithdrawalSharesEventFP:
+        """Redeem withdrawal shares from the simulated pool, as far as the idle liquidity allows.
+
+        Arguments
+        ---------
+        sender: LocalAccount
+            The account redeeming withdrawal shares.
+        withdrawal_shares: FixedPoint
+            The amount of withdrawal shares to redeem.
+
+        Returns
+        -------
+        RedeemWithdrawalSharesEventFP
+            The event of the trade.
+        """
+        fn_name = "redeemWithdrawalShares"
+        self._start_trade(fn_name, withdrawal_shares)
+        self._check_asset_balance(fn_name, sender.address, WITHDRAWAL_SHARE_ASSET_ID, withdrawal_shares)
+        self._distribute_excess_idle()
+        redeemed_shares, base_proceeds = self._redeem_withdrawal_shares(sender.address, withdrawal_shares)
+        return RedeemWithdrawalSharesEventFP(
+            **self._event_fields(),
+            args=RedeemWithdrawalSharesEventFP.RedeemWithdrawalSharesEventArgsFP(
+                provider=sender.address,
+                destination=sender.address,
+                withdrawal_share_amount=redeemed_shares,
+                amount=base_proceeds,
+                vault_share_price=self._pool_info.vault_share_price,
+                as_base=True,
+                extra_data=self.txn_signature,
+            ),
+        )
+
+    ################
+    # Pool accounting
+    ################
+
+    def _build_pool_state(self, block_data: BlockData | None = None) -> PoolState:
+        if block_data is None:
+            block_data = self.get_block("latest")
+        lp_supply = self._total_supplies.get(LP_ASSET_ID, FixedPoint(0))
+        withdrawal_supply = self._total_supplies.get(WITHDRAWAL_SHARE_ASSET_ID, FixedPoint(0))
+        pool_info = replace(
+            self._pool_info,
+            lp_total_supply=lp_supply + withdrawal_supply - self._pool_info.withdrawal_shares_ready_to_withdraw,
+        )
+        checkpoint_time = self._latest_checkpoint_time()
+        pool_state = PoolState(
+            block=block_data,
+            pool_config=self.pool_config,
+            pool_info=pool_info,
+            checkpoint_time=checkpoint_time,
+            checkpoint=self.get_checkpoint(Timestamp(checkpoint_time)),
+            exposure=self._exposure.get(checkpoint_time, FixedPoint(0)),
+            vault_shares=self._vault_shares,
+            total_supply_withdrawal_shares=withdrawal_supply,
+            hyperdrive_base_balance=FixedPoint(0),
+            hyperdrive_eth_balance=FixedPoint(0),
+            gov_fees_accrued=self._gov_fees_accrued,
+        )
+        if pool_info.lp_total_supply > FixedPoint(0) and self._is_initialized:
+            present_value = _calc_present_value(pool_state, self._timestamp)
+            pool_info.lp_share_price = present_value * pool_info.vault_share_price / pool_info.lp_total_supply
+        return pool_state
+
+    def _latest_checkpoint_time(self) -> int:
+        return _calc_checkpoint_id(self.pool_config.checkpoint_duration, Timestamp(self._timestamp))
+
+    def _mine_block(self) -> None:
+        self._accrue_interest(self.block_time)
+        self._timestamp += self.block_time
+        self._block_number += 1
+
+    def _accrue_interest(self, time_delta: int) -> None:
+        if time_delta <= 0:
+            return
+        self._pool_info.vault_share_price *= FixedPoint(1) + self._variable_rate * FixedPoint(time_delta) / FixedPoint(
+            SECONDS_PER_YEAR
+        )
+
+    def _start_trade(self, fn_name: str, amount: FixedPoint) -> None:
+        if not self._is_initialized:
+            self._revert(fn_name, "NotPayable()")
+        self._mine_block()
+        self._apply_checkpoints()
+        if amount < self.pool_config.minimum_transaction_amount:
+            self._revert(fn_name, "MinimumTransactionAmount()")
+
+    def _apply_checkpoints(self) -> list[CreateCheckpointEventFP]:
+        """Create all checkpoints up to the latest one, maturing positions in the process."""
+        latest_checkpoint_time = self._latest_checkpoint_time()
+        if self._last_checkpoint_time is None:
+            checkpoint_times = [latest_checkpoint_time]
+        else:
+            checkpoint_times = list(
+                range(
+                    self._last_checkpoint_time + self.pool_config.checkpoint_duration,
+                    latest_checkpoint_time + 1,
+                    self.pool_config.checkpoint_duration,
+                )
+            )
+        return [self._apply_checkpoint(checkpoint_time) for checkpoint_time in checkpoint_times]
+
+    def _apply_checkpoint(self, checkpoint_time: int) -> CreateCheckpointEventFP:
+        vault_share_price = self._pool_info.vault_share_price
+        pool_state = self._build_pool_state()
+        self._checkpoints[checkpoint_time] = CheckpointFP(
+            weighted_spot_price=_calc_spot_price(pool_state),
+            last_weighted_spot_price_update_time=self._timestamp,
+            vault_share_price=vault_share_price,
+        )
+        self._last_checkpoint_time = checkpoint_time
+
+        # Collect the interest earned by the zombie shares of matured longs
+        zombie_interest = (
+            self._pool_info.zombie_share_reserves - self._pool_info.zombie_base_proceeds / vault_share_price
+        )
+        if zombie_interest > FixedPoint(0):
+            governance_fee = zombie_interest * self.pool_config.fees.governance_zombie
+            self._pool_info.zombie_share_reserves -= zombie_interest
+            self._gov_fees_accrued += governance_fee
+            self._update_liquidity(zombie_interest - governance_fee)
+
+        # Matured longs are moved from the reserves to the zombie reserves
+        matured_longs = self.get_long_total_supply(checkpoint_time)
+        if matured_longs > FixedPoint(0):
+            share_proceeds = matured_longs / vault_share_price
+            self._pool_info.share_reserves -= share_proceeds
+            self._pool_info.share_adjustment -= share_proceeds
+            self._pool_info.zombie_share_reserves += share_proceeds
+            self._pool_info.zombie_base_proceeds += matured_longs
+            self._pool_info.long_average_maturity_time = _update_average(
+                self._pool_info.long_average_maturity_time,
+                self._pool_info.longs_outstanding,
+                FixedPoint(checkpoint_time),
+                -matured_longs,
+            )
+            self._pool_info.longs_outstanding -= matured_longs
+
+        # Matured shorts pay the face value of their bonds into the reserves
+        matured_shorts = self.get_short_total_supply(checkpoint_time)
+        if matured_shorts > FixedPoint(0):
+            share_payment = matured_shorts / vault_share_price
+            self._pool_info.share_reserves += share_payment
+            self._pool_info.share_adjustment += share_payment
+            self._pool_info.short_average_maturity_time = _update_average(
+                self._pool_info.short_average_maturity_time,
+                self._pool_info.shorts_outstanding,
+                FixedPoint(checkpoint_time),
+                -matured_shorts,
+            )
+            self._pool_info.shorts_outstanding -= matured_shorts
+        open_checkpoint_time = checkpoint_time - self.pool_config.position_duration
+        self._update_exposure(open_checkpoint_time, -self._exposure.get(open_checkpoint_time, FixedPoint(0)))
+
+        self._distribute_excess_idle()
+        self._checkpoint_events[checkpoint_time] = CreateCheckpointEventFP(
+            **self._event_fields(),
+            args=CreateCheckpointEventFP.CreateCheckpointEventArgsFP(
+                checkpoint_time=checkpoint_time,
+                checkpoint_vault_share_price=vault_share_price,
+                vault_share_price=vault_share_price,
+                matured_shorts=matured_shorts,
+                matured_longs=matured_longs,
+                lp_share_price=self._build_pool_state().pool_info.lp_share_price,
+            ),
+        )
+        return self._checkpoint_events[checkpoint_time]
+
+    def _update_liquidity(self, share_reserves_delta: FixedPoint) -> None:
+        """Add or remove shares from the reserves while keeping the spot price constant."""
+        share_reserves = self._pool_info.share_reserves
+        updated_share_reserves = share_reserves + share_reserves_delta
+        self._pool_info.share_adjustment = self._pool_info.share_adjustment * updated_share_reserves / share_reserves
+        self._pool_info.bond_reserves = self._pool_info.bond_reserves * updated_share_reserves / share_reserves
+        self._pool_info.share_reserves = updated_share_reserves
+
+    def _long_exposure_after(self, checkpoint_time: int, delta: FixedPoint) -> FixedPoint:
+        """Get the pool's long exposure after changing a checkpoint's net exposure by delta."""
+        exposure = self._exposure.get(checkpoint_time, FixedPoint(0))
+        updated_exposure = exposure + delta
+        return self._pool_info.long_exposure + max(updated_exposure, FixedPoint(0)) - max(exposure, FixedPoint(0))
+
+    def _update_exposure(self, checkpoint_time: int, delta: FixedPoint) -> None:
+        """Update the net exposure of a checkpoint, where only the net long exposure counts towards the pool's."""
+        updated_exposure = self._exposure.get(checkpoint_time, FixedPoint(0)) + delta
+        self._pool_info.long_exposure = self._long_exposure_after(checkpoint_time, delta)
+        if updated_exposure == FixedPoint(0):
+            self._exposure.pop(checkpoint_time, None)
+        else:
+            self._exposure[checkpoint_time] = updated_exposure
+
+    def _check_solvency(self, fn_name: str, share_reserves: FixedPoint, long_exposure: FixedPoint) -> None:
+        """Revert if the prospective reserves can't cover the long exposure."""
+        solvency = share_reserves - long_exposure / self._pool_info.vault_share_price
+        if solvency < self.pool_config.minimum_share_reserves:
+            self._revert(fn_name, "InsufficientLiquidity()")
+
+    def _split_bonds(self, bond_amount: FixedPoint, maturity_time: int) -> tuple[FixedPoint, FixedPoint]:
+        """Split bonds into the part traded on the curve and the part settled at the flat price."""
+        time_remaining = FixedPoint(maturity_time - self._timestamp) / FixedPoint(self.pool_config.position_duration)
+        curve_bonds = bond_amount * time_remaining
+        return curve_bonds, bond_amount - curve_bonds
+
+    def _calc_fees(
+        self, pool_state: PoolState, curve_bonds: FixedPoint, flat_bonds: FixedPoint
+    ) -> tuple[FixedPoint, FixedPoint]:
+        """Estimate the curve and flat fees of a trade, in shares."""
+        vault_share_price = pool_state.pool_info.vault_share_price
+        spot_price = _calc_spot_price(pool_state)
+        curve_fee = self.pool_config.fees.curve * (FixedPoint(1) - spot_price) * curve_bonds / vault_share_price
+        flat_fee = self.pool_config.fees.flat * flat_bonds / vault_share_price
+        return curve_fee, flat_fee
+
+    def _distribute_excess_idle(self) -> None:
+        """Use the idle liquidity to mark outstanding withdrawal shares as ready to withdraw."""
+        withdrawal_supply = self._total_supplies.get(WITHDRAWAL_SHARE_ASSET_ID, FixedPoint(0))
+        outstanding_withdrawal_shares = withdrawal_supply - self._pool_info.withdrawal_shares_ready_to_withdraw
+        if outstanding_withdrawal_shares <= FixedPoint(0):
+            return
+        pool_state = self._build_pool_state()
+        lp_share_price = pool_state.pool_info.lp_share_price / pool_state.pool_info.vault_share_price
+        idle_shares = self.get_idle_shares(pool_state)
+        if idle_shares <= FixedPoint(0) or lp_share_price <= FixedPoint(0):
+            return
+        redeemed_withdrawal_shares = min(outstanding_withdrawal_shares, idle_shares / lp_share_price)
+        share_proceeds = min(redeemed_withdrawal_shares * lp_share_price, idle_shares)
+        if share_proceeds <= FixedPoint(0):
+            return
+        # The proceeds stay in the vault until the withdrawal shares are redeemed
+        self._update_liquidity(-share_proceeds)
+        self._pool_info.withdrawal_shares_ready_to_withdraw += redeemed_withdrawal_shares
+        self._pool_info.withdrawal_shares_proceeds += share_proceeds
+
+    def _redeem_withdrawal_shares(self, address: str, withdrawal_shares: FixedPoint) -> tuple[FixedPoint, FixedPoint]:
+        """Redeem up to `withdrawal_shares` of the ready withdrawal shares, returning the redeemed shares and base."""
+        ready_withdrawal_shares = self._pool_info.withdrawal_shares_ready_to_withdraw
+        redeemed_shares = min(withdrawal_shares, ready_withdrawal_shares)
+        if redeemed_shares <= FixedPoint(0):
+            return FixedPoint(0), FixedPoint(0)
+        share_proceeds = self._pool_info.withdrawal_shares_proceeds * redeemed_shares / ready_withdrawal_shares
+        self._pool_info.withdrawal_shares_ready_to_withdraw -= redeemed_shares
+        self._pool_info.withdrawal_shares_proceeds -= share_proceeds
+        self._burn(address, WITHDRAWAL_SHARE_ASSET_ID, redeemed_shares)
+        return redeemed_shares, self._transfer_shares_out(address, share_proceeds)
+
+    ################
+    # Accounts
+    ################
+
+    def _check_base_balance(self, fn_name: str, address: str, base: FixedPoint) -> None:
+        if self._base_balances.get(address, FixedPoint(0)) < base:
+            self._revert(fn_name, "InsufficientBalance()")
+
+    def _check_asset_balance(self, fn_name: str, address: str, asset_id: int, amount: FixedPoint) -> None:
+        if self._asset_balances.get(address, {}).get(asset_id, FixedPoint(0)) < amount:
+            self._revert(fn_name, "InsufficientBalance()")
+
+    def _transfer_base_in(self, address: str, base: FixedPoint) -> None:
+        """Transfer base from the trader into the vault; callers check the balance before mutating the pool."""
+        self._base_balances[address] = self._base_balances[address] - base
+        self._vault_shares += base / self._pool_info.vault_share_price
+
+    def _transfer_shares_out(self, address: str, shares: FixedPoint) -> FixedPoint:
+        base = shares * self._pool_info.vault_share_price
+        self._vault_shares -= shares
+        self._base_balances[address] = self._base_balances.get(address, FixedPoint(0)) + base
+        return base
+
+    def _mint(self, address: str, asset_id: int, amount: FixedPoint) -> None:
+        balances = self._asset_balances.setdefault(address, {})
+        balances[asset_id] = balances.get(asset_id, FixedPoint(0)) + amount
+        self._total_supplies[asset_id] = self._total_supplies.get(asset_id, FixedPoint(0)) + amount
+
+    def _burn(self, address: str, asset_id: int, amount: FixedPoint) -> None:
+        """Burn tokens from the trader; callers check the balance before mutating the pool."""
+        balances = self._asset_balances[address]
+        balances[asset_id] = balances[asset_id] - amount
+        self._total_supplies[asset_id] -= amount
+
+    ################
+    # Helpers
+    ################
+
+    def _snapshot(self) -> dict[str, Any]:
+        """Copy the mutable state of the simulated chain, to restore if a write reverts."""
+        return {
+            "_block_number": self._block_number,
+            "_timestamp": self._timestamp,
+            "_variable_rate": self._variable_rate,
+            "_vault_shares": self._vault_shares,
+            "_pool_info": replace(self._pool_info),
+            "_gov_fees_accrued": self._gov_fees_accrued,
+            "_checkpoints": dict(self._checkpoints),
+            "_checkpoint_events": dict(self._checkpoint_events),
+            "_exposure": dict(self._exposure),
+            "_last_checkpoint_time": self._last_checkpoint_time,
+            "_is_initialized": self._is_initialized,
+            "_base_balances": dict(self._base_balances),
+            "_eth_balances": dict(self._eth_balances),
+            "_asset_balances": {address: dict(balances) for address, balances in self._asset_balances.items()},
+            "_total_supplies": dict(self._total_supplies),
+            "_current_pool_state": self._current_pool_state,
+            "last_state_block_number": self.last_state_block_number,
+        }
+
+    def _restore(self, snapshot: dict[str, Any]) -> None:
+        for name, value in snapshot.items():
+            setattr(self, name, value)
+
+    def _event_fields(self) -> dict[str, Any]:
+        block_hash = HexBytes(self._block_number.to_bytes(32, "big"))
+        return {
+            "log_index": 0,
+            "transaction_index": 0,
+            "transaction_hash": block_hash,
+            "address": self.hyperdrive_address,
+            "block_hash": block_hash,
+            "block_number": self._block_number,
+        }
+
+    def _revert(self, fn_name: str, error: str, orig_exception: BaseException | None = None) -> NoReturn:
+        """Raise the simulated contract error the same way the contract call would."""
+        raise PypechainCallException(
+            f"Error in {fn_name}",
+            # The error data is the selector of the custom error, as returned by the contract
+            orig_exception=(
+                ContractCustomError(error, data=Web3.keccak(text=error)[:4].to_0x_hex())
+                if orig_exception is None
+                else orig_exception
+            ),
+            decoded_error=error,
+            function_name=fn_name,
+            block_number=BlockNumber(self._block_number),
+        )
+
+    def _call_math(self, fn_name: str, func: Callable[[], Any]) -> Any:
+        """Call hyperdrivepy, treating errors from the math as a reverted contract call."""
+        try:
+            return func()
+        # Hyperdrivepy raises pyo3 panics, which aren't subclasses of Exception
+        except BaseException as exc:  # pylint: disable=broad-except
+            if isinstance(exc, (KeyboardInterrupt, SystemExit, PypechainCallException)):
+                raise
+            self._revert(fn_name, f"{type(exc).__name__}: {exc}", orig_exception=exc)
+
+
+def _update_average(average: FixedPoint, total: FixedPoint, value: FixedPoint, delta: FixedPoint) -> FixedPoint:
+    """Update a weighted average after adding (or removing, for a negative delta) a value."""
+    updated_total = total + delta
+    if updated_total <= FixedPoint(0):
+        return FixedPoint(0)
+    return (average * total + value * delta) / updated_total
+
+
+def _sub_floor(value: FixedPoint, delta: FixedPoint) -> FixedPoint:
+    return max(value - delta, FixedPoint(0))
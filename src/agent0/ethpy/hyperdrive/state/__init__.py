@@ -1,3 +1,3 @@
 """Hyperdrive state classes and conversion helper functions."""
 
-from .pool_state import PoolState
+from .pool_state import PoolReserves, PoolState
@@ -2,21 +2,58 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from typing import Any
 
+from eth_typing import BlockNumber
 from fixedpointmath import FixedPoint
 from hyperdrivetypes import CheckpointFP, PoolConfigFP, PoolInfoFP
-from web3.types import BlockData
+from web3.types import BlockData, Timestamp
 
 from agent0.utils.conversions import dataclass_to_dict
 
 # pylint: disable=too-many-instance-attributes
 
 
-@dataclass
+@dataclass(slots=True)
+class PoolReserves:
+    """A compact record of the pool info fields that trades change."""
+
+    share_reserves: FixedPoint
+    share_adjustment: FixedPoint
+    bond_reserves: FixedPoint
+    zombie_share_reserves: FixedPoint
+    lp_total_supply: FixedPoint
+    vault_share_price: FixedPoint
+    longs_outstanding: FixedPoint
+    shorts_outstanding: FixedPoint
+    long_exposure: FixedPoint
+
+    @classmethod
+    def from_pool_info(cls, pool_info: PoolInfoFP) -> PoolReserves:
+        """Get the reserves from the pool info.
+
+        Arguments
+        ---------
+        pool_info: PoolInfoFP
+            The pool info.
+
+        Returns
+        -------
+        PoolReserves
+            The reserves of the pool info.
+        """
+        return cls(**{name: getattr(pool_info, name) for name in cls.__slots__})
+
+
+@dataclass(frozen=True)
 class PoolState:
-    r"""A collection of stateful variables for deployed Hyperdrive and Yield contracts."""
+    r"""A collection of stateful variables for deployed Hyperdrive and Yield contracts.
+
+    Pool states are immutable. Hypothetical states are derived with `with_pool_info_deltas`, which shares
+    the unchanged block, pool config, and checkpoint with the original state instead of copying them,
+    so the sub-objects of a pool state must not be modified in place.
+    """
 
     block: BlockData
     pool_config: PoolConfigFP
@@ -29,6 +66,8 @@ class PoolState:
     hyperdrive_base_balance: FixedPoint
     hyperdrive_eth_balance: FixedPoint
     gov_fees_accrued: FixedPoint
+    block_number: BlockNumber = field(init=False)
+    block_time: Timestamp = field(init=False)
 
     def __post_init__(self):
         ## TODO: Get these using the api getter functions without creating a circular import
@@ -36,12 +75,12 @@ class PoolState:
         block_number = self.block.get("number", None)
         if block_number is None:
             raise AssertionError("The provided block has no number")
-        self.block_number = block_number
+        object.__setattr__(self, "block_number", block_number)
         # Get the block timestamp
         block_timestamp = self.block.get("timestamp", None)
         if block_timestamp is None:
             raise AssertionError("The provided block has no timestamp")
-        self.block_time = block_timestamp
+        object.__setattr__(self, "block_time", block_timestamp)
 
     @property
     def pool_info_to_dict(self) -> dict[str, Any]:
@@ -57,3 +96,32 @@ class PoolState:
     def checkpoint_to_dict(self) -> dict[str, Any]:
         """Get the checkpoint property."""
         return dataclass_to_dict(self.checkpoint.to_pypechain())
+
+    @property
+    def reserves(self) -> PoolReserves:
+        """The pool info fields that trades change."""
+        return PoolReserves.from_pool_info(self.pool_info)
+
+    def with_pool_info_deltas(self, **deltas: FixedPoint) -> PoolState:
+        """Derive the pool state after changes to the pool's reserves.
+
+        Only the pool info is copied; the block, pool config, and checkpoint are shared with this state.
+
+        Arguments
+        ---------
+        **deltas: FixedPoint
+            The changes to the pool info fields, keyed by a field of `PoolReserves`,
+            e.g., `share_reserves=FixedPoint(100)`.
+
+        Returns
+        -------
+        PoolState
+            The derived pool state.
+        """
+        unknown_fields = set(deltas) - set(PoolReserves.__slots__)
+        if unknown_fields:
+            raise ValueError(f"Can't apply deltas to pool info fields {sorted(unknown_fields)}.")
+        pool_info = replace(
+            self.pool_info, **{name: getattr(self.pool_info, name) + delta for name, delta in deltas.items()}
+        )
+        return replace(self, pool_info=pool_info)
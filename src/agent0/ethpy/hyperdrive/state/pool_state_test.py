@@ -0,0 +1,51 @@
+"""Tests for deriving hypothetical pool states."""
+
+from __future__ import annotations
+
+from dataclasses import FrozenInstanceError, fields
+from types import SimpleNamespace
+
+import pytest
+from fixedpointmath import FixedPoint
+from hyperdrivetypes import PoolInfoFP
+
+from .pool_state import PoolReserves, PoolState
+
+
+def _pool_state() -> PoolState:
+    pool_info = PoolInfoFP(**{field.name: FixedPoint(100) for field in fields(PoolInfoFP)})
+    return PoolState(
+        block={"number": 10, "timestamp": 120},  # type: ignore
+        pool_config=SimpleNamespace(),  # type: ignore
+        pool_info=pool_info,
+        checkpoint_time=0,
+        checkpoint=SimpleNamespace(),  # type: ignore
+        exposure=FixedPoint(0),
+        vault_shares=FixedPoint(0),
+        total_supply_withdrawal_shares=FixedPoint(0),
+        hyperdrive_base_balance=FixedPoint(0),
+        hyperdrive_eth_balance=FixedPoint(0),
+        gov_fees_accrued=FixedPoint(0),
+    )
+
+
+def test_with_pool_info_deltas():
+    """Derived pool states copy the pool info and share everything else."""
+    pool_state = _pool_state()
+    derived_state = pool_state.with_pool_info_deltas(share_reserves=FixedPoint(5), bond_reserves=FixedPoint(-10))
+    assert derived_state.reserves == PoolReserves.from_pool_info(derived_state.pool_info)
+    assert derived_state.pool_info.share_reserves == FixedPoint(105)
+    assert derived_state.pool_info.bond_reserves == FixedPoint(90)
+    assert derived_state.pool_info.vault_share_price == FixedPoint(100)
+    assert (derived_state.block_number, derived_state.block_time) == (10, 120)
+    assert derived_state.block is pool_state.block
+    assert derived_state.pool_config is pool_state.pool_config
+    assert derived_state.checkpoint is pool_state.checkpoint
+
+    # The original state is unchanged
+    assert pool_state.pool_info.share_reserves == FixedPoint(100)
+    assert pool_state.pool_info.bond_reserves == FixedPoint(100)
+    with pytest.raises(FrozenInstanceError):
+        pool_state.pool_info = derived_state.pool_info  # type: ignore
+    with pytest.raises(ValueError):
+        pool_state.with_pool_info_deltas(lp_share_price=FixedPoint(1))
@@ -1,4 +1,12 @@
 """System level fuzz bots."""
 
+from .fuzz_farm import (
+    FuzzEpisodeResult,
+    FuzzFailure,
+    FuzzFarmResults,
+    get_failure_signature,
+    replay_fuzz_episode,
+    run_fuzz_farm,
+)
 from .invariant_checks import run_invariant_checks
 from .run_fuzz_bots import generate_fuzz_hyperdrive_config, run_fuzz_bots
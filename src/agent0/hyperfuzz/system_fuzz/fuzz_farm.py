@@ -0,0 +1,487 @@
+"""Runs fuzz bots on many independent local chains across worker processes."""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import re
+import traceback
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable
+
+import numpy as np
+from docker.errors import APIError
+from pypechain.core import PypechainCallException
+
+from agent0.core.hyperdrive.crash_report import write_anvil_state_dump
+from agent0.core.hyperdrive.interactive import AnvilProcessPool, LocalChain, LocalHyperdrive
+from agent0.core.hyperdrive.interactive.anvil_pool import get_free_port
+from agent0.hyperfuzz import FuzzAssertionException
+from agent0.hyperlogs.rollbar_utilities import log_rollbar_message
+
+from .run_fuzz_bots import generate_fuzz_hyperdrive_config, run_fuzz_bots
+
+# The number of seconds the coordinator waits on results before checking if workers are alive
+_RESULT_POLL_TIMEOUT = 1
+_HEX_REGEX = re.compile(r"0x[0-9a-fA-F]+")
+_NUMBER_REGEX = re.compile(r"-?\d+(\.\d+)?(e-?\d+)?")
+# The number of times a worker tries to launch a chain on new ports when its ports get taken
+_MAX_LAUNCH_ATTEMPTS = 5
+
+
+@dataclass
+class FuzzFailure:
+    """A failed fuzz episode, reported by a worker."""
+
+    signature: str
+    """The signature of the failure, used to deduplicate failures across workers."""
+    worker_id: int
+    """The worker that hit the failure."""
+    rng_seed: int
+    """The rng seed of the worker."""
+    episode: int
+    """The episode of the worker that failed."""
+    episode_seed: int
+    """The rng seed of the episode, to replay the failure with `replay_fuzz_episode`."""
+    exception: str
+    """The representation of the exception."""
+    traceback: str
+    """The formatted traceback of the exception."""
+    anvil_state_file: str | None = None
+    """The anvil state dump at the time of the failure, if dumped."""
+
+
+@dataclass
+class FuzzEpisodeResult:
+    """The result of a single fuzz episode, i.e., fuzzing one pool on a fresh chain."""
+
+    worker_id: int
+    """The worker that ran the episode."""
+    episode: int
+    """The index of the episode within the worker."""
+    failure: FuzzFailure | None = None
+    """The failure, or None if the episode passed."""
+
+
+@dataclass
+class FuzzFarmResults:
+    """The results of a fuzz farm run."""
+
+    num_episodes: int = 0
+    """The number of episodes run across all workers."""
+    failures: dict[str, list[FuzzFailure]] = field(default_factory=dict)
+    """The failures keyed by signature, in the order they were reported."""
+
+
+@dataclass
+class _WorkerConfig:
+    num_episodes: int | None
+    num_iterations_per_episode: int
+    steth: bool
+    lp_share_price_test: bool
+    run_async: bool
+    ignore_raise_error_func: Callable[[Exception], bool] | None
+    dump_anvil_state: bool
+    log_dir: str
+
+
+@dataclass
+class _WorkerDone:
+    worker_id: int
+
+
+def _normalize_message(message: str) -> str:
+    # Amounts, addresses, and block numbers differ between runs of the same failure
+    message = _HEX_REGEX.sub("0x_", message)
+    return _NUMBER_REGEX.sub("_", message)
+
+
+def get_failure_signature(exc: BaseException) -> str:
+    """Get a signature of a fuzz failure that is stable across runs, used to deduplicate failures.
+
+    Contract call failures are identified by the called function and the decoded error, and invariant
+    failures by their messages with any numbers and addresses removed.
+
+    Arguments
+    ---------
+    exc: BaseException
+        The exception raised by the failing fuzz run.
+
+    Returns
+    -------
+    str
+        The signature of the failure.
+    """
+    if isinstance(exc, FuzzAssertionException):
+        # Multiple failed invariant checks get raised as a single exception wrapping each one
+        if len(exc.args) > 0 and all(isinstance(arg, BaseException) for arg in exc.args):
+            return " | ".join(sorted(get_failure_signature(arg) for arg in exc.args))
+        # The first argument is the name of the check suite, the rest are the messages
+        messages = [str(arg) for arg in exc.args[1:]] if len(exc.args) > 1 else [str(arg) for arg in exc.args]
+        return "FuzzAssertionException: " + _normalize_message(" ".join(messages))
+    if isinstance(exc, PypechainCallException):
+        error = exc.decoded_error
+        if error is None:
+            error = type(exc.orig_exception).__name__
+        return f"PypechainCallException: {exc.function_name}: {error}"
+    lines = str(exc).splitlines()
+    return f"{type(exc).__name__}: {_normalize_message(lines[0] if len(lines) > 0 else '')}"
+
+
+def _get_episode_chain_config(episode_seed: int, **kwargs: Any) -> LocalChain.Config:
+    # Everything that affects the trades of an episode is set here, so replays match the farm
+    return LocalChain.Config(
+        block_timestamp_interval=12,
+        preview_before_trade=True,
+        log_to_rollbar=False,
+        rng_seed=episode_seed,
+        crash_log_level=logging.ERROR,
+        gas_limit=int(1e6),  # Plenty of gas limit for transactions
+        **kwargs,
+    )
+
+
+def _is_port_in_use_error(exc: APIError) -> bool:
+    message = str(exc)
+    return "port is already allocated" in message or "address already in use" in message
+
+
+def _launch_local_chain(chain_config: LocalChain.Config) -> LocalChain:
+    # Free ports are released before postgres binds to them, so another process can take the port
+    # in between. If that happens, we retry on a new port.
+    attempt = 1
+    while True:
+        try:
+            return LocalChain(chain_config)
+        except APIError as exc:
+            if not _is_port_in_use_error(exc) or attempt >= _MAX_LAUNCH_ATTEMPTS:
+                raise
+            logging.warning("Postgres port %s is in use, retrying on a new port", chain_config.db_port)
+            chain_config = replace(chain_config, db_port=get_free_port())
+            attempt += 1
+
+
+def _run_fuzz_episode(
+    chain: LocalChain,
+    num_iterations_per_episode: int,
+    steth: bool,
+    lp_share_price_test: bool,
+    run_async: bool,
+    ignore_raise_error_func: Callable[[Exception], bool] | None,
+) -> None:
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    assert chain.config.rng is not None
+    hyperdrive_config = generate_fuzz_hyperdrive_config(
+        chain.config.rng, lp_share_price_test=lp_share_price_test, steth=steth
+    )
+    hyperdrive_pool = LocalHyperdrive(chain, hyperdrive_config)
+    run_fuzz_bots(
+        chain,
+        hyperdrive_pool,
+        check_invariance=True,
+        raise_error_on_failed_invariance_checks=True,
+        raise_error_on_crash=True,
+        ignore_raise_error_func=ignore_raise_error_func,
+        log_to_rollbar=False,
+        run_async=run_async,
+        random_advance_time=True,
+        random_variable_rate=True,
+        num_iterations=num_iterations_per_episode,
+        lp_share_price_test=lp_share_price_test,
+    )
+
+
+def _get_episode_seed(seed_sequence: np.random.SeedSequence) -> int:
+    # Each episode gets its own child seed, so any episode can be replayed on its own
+    return int(seed_sequence.spawn(1)[0].generate_state(1)[0])
+
+
+def _run_fuzz_worker(
+    worker_id: int,
+    rng_seed: int,
+    config: _WorkerConfig,
+    result_queue: multiprocessing.Queue,
+    stop_event,
+) -> None:
+    # pylint: disable=too-many-locals
+    seed_sequence = np.random.SeedSequence(rng_seed)
+    # Each worker gets its own anvil and postgres on free ports
+    anvil_pool = AnvilProcessPool(size=1)
+    db_port = get_free_port()
+
+    episode = 0
+    try:
+        while not stop_event.is_set() and (config.num_episodes is None or episode < config.num_episodes):
+            failure = None
+            episode_seed = _get_episode_seed(seed_sequence)
+            chain = _launch_local_chain(
+                _get_episode_chain_config(
+                    episode_seed,
+                    db_port=db_port,
+                    anvil_pool=anvil_pool,
+                    log_level_threshold=logging.WARNING,
+                    log_filename=os.path.join(config.log_dir, f"worker_{worker_id}.log"),
+                    log_to_stdout=False,
+                    crash_report_additional_info={
+                        "rng_seed": rng_seed,
+                        "worker_id": worker_id,
+                        "episode_seed": episode_seed,
+                    },
+                )
+            )
+            # Keep the port that worked for the next episodes
+            db_port = chain.config.db_port
+            try:
+                _run_fuzz_episode(
+                    chain,
+                    num_iterations_per_episode=config.num_iterations_per_episode,
+                    steth=config.steth,
+                    lp_share_price_test=config.lp_share_price_test,
+                    run_async=config.run_async,
+                    ignore_raise_error_func=config.ignore_raise_error_func,
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                anvil_state_file = None
+                if config.dump_anvil_state:
+                    anvil_state_file = write_anvil_state_dump(chain._web3)  # pylint: disable=protected-access
+                failure = FuzzFailure(
+                    signature=get_failure_signature(exc),
+                    worker_id=worker_id,
+                    rng_seed=rng_seed,
+                    episode=episode,
+                    episode_seed=episode_seed,
+                    exception=repr(exc),
+                    traceback=traceback.format_exc(),
+                    anvil_state_file=None if anvil_state_file is None else str(anvil_state_file),
+                )
+            finally:
+                chain.cleanup()
+            result_queue.put(FuzzEpisodeResult(worker_id=worker_id, episode=episode, failure=failure))
+            episode += 1
+    finally:
+        anvil_pool.shutdown()
+        result_queue.put(_WorkerDone(worker_id=worker_id))
+
+
+def replay_fuzz_episode(
+    episode_seed: int,
+    num_iterations_per_episode: int = 3000,
+    steth: bool = False,
+    lp_share_price_test: bool = False,
+    run_async: bool = False,
+    ignore_raise_error_func: Callable[[Exception], bool] | None = None,
+    chain_port: int = 10_000,
+    db_port: int = 5433,
+) -> None:
+    """Reruns a single fuzz farm episode on a local chain, e.g., to reproduce a `FuzzFailure`.
+
+    The episode uses the same pool config and trades as the farm, given the `episode_seed` of the failure
+    and the same settings the farm was run with. Trades of concurrent bots (i.e., `run_async`) can land in a
+    different order than in the farm.
+
+    Arguments
+    ---------
+    episode_seed: int
+        The rng seed of the episode, from `FuzzFailure.episode_seed`.
+    num_iterations_per_episode: int, optional
+        The number of fuzz bot iterations for the episode. Defaults to 3000.
+    steth: bool, optional
+        If True, fuzzes a steth pool instead of an erc4626 pool. Defaults to False.
+    lp_share_price_test: bool, optional
+        If True, runs the lp share price test. Defaults to False.
+    run_async: bool, optional
+        If True, the bots trade concurrently. Defaults to False.
+    ignore_raise_error_func: Callable[[Exception], bool] | None, optional
+        A function that determines if an exception should be ignored instead of failing the episode.
+        Defaults to failing on all errors.
+    chain_port: int, optional
+        The port to run anvil on. Defaults to 10000.
+    db_port: int, optional
+        The port to run postgres on. Defaults to 5433.
+    """
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    chain = LocalChain(_get_episode_chain_config(episode_seed, chain_port=chain_port, db_port=db_port))
+    try:
+        _run_fuzz_episode(
+            chain,
+            num_iterations_per_episode=num_iterations_per_episode,
+            steth=steth,
+            lp_share_price_test=lp_share_price_test,
+            run_async=run_async,
+            ignore_raise_error_func=ignore_raise_error_func,
+        )
+    finally:
+        chain.cleanup()
+
+
+def run_fuzz_farm(
+    num_workers: int | None = None,
+    num_episodes_per_worker: int | None = None,
+    num_iterations_per_episode: int = 3000,
+    steth: bool = False,
+    lp_share_price_test: bool = False,
+    run_async: bool = False,
+    rng_seed: int | None = None,
+    ignore_raise_error_func: Callable[[Exception], bool] | None = None,
+    on_new_failure: Callable[[FuzzFailure], None] | None = None,
+    log_to_rollbar: bool = False,
+    dump_anvil_state: bool = True,
+    log_dir: str = ".logging/fuzz_farm",
+) -> FuzzFarmResults:
+    """Runs fuzz bots on independent local chains in parallel worker processes.
+
+    Each worker runs its own anvil and postgres on free ports with its own rng seed, and fuzzes
+    a fresh pool on a fresh chain each episode. Each episode gets its own rng seed spawned from the
+    worker's seed, so failures can be replayed with `replay_fuzz_episode`. Episode results get streamed back
+    to this process, which deduplicates failures by their signature (see `get_failure_signature`).
+
+    .. note::
+        The workers are started with the `spawn` method, so `ignore_raise_error_func` must be picklable,
+        e.g., a function defined at the module level of an importable module.
+
+    Arguments
+    ---------
+    num_workers: int | None, optional
+        The number of worker processes. Defaults to the number of cpus.
+    num_episodes_per_worker: int | None, optional
+        The number of episodes each worker runs. Defaults to None (infinite).
+    num_iterations_per_episode: int, optional
+        The number of fuzz bot iterations for each episode. Defaults to 3000.
+    steth: bool, optional
+        If True, fuzzes steth pools instead of erc4626 pools. Defaults to False.
+    lp_share_price_test: bool, optional
+        If True, runs the lp share price test. Defaults to False.
+    run_async: bool, optional
+        If True, the bots in each worker trade concurrently. Defaults to False.
+    rng_seed: int | None, optional
+        The seed used to generate each worker's rng seed. Defaults to a random seed.
+    ignore_raise_error_func: Callable[[Exception], bool] | None, optional
+        A function that determines if an exception should be ignored instead of failing the episode.
+        Defaults to failing on all errors.
+    on_new_failure: Callable[[FuzzFailure], None] | None, optional
+        Called in this process for the first failure of each signature.
+    log_to_rollbar: bool, optional
+        If True, logs the first failure of each signature to rollbar. Defaults to False.
+    dump_anvil_state: bool, optional
+        If True, workers dump the anvil state on failure. Defaults to True.
+    log_dir: str, optional
+        The directory the workers log to, one file per worker. Defaults to `.logging/fuzz_farm`.
+
+    Returns
+    -------
+    FuzzFarmResults
+        The number of episodes run, and the failures grouped by signature.
+    """
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    # pylint: disable=too-many-locals
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    if rng_seed is None:
+        rng_seed = random.randint(0, 10000000)
+    worker_seeds = [int(seed) for seed in np.random.default_rng(rng_seed).integers(0, 2**31, size=num_workers)]
+    worker_config = _WorkerConfig(
+        num_episodes=num_episodes_per_worker,
+        num_iterations_per_episode=num_iterations_per_episode,
+        steth=steth,
+        lp_share_price_test=lp_share_price_test,
+        run_async=run_async,
+        ignore_raise_error_func=ignore_raise_error_func,
+        dump_anvil_state=dump_anvil_state,
+        log_dir=log_dir,
+    )
+    os.makedirs(log_dir, exist_ok=True)
+
+    # Forking a process with running threads (e.g., a background data pipeline) isn't safe
+    context = multiprocessing.get_context("spawn")
+    result_queue = context.Queue()
+    stop_event = context.Event()
+    workers = {
+        worker_id: context.Process(
+            target=_run_fuzz_worker,
+            args=(worker_id, worker_seeds[worker_id], worker_config, result_queue, stop_event),
+            name=f"fuzz_farm_worker_{worker_id}",
+        )
+        for worker_id in range(num_workers)
+    }
+    for worker in workers.values():
+        worker.start()
+    logging.info("Started %s fuzz workers with seeds %s", num_workers, worker_seeds)
+
+    results = FuzzFarmResults()
+    running = set(workers)
+    try:
+        while len(running) > 0:
+            try:
+                result = result_queue.get(timeout=_RESULT_POLL_TIMEOUT)
+            except queue.Empty:
+                # Workers that died without reporting back are no longer running
+                for worker_id in list(running):
+                    if not workers[worker_id].is_alive():
+                        logging.error("Fuzz worker %s exited with code %s", worker_id, workers[worker_id].exitcode)
+                        running.discard(worker_id)
+                continue
+
+            if isinstance(result, _WorkerDone):
+                running.discard(result.worker_id)
+                continue
+
+            results.num_episodes += 1
+            failure = result.failure
+            if failure is None:
+                continue
+            if failure.signature in results.failures:
+                results.failures[failure.signature].append(failure)
+                logging.info(
+                    "Duplicate failure on worker %s (episode seed %s): %s",
+                    failure.worker_id,
+                    failure.episode_seed,
+                    failure.signature,
+                )
+                continue
+
+            results.failures[failure.signature] = [failure]
+            logging.error(
+                "New failure on worker %s (seed %s, episode %s, episode seed %s): %s\n%s",
+                failure.worker_id,
+                failure.rng_seed,
+                failure.episode,
+                failure.episode_seed,
+                failure.signature,
+                failure.traceback,
+            )
+            if log_to_rollbar:
+                log_rollbar_message(
+                    f"FuzzFarm: {failure.signature}",
+                    logging.ERROR,
+                    extra_data={
+                        "worker_id": failure.worker_id,
+                        "rng_seed": failure.rng_seed,
+                        "episode": failure.episode,
+                        "episode_seed": failure.episode_seed,
+                        "exception": failure.exception,
+                        "traceback": failure.traceback,
+                        "anvil_state_file": failure.anvil_state_file,
+                    },
+                )
+            if on_new_failure is not None:
+                on_new_failure(failure)
+    finally:
+        # Workers finish their current episode before stopping. Workers can't exit while
+        # their results are waiting to get flushed to the queue, so we drain it while waiting.
+        stop_event.set()
+        for worker in workers.values():
+            while worker.is_alive():
+                worker.join(timeout=_RESULT_POLL_TIMEOUT)
+                try:
+                    while True:
+                        result_queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    return results
@@ -0,0 +1,105 @@
+"""Tests for the fuzz farm."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from docker.errors import APIError
+from pypechain.core import PypechainCallException
+from web3.exceptions import ContractCustomError
+
+from agent0.core.hyperdrive.interactive import LocalChain
+from agent0.hyperfuzz import FuzzAssertionException
+
+from . import fuzz_farm
+from .fuzz_farm import _get_episode_seed, _launch_local_chain, get_failure_signature, run_fuzz_farm
+
+
+def test_failure_signature_invariant_checks():
+    """Invariant failures that only differ in amounts or addresses have the same signature."""
+    exc_1 = FuzzAssertionException(
+        "Continuous Fuzz Bots Invariant Checks", "Pool eth balance 1.5 != 0.", exception_data={"block_number": 10}
+    )
+    exc_2 = FuzzAssertionException(
+        "Continuous Fuzz Bots Invariant Checks", "Pool eth balance 20.25 != 0.", exception_data={"block_number": 15}
+    )
+    exc_3 = FuzzAssertionException("Continuous Fuzz Bots Invariant Checks", "Pool base balance 1.5 != 0.")
+    assert get_failure_signature(exc_1) == get_failure_signature(exc_2)
+    assert get_failure_signature(exc_1) != get_failure_signature(exc_3)
+
+    # Multiple failed checks are identified by all of their failures, regardless of order
+    assert get_failure_signature(FuzzAssertionException(exc_1, exc_3)) == get_failure_signature(
+        FuzzAssertionException(exc_3, exc_2)
+    )
+
+
+def test_failure_signature_contract_calls():
+    """Contract call failures are identified by the function and the decoded error."""
+    exc_1 = PypechainCallException(
+        "Error in openLong from 0x1234",
+        orig_exception=ContractCustomError("0xabcd"),
+        decoded_error="InsufficientLiquidity()",
+        function_name="openLong",
+    )
+    exc_2 = PypechainCallException(
+        "Error in openLong from 0x5678",
+        orig_exception=ContractCustomError("0xabcd"),
+        decoded_error="InsufficientLiquidity()",
+        function_name="openLong",
+    )
+    exc_3 = PypechainCallException(
+        "Error in openShort from 0x1234",
+        orig_exception=ContractCustomError("0xabcd"),
+        decoded_error="InsufficientLiquidity()",
+        function_name="openShort",
+    )
+    assert get_failure_signature(exc_1) == get_failure_signature(exc_2)
+    assert get_failure_signature(exc_1) != get_failure_signature(exc_3)
+    assert get_failure_signature(ValueError("Bad amount 10")) == get_failure_signature(ValueError("Bad amount 12"))
+
+
+def test_episode_seeds():
+    """Episode seeds are reproducible from the worker seed and differ across episodes and workers."""
+    seed_sequence = np.random.SeedSequence(1234)
+    episode_seeds = [_get_episode_seed(seed_sequence) for _ in range(3)]
+    assert len(set(episode_seeds)) == 3
+    seed_sequence = np.random.SeedSequence(1234)
+    assert [_get_episode_seed(seed_sequence) for _ in range(3)] == episode_seeds
+    assert _get_episode_seed(np.random.SeedSequence(1235)) not in episode_seeds
+
+
+def test_launch_retries_on_port_in_use(monkeypatch: pytest.MonkeyPatch):
+    """Chains get launched on a new postgres port if the port was taken."""
+    db_ports = []
+    errors = ["port is already allocated", "port is already allocated"]
+
+    class _FakeLocalChain:
+        def __init__(self, config: LocalChain.Config):
+            db_ports.append(config.db_port)
+            if len(errors) > 0:
+                raise APIError(f"Bind for 127.0.0.1:{config.db_port} failed: {errors.pop(0)}")
+            self.config = config
+
+    monkeypatch.setattr(fuzz_farm, "LocalChain", _FakeLocalChain)
+    monkeypatch.setattr(fuzz_farm, "get_free_port", lambda: 1000 + len(db_ports))
+    chain = _launch_local_chain(LocalChain.Config(db_port=1234))
+    assert db_ports == [1234, 1001, 1002]
+    assert chain.config.db_port == 1002
+
+    # Other errors aren't retried
+    db_ports.clear()
+    errors.append("no such image")
+    with pytest.raises(APIError):
+        _launch_local_chain(LocalChain.Config(db_port=1234))
+    assert db_ports == [1234]
+
+
+@pytest.mark.anvil
+@pytest.mark.docker
+def test_run_fuzz_farm():
+    """Runs a small fuzz farm to ensure workers report back."""
+    results = run_fuzz_farm(num_workers=2, num_episodes_per_worker=1, num_iterations_per_episode=1, rng_seed=1234)
+    assert results.num_episodes == 2
+    for signature, failures in results.failures.items():
+        assert all(failure.signature == signature for failure in failures)
+        assert len({failure.episode_seed for failure in failures}) == len(failures)
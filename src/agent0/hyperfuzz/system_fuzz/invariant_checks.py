@@ -13,8 +13,8 @@ from web3.types import BlockData
 
 from agent0.core.hyperdrive.crash_report import (
     build_crash_trade_result,
-    get_anvil_state_dump,
     log_hyperdrive_crash_report,
+    write_anvil_state_dump,
 )
 from agent0.ethpy.hyperdrive import HyperdriveReadInterface
 from agent0.ethpy.hyperdrive.state.pool_state import PoolState
@@ -179,7 +179,9 @@ def run_invariant_checks(
         out_exceptions.append(error)
         report = build_crash_trade_result(error, interface, additional_info=error.exception_data, pool_state=pool_state)
         if log_anvil_state_dump:
-            report.anvil_state = get_anvil_state_dump(interface.web3)
+            anvil_state_file = write_anvil_state_dump(interface.web3)
+            if anvil_state_file is not None:
+                report.anvil_state_file = str(anvil_state_file)
         rollbar_data = error.exception_data
 
         if pool_name is not None:
@@ -2,21 +2,28 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Callable, Sequence
 
 from eth_typing import ChecksumAddress
 from fixedpointmath import FixedPoint
+from hyperdrivetypes import BaseEvent
 from numpy.random import Generator
 from pypechain.core import PypechainCallException
-from web3.types import RPCEndpoint
+from web3.types import BlockIdentifier, RPCEndpoint
 
 from agent0 import Chain, Hyperdrive, LocalChain, LocalHyperdrive, PolicyZoo
 from agent0.chainsync.db.hyperdrive import get_trade_events
+from agent0.core.base import Trade
 from agent0.core.base.make_key import make_private_key
+from agent0.core.hyperdrive import HyperdriveMarketAction
+from agent0.core.hyperdrive.agent import TradeResult
 from agent0.core.hyperdrive.interactive.hyperdrive_agent import HyperdriveAgent
+from agent0.core.hyperdrive.interactive.local_hyperdrive_agent import LocalHyperdriveAgent
 from agent0.ethpy.base import set_account_balance
 from agent0.ethpy.hyperdrive import HyperdriveReadWriteInterface
+from agent0.ethpy.hyperdrive.state import PoolState
 from agent0.hyperfuzz import FuzzAssertionException
 from agent0.hyperfuzz.system_fuzz.invariant_checks import run_invariant_checks
 from agent0.hyperlogs.rollbar_utilities import log_rollbar_exception, log_rollbar_message
@@ -219,6 +226,160 @@ def _check_trades_made_on_pool(
                 log_rollbar_message(error_message, log_level)
 
 
+def _handle_trade_exception(
+    exc: PypechainCallException,
+    pool: Hyperdrive,
+    raise_error_on_crash: bool,
+    ignore_raise_error_func: Callable[[Exception], bool] | None,
+) -> None:
+    if ignore_raise_error_func is None or not ignore_raise_error_func(exc):
+        # To ensure we log all errors, even when not from a trade contract call,
+        # we log the exception here.
+        # E.g., there's a crash when calling `interface.get_hyperdrive_state` from
+        # a contract call.
+        # TODO this can result in duplicate entries of the same error
+        log_rollbar_exception(
+            rollbar_log_prefix=f"FuzzBots: Unexpected contract call error on pool {pool.name}",
+            exception=exc,
+            log_level=logging.ERROR,
+        )
+
+        if raise_error_on_crash:
+            raise exc
+    # Otherwise, we ignore crashes, we want the bot to keep trading
+    # These errors will get logged regardless
+
+
+def _execute_policy_actions_concurrently(
+    agents: Sequence[HyperdriveAgent],
+    pool: Hyperdrive,
+    raise_error_on_crash: bool,
+    ignore_raise_error_func: Callable[[Exception], bool] | None,
+) -> list[BaseEvent]:
+    """Get every agent's policy action, then submit all of the trades concurrently.
+
+    Only the trades are submitted concurrently. The policy actions are computed sequentially
+    before any trade gets sent, so every agent acts on the same pool state. The interface fetches
+    that state once and caches it for the block, and the policy context memoizes the calculations
+    shared across agents, so the sequential part doesn't make any repeated rpc calls.
+
+    Arguments
+    ---------
+    agents: Sequence[HyperdriveAgent]
+        The agents to execute policy actions for.
+    pool: Hyperdrive
+        The pool the agents trade on.
+    raise_error_on_crash: bool
+        Whether to raise an error if a trade fails.
+    ignore_raise_error_func: Callable[[Exception], bool] | None
+        A function that returns True if a crash should not raise an error.
+
+    Returns
+    -------
+    list[BaseEvent]
+        The events of the trades that were mined.
+    """
+    # pylint: disable=protected-access
+
+    # Policy actions run sequentially in this thread. Running them in threads wouldn't run the
+    # python policy code in parallel, and they'd race on the shared pool state cache and memo.
+    agents_actions: list[tuple[HyperdriveAgent, list[Trade[HyperdriveMarketAction]]]] = []
+    for agent in agents:
+        try:
+            actions = agent.get_policy_action(pool)
+        except PypechainCallException as exc:
+            _handle_trade_exception(exc, pool, raise_error_on_crash, ignore_raise_error_func)
+            continue
+        if len(actions) == 0:
+            continue
+        if isinstance(agent, LocalHyperdriveAgent):
+            # Approvals are their own transaction, so we set them before submitting any trades
+            local_pool = agent._ensure_pool_type(pool)
+            assert local_pool is not None
+            agent._ensure_approval_set(local_pool)
+        agents_actions.append((agent, actions))
+
+    if len(agents_actions) == 0:
+        return []
+
+    # The agents submit their trades from a single event loop, and an agent's nonce is read from
+    # the pending block right before its transaction gets sent. Since there's no await between
+    # reading the nonce and sending the transaction, nonces can't race across or within agents,
+    # and a trade failing before getting sent doesn't leave a nonce gap.
+    async def _async_execute_all() -> list[list[TradeResult] | BaseException]:
+        return await asyncio.gather(
+            *[agent._async_execute_action(actions, pool) for agent, actions in agents_actions],
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(_async_execute_all())
+
+    # We handle every agent's results before raising, so that all agents' wallets stay up to date
+    events: list[BaseEvent] = []
+    exceptions: list[BaseException] = []
+    for (agent, _), result in zip(agents_actions, results):
+        if isinstance(result, BaseException):
+            exceptions.append(result)
+            continue
+        try:
+            events.extend(agent._handle_trade_results(result, pool))
+        except Exception as exc:  # pylint: disable=broad-except
+            exceptions.append(exc)
+
+    # We sync the database once after all trades are mined
+    if isinstance(pool, LocalHyperdrive):
+        pool._maybe_run_blocking_data_pipeline()
+
+    for exc in exceptions:
+        if not isinstance(exc, PypechainCallException):
+            raise exc
+        _handle_trade_exception(exc, pool, raise_error_on_crash, ignore_raise_error_func)
+    return events
+
+
+def _check_invariance_on_block(
+    chain: Chain,
+    pool: Hyperdrive,
+    log_to_rollbar: bool,
+    lp_share_price_test: bool,
+    pending_pool_state: PoolState | None,
+    raise_error_on_failed_invariance_checks: bool,
+    ignore_raise_error_func: Callable[[Exception], bool] | None,
+    block_identifier: BlockIdentifier = "latest",
+) -> None:
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    check_block = pool.interface.get_block(block_identifier)
+    check_block_number = check_block.get("number", None)
+    if check_block_number is None:
+        raise AssertionError("Block has no number.")
+    # pylint: disable=protected-access
+    fuzz_exceptions = run_invariant_checks(
+        check_block_data=check_block,
+        interface=pool.interface,
+        log_to_rollbar=log_to_rollbar,
+        rollbar_log_level_threshold=chain.config.rollbar_log_level_threshold,
+        rollbar_log_filter_func=chain.config.rollbar_log_filter_func,
+        lp_share_price_test=lp_share_price_test,
+        crash_report_additional_info=pool._crash_report_additional_info,
+        log_anvil_state_dump=chain.config.log_anvil_state_dump,
+        pool_name=pool.name,
+        pending_pool_state=pending_pool_state,
+        check_price_spike=False,
+    )
+    if len(fuzz_exceptions) > 0 and raise_error_on_failed_invariance_checks:
+        # If we have an ignore function, we filter exceptions
+        if ignore_raise_error_func is not None:
+            fuzz_exceptions = [e for e in fuzz_exceptions if not ignore_raise_error_func(e)]
+        # Do nothing if no exceptions
+        # If single failure, we raise it by itself
+        if len(fuzz_exceptions) == 1:
+            raise fuzz_exceptions[0]
+        if len(fuzz_exceptions) > 1:
+            # Otherwise, we raise a new fuzz assertion exception wht the list of exceptions
+            raise FuzzAssertionException(*fuzz_exceptions)
+
+
 def run_fuzz_bots(
     chain: Chain,
     hyperdrive_pools: Hyperdrive | Sequence[Hyperdrive],
@@ -236,6 +397,7 @@ def run_fuzz_bots(
     minimum_avg_agent_eth: FixedPoint | None = None,
     log_to_rollbar: bool = True,
     run_async: bool = False,
+    build_blocks: bool = False,
     random_advance_time: bool = False,
     random_variable_rate: bool = False,
     num_iterations: int | None = None,
@@ -283,7 +445,14 @@ def run_fuzz_bots(
     log_to_rollbar: bool, optional
         If True, log errors rollbar. Defaults to True.
     run_async: bool, optional
-        If True, will run the bots asynchronously. Defaults to False.
+        If True, all agents get their policy actions against the same pool state, and their trades
+        on a pool are submitted concurrently, with invariance checks running on every block mined by the trades.
+        Not allowed with `lp_share_price_test` unless building blocks, as the trades get mined
+        in different blocks. Defaults to False.
+    build_blocks: bool, optional
+        If True, all agents' trades on a pool are mined together in a single block per iteration,
+        and invariance checks run once per block. Only allowed for LocalChain. Since building blocks already
+        submits trades concurrently, this takes precedence over `run_async`. Defaults to False.
     random_advance_time: bool, optional
         If True, will advance the time randomly between sets of trades. Defaults to False.
     random_variable_rate: bool, optional
@@ -336,6 +505,9 @@ def run_fuzz_bots(
     if not isinstance(hyperdrive_pools, Sequence):
         hyperdrive_pools = [hyperdrive_pools]
 
+    if run_async and lp_share_price_test and not build_blocks:
+        raise ValueError("The lp share price test requires building blocks when running async")
+
     # Initialize agents. If agents are provided, use them.
     # NOTE the input agents are assumed to have a policy attached.
     if agents is None:
@@ -386,6 +558,14 @@ def run_fuzz_bots(
             _agents.append(agent)
         agents = _agents
 
+    if build_blocks:
+        if not isinstance(chain, LocalChain):
+            raise ValueError("Building blocks only allowed for pools deployed on LocalChain")
+        if not all(isinstance(pool, LocalHyperdrive) for pool in hyperdrive_pools):
+            raise ValueError("Building blocks only allowed for LocalHyperdrive pools")
+        if not all(isinstance(agent, LocalHyperdriveAgent) for agent in agents):
+            raise ValueError("Building blocks only allowed for agents on LocalChain")
+
     # Make trades until the user or agents stop us
     logging.info("Trading...")
     iteration = 0
@@ -417,12 +597,71 @@ def run_fuzz_bots(
                     raise ValueError("Random variable rate only allowed for LocalHyperdrive pools")
 
         iteration += 1
-        if run_async:
-            # There are race conditions throughout that need to be fixed here
-            raise NotImplementedError("Running async not implemented")
 
         for pool in hyperdrive_pools:
             logging.info("Trading on %s", pool.name)
+            if build_blocks:
+                # Type narrowing, checked when starting
+                assert isinstance(chain, LocalChain) and isinstance(pool, LocalHyperdrive)
+                pending_pool_state = None
+                if check_invariance and lp_share_price_test:
+                    pending_pool_state = pool.interface.get_hyperdrive_state("pending")
+
+                # Every agent gets their policy action against the state at the start of the block,
+                # and all trades are mined in a single block
+                pending_actions = []
+                with chain.build_block() as block_builder:
+                    for agent in agents:
+                        assert isinstance(agent, LocalHyperdriveAgent)
+                        try:
+                            pending_actions.append(block_builder.add_policy_action(agent, pool=pool))
+                        except PypechainCallException as exc:
+                            _handle_trade_exception(exc, pool, raise_error_on_crash, ignore_raise_error_func)
+                block_trades = []
+                for pending in pending_actions:
+                    try:
+                        block_trades.extend(pending.result())
+                    except PypechainCallException as exc:
+                        _handle_trade_exception(exc, pool, raise_error_on_crash, ignore_raise_error_func)
+
+                # Invariance checks run once per block
+                if check_invariance and (not lp_share_price_test or (lp_share_price_test and len(block_trades) > 0)):
+                    _check_invariance_on_block(
+                        chain,
+                        pool,
+                        log_to_rollbar=log_to_rollbar,
+                        lp_share_price_test=lp_share_price_test,
+                        pending_pool_state=pending_pool_state,
+                        raise_error_on_failed_invariance_checks=raise_error_on_failed_invariance_checks,
+                        ignore_raise_error_func=ignore_raise_error_func,
+                    )
+                continue
+
+            if run_async:
+                # All agents trade concurrently, and the trades can get mined across multiple blocks.
+                # Invariance checks run on every block mined by the trades, so that a violation in an
+                # intermediate block isn't hidden by later trades. The lp share price test isn't allowed here,
+                # checked when starting.
+                pre_trade_block_number = chain.block_number()
+                _execute_policy_actions_concurrently(agents, pool, raise_error_on_crash, ignore_raise_error_func)
+                if check_invariance:
+                    # We check the latest block if no trades were mined
+                    latest_block_number = chain.block_number()
+                    for block_number in range(
+                        min(pre_trade_block_number + 1, latest_block_number), latest_block_number + 1
+                    ):
+                        _check_invariance_on_block(
+                            chain,
+                            pool,
+                            log_to_rollbar=log_to_rollbar,
+                            lp_share_price_test=False,
+                            pending_pool_state=None,
+                            raise_error_on_failed_invariance_checks=raise_error_on_failed_invariance_checks,
+                            ignore_raise_error_func=ignore_raise_error_func,
+                            block_identifier=block_number,
+                        )
+                continue
+
             # Execute the agent policies
             for agent in agents:
                 # If we're checking invariance, and we're doing the lp share test,
@@ -436,57 +675,22 @@ def run_fuzz_bots(
                 try:
                     agent_trade = agent.execute_policy_action(pool=pool)
                 except PypechainCallException as exc:
-                    if ignore_raise_error_func is None or not ignore_raise_error_func(exc):
-                        # To ensure we log all errors, even when not from a trade contract call,
-                        # we log the exception here.
-                        # E.g., there's a crash when calling `interface.get_hyperdrive_state` from
-                        # a contract call.
-                        # TODO this can result in duplicate entries of the same error
-                        log_rollbar_exception(
-                            rollbar_log_prefix=f"FuzzBots: Unexpected contract call error on pool {pool.name}",
-                            exception=exc,
-                            log_level=logging.ERROR,
-                        )
-
-                        if raise_error_on_crash:
-                            raise exc
-                    # Otherwise, we ignore crashes, we want the bot to keep trading
-                    # These errors will get logged regardless
+                    _handle_trade_exception(exc, pool, raise_error_on_crash, ignore_raise_error_func)
 
                 # Check invariance on every iteration if we're not doing lp_share_price_test.
                 # Only check invariance if a trade was executed for lp_share_price_test.
                 # This is because the lp_share_price_test requires a trade to be executed
                 # in order to mine a block, as it waits for the pending block to be mined.
                 if check_invariance and (not lp_share_price_test or (lp_share_price_test and len(agent_trade) > 0)):
-                    latest_block = pool.interface.get_block("latest")
-                    latest_block_number = latest_block.get("number", None)
-                    if latest_block_number is None:
-                        raise AssertionError("Block has no number.")
-                    # pylint: disable=protected-access
-                    fuzz_exceptions = run_invariant_checks(
-                        check_block_data=latest_block,
-                        interface=pool.interface,
+                    _check_invariance_on_block(
+                        chain,
+                        pool,
                         log_to_rollbar=log_to_rollbar,
-                        rollbar_log_level_threshold=chain.config.rollbar_log_level_threshold,
-                        rollbar_log_filter_func=chain.config.rollbar_log_filter_func,
                         lp_share_price_test=lp_share_price_test,
-                        crash_report_additional_info=pool._crash_report_additional_info,
-                        log_anvil_state_dump=chain.config.log_anvil_state_dump,
-                        pool_name=pool.name,
                         pending_pool_state=pending_pool_state,
-                        check_price_spike=False,
+                        raise_error_on_failed_invariance_checks=raise_error_on_failed_invariance_checks,
+                        ignore_raise_error_func=ignore_raise_error_func,
                     )
-                    if len(fuzz_exceptions) > 0 and raise_error_on_failed_invariance_checks:
-                        # If we have an ignore function, we filter exceptions
-                        if ignore_raise_error_func is not None:
-                            fuzz_exceptions = [e for e in fuzz_exceptions if not ignore_raise_error_func(e)]
-                        # Do nothing if no exceptions
-                        # If single failure, we raise it by itself
-                        if len(fuzz_exceptions) == 1:
-                            raise fuzz_exceptions[0]
-                        if len(fuzz_exceptions) > 1:
-                            # Otherwise, we raise a new fuzz assertion exception wht the list of exceptions
-                            raise FuzzAssertionException(*fuzz_exceptions)
 
         # Check trades on pools and log if no trades have been made on any of the pools
         _check_trades_made_on_pool(chain, hyperdrive_pools, fuzz_start_block, iteration)
@@ -505,8 +709,6 @@ def run_fuzz_bots(
             # Update agent funds
             if (average_agent_base < minimum_avg_agent_base) or (average_agent_eth < minimum_avg_agent_eth):
                 logging.info("Refunding agents...")
-                if run_async:
-                    raise NotImplementedError("Running async not implemented")
                 _ = [
                     agent.add_funds(
                         base=base_budget_per_bot,
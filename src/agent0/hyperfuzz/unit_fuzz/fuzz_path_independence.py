@@ -18,7 +18,7 @@
 # Invariance checks (these should be True):
 # We are checking that the pool ends up in the same sate regardless of close transaction order
 - the following state values should equal in all checks:
-  - effective share reserves 
+  - effective share reserves
   - present value
   - shorts outstanding
   - withdrawal shares proceeds
@@ -36,11 +36,11 @@ import json
 import logging
 import sys
 import time
+from dataclasses import replace
 from math import perm
 from typing import Any, NamedTuple, Sequence
 
 import pandas as pd
-import rollbar
 from fixedpointmath import FixedPoint, isclose
 from pypechain.core import PypechainCallException
 
@@ -48,6 +48,7 @@ from agent0.core.hyperdrive.crash_report import build_crash_trade_result, log_hy
 from agent0.core.hyperdrive.interactive import LocalChain, LocalHyperdrive
 from agent0.hyperfuzz import FuzzAssertionException
 from agent0.hyperlogs import ExtendedJSONEncoder
+from agent0.hyperlogs.rollbar_utilities import log_rollbar_message
 
 from .helpers import close_trades, execute_random_trades, permute_trade_events, setup_fuzz
 
@@ -107,6 +108,8 @@ def fuzz_path_independence(
     if perm(num_trades) < 2 * num_paths_checked:
         raise AssertionError("Need more trades to check {num_paths_checked} paths.")
 
+    # We load the snapshot once per path, so we keep the snapshot in memory instead of on disk
+    chain_config = replace(chain_config, in_memory_snapshot=True)
     chain, random_seed, rng, hyperdrive_pool = setup_fuzz(
         chain_config,
         # Trade crashes in this file have expected failures, hence we log interactive
@@ -205,7 +208,7 @@ def fuzz_path_independence(
             # TODO abstract out rollbar logging into a single point in interactive hyperdrive
             if chain.config.rollbar_log_level_threshold <= logging.WARNING:
                 rollbar_data = {"fuzz_random_seed": random_seed}
-                rollbar.report_message(message, "warning", extra_data=rollbar_data)
+                log_rollbar_message(message, logging.WARNING, extra_data=rollbar_data)
 
             continue
 
@@ -286,9 +289,9 @@ def fuzz_path_independence(
                 "close_random_paths": [[trade for _, trade in path] for path in trade_paths],
                 "trade_event_paths": trade_event_paths,
             }
-            rollbar.report_message(
+            log_rollbar_message(
                 warning_message,
-                "warning",
+                logging.WARNING,
                 extra_data=json.loads(json.dumps(rollbar_data, indent=2, cls=ExtendedJSONEncoder)),
             )
 
@@ -8,11 +8,14 @@ from .logs import (
     DEFAULT_LOG_FORMATTER,
     DEFAULT_LOG_LEVEL,
     DEFAULT_LOG_MAXBYTES,
+    JsonLineFormatter,
     add_file_handler,
     add_stdout_handler,
     close_logging,
     get_root_logger,
     setup_logging,
+    start_queue_listener,
+    stop_queue_listener,
 )
 
 # Setup barebones logging without a handler for users to adapt to their needs.
@@ -2,10 +2,14 @@
 
 from __future__ import annotations
 
+import copy
+import json
 import logging
 import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 # Logging defaults
 DEFAULT_LOG_LEVEL = logging.INFO
@@ -13,6 +17,82 @@ DEFAULT_LOG_FORMATTER = "\n%(asctime)s: %(levelname)s: %(filename)s:%(lineno)s::
 DEFAULT_LOG_DATETIME = "%y-%m-%d %H:%M:%S"
 DEFAULT_LOG_MAXBYTES = int(2e6)  # 2MB
 
+# The listener of the root logger's queue handler, if logging with a queue
+_queue_listener: QueueListener | None = None
+# Formats exceptions of queued records if the queue handler has no formatter
+_DEFAULT_FORMATTER = logging.Formatter()
+
+
+class _RecordQueueHandler(QueueHandler):
+    """A queue handler that keeps the exception and stack of a record separate from its message.
+
+    The default handler formats the record before queueing it, which folds the exception and stack into
+    the message. This handler only merges the message with its arguments, and keeps the formatted exception
+    in `exc_text` and the stack in `stack_info`, so handlers behind the queue format records the same way
+    as without a queue.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Prepare a record for queueing by merging its message with its arguments and formatting its exception.
+
+        The exception info holds a traceback, which can't be pickled and keeps frames alive, so it's replaced
+        by its text.
+
+        Arguments
+        ---------
+        record: logging.LogRecord
+            The record to prepare.
+
+        Returns
+        -------
+        logging.LogRecord
+            A copy of the record that's safe to queue.
+        """
+        # Other handlers of the logger get the original record
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = (self.formatter or _DEFAULT_FORMATTER).formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Formats log records as compact, single line json objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format the log record as a json line.
+
+        Arguments
+        ---------
+        record: logging.LogRecord
+            The log record to format.
+
+        Returns
+        -------
+        str
+            The json line.
+        """
+        log_obj = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "function": record.funcName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            log_obj["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_obj["exception"] = record.exc_text
+        if record.stack_info:
+            log_obj["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(log_obj, separators=(",", ":"), default=str)
+
 
 def setup_logging(
     log_filename: str | None = None,
@@ -22,6 +102,8 @@ def setup_logging(
     log_stdout: bool = True,
     log_format_string: str | None = None,
     keep_previous_handlers: bool = False,
+    log_with_queue: bool = False,
+    log_json_lines: bool = False,
 ) -> None:
     r"""Set up basic logging with default settings, customized by inputs.
 
@@ -49,18 +131,25 @@ def setup_logging(
         Log formatter object. Defaults to None.
     keep_previous_handlers: bool, optional
         Whether to keep previous handlers. Defaults to False.
+    log_with_queue: bool, optional
+        Whether to hand log records to a queue that a background thread writes to the handlers, so that logging
+        doesn't wait on formatting and writing to stdout or file. Defaults to False.
+    log_json_lines: bool, optional
+        Whether to format log records as compact json lines, ignoring `log_format_string`. Defaults to False.
 
     .. todo::
         - Test the various optional input combinations
     """
     # pylint: disable=too-many-arguments
     # pylint: disable=too-many-positional-arguments
+    # The handlers of a previous queue go back on the root logger, to be removed or requeued below
+    stop_queue_listener()
     # remove all handlers if requested
     if not keep_previous_handlers:
         remove_handlers(get_root_logger())
     # add handler logging to stdout if requested
     if log_stdout is True:
-        add_stdout_handler(log_format_string=log_format_string, log_level=log_level)
+        add_stdout_handler(log_format_string=log_format_string, log_level=log_level, log_json_lines=log_json_lines)
     # add handler logging to file if requested
     if log_filename is not None:
         add_file_handler(
@@ -69,7 +158,10 @@ def setup_logging(
             log_format_string=log_format_string,
             max_bytes=max_bytes,
             log_level=log_level,
+            log_json_lines=log_json_lines,
         )
+    if log_with_queue and get_root_logger().handlers:
+        start_queue_listener()
     # Set the root logger's level to the lowest level among all of its
     # While the root logger doesn't log anything, it captures logging statements to feed to the handlers
     # Therefore set the root logger's level to the lowest level among all of its handlers
@@ -87,6 +179,8 @@ def close_logging(delete_logs=True) -> None:
     delete_logs: bool
         Whether to delete logs before closing logging.
     """
+    # Write out any queued records before closing the handlers
+    stop_queue_listener()
     logging.shutdown()
     root_logger = get_root_logger()
     if delete_logs:
@@ -102,6 +196,58 @@ def close_logging(delete_logs=True) -> None:
     remove_handlers(root_logger)
 
 
+def start_queue_listener(logger: logging.Logger | None = None) -> None:
+    """Move the handlers of the root logger to a background thread that's fed by a queue.
+
+    The logger gets a single queue handler, which only merges the message with its arguments and formats any
+    exception before queueing the record. Formatting and writing the record happens in the listener thread,
+    with each handler keeping its own level and formatter. Only the root logger can have a queue listener at a time.
+
+    Arguments
+    ---------
+    logger: logging.Logger, optional
+        Logger whose handlers to move to the queue. Defaults to get_root_logger().
+    """
+    # pylint: disable=global-statement
+    global _queue_listener
+    logger = get_root_logger(logger)
+    if _queue_listener is not None:
+        raise ValueError("A queue listener is already running, stop it before starting a new one.")
+    handlers = list(logger.handlers)
+    remove_handlers(logger)
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = _RecordQueueHandler(log_queue)
+    if handlers:
+        queue_handler.setLevel(min(handler.level for handler in handlers))
+    _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
+    logger.addHandler(queue_handler)
+
+
+def stop_queue_listener(logger: logging.Logger | None = None) -> None:
+    """Write out any queued log records, stop the queue listener, and move its handlers back to the root logger.
+
+    Does nothing if there is no queue listener.
+
+    Arguments
+    ---------
+    logger: logging.Logger, optional
+        Logger with the queue handler. Defaults to get_root_logger().
+    """
+    # pylint: disable=global-statement
+    global _queue_listener
+    if _queue_listener is None:
+        return
+    logger = get_root_logger(logger)
+    _queue_listener.stop()
+    for handler in list(logger.handlers):
+        if isinstance(handler, QueueHandler):
+            logger.removeHandler(handler)
+    for handler in _queue_listener.handlers:
+        logger.addHandler(handler)
+    _queue_listener = None
+
+
 def prepare_log_path(log_filename: str) -> tuple[str, str]:
     """Split filename into path and name. Postpend ".log" extension if necessary. Make dir if necessary.
 
@@ -133,7 +279,7 @@ def prepare_log_path(log_filename: str) -> tuple[str, str]:
     return log_dir, log_name
 
 
-def create_formatter(log_format_string: str | None = None) -> logging.Formatter:
+def create_formatter(log_format_string: str | None = None, log_json_lines: bool = False) -> logging.Formatter:
     """Create Formatter object from a log format string, applying default settings if log_format_string is None.
 
     Default settings are defined in hyperlogs.DEFAULT_LOG_FORMATTER and hyperlogs.DEFAULT_LOG_DATETIME.
@@ -142,13 +288,17 @@ def create_formatter(log_format_string: str | None = None) -> logging.Formatter:
     ---------
     log_format_string: str, optional
         Logging format described in string format.
+    log_json_lines: bool, optional
+        Whether to format records as compact json lines, ignoring `log_format_string`. Defaults to False.
 
     Returns
     -------
     logging.Formatter
         Logging format as a Formatter object, after defaults are applied.
     """
-    if log_format_string is None:
+    if log_json_lines:
+        log_formatter = JsonLineFormatter()
+    elif log_format_string is None:
         log_formatter = logging.Formatter(DEFAULT_LOG_FORMATTER, DEFAULT_LOG_DATETIME)
     else:
         log_formatter = logging.Formatter(log_format_string, DEFAULT_LOG_DATETIME)
@@ -214,6 +364,7 @@ def add_stdout_handler(
     log_format_string: str | None = None,
     log_level: int | None = logging.INFO,
     keep_previous_handlers: bool = True,
+    log_json_lines: bool = False,
 ) -> None:
     """Add a stdout handler to the root logger.
 
@@ -228,13 +379,15 @@ def add_stdout_handler(
         Log level to track. Defaults to hyperlogs.DEFAULT_LOG_LEVEL.
     keep_previous_handlers: bool, optional
         Whether to keep previous handlers. Defaults to True.
+    log_json_lines: bool, optional
+        Whether to format records as compact json lines, ignoring `log_format_string`. Defaults to False.
     """
     logger = get_root_logger(logger)
     if not keep_previous_handlers:
         remove_handlers(logger)
     stream_handler = logging.StreamHandler(sys.stdout)
     stream_handler.setLevel(create_log_level(log_level))
-    stream_handler.setFormatter(create_formatter(log_format_string))
+    stream_handler.setFormatter(create_formatter(log_format_string, log_json_lines))
     logger.addHandler(stream_handler)
 
 
@@ -246,6 +399,7 @@ def add_file_handler(
     log_level: int | None = logging.INFO,
     max_bytes=None,
     keep_previous_handlers: bool = True,
+    log_json_lines: bool = False,
 ):
     """Add a file handler to the root logger.
 
@@ -265,6 +419,8 @@ def add_file_handler(
         Maximum size of the log file in bytes. Defaults to hyperlogs.DEFAULT_LOG_MAXBYTES.
     keep_previous_handlers: bool, optional
         Whether to keep previous handlers. Defaults to True.
+    log_json_lines: bool, optional
+        Whether to format records as compact json lines, ignoring `log_format_string`. Defaults to False.
     """
     # pylint: disable=too-many-arguments
     # pylint: disable=too-many-positional-arguments
@@ -276,7 +432,11 @@ def add_file_handler(
     if delete_previous_logs and os.path.exists(os.path.join(log_dir, log_name)):
         os.remove(os.path.join(log_dir, log_name))
     file_handler = create_file_handler(
-        log_dir, log_name, create_formatter(log_format_string), create_max_bytes(max_bytes), create_log_level(log_level)
+        log_dir,
+        log_name,
+        create_formatter(log_format_string, log_json_lines),
+        create_max_bytes(max_bytes),
+        create_log_level(log_level),
     )
     logger.addHandler(file_handler)
 
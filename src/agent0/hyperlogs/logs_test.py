@@ -3,10 +3,12 @@
 from __future__ import annotations
 
 import itertools
+import json
 import logging
 import os
 import sys
 import unittest
+from logging.handlers import QueueHandler
 
 from . import add_file_handler, add_stdout_handler, close_logging, get_root_logger, setup_logging
 
@@ -89,3 +91,48 @@ class TestLogging(unittest.TestCase):
         add_file_handler(log_filename=log_filename)
         self.assertEqual(len(get_root_logger().handlers), 2)
         close_logging()
+
+    def test_queue_logging(self):
+        """Verifies that queued log records get written as json lines once logging is closed."""
+        log_filename = ".logging/test_queue_logging.log"
+        setup_logging(log_filename=log_filename, log_stdout=True, log_with_queue=True, log_json_lines=True)
+        # The stdout and file handlers are behind a single queue handler
+        self.assertEqual(len(get_root_logger().handlers), 1)
+        self.assertIsInstance(get_root_logger().handlers[0], QueueHandler)
+        logging.info("Trading on pool %s", "0xabc")
+        logging.debug("Not logged")
+        close_logging(delete_logs=False)
+        self.assertEqual(len(get_root_logger().handlers), 0)
+
+        with open(log_filename, encoding="utf-8") as file:
+            lines = file.read().splitlines()
+        os.remove(log_filename)
+        self.assertEqual(len(lines), 1)
+        log_obj = json.loads(lines[0])
+        self.assertEqual(log_obj["level"], "INFO")
+        self.assertEqual(log_obj["message"], "Trading on pool 0xabc")
+
+    def test_queue_logging_exception(self):
+        """Verifies that queued records keep their exception and stack separate from the message."""
+        log_filename = ".logging/test_queue_logging_exception.log"
+        setup_logging(log_filename=log_filename, log_stdout=False, log_with_queue=True, log_json_lines=True)
+        try:
+            raise ValueError("Bad trade")
+        except ValueError:
+            logging.exception("Trade on pool %s failed", "0xabc")
+        logging.warning("Checking pool", stack_info=True)
+        close_logging(delete_logs=False)
+
+        with open(log_filename, encoding="utf-8") as file:
+            lines = file.read().splitlines()
+        os.remove(log_filename)
+        self.assertEqual(len(lines), 2)
+        exception_obj = json.loads(lines[0])
+        self.assertEqual(exception_obj["message"], "Trade on pool 0xabc failed")
+        self.assertIn("Traceback", exception_obj["exception"])
+        self.assertIn("ValueError: Bad trade", exception_obj["exception"])
+        self.assertNotIn("stack", exception_obj)
+        stack_obj = json.loads(lines[1])
+        self.assertEqual(stack_obj["message"], "Checking pool")
+        self.assertNotIn("exception", stack_obj)
+        self.assertIn("test_queue_logging_exception", stack_obj["stack"])
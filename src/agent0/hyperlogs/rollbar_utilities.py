@@ -2,12 +2,18 @@
 
 from __future__ import annotations
 
+import atexit
 import datetime
 import getpass
 import logging
 import os
 import platform
+import queue
+import threading
+import time
+from dataclasses import dataclass
 from traceback import format_exception
+from typing import Any, Callable
 
 import rollbar
 from dotenv import load_dotenv
@@ -15,14 +21,283 @@ from dotenv import load_dotenv
 load_dotenv(".env")
 ROLLBAR_API_KEY = os.getenv("ROLLBAR_API_KEY")
 
+# The reporter that sends rollbar events from a background thread, if started
+_async_reporter: AsyncRollbarReporter | None = None
 
-def initialize_rollbar(environment_name: str) -> bool:
+
+@dataclass
+class _RollbarEvent:
+    message: str
+    level_name: str
+    extra_data: dict | None
+
+
+@dataclass
+class _DuplicateWindow:
+    start_time: float
+    num_duplicates: int
+    last_event: _RollbarEvent
+
+
+class AsyncRollbarReporter:
+    """Sends rollbar events from a background thread, so reporting never blocks the caller.
+
+    Events go on a bounded queue, and are dropped if the queue is full, e.g., when the reporting service is down.
+    The background thread takes events off the queue in batches and sends them at a limited rate. Events with the
+    same message and level within a time window are collapsed: the first one is sent immediately, and the last
+    duplicate is sent with the number of duplicates when the window ends. Queued events and collapsed duplicates
+    are sent on shutdown, without the rate limit so that they aren't lost at exit.
+
+    .. note::
+        Events are sent with `rollbar.report_message` by default, so rollbar should be initialized with
+        the "blocking" handler for the rate limit and shutdown to apply to the requests to rollbar.
+        `initialize_rollbar` does this when `async_reporting` is set.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        send_func: Callable[[str, str, dict | None], Any] | None = None,
+        max_queue_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        max_events_per_second: float = 5.0,
+        duplicate_window: float = 60.0,
+    ) -> None:
+        """Initialize the reporter and start the background thread.
+
+        Arguments
+        ---------
+        send_func: Callable[[str, str, dict | None], Any] | None, optional
+            The function that sends an event, taking the message, the level name, and the extra data.
+            Defaults to `rollbar.report_message`.
+        max_queue_size: int, optional
+            The number of events that can be waiting to be sent. Defaults to 1000.
+        batch_size: int, optional
+            The maximum number of events to take off the queue at once. Defaults to 50.
+        flush_interval: float, optional
+            The number of seconds between checking for ended duplicate windows. Defaults to 1.
+        max_events_per_second: float, optional
+            The maximum rate of sending events. Defaults to 5.
+        duplicate_window: float, optional
+            The number of seconds that duplicate events get collapsed for. Defaults to 60.
+        """
+        # pylint: disable=too-many-arguments
+        # pylint: disable=too-many-positional-arguments
+        if send_func is None:
+            send_func = _send_to_rollbar
+        self._send_func = send_func
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_events_per_second = max_events_per_second
+        self.duplicate_window = duplicate_window
+
+        self._lock = threading.Lock()
+        self.num_sent = 0
+        self.num_dropped = 0
+        self.num_collapsed = 0
+        self.num_failed = 0
+
+        self._windows: dict[tuple[str, str], _DuplicateWindow] = {}
+        # Allow a burst of up to a second of events
+        self._tokens = max_events_per_second
+        self._last_token_time = time.monotonic()
+        # Set on shutdown, to send the remaining events without rate limiting
+        self._draining = threading.Event()
+
+        self._queue: queue.Queue[_RollbarEvent | None] = queue.Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(target=self._run, name="async-rollbar-reporter", daemon=True)
+        self._thread.start()
+
+    def report(self, message: str, level_name: str, extra_data: dict | None = None) -> bool:
+        """Queue an event to be sent to rollbar.
+
+        Arguments
+        ---------
+        message: str
+            The message to send to rollbar.
+        level_name: str
+            The name of the logging level.
+        extra_data: dict | None, optional
+            Extra data to send to rollbar.
+
+        Returns
+        -------
+        bool
+            Whether the event was queued. Events are dropped if the queue is full or the reporter was shut down.
+        """
+        if not self._thread.is_alive():
+            return False
+        try:
+            self._queue.put_nowait(_RollbarEvent(message, level_name, extra_data))
+        except queue.Full:
+            with self._lock:
+                self.num_dropped += 1
+            return False
+        return True
+
+    def shutdown(self, timeout: float | None = 10.0) -> None:
+        """Send any queued events and collapsed duplicates, and stop the background thread.
+
+        Arguments
+        ---------
+        timeout: float | None, optional
+            The number of seconds to wait for events to be sent. Defaults to 10.
+        """
+        if not self._thread.is_alive():
+            return
+        self._draining.set()
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logging.warning("Timed out shutting down the rollbar reporter, dropping queued events.")
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logging.warning("Timed out sending queued rollbar events.")
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            stop = None in batch
+            now = time.monotonic()
+            # Windows that ended get sent before new events can restart them
+            self._send_ended_windows(now, end_all=False)
+            for event in batch:
+                if event is not None:
+                    self._add_event(event, now)
+            if stop:
+                self._send_ended_windows(now, end_all=True)
+                return
+
+    def _next_batch(self) -> list[_RollbarEvent | None]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _add_event(self, event: _RollbarEvent, now: float) -> None:
+        key = (event.level_name, event.message)
+        window = self._windows.get(key)
+        if window is not None and now - window.start_time < self.duplicate_window:
+            window.num_duplicates += 1
+            window.last_event = event
+            with self._lock:
+                self.num_collapsed += 1
+            return
+        self._windows[key] = _DuplicateWindow(start_time=now, num_duplicates=0, last_event=event)
+        self._send(event)
+
+    def _send_ended_windows(self, now: float, end_all: bool) -> None:
+        for key, window in list(self._windows.items()):
+            if not end_all and now - window.start_time < self.duplicate_window:
+                continue
+            if window.num_duplicates > 0:
+                extra_data = dict(window.last_event.extra_data or {})
+                extra_data["num_duplicates"] = window.num_duplicates
+                self._send(_RollbarEvent(window.last_event.message, window.last_event.level_name, extra_data))
+                # A flood of duplicates gets reported once per window
+                self._windows[key] = _DuplicateWindow(start_time=now, num_duplicates=0, last_event=window.last_event)
+            else:
+                del self._windows[key]
+
+    def _send(self, event: _RollbarEvent) -> None:
+        # Token bucket rate limiting
+        now = time.monotonic()
+        self._tokens = min(
+            self.max_events_per_second, self._tokens + (now - self._last_token_time) * self.max_events_per_second
+        )
+        self._last_token_time = now
+        if self._tokens < 1 and not self._draining.is_set():
+            time.sleep((1 - self._tokens) / self.max_events_per_second)
+            self._tokens = 1
+            self._last_token_time = time.monotonic()
+        self._tokens -= 1
+        try:
+            self._send_func(event.message, event.level_name, event.extra_data)
+        except Exception as exc:  # pylint: disable=broad-except
+            # Reporting is best effort, so failures to reach rollbar don't stop the reporter
+            logging.warning("Failed to report to rollbar: %s", repr(exc))
+            with self._lock:
+                self.num_failed += 1
+            return
+        with self._lock:
+            self.num_sent += 1
+
+
+def start_async_rollbar_reporter(**kwargs: Any) -> AsyncRollbarReporter:
+    """Start sending rollbar events from a background thread.
+
+    After this is called, `log_rollbar_message` and `log_rollbar_exception` queue events instead of
+    sending them. Queued events are sent on exit, or when `shutdown_async_rollbar_reporter` is called.
+
+    Arguments
+    ---------
+    **kwargs: Any
+        Keyword arguments passed to `AsyncRollbarReporter`.
+
+    Returns
+    -------
+    AsyncRollbarReporter
+        The reporter.
+    """
+    # pylint: disable=global-statement
+    global _async_reporter
+    shutdown_async_rollbar_reporter()
+    _async_reporter = AsyncRollbarReporter(**kwargs)
+    atexit.register(shutdown_async_rollbar_reporter)
+    return _async_reporter
+
+
+def shutdown_async_rollbar_reporter(timeout: float | None = 10.0) -> None:
+    """Send any queued rollbar events and go back to sending events when they're logged.
+
+    Arguments
+    ---------
+    timeout: float | None, optional
+        The number of seconds to wait for events to be sent. Defaults to 10.
+    """
+    # pylint: disable=global-statement
+    global _async_reporter
+    if _async_reporter is None:
+        return
+    try:
+        atexit.unregister(shutdown_async_rollbar_reporter)
+    except Exception:  # pylint: disable=broad-except
+        pass
+    _async_reporter.shutdown(timeout)
+    _async_reporter = None
+
+
+def _send_to_rollbar(message: str, level_name: str, extra_data: dict | None = None) -> None:
+    rollbar.report_message(message, level_name, extra_data=extra_data)
+
+
+def _report_message(message: str, level_name: str, extra_data: dict | None = None) -> None:
+    if _async_reporter is not None:
+        _async_reporter.report(message, level_name, extra_data)
+    else:
+        rollbar.report_message(message, level_name, extra_data=extra_data)
+
+
+def initialize_rollbar(environment_name: str, async_reporting: bool = False) -> bool:
     """Initializes the rollbar sdk.
 
     Arguments
     ---------
     environment_name: str
         The name of the environment.  Should be something like localfuzzbots or aws.fuzzbots
+    async_reporting: bool, optional
+        Whether to send events from a background thread with `AsyncRollbarReporter`, so that reporting
+        never blocks the caller. Rollbar then sends with the "blocking" handler on the reporter's thread.
+        Defaults to False.
 
     Returns
     -------
@@ -36,7 +311,11 @@ def initialize_rollbar(environment_name: str) -> bool:
             access_token=ROLLBAR_API_KEY,
             environment=environment_name,
             code_version="1.0",
+            # The reporter already sends from its own thread
+            handler="blocking" if async_reporting else "default",
         )
+        if async_reporting:
+            start_async_rollbar_reporter()
         env_details = {
             "environment": os.getenv("APP_ENV", "development"),  # e.g., 'production', 'development'
             "platform": platform.system(),  # e.g., 'Linux', 'Windows'
@@ -47,7 +326,7 @@ def initialize_rollbar(environment_name: str) -> bool:
             "user": getpass.getuser(),
         }
 
-        rollbar.report_message("rollbar initialized", "info", extra_data=env_details)
+        _report_message("rollbar initialized", "info", extra_data=env_details)
 
     return log_to_rollbar
 
@@ -65,7 +344,7 @@ def log_rollbar_message(message: str, log_level: int, extra_data: dict | None =
         Extra data to send to rollbar.  This is usually the custom crash report data.
     """
     log_level_name = logging.getLevelName(log_level)
-    rollbar.report_message(message, log_level_name, extra_data=extra_data)
+    _report_message(message, log_level_name, extra_data=extra_data)
 
 
 def log_rollbar_exception(
@@ -98,4 +377,4 @@ def log_rollbar_exception(
     if "full_exception" not in extra_data:
         extra_data["full_exception"] = format_exception(exception)
 
-    rollbar.report_message(log_message, log_level_name, extra_data=extra_data)
+    _report_message(log_message, log_level_name, extra_data=extra_data)
@@ -0,0 +1,124 @@
+"""Tests for reporting to rollbar."""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import rollbar
+
+from . import rollbar_utilities
+from .rollbar_utilities import AsyncRollbarReporter, log_rollbar_message
+
+
+class _RollbarStandIn(BaseHTTPRequestHandler):
+    """Records the items posted to the rollbar api."""
+
+    items: list[dict] = []
+    delay: float = 0
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Record the item and respond like rollbar."""
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(self.delay)
+        self.items.append(json.loads(body))
+        response = json.dumps({"err": 0, "result": {"uuid": "0"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Don't log requests."""
+
+
+@pytest.fixture(name="rollbar_stand_in")
+def rollbar_stand_in_fixture(monkeypatch: pytest.MonkeyPatch):
+    """Point the rollbar sdk to a local stand-in for the rollbar api."""
+    _RollbarStandIn.items = []
+    _RollbarStandIn.delay = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RollbarStandIn)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    # Rollbar ignores being initialized again, so the settings are patched instead
+    monkeypatch.setitem(rollbar.SETTINGS, "access_token", "test")
+    monkeypatch.setitem(rollbar.SETTINGS, "environment", "test")
+    monkeypatch.setitem(rollbar.SETTINGS, "endpoint", f"http://127.0.0.1:{server.server_port}/api/1/")
+    # The reporter sends on its own thread, so rollbar sends on the reporter's thread
+    monkeypatch.setitem(rollbar.SETTINGS, "handler", "blocking")
+    yield _RollbarStandIn
+    rollbar_utilities.shutdown_async_rollbar_reporter()
+    server.shutdown()
+    server.server_close()
+
+
+def _messages(items: list[dict]) -> list[tuple[str, int | None]]:
+    return [
+        (item["data"]["body"]["message"]["body"], item["data"]["body"]["message"].get("num_duplicates"))
+        for item in items
+    ]
+
+
+def test_collapses_duplicates(rollbar_stand_in):
+    """Duplicate events within the window are sent once, then summarized on shutdown."""
+    reporter = rollbar_utilities.start_async_rollbar_reporter(duplicate_window=60)
+    for _ in range(100):
+        log_rollbar_message("invariant check failed", logging.ERROR, extra_data={"block": 1})
+    log_rollbar_message("checkpoint bot sleeping", logging.INFO)
+    rollbar_utilities.shutdown_async_rollbar_reporter()
+
+    assert sorted(_messages(rollbar_stand_in.items), key=str) == [
+        ("checkpoint bot sleeping", None),
+        ("invariant check failed", 99),
+        ("invariant check failed", None),
+    ]
+    assert (reporter.num_sent, reporter.num_collapsed, reporter.num_dropped) == (3, 99, 0)
+
+
+def test_outage_does_not_block(rollbar_stand_in):
+    """Reporting returns immediately when the service is slow, dropping events once the queue is full."""
+    rollbar_stand_in.delay = 0.2
+    reporter = AsyncRollbarReporter(max_queue_size=5, max_events_per_second=100)
+    start_time = time.monotonic()
+    queued = [reporter.report(f"error {i}", "error") for i in range(50)]
+    assert time.monotonic() - start_time < 0.1
+    assert not all(queued)
+    reporter.shutdown()
+    assert reporter.num_dropped == queued.count(False)
+    assert len(rollbar_stand_in.items) == reporter.num_sent == queued.count(True)
+
+
+def test_send_failures():
+    """Failures to send are counted without stopping the reporter."""
+    sent = []
+
+    def _send(message, level_name, extra_data):
+        if message == "bad":
+            raise ConnectionError("rollbar is down")
+        sent.append((message, level_name, extra_data))
+
+    reporter = AsyncRollbarReporter(send_func=_send)
+    assert reporter.report("bad", "error")
+    assert reporter.report("good", "info", {"a": 1})
+    reporter.shutdown()
+    assert sent == [("good", "info", {"a": 1})]
+    assert (reporter.num_sent, reporter.num_failed) == (1, 1)
+    # Events after shutdown are dropped
+    assert not reporter.report("late", "info")
+
+
+def test_shutdown_sends_queued_events(rollbar_stand_in):
+    """Queued events are sent on shutdown without waiting on the rate limit."""
+    reporter = AsyncRollbarReporter(max_events_per_second=1)
+    for i in range(20):
+        assert reporter.report(f"error {i}", "error")
+    start_time = time.monotonic()
+    reporter.shutdown(timeout=5)
+    assert time.monotonic() - start_time < 5
+    assert len(rollbar_stand_in.items) == reporter.num_sent == 20
+    assert reporter.num_dropped == 0
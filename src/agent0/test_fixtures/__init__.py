@@ -1,5 +1,5 @@
 """Test fixtures for agent0."""
 
-from .chain_fixture import chain_fixture, fast_chain_fixture, init_chain
+from .chain_fixture import chain_fixture, deployment_cache_dir, fast_chain_fixture, init_chain
 from .hyperdrive_fixture import fast_hyperdrive_fixture, hyperdrive_fixture, init_hyperdrive
 from .interface_fixture import hyperdrive_read_interface_fixture, hyperdrive_read_write_interface_fixture
@@ -9,20 +9,26 @@ import docker
 import pytest
 from docker.errors import DockerException
 
-from agent0.core.hyperdrive.interactive import LocalChain
+from agent0.core.hyperdrive.interactive import AnvilProcessPool, LocalChain
 
 # Fixtures defined in the same file
 # pylint: disable=redefined-outer-name
 
+# Anvil processes are reused across tests, and get terminated when the test session exits
+_anvil_pool = AnvilProcessPool(size=2)
 
-def launch_chain(port_base) -> LocalChain:
+
+def launch_chain(port_base, deployment_cache_dir: Path | None = None) -> LocalChain:
     """Launches a local chain.
 
     Arguments
     ---------
     port_base: int
-        The base port number to use for the chain and database.
-        The chain port will be `port_base`, and the database port will be `port_base + 1`.
+        The base port number to use for the database, which will be `port_base + 1`.
+        The chain is taken from a pool of anvil processes running on free ports.
+    deployment_cache_dir: Path | None, optional
+        The directory to cache pool deployments in, e.g., from the `deployment_cache_dir` fixture.
+        Defaults to deploying pools without a cache.
 
     Returns
     -------
@@ -53,41 +59,71 @@ def launch_chain(port_base) -> LocalChain:
             raise exc
 
     local_chain_config = LocalChain.Config(
-        chain_port=port_base,
+        # The anvil pool chooses the chain port
         db_port=port_base + 1,
         # Always preview before trade in tests
         preview_before_trade=True,
+        # Most tests deploy a pool with the same config on a fresh chain
+        deployment_cache_dir=None if deployment_cache_dir is None else str(deployment_cache_dir),
+        anvil_pool=_anvil_pool,
     )
     return LocalChain(local_chain_config)
 
 
+@pytest.fixture(scope="session")
+def deployment_cache_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """A directory to cache pool deployments in for the test session.
+
+    Arguments
+    ---------
+    tmp_path_factory: pytest.TempPathFactory
+        The pytest factory for temporary directories.
+
+    Returns
+    -------
+    Path
+        The deployment cache directory.
+    """
+    return tmp_path_factory.mktemp("deployment_cache")
+
+
 @pytest.fixture(scope="function")
-def chain_fixture() -> Iterator[LocalChain]:
+def chain_fixture(deployment_cache_dir: Path) -> Iterator[LocalChain]:
     """Local chain connected to a local database hosted in docker.
     This fixture launches a chain from scratch in a function scope.
 
+    Arguments
+    ---------
+    deployment_cache_dir: Path
+        Session scoped deployment cache directory.
+
     Yield
     -----
     LocalChain
         The local chain instance.
     """
-    _chain = launch_chain(port_base=20000)
+    _chain = launch_chain(port_base=20000, deployment_cache_dir=deployment_cache_dir)
     yield _chain
     _chain.cleanup()
     del _chain
 
 
 @pytest.fixture(scope="session")
-def init_chain() -> Iterator[LocalChain]:
+def init_chain(deployment_cache_dir: Path) -> Iterator[LocalChain]:
     """Local chain connected to a local database hosted in docker.
     This fixture launches a chain from scratch in a session scope.
 
+    Arguments
+    ---------
+    deployment_cache_dir: Path
+        Session scoped deployment cache directory.
+
     Yield
     -----
     LocalChain
         local chain instance.
     """
-    _chain = launch_chain(30000)
+    _chain = launch_chain(30000, deployment_cache_dir=deployment_cache_dir)
     yield _chain
     _chain.cleanup()
     del _chain
@@ -1,5 +1,6 @@
 """Local chain connected to a local database hosted in docker."""
 
+from pathlib import Path
 from typing import Iterator
 
 import pytest
@@ -60,10 +61,15 @@ def hyperdrive_fixture(chain_fixture: LocalChain) -> LocalHyperdrive:
 
 
 @pytest.fixture(scope="session")
-def init_hyperdrive() -> Iterator[LocalHyperdrive]:
+def init_hyperdrive(deployment_cache_dir: Path) -> Iterator[LocalHyperdrive]:
     """Local hyperdrive pool test fixture.
     This fixture launches a hyperdrive pool from scratch in a session scope.
 
+    Arguments
+    ---------
+    deployment_cache_dir: Path
+        Session scoped deployment cache directory.
+
     Yield
     -----
     LocalHyperdrive
@@ -72,7 +78,7 @@ def init_hyperdrive() -> Iterator[LocalHyperdrive]:
     # Need to launch seperate chain with different port here since
     # the pool itself is going to snapshot.
     # This avoids collisions with the chain fixture.
-    _chain = launch_chain(50000)
+    _chain = launch_chain(50000, deployment_cache_dir=deployment_cache_dir)
     yield launch_hyperdrive(_chain)
     _chain.cleanup()
     del _chain
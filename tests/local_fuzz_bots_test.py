@@ -50,3 +50,30 @@ class TestLocalFuzzBots:
             num_iterations=1,
             lp_share_price_test=True,
         )
+
+        # Run with agents trading concurrently
+        run_fuzz_bots(
+            fast_hyperdrive_fixture.chain,
+            fast_hyperdrive_fixture,
+            check_invariance=True,
+            raise_error_on_failed_invariance_checks=False,
+            raise_error_on_crash=False,
+            log_to_rollbar=False,
+            run_async=True,
+            random_advance_time=True,
+            random_variable_rate=True,
+            num_iterations=2,
+            lp_share_price_test=False,
+        )
+
+        # The lp share price test requires all trades to be in the same block
+        with pytest.raises(ValueError):
+            run_fuzz_bots(
+                fast_hyperdrive_fixture.chain,
+                fast_hyperdrive_fixture,
+                check_invariance=True,
+                log_to_rollbar=False,
+                run_async=True,
+                num_iterations=1,
+                lp_share_price_test=True,
+            )